@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+Route registry for the SHOTLIST API servers
+Maps (method, path) to handler methods with path parameters, per-route
+middleware, automatic 404/405 responses and per-route timing
+"""
+
+import io
+import re
+import json
+import time
+import sqlite3
+import threading
+from urllib.parse import urlparse, parse_qs
+
+from data_versions import get_versions, compute_etag, matching_etag
+from response_cache import response_cache, response_key
+from single_flight import flights
+
+_PARAM_PATTERN = re.compile(r'{(\w+)}')
+
+
+class RouteContext:
+    """Per-request values a route's middleware and handler can draw on"""
+
+    def __init__(self, method, path, params, path_params):
+        self.method = method
+        self.path = path
+        self.params = params
+        self.path_params = path_params
+        self.user_id = None
+        self.body = None
+        self.data_versions = None
+        self.on_finish = []  # called with failed=True/False once the request is done
+
+
+class Route:
+    """One registered endpoint plus its timing counters
+
+    args names the RouteContext attributes passed positionally to the
+    handler (e.g. ('params', 'user_id')); path parameters are passed as
+    keyword arguments. upstream marks handlers that wait on third-party
+    APIs so serving engines can schedule them separately. stream_body
+    hands the handler the connection's rfile, bounded to Content-Length,
+    instead of the body read into memory; whatever it leaves unread is
+    discarded after it returns.
+    """
+
+    def __init__(self, method, pattern, handler, args=(), middleware=(), upstream=False, stream_body=False):
+        self.method = method
+        self.pattern = pattern
+        self.handler = handler
+        self.args = tuple(args)
+        self.middleware = tuple(middleware)
+        self.upstream = upstream
+        self.stream_body = stream_body
+
+        self.calls = 0
+        self.errors = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    def record(self, elapsed, failed):
+        self.calls += 1
+        self.total_time += elapsed
+        if elapsed > self.max_time:
+            self.max_time = elapsed
+        if failed:
+            self.errors += 1
+
+    def stats(self):
+        return {
+            'method': self.method,
+            'path': self.pattern,
+            'calls': self.calls,
+            'errors': self.errors,
+            'avg_ms': round(self.total_time / self.calls * 1000, 3) if self.calls else 0,
+            'max_ms': round(self.max_time * 1000, 3),
+            'total_ms': round(self.total_time * 1000, 3)
+        }
+
+
+class BoundedReader:
+    """The next length bytes of a connection's rfile, read on demand"""
+
+    def __init__(self, rfile, length):
+        self._rfile = rfile
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self._rfile.read(size) if size else b''
+        # A short read means the client went away
+        self.remaining = self.remaining - len(data) if len(data) == size else 0
+        return data
+
+    def discard(self, read_size=64 * 1024):
+        """Skip whatever the handler left unread"""
+        while self.remaining:
+            self.read(read_size)
+
+
+class Router:
+    """(method, path) -> Route registry
+
+    Static paths resolve with a single dict lookup. Patterns containing
+    {name} segments are matched in registration order only when no static
+    route exists for the path.
+    """
+
+    def __init__(self):
+        self._static = {}    # (method, path) -> Route
+        self._methods = {}   # path -> [methods] for 405 responses
+        self._dynamic = []   # (compiled pattern, Route)
+        self._lock = threading.Lock()
+
+    def add(self, method, pattern, handler, args=(), middleware=(), upstream=False, stream_body=False):
+        """Register handler for method + pattern"""
+        route = Route(method, pattern, handler, args, middleware, upstream, stream_body)
+
+        if _PARAM_PATTERN.search(pattern):
+            regex = '^' + _PARAM_PATTERN.sub(r'(?P<\1>[^/]+)', pattern) + '$'
+            self._dynamic.append((re.compile(regex), route))
+        else:
+            if (method, pattern) in self._static:
+                raise ValueError(f"Route already registered: {method} {pattern}")
+            self._static[(method, pattern)] = route
+            self._methods.setdefault(pattern, []).append(method)
+        return route
+
+    def route(self, method, pattern, args=(), middleware=(), upstream=False, stream_body=False):
+        """Decorator form of add()"""
+        def decorator(handler):
+            self.add(method, pattern, handler, args, middleware, upstream, stream_body)
+            return handler
+        return decorator
+
+    def resolve(self, method, path):
+        """Find the route for a request
+
+        Returns (route, path_params, allowed_methods); route is None when
+        nothing matches, and allowed_methods is non-empty when the path
+        exists under other methods.
+        """
+        route = self._static.get((method, path))
+        if route is not None:
+            return route, {}, ()
+
+        allowed = list(self._methods.get(path, ()))
+        for regex, candidate in self._dynamic:
+            match = regex.match(path)
+            if match:
+                if candidate.method == method:
+                    return candidate, match.groupdict(), ()
+                allowed.append(candidate.method)
+        return None, {}, tuple(allowed)
+
+    def dispatch(self, handler, method):
+        """Route handler's current request to the registered endpoint"""
+        parsed_path = urlparse(handler.path)
+        path = parsed_path.path
+
+        # Consume the whole request body up front, or after a streaming
+        # route's handler. Handlers that ignore it (or reject the request
+        # early) would otherwise leave bytes behind that the next request
+        # on a keep-alive connection is parsed from.
+        connection_rfile = handler.rfile
+        try:
+            content_length = int(handler.headers.get('Content-Length') or 0)
+        except ValueError:
+            content_length = -1
+        if content_length < 0 or 'Transfer-Encoding' in handler.headers:
+            handler.close_connection = True
+            handler._send_json({'error': 'Unsupported request body framing'}, 400, headers={'Connection': 'close'})
+            return
+
+        route, path_params, allowed = self.resolve(method, path)
+        if route is not None and route.stream_body:
+            handler.rfile = BoundedReader(connection_rfile, content_length)
+        else:
+            handler.rfile = io.BytesIO(connection_rfile.read(content_length) if content_length else b'')
+
+        try:
+            if route is None:
+                if allowed:
+                    handler._send_json({'error': 'Method not allowed'}, 405, headers={
+                        'Allow': ', '.join(sorted(set(allowed + ('OPTIONS',))))
+                    })
+                else:
+                    handler._send_json({'error': 'Endpoint not found'}, 404)
+                return
+
+            context = RouteContext(method, path, parse_qs(parsed_path.query), path_params)
+            handler.route_context = context
+            handler.response_etag = None
+            handler.response_capture = None
+
+            started = time.perf_counter()
+            failed = True
+            try:
+                for middleware in route.middleware:
+                    if not middleware(handler, context):
+                        failed = False
+                        return
+                route.handler(handler, *[getattr(context, name) for name in route.args], **path_params)
+                failed = False
+            finally:
+                for callback in context.on_finish:
+                    callback(failed)
+                elapsed = time.perf_counter() - started
+                with self._lock:
+                    route.record(elapsed, failed)
+        finally:
+            if isinstance(handler.rfile, BoundedReader) and not handler.close_connection:
+                handler.rfile.discard()
+            handler.rfile = connection_rfile
+
+    def routes(self):
+        """All registered routes"""
+        return list(self._static.values()) + [route for _, route in self._dynamic]
+
+    def stats(self):
+        """Timing counters for every route that has been called"""
+        return [route.stats() for route in self.routes() if route.calls]
+
+
+# ==================== MIDDLEWARE ====================
+# A middleware receives (handler, context) and returns True to continue.
+# Returning False means it has already written the response.
+
+def require_session(handler, context):
+    """Resolve X-Session-ID to context.user_id or answer 401"""
+    user_id = handler.authenticate_request()
+    if not user_id:
+        handler._send_json({'error': 'Unauthorized', 'message': 'Please login first'}, 401)
+        return False
+    context.user_id = user_id
+    return True
+
+
+def json_body(handler, context):
+    """Parse the JSON request body into context.body or answer 400"""
+    content_length = int(handler.headers.get('Content-Length', 0))
+    if content_length == 0:
+        handler._send_json({'success': False, 'message': 'No data'}, 400)
+        return False
+
+    try:
+        context.body = json.loads(handler.rfile.read(content_length).decode('utf-8'))
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        handler._send_json({'success': False, 'message': f'Invalid JSON: {e}'}, 400)
+        return False
+    return True
+
+
+def conditional_get(*tables):
+    """Middleware factory: answer 304 while the tables behind a route are unchanged
+
+    The ETag covers the data versions of tables, the path, the query and
+    the requesting user. Routes whose tables aren't tracked are served
+    normally, without an ETag.
+    """
+    def middleware(handler, context):
+        conn = handler.get_db_connection()
+        try:
+            versions = get_versions(conn, tables)
+        except sqlite3.OperationalError:
+            return True
+        finally:
+            conn.close()
+        if None in versions:
+            return True
+
+        context.data_versions = versions
+        etag = compute_etag(context.path, context.params, context.user_id, versions)
+        matched = matching_etag(handler.headers.get('If-None-Match'), etag)
+        if matched:
+            handler._send_not_modified(matched)
+            return False
+        handler.response_etag = etag
+        return True
+    return middleware
+
+
+def cached(*tables):
+    """Middleware factory: serve the route from response_cache while tables are unchanged
+
+    Misses run the handler with its output captured; a single 200 response
+    is stored under the request's query and user. Routes whose tables
+    aren't version-tracked are never cached. Place after conditional_get
+    to reuse the versions it read.
+    """
+    def middleware(handler, context):
+        versions = context.data_versions
+        if versions is None:
+            conn = handler.get_db_connection()
+            try:
+                versions = get_versions(conn, tables)
+            except sqlite3.OperationalError:
+                return True
+            finally:
+                conn.close()
+        if None in versions:
+            return True
+
+        key = response_key(context.path, context.params, context.user_id)
+        entry = response_cache.get(key, versions)
+        if entry is not None:
+            status, content_type, body = entry
+            handler._send_body(body, status, content_type, cache_key=('response', key, versions))
+            return False
+
+        capture = handler.response_capture = []
+
+        def store(failed):
+            if not failed and len(capture) == 1 and capture[0][0] == 200:
+                response_cache.put(key, tables, versions, *capture[0])
+
+        context.on_finish.append(store)
+        return True
+    return middleware
+
+
+def coalesce(handler, context):
+    """Share one execution among concurrent identical requests
+
+    The first request for a key runs the handler; identical requests that
+    arrive while it is running wait and are answered with its captured
+    response. Place last in the chain so only requests that would really
+    execute the handler take part.
+    """
+    key = (context.method, response_key(context.path, context.params, context.user_id), context.data_versions)
+    call, leader = flights.begin(key)
+    if not leader:
+        result = flights.wait(call)
+        if result is None:
+            return True
+        status, content_type, body = result
+        handler._send_body(body, status, content_type)
+        return False
+
+    if handler.response_capture is None:
+        handler.response_capture = []
+    capture = handler.response_capture
+
+    def publish(failed):
+        ok = not failed and len(capture) == 1 and capture[0][0] == 200
+        flights.finish(key, capture[0] if ok else None)
+
+    context.on_finish.append(publish)
+    return True
+
+
+def versioned(*tables):
+    """ETag revalidation, response caching and coalescing for a read-only route over tables"""
+    return (conditional_get(*tables), cached(*tables), coalesce)
@@ -18,6 +18,30 @@ from urllib.parse import urlparse, parse_qs, urlencode
 from datetime import datetime, timedelta
 import jwt # Added for Apple OAuth
 import logging
+import argparse
+from concurrent_server import (
+    make_server, PreforkSupervisor,
+    DEFAULT_THREADS, DEFAULT_QUEUE_SIZE, DEFAULT_WORKERS, KeepAliveTimeoutMixin, ResponseMixin
+)
+from async_server import AsyncHTTPServer
+from compression import variant_cache
+from api_router import Router, versioned
+from data_versions import tracked_tables
+from response_cache import response_cache
+import dashboard_queries
+import campaign_listing
+import columnar_cache
+import downsampling
+import period_comparison
+import time_buckets
+from dashboard_queries import Scope
+from single_flight import flights
+import db_pool
+import db_config
+import migrations
+import social_monthly
+import bulk_ingest
+import write_batcher
 # Note: Notion API integration uses requests library (already imported)
 
 # Import social media integration
@@ -298,135 +322,57 @@ def create_or_update_user(conn, email, full_name, provider):
 
 DATABASE = 'shotlist_analytics.db'
 
-class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
+class CampaignAnalyticsAPI(KeepAliveTimeoutMixin, ResponseMixin, BaseHTTPRequestHandler):
     """API Handler for Campaign Analytics"""
 
-    def _set_headers(self, status=200, content_type='application/json'):
-        """Set HTTP headers"""
-        self.send_response(status)
-        self.send_header('Content-type', content_type)
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-        self.end_headers()
+    # Persistent connections: every response carries Content-Length, and an
+    # idle keep-alive connection is dropped after `idle_timeout` seconds
+    protocol_version = 'HTTP/1.1'
 
     def do_OPTIONS(self):
         """Handle OPTIONS request for CORS"""
-        self._set_headers()
+        self._send_body(b'')
 
     def do_GET(self):
         """Handle GET requests"""
-        parsed_path = urlparse(self.path)
-        path = parsed_path.path
-        query_params = parse_qs(parsed_path.query)
-
-        if path == '/':
-            self.serve_index()
-        elif path == '/api/health':
-            self.health_check()
-        elif path == '/api/campaigns':
-            self.get_campaigns()
-        elif path == '/api/kpis':
-            self.get_kpis()
-        elif path == '/api/social-media':
-            self.get_social_media()
-        elif path == '/api/seo-metrics':
-            self.get_seo_metrics()
-        elif path == '/api/roi-trend':
-            self.get_roi_trend()
-        elif path == '/api/revenue-cost':
-            self.get_revenue_cost()
-        elif path == '/api/social-media/accounts':
-            self.get_social_media_accounts(query_params)
-        elif path == '/api/social-media/settings':
-            self.get_social_media_settings(query_params)
-        elif path == '/api/social-media/audit':
-            self.get_social_media_audit(query_params)
-        elif path == '/api/social-media/metrics/daily':
-            self.get_daily_metrics(query_params)
-        elif path == '/api/social-media/metrics/summary':
-            self.get_performance_summary()
-        elif path == '/api/social-media/metrics/content':
-            self.get_top_content(query_params)
-        elif path == '/api/social-media/metrics/audience':
-            self.get_audience_insights(query_params)
-        elif path == '/api/figma/import':
-            self.figma_import(query_params)
-        elif path == '/api/figma/import-all':
-            self.figma_import_all()
-        elif path == '/export-data':
-            self.export_data()
-        elif SOCIAL_MEDIA_AVAILABLE and path == '/api/social/accounts':
-            self.get_social_accounts(query_params)
-        elif SOCIAL_MEDIA_AVAILABLE and path == '/api/social/metrics':
-            self.get_social_metrics(query_params)
-        elif SOCIAL_MEDIA_AVAILABLE and path == '/api/social/dashboard':
-            self.get_social_dashboard(query_params)
-        elif SOCIAL_MEDIA_AVAILABLE and path == '/api/social/top-content':
-            self.get_top_social_content(query_params)
-        else:
-            self.send_error(404, 'File not found')
+        self.router.dispatch(self, 'GET')
 
     def do_POST(self):
         """Handle POST requests"""
-        parsed_path = urlparse(self.path)
-        path = parsed_path.path
-        query_params = parse_qs(parsed_path.query)
-
-        # Route handling for POST requests
-        if path == '/api/social-login':
-            self.handle_social_login()
-        elif path == '/api/login':
-            self.handle_login()
-        elif path == '/api/change-password':
-            self.handle_change_password()
-        elif path == '/api/social-media/account':
-            self.add_social_media_account()
-        elif path == '/api/social-media/settings':
-            self.update_social_media_settings()
-        elif path == '/api/social-media/disconnect':
-            self.disconnect_social_media_account()
-        elif path == '/api/social-media/metrics/daily':
-            self.add_daily_metrics()
-        elif path == '/api/social-media/metrics/performance':
-            self.get_performance_summary()
-        elif path == '/api/social-media/metrics/content':
-            self.record_content_performance()
-        elif path == '/api/social-media/metrics/audience':
-            self.record_audience_demographics()
-        elif path == '/api/social-media/metrics/roi':
-            self.calculate_campaign_roi()
-        elif path == '/api/figma/export':
-            self.figma_export()
-        elif path == '/api/figma/sync-config':
-            self.figma_save_config()
-        elif SOCIAL_MEDIA_AVAILABLE and path == '/api/social/connect':
-            self.connect_social_account()
-        elif SOCIAL_MEDIA_AVAILABLE and path == '/api/social/sync':
-            self.sync_social_metrics(query_params)
-        elif SOCIAL_MEDIA_AVAILABLE and path == '/api/social/disconnect':
-            self.disconnect_social_account()
-        # Ads Platforms endpoints
-        elif path == '/api/ads-platforms/connect':
-            self.connect_ads_platform()
-        elif path == '/api/ads-platforms/status':
-            self.get_ads_platforms_status()
-        elif path == '/api/ads-platforms/disconnect':
-            self.disconnect_ads_platform()
-        # Notion endpoints
-        elif path == '/api/notion/connect':
-            self.connect_notion()
-        elif path == '/api/notion/test':
-            self.test_notion_connection()
-        elif path == '/api/notion/config':
-            self.get_notion_config()
-        elif path == '/api/notion/events':
-            self.get_notion_events()
-        elif path == '/api/notion/sync-event':
-            self.sync_event_to_notion()
-        else:
-            self._set_headers(404)
-            self.wfile.write(json.dumps({'error': 'Endpoint not found'}).encode())
+        self.router.dispatch(self, 'POST')
+
+    def get_route_metrics(self):
+        """Per-route call counts and timings"""
+        self._send_json({
+            'success': True,
+            'routes': self.router.stats()
+        })
+
+    def get_cache_metrics(self):
+        """Response cache, compression cache and coalescing usage"""
+        self._send_json({
+            'success': True,
+            'responses': response_cache.stats(),
+            'compressed_variants': variant_cache.stats(),
+            'single_flight': flights.stats()
+        })
+
+    def get_db_metrics(self):
+        """Connection pool usage, journal mode, WAL checkpointing, write batching, monthly aggregation and the columnar cache"""
+        conn = self.get_db_connection()
+        storage = db_config.storage_stats(conn, DATABASE)
+        conn.close()
+        aggregator = social_monthly.aggregator
+        batcher = write_batcher.batcher
+        cache = columnar_cache.active()
+        self._send_json({
+            'success': True,
+            'pool': db_pool.pool.stats(),
+            'storage': storage,
+            'write_batcher': batcher.stats() if batcher is not None else None,
+            'social_monthly': aggregator.stats() if aggregator is not None else None,
+            'columnar_cache': cache.stats() if cache is not None else None
+        })
 
     def save_social_media_config(self):
         """Save social media configuration"""
@@ -442,17 +388,6 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             conn = self.get_db_connection()
             cursor = conn.cursor()
 
-            # Create a table for social media configuration if it doesn't exist
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS social_media_config (
-                    platform TEXT PRIMARY KEY,
-                    access_token TEXT,
-                    track_impressions INTEGER,
-                    track_engagement INTEGER,
-                    track_followers INTEGER
-                )
-            ''')
-
             # Upsert configuration for each platform
             platforms = ['instagram', 'facebook', 'linkedin', 'tiktok']
             for platform in platforms:
@@ -473,405 +408,151 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             conn.close()
 
             # Send success response
-            self._set_headers()
-            self.wfile.write(json.dumps({
+            self._send_json({
                 'success': True, 
                 'message': 'Social media configuration saved successfully'
-            }).encode())
+            })
 
         except Exception as e:
             # Send error response
-            self._set_headers(500)
-            self.wfile.write(json.dumps({
+            self._send_json({
                 'success': False, 
                 'error': str(e)
-            }).encode())
+            }, 500)
 
     def get_db_connection(self):
-        """Create database connection"""
-        conn = sqlite3.connect(DATABASE)
-        conn.row_factory = sqlite3.Row
-        return conn
+        """Pooled database connection for this thread; close() hands it back"""
+        return db_pool.connect(DATABASE)
 
     def get_campaigns(self, params):
         """Get list of campaigns"""
         try:
             conn = self.get_db_connection()
             cursor = conn.cursor()
-
-            campaign_type = params.get('type', ['all'])[0]
-            status = params.get('status', ['all'])[0]
-
-            query = 'SELECT * FROM campaigns WHERE 1=1'
-            query_params = []
-
-            if campaign_type != 'all':
-                query += ' AND campaign_type = ?'
-                query_params.append(campaign_type)
-
-            if status != 'all':
-                query += ' AND status = ?'
-                query_params.append(status)
-
-            query += ' ORDER BY created_at DESC'
-
-            cursor.execute(query, query_params)
-            rows = cursor.fetchall()
-
-            campaigns = []
-            for row in rows:
-                # Get total spent from ROI metrics
-                cursor.execute('''
-                    SELECT SUM(cost) as total_spent, SUM(revenue) as total_revenue
-                    FROM roi_metrics WHERE campaign_id = ?
-                ''', (row['campaign_id'],))
-                metrics = cursor.fetchone()
-
-                total_spent = metrics['total_spent'] or 0
-                total_revenue = metrics['total_revenue'] or 0
-                roi = ((total_revenue - total_spent) / total_spent * 100) if total_spent > 0 else 0
-
-                campaigns.append({
-                    'campaign_id': row['campaign_id'],
-                    'campaign_name': row['campaign_name'],
-                    'client_name': row['client_name'],
-                    'campaign_type': row['campaign_type'],
-                    'start_date': row['start_date'],
-                    'end_date': row['end_date'],
-                    'budget': row['budget'],
-                    'spent': round(total_spent, 2),
-                    'revenue': round(total_revenue, 2),
-                    'roi': round(roi, 2),
-                    'status': row['status']
-                })
-
+            page = campaign_listing.list_campaigns(cursor, params, Scope())
             conn.close()
 
-            self._set_headers()
-            self.wfile.write(json.dumps({'campaigns': campaigns}).encode())
+            self._send_json(page)
 
+        except campaign_listing.ListingError as e:
+            conn.close()
+            self._send_json({'error': str(e)}, 400)
         except Exception as e:
-            self._set_headers(500)
-            self.wfile.write(json.dumps({'error': str(e)}).encode())
+            self._send_json({'error': str(e)}, 500)
 
     def get_kpis(self, params):
         """Get overall KPI metrics"""
         try:
             conn = self.get_db_connection()
             cursor = conn.cursor()
-
-            days = int(params.get('days', ['30'])[0])
-            campaign_id = params.get('campaign_id', ['all'])[0]
-
-            date_filter = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
-
-            # Build campaign filter
-            campaign_filter = ''
-            campaign_params = [date_filter]
-            if campaign_id != 'all':
-                campaign_filter = ' AND campaign_id = ?'
-                campaign_params.append(campaign_id)
-
-            # Get ROI metrics
-            cursor.execute(f'''
-                SELECT
-                    SUM(revenue) as total_revenue,
-                    SUM(cost) as total_cost,
-                    SUM(conversions) as total_conversions,
-                    AVG(roi_percentage) as avg_roi,
-                    AVG(roas) as avg_roas
-                FROM roi_metrics
-                WHERE date >= ?{campaign_filter}
-            ''', campaign_params)
-
-            current_metrics = cursor.fetchone()
-
-            # Get previous period for comparison
-            prev_date_start = (datetime.now() - timedelta(days=days*2)).strftime('%Y-%m-%d')
-            prev_date_end = date_filter
-
-            cursor.execute(f'''
-                SELECT
-                    SUM(revenue) as total_revenue,
-                    SUM(cost) as total_cost,
-                    SUM(conversions) as total_conversions,
-                    AVG(roi_percentage) as avg_roi,
-                    AVG(roas) as avg_roas
-                FROM roi_metrics
-                WHERE date >= ? AND date < ?{campaign_filter}
-            ''', [prev_date_start, prev_date_end] + ([campaign_id] if campaign_id != 'all' else []))
-
-            prev_metrics = cursor.fetchone()
-
-            # Calculate changes
-            def calc_change(current, previous):
-                if previous and previous > 0:
-                    return round(((current - previous) / previous) * 100, 2)
-                return 0
-
-            total_revenue = current_metrics['total_revenue'] or 0
-            total_cost = current_metrics['total_cost'] or 0
-            total_conversions = current_metrics['total_conversions'] or 0
-            avg_roi = current_metrics['avg_roi'] or 0
-            avg_roas = current_metrics['avg_roas'] or 0
-
-            prev_revenue = prev_metrics['total_revenue'] or 0
-            prev_conversions = prev_metrics['total_conversions'] or 0
-            prev_roi = prev_metrics['avg_roi'] or 0
-            prev_roas = prev_metrics['avg_roas'] or 0
-
-            kpis = {
-                'roi': {
-                    'value': round(avg_roi, 2),
-                    'change': calc_change(avg_roi, prev_roi)
-                },
-                'revenue': {
-                    'value': round(total_revenue, 2),
-                    'change': calc_change(total_revenue, prev_revenue)
-                },
-                'conversions': {
-                    'value': int(total_conversions),
-                    'change': calc_change(total_conversions, prev_conversions)
-                },
-                'roas': {
-                    'value': round(avg_roas, 2),
-                    'change': calc_change(avg_roas, prev_roas)
-                }
-            }
-
+            kpis = dashboard_queries.kpis(cursor, params, Scope())
             conn.close()
 
-            self._set_headers()
-            self.wfile.write(json.dumps({'kpis': kpis}).encode())
+            self._send_json({'kpis': kpis})
 
+        except period_comparison.ComparisonError as e:
+            conn.close()
+            self._send_json({'error': str(e)}, 400)
         except Exception as e:
-            self._set_headers(500)
-            self.wfile.write(json.dumps({'error': str(e)}).encode())
+            self._send_json({'error': str(e)}, 500)
 
     def get_roi_trend(self, params):
         """Get ROI trend data for chart"""
         try:
             conn = self.get_db_connection()
             cursor = conn.cursor()
-
-            days = int(params.get('days', ['30'])[0])
-            campaign_id = params.get('campaign_id', ['all'])[0]
-
-            date_filter = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
-
-            campaign_filter = ''
-            query_params = [date_filter]
-            if campaign_id != 'all':
-                campaign_filter = ' AND campaign_id = ?'
-                query_params.append(campaign_id)
-
-            cursor.execute(f'''
-                SELECT
-                    date,
-                    AVG(roi_percentage) as roi
-                FROM roi_metrics
-                WHERE date >= ?{campaign_filter}
-                GROUP BY date
-                ORDER BY date
-            ''', query_params)
-
-            rows = cursor.fetchall()
-
-            trend = {
-                'labels': [row['date'] for row in rows],
-                'data': [round(row['roi'], 2) for row in rows]
-            }
-
+            trend = dashboard_queries.roi_trend(cursor, params, Scope())
             conn.close()
 
-            self._set_headers()
-            self.wfile.write(json.dumps({'trend': trend}).encode())
+            self._send_json({'trend': trend})
 
+        except (time_buckets.BucketError, downsampling.DownsampleError) as e:
+            conn.close()
+            self._send_json({'error': str(e)}, 400)
         except Exception as e:
-            self._set_headers(500)
-            self.wfile.write(json.dumps({'error': str(e)}).encode())
+            self._send_json({'error': str(e)}, 500)
 
     def get_revenue_cost(self, params):
         """Get revenue vs cost data for chart"""
         try:
             conn = self.get_db_connection()
             cursor = conn.cursor()
-
-            days = int(params.get('days', ['30'])[0])
-            campaign_id = params.get('campaign_id', ['all'])[0]
-
-            date_filter = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
-
-            campaign_filter = ''
-            query_params = [date_filter]
-            if campaign_id != 'all':
-                campaign_filter = ' AND campaign_id = ?'
-                query_params.append(campaign_id)
-
-            cursor.execute(f'''
-                SELECT
-                    date,
-                    SUM(revenue) as revenue,
-                    SUM(cost) as cost
-                FROM roi_metrics
-                WHERE date >= ?{campaign_filter}
-                GROUP BY date
-                ORDER BY date
-            ''', query_params)
-
-            rows = cursor.fetchall()
-
-            data = {
-                'labels': [row['date'] for row in rows],
-                'revenue': [round(row['revenue'], 2) for row in rows],
-                'cost': [round(row['cost'], 2) for row in rows]
-            }
-
+            data = dashboard_queries.revenue_cost(cursor, params, Scope())
             conn.close()
 
-            self._set_headers()
-            self.wfile.write(json.dumps({'data': data}).encode())
+            self._send_json({'data': data})
 
+        except (time_buckets.BucketError, downsampling.DownsampleError) as e:
+            conn.close()
+            self._send_json({'error': str(e)}, 400)
         except Exception as e:
-            self._set_headers(500)
-            self.wfile.write(json.dumps({'error': str(e)}).encode())
+            self._send_json({'error': str(e)}, 500)
 
     def get_social_media(self, params):
         """Get social media metrics by platform"""
         try:
             conn = self.get_db_connection()
             cursor = conn.cursor()
+            platforms = dashboard_queries.social_platforms(
+                cursor, params, Scope(), self._social_tracking_config(cursor)
+            )
+            conn.close()
 
-            # First, check tracking configuration
-            cursor.execute('SELECT * FROM social_media_config')
-            tracking_config = {row['platform']: {
-                'track_impressions': bool(row['track_impressions']),
-                'track_engagement': bool(row['track_engagement']),
-                'track_followers': bool(row['track_followers'])
-            } for row in cursor.fetchall()}
-
-            # Existing social media metrics retrieval
-            days = int(params.get('days', ['30'])[0])
-            campaign_id = params.get('campaign_id', ['all'])[0]
-
-            date_filter = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
-
-            campaign_filter = ''
-            query_params = [date_filter]
-            if campaign_id != 'all':
-                campaign_filter = ' AND campaign_id = ?'
-                query_params.append(campaign_id)
-
-            cursor.execute(f'''
-                SELECT
-                    platform,
-                    SUM(impressions) as impressions,
-                    SUM(engagement) as engagement,
-                    SUM(reach) as reach,
-                    SUM(followers_gained) as followers,
-                    SUM(clicks) as clicks
-                FROM social_media_metrics
-                WHERE date >= ?{campaign_filter}
-                GROUP BY platform
-            ''', query_params)
-
-            rows = cursor.fetchall()
-
-            platforms = {}
-            for row in rows:
-                platform = row['platform']
-                # Only include metrics for platforms with tracking enabled
-                if tracking_config.get(platform, {}).get('track_impressions', True):
-                    platforms[platform] = {
-                        'impressions': row['impressions'] if tracking_config[platform].get('track_impressions', True) else 0,
-                        'engagement': row['engagement'] if tracking_config[platform].get('track_engagement', True) else 0,
-                        'reach': row['reach'] if tracking_config[platform].get('track_impressions', True) else 0,
-                        'followers': row['followers'] if tracking_config[platform].get('track_followers', True) else 0,
-                        'clicks': row['clicks'] if tracking_config[platform].get('track_engagement', True) else 0
-                    }
+            self._send_json({'platforms': platforms})
 
+        except Exception as e:
+            self._send_json({'error': str(e)}, 500)
+
+    def _social_tracking_config(self, cursor):
+        """Per-platform tracking switches from social_media_config"""
+        cursor.execute('SELECT * FROM social_media_config')
+        return {row['platform']: {
+            'track_impressions': bool(row['track_impressions']),
+            'track_engagement': bool(row['track_engagement']),
+            'track_followers': bool(row['track_followers'])
+        } for row in cursor.fetchall()}
+
+    def get_dashboard(self, params):
+        """All dashboard widgets in one response"""
+        try:
+            conn = self.get_db_connection()
+            cursor = conn.cursor()
+            widgets = dashboard_queries.dashboard(
+                cursor, params, Scope(),
+                load_tracking_config=lambda: self._social_tracking_config(cursor)
+            )
             conn.close()
 
-            self._set_headers()
-            self.wfile.write(json.dumps({'platforms': platforms}).encode())
+            self._send_json(widgets)
 
         except Exception as e:
-            self._set_headers(500)
-            self.wfile.write(json.dumps({'error': str(e)}).encode())
+            self._send_json({'error': str(e)}, 500)
 
     def get_seo_metrics(self, params):
         """Get SEO performance metrics"""
         try:
             conn = self.get_db_connection()
             cursor = conn.cursor()
-
-            days = int(params.get('days', ['30'])[0])
-            date_filter = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
-
-            cursor.execute('''
-                SELECT
-                    SUM(organic_traffic) as traffic,
-                    AVG(keyword_rankings) as keywords,
-                    SUM(backlinks) as backlinks,
-                    AVG(domain_authority) as domain_authority
-                FROM seo_metrics
-                WHERE date >= ?
-            ''', (date_filter,))
-
-            current = cursor.fetchone()
-
-            # Get previous period
-            prev_date_start = (datetime.now() - timedelta(days=days*2)).strftime('%Y-%m-%d')
-            cursor.execute('''
-                SELECT
-                    SUM(organic_traffic) as traffic,
-                    AVG(keyword_rankings) as keywords,
-                    SUM(backlinks) as backlinks
-                FROM seo_metrics
-                WHERE date >= ? AND date < ?
-            ''', (prev_date_start, date_filter))
-
-            prev = cursor.fetchone()
-
-            def calc_change(current, previous):
-                if previous and previous > 0:
-                    return round(((current - previous) / previous) * 100, 2)
-                return 0
-
-            metrics = {
-                'organic_traffic': {
-                    'value': int(current['traffic'] or 0),
-                    'change': calc_change(current['traffic'] or 0, prev['traffic'] or 0)
-                },
-                'keyword_rankings': {
-                    'value': int(current['keywords'] or 0),
-                    'change': int((current['keywords'] or 0) - (prev['keywords'] or 0))
-                },
-                'backlinks': {
-                    'value': int(current['backlinks'] or 0),
-                    'change': int((current['backlinks'] or 0) - (prev['backlinks'] or 0))
-                },
-                'domain_authority': {
-                    'value': int(current['domain_authority'] or 0),
-                    'change': 0
-                }
-            }
-
+            metrics = dashboard_queries.seo_metrics(cursor, params, Scope())
             conn.close()
 
-            self._set_headers()
-            self.wfile.write(json.dumps({'metrics': metrics}).encode())
+            self._send_json({'metrics': metrics})
 
+        except period_comparison.ComparisonError as e:
+            conn.close()
+            self._send_json({'error': str(e)}, 400)
         except Exception as e:
-            self._set_headers(500)
-            self.wfile.write(json.dumps({'error': str(e)}).encode())
+            self._send_json({'error': str(e)}, 500)
 
     def export_data(self, params):
         """Export campaign data as CSV"""
+        conn = None
         try:
             conn = self.get_db_connection()
             cursor = conn.cursor()
 
+            # campaign_id breaks name ties so rows come straight off the
+            # campaign name and roi (campaign_id, date) indexes, unsorted
             cursor.execute('''
                 SELECT
                     c.campaign_name,
@@ -886,28 +567,35 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
                     r.roi_percentage
                 FROM campaigns c
                 LEFT JOIN roi_metrics r ON c.campaign_id = r.campaign_id
-                ORDER BY c.campaign_name, r.date
+                ORDER BY c.campaign_name, c.campaign_id, r.date
             ''')
+        except Exception as e:
+            if conn:
+                conn.close()
+            self._send_json({'error': str(e)}, 500)
+            return
 
-            rows = cursor.fetchall()
+        try:
+            self._send_stream(self._csv_chunks(cursor), content_type='text/csv', headers={
+                'Content-Disposition': 'attachment; filename=campaign_data.csv'
+            })
+        finally:
+            conn.close()
 
-            # Generate CSV
-            csv_data = 'Campaign,Client,Type,Budget,Status,Date,Revenue,Cost,Conversions,ROI\n'
+    def _csv_chunks(self, cursor, batch_size=500):
+        """Yield the export CSV a batch of rows at a time"""
+        yield b'Campaign,Client,Type,Budget,Status,Date,Revenue,Cost,Conversions,ROI\n'
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            csv_data = ''
             for row in rows:
                 csv_data += f"{row['campaign_name']},{row['client_name']},{row['campaign_type']},"
                 csv_data += f"{row['budget']},{row['status']},{row['date'] or ''},"
                 csv_data += f"{row['revenue'] or 0},{row['cost'] or 0},"
                 csv_data += f"{row['conversions'] or 0},{row['roi_percentage'] or 0}\n"
-
-            conn.close()
-
-            self._set_headers(content_type='text/csv')
-            self.send_header('Content-Disposition', 'attachment; filename=campaign_data.csv')
-            self.wfile.write(csv_data.encode())
-
-        except Exception as e:
-            self._set_headers(500)
-            self.wfile.write(json.dumps({'error': str(e)}).encode())
+            yield csv_data.encode()
 
     def handle_social_login(self):
         """Initiate social login process"""
@@ -920,11 +608,10 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             provider = data.get('provider', '').lower()
             
             if provider not in OAUTH_CONFIG:
-                self._set_headers(400)
-                self.wfile.write(json.dumps({
+                self._send_json({
                     'success': False, 
                     'message': f'Unsupported provider: {provider}'
-                }).encode())
+                }, 400)
                 return
             
             # Generate state token to prevent CSRF
@@ -933,13 +620,6 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             # Store state in session or database for verification
             conn = self.get_db_connection()
             cursor = conn.cursor()
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS oauth_states (
-                    state TEXT PRIMARY KEY,
-                    provider TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
             cursor.execute('INSERT OR REPLACE INTO oauth_states (state, provider) VALUES (?, ?)', (state, provider))
             conn.commit()
             conn.close()
@@ -961,18 +641,16 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             authorization_url = f"{config['authorization_url']}?{urlencode(params)}"
             
             # Return authorization URL
-            self._set_headers()
-            self.wfile.write(json.dumps({
+            self._send_json({
                 'success': True, 
                 'authorizationUrl': authorization_url
-            }).encode())
+            })
         
         except Exception as e:
-            self._set_headers(500)
-            self.wfile.write(json.dumps({
+            self._send_json({
                 'success': False, 
                 'message': str(e)
-            }).encode())
+            }, 500)
 
     def handle_login(self):
         """Handle traditional email/password login with comprehensive logging"""
@@ -988,12 +666,11 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             # Validate content length
             if content_length == 0:
                 logger.warning("Empty login request received")
-                self._set_headers(400)
-                self.wfile.write(json.dumps({
+                self._send_json({
                     'success': False, 
                     'message': 'No data received. Please provide login credentials.',
                     'error_code': 'EMPTY_REQUEST'
-                }).encode())
+                }, 400)
                 return
 
             # Read request body
@@ -1006,13 +683,12 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
                 logger.info(f"Parsed login data for email: {data.get('email', 'N/A')}")
             except json.JSONDecodeError as json_error:
                 logger.error(f"JSON decode error: {json_error}")
-                self._set_headers(400)
-                self.wfile.write(json.dumps({
+                self._send_json({
                     'success': False, 
                     'message': 'Invalid JSON format. Please check your request.',
                     'error_code': 'INVALID_JSON',
                     'details': str(json_error)
-                }).encode())
+                }, 400)
                 return
 
             # Extract and validate credentials
@@ -1022,22 +698,20 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             # Validate input
             if not email:
                 logger.warning("Login attempt with missing email")
-                self._set_headers(400)
-                self.wfile.write(json.dumps({
+                self._send_json({
                     'success': False, 
                     'message': 'Email is required.',
                     'error_code': 'MISSING_EMAIL'
-                }).encode())
+                }, 400)
                 return
 
             if not password:
                 logger.warning(f"Login attempt with missing password for email: {email}")
-                self._set_headers(400)
-                self.wfile.write(json.dumps({
+                self._send_json({
                     'success': False, 
                     'message': 'Password is required.',
                     'error_code': 'MISSING_PASSWORD'
-                }).encode())
+                }, 400)
                 return
 
             # Connect to database
@@ -1053,12 +727,11 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             
             if not user:
                 logger.warning(f"Login attempt for non-existent user: {email}")
-                self._set_headers(401)
-                self.wfile.write(json.dumps({
+                self._send_json({
                     'success': False, 
                     'message': 'User not found. Please check your email or sign up.',
                     'error_code': 'USER_NOT_FOUND'
-                }).encode())
+                }, 401)
                 return
             
             # Verify password (use secure password hashing in production)
@@ -1070,56 +743,51 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             if hashed_password != user['password']:
                 # Log failed login attempt
                 logger.warning(f"Failed login attempt for email: {email}")
-                cursor.execute('''
+                write_batcher.execute(DATABASE, '''
                     INSERT INTO login_attempts 
                     (email, attempt_time, success, ip_address) 
                     VALUES (?, CURRENT_TIMESTAMP, 0, ?)
-                ''', (email, self.client_address[0]))
-                conn.commit()
+                ''', (email, self.client_address[0]), wait=False)
 
-                self._set_headers(401)
-                self.wfile.write(json.dumps({
+                self._send_json({
                     'success': False, 
                     'message': 'Invalid password. Please try again.',
                     'error_code': 'INVALID_PASSWORD',
                     'remaining_attempts': 3
-                }).encode())
+                }, 401)
                 return
             
             # Check user account status
             if user['is_active'] == 0:
                 logger.warning(f"Login attempt for inactive account: {email}")
-                self._set_headers(403)
-                self.wfile.write(json.dumps({
+                self._send_json({
                     'success': False, 
                     'message': 'Account is inactive. Please contact support.',
                     'error_code': 'ACCOUNT_INACTIVE'
-                }).encode())
+                }, 403)
                 return
 
             # Generate session
             session_id = str(uuid.uuid4())
-            
-            # Store session
-            cursor.execute('''
-                INSERT INTO sessions (session_id, user_id, created_at, expires_at) 
-                VALUES (?, ?, CURRENT_TIMESTAMP, datetime('now', '+1 day'))
-            ''', (session_id, user['user_id']))
+            conn.close()
 
-            # Log successful login
+            # Store session and log successful login; the session must be
+            # committed before the client can use it
             logger.info(f"Successful login for user: {email}")
-            cursor.execute('''
-                INSERT INTO login_attempts 
-                (email, attempt_time, success, ip_address) 
-                VALUES (?, CURRENT_TIMESTAMP, 1, ?)
-            ''', (email, self.client_address[0]))
-            
-            conn.commit()
-            conn.close()
+            write_batcher.write(DATABASE, [
+                ('''
+                    INSERT INTO sessions (session_id, user_id, created_at, expires_at) 
+                    VALUES (?, ?, CURRENT_TIMESTAMP, datetime('now', '+1 day'))
+                ''', (session_id, user['user_id'])),
+                ('''
+                    INSERT INTO login_attempts 
+                    (email, attempt_time, success, ip_address) 
+                    VALUES (?, CURRENT_TIMESTAMP, 1, ?)
+                ''', (email, self.client_address[0])),
+            ])
             
             # Return success response
-            self._set_headers()
-            self.wfile.write(json.dumps({
+            self._send_json({
                 'success': True,
                 'session_id': session_id,
                 'user': {
@@ -1128,18 +796,25 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
                     'full_name': user['full_name'],
                     'role': user['role']
                 }
-            }).encode())
+            })
+
+        except write_batcher.WriteQueueFull as e:
+            logger.warning(f"Login rejected, write queue full: {e}")
+            self._send_json({
+                'success': False,
+                'message': 'Server is busy. Please try again.',
+                'error_code': 'SERVER_BUSY'
+            }, 503, headers={'Retry-After': '1'})
         
         except Exception as e:
             # Catch-all error handling with detailed logging
             logger.error(f"Unexpected login error: {e}", exc_info=True)
-            self._set_headers(500)
-            self.wfile.write(json.dumps({
+            self._send_json({
                 'success': False, 
                 'message': 'Internal server error. Please try again later.',
                 'error_code': 'INTERNAL_SERVER_ERROR',
                 'details': str(e)
-            }).encode())
+            }, 500)
 
     def health_check(self):
         """Provide a simple health check endpoint"""
@@ -1165,8 +840,7 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
                 'version': '1.0.0'
             }
 
-            self._set_headers()
-            self.wfile.write(json.dumps(health_data).encode())
+            self._send_json(health_data)
 
         except Exception as e:
             # Handle any errors during health check
@@ -1176,8 +850,7 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
                 'timestamp': datetime.now().isoformat()
             }
 
-            self._set_headers(500)
-            self.wfile.write(json.dumps(error_data).encode())
+            self._send_json(error_data, 500)
 
     def handle_change_password(self):
         """Handle password change request"""
@@ -1187,11 +860,10 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             
             if content_length == 0:
                 logger.warning("Empty password change request received")
-                self._set_headers(400)
-                self.wfile.write(json.dumps({
+                self._send_json({
                     'success': False,
                     'message': 'No data received'
-                }).encode())
+                }, 400)
                 return
 
             # Read and parse request body
@@ -1203,31 +875,28 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             
             # Validate input
             if not current_password or not new_password:
-                self._set_headers(400)
-                self.wfile.write(json.dumps({
+                self._send_json({
                     'success': False,
                     'message': 'Current password and new password are required'
-                }).encode())
+                }, 400)
                 return
             
             # Validate new password strength
             if len(new_password) < 8:
-                self._set_headers(400)
-                self.wfile.write(json.dumps({
+                self._send_json({
                     'success': False,
                     'message': 'New password must be at least 8 characters long'
-                }).encode())
+                }, 400)
                 return
             
             # Get session ID from headers
             session_id = self.headers.get('X-Session-ID')
             
             if not session_id:
-                self._set_headers(401)
-                self.wfile.write(json.dumps({
+                self._send_json({
                     'success': False,
                     'message': 'Not authenticated'
-                }).encode())
+                }, 401)
                 return
             
             # Connect to database
@@ -1245,11 +914,10 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             if not user:
                 conn.close()
                 logger.warning("Password change attempt with invalid session")
-                self._set_headers(401)
-                self.wfile.write(json.dumps({
+                self._send_json({
                     'success': False,
                     'message': 'Invalid or expired session'
-                }).encode())
+                }, 401)
                 return
             
             # Verify current password
@@ -1258,11 +926,10 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             if hashed_current != user['password']:
                 conn.close()
                 logger.warning(f"Failed password change attempt for user: {user['email']}")
-                self._set_headers(401)
-                self.wfile.write(json.dumps({
+                self._send_json({
                     'success': False,
                     'message': 'Current password is incorrect'
-                }).encode())
+                }, 401)
                 return
             
             # Hash new password
@@ -1288,37 +955,33 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             conn.close()
             
             # Return success response
-            self._set_headers()
-            self.wfile.write(json.dumps({
+            self._send_json({
                 'success': True,
                 'message': 'Password changed successfully'
-            }).encode())
+            })
             
         except json.JSONDecodeError as e:
             logger.error(f"JSON decode error in password change: {e}")
-            self._set_headers(400)
-            self.wfile.write(json.dumps({
+            self._send_json({
                 'success': False,
                 'message': 'Invalid JSON format'
-            }).encode())
+            }, 400)
         except Exception as e:
             logger.error(f"Error changing password: {e}")
-            self._set_headers(500)
-            self.wfile.write(json.dumps({
+            self._send_json({
                 'success': False,
                 'message': 'An error occurred while changing password'
-            }).encode())
+            }, 500)
 
     def add_social_media_account(self):
         """Add a new social media account for a user"""
         try:
             content_length = int(self.headers.get('Content-Length', 0))
             if content_length == 0:
-                self._set_headers(400)
-                self.wfile.write(json.dumps({
+                self._send_json({
                     'success': False,
                     'message': 'No data received'
-                }).encode())
+                }, 400)
                 return
 
             post_data = self.rfile.read(content_length)
@@ -1328,11 +991,10 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             required_fields = ['user_id', 'platform', 'username', 'account_email', 'access_token']
             for field in required_fields:
                 if field not in data:
-                    self._set_headers(400)
-                    self.wfile.write(json.dumps({
+                    self._send_json({
                         'success': False,
                         'message': f'Missing required field: {field}'
-                    }).encode())
+                    }, 400)
                     return
 
             # Add account
@@ -1356,42 +1018,37 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             conn.commit()
             conn.close()
 
-            self._set_headers()
-            self.wfile.write(json.dumps({
+            self._send_json({
                 'success': True,
                 'account_id': account_id,
                 'message': f'Successfully added {data["platform"]} account'
-            }).encode())
+            })
 
         except json.JSONDecodeError:
-            self._set_headers(400)
-            self.wfile.write(json.dumps({
+            self._send_json({
                 'success': False,
                 'message': 'Invalid JSON'
-            }).encode())
+            }, 400)
         except sqlite3.IntegrityError:
-            self._set_headers(409)
-            self.wfile.write(json.dumps({
+            self._send_json({
                 'success': False,
                 'message': 'Account already exists for this user on this platform'
-            }).encode())
+            }, 409)
         except Exception as e:
-            self._set_headers(500)
-            self.wfile.write(json.dumps({
+            self._send_json({
                 'success': False,
                 'message': str(e)
-            }).encode())
+            }, 500)
 
     def update_social_media_settings(self):
         """Update social media settings for a user"""
         try:
             content_length = int(self.headers.get('Content-Length', 0))
             if content_length == 0:
-                self._set_headers(400)
-                self.wfile.write(json.dumps({
+                self._send_json({
                     'success': False,
                     'message': 'No data received'
-                }).encode())
+                }, 400)
                 return
 
             post_data = self.rfile.read(content_length)
@@ -1399,11 +1056,10 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
 
             user_id = data.get('user_id')
             if not user_id:
-                self._set_headers(400)
-                self.wfile.write(json.dumps({
+                self._send_json({
                     'success': False,
                     'message': 'Missing user_id'
-                }).encode())
+                }, 400)
                 return
 
             conn = self.get_db_connection()
@@ -1457,35 +1113,31 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             conn.commit()
             conn.close()
 
-            self._set_headers()
-            self.wfile.write(json.dumps({
+            self._send_json({
                 'success': True,
                 'message': 'Settings updated successfully'
-            }).encode())
+            })
 
         except json.JSONDecodeError:
-            self._set_headers(400)
-            self.wfile.write(json.dumps({
+            self._send_json({
                 'success': False,
                 'message': 'Invalid JSON'
-            }).encode())
+            }, 400)
         except Exception as e:
-            self._set_headers(500)
-            self.wfile.write(json.dumps({
+            self._send_json({
                 'success': False,
                 'message': str(e)
-            }).encode())
+            }, 500)
 
     def disconnect_social_media_account(self):
         """Disconnect a social media account"""
         try:
             content_length = int(self.headers.get('Content-Length', 0))
             if content_length == 0:
-                self._set_headers(400)
-                self.wfile.write(json.dumps({
+                self._send_json({
                     'success': False,
                     'message': 'No data received'
-                }).encode())
+                }, 400)
                 return
 
             post_data = self.rfile.read(content_length)
@@ -1493,11 +1145,10 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
 
             account_id = data.get('account_id')
             if not account_id:
-                self._set_headers(400)
-                self.wfile.write(json.dumps({
+                self._send_json({
                     'success': False,
                     'message': 'Missing account_id'
-                }).encode())
+                }, 400)
                 return
 
             conn = self.get_db_connection()
@@ -1512,35 +1163,31 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             conn.commit()
             conn.close()
 
-            self._set_headers()
-            self.wfile.write(json.dumps({
+            self._send_json({
                 'success': True,
                 'message': 'Account disconnected successfully'
-            }).encode())
+            })
 
         except json.JSONDecodeError:
-            self._set_headers(400)
-            self.wfile.write(json.dumps({
+            self._send_json({
                 'success': False,
                 'message': 'Invalid JSON'
-            }).encode())
+            }, 400)
         except Exception as e:
-            self._set_headers(500)
-            self.wfile.write(json.dumps({
+            self._send_json({
                 'success': False,
                 'message': str(e)
-            }).encode())
+            }, 500)
 
     def get_social_media_accounts(self, query_params):
         """Get social media accounts for a user"""
         try:
             user_id = query_params.get('user_id', [None])[0]
             if not user_id:
-                self._set_headers(400)
-                self.wfile.write(json.dumps({
+                self._send_json({
                     'success': False,
                     'message': 'Missing user_id parameter'
-                }).encode())
+                }, 400)
                 return
 
             conn = self.get_db_connection()
@@ -1557,30 +1204,27 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             accounts = [dict(row) for row in cursor.fetchall()]
             conn.close()
 
-            self._set_headers()
-            self.wfile.write(json.dumps({
+            self._send_json({
                 'success': True,
                 'accounts': accounts,
                 'count': len(accounts)
-            }).encode())
+            })
 
         except Exception as e:
-            self._set_headers(500)
-            self.wfile.write(json.dumps({
+            self._send_json({
                 'success': False,
                 'message': str(e)
-            }).encode())
+            }, 500)
 
     def get_social_media_settings(self, query_params):
         """Get social media settings for a user"""
         try:
             user_id = query_params.get('user_id', [None])[0]
             if not user_id:
-                self._set_headers(400)
-                self.wfile.write(json.dumps({
+                self._send_json({
                     'success': False,
                     'message': 'Missing user_id parameter'
-                }).encode())
+                }, 400)
                 return
 
             conn = self.get_db_connection()
@@ -1597,18 +1241,16 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             settings = dict(cursor.fetchone() or {})
             conn.close()
 
-            self._set_headers()
-            self.wfile.write(json.dumps({
+            self._send_json({
                 'success': True,
                 'settings': settings
-            }).encode())
+            })
 
         except Exception as e:
-            self._set_headers(500)
-            self.wfile.write(json.dumps({
+            self._send_json({
                 'success': False,
                 'message': str(e)
-            }).encode())
+            }, 500)
 
     def get_social_media_audit(self, query_params):
         """Get audit log for a social media account"""
@@ -1617,11 +1259,10 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             limit = int(query_params.get('limit', ['50'])[0])
 
             if not account_id:
-                self._set_headers(400)
-                self.wfile.write(json.dumps({
+                self._send_json({
                     'success': False,
                     'message': 'Missing account_id parameter'
-                }).encode())
+                }, 400)
                 return
 
             conn = self.get_db_connection()
@@ -1638,27 +1279,24 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             logs = [dict(row) for row in cursor.fetchall()]
             conn.close()
 
-            self._set_headers()
-            self.wfile.write(json.dumps({
+            self._send_json({
                 'success': True,
                 'logs': logs,
                 'count': len(logs)
-            }).encode())
+            })
 
         except Exception as e:
-            self._set_headers(500)
-            self.wfile.write(json.dumps({
+            self._send_json({
                 'success': False,
                 'message': str(e)
-            }).encode())
+            }, 500)
 
     def add_daily_metrics(self):
         """Record daily social media metrics"""
         try:
             content_length = int(self.headers.get('Content-Length', 0))
             if content_length == 0:
-                self._set_headers(400)
-                self.wfile.write(json.dumps({'success': False, 'message': 'No data'}).encode())
+                self._send_json({'success': False, 'message': 'No data'}, 400)
                 return
 
             post_data = self.rfile.read(content_length)
@@ -1668,8 +1306,7 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             platform = data.get('platform')
             
             if not account_id or not platform:
-                self._set_headers(400)
-                self.wfile.write(json.dumps({'success': False, 'message': 'Missing required fields'}).encode())
+                self._send_json({'success': False, 'message': 'Missing required fields'}, 400)
                 return
 
             conn = self.get_db_connection()
@@ -1701,12 +1338,11 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             
             conn.commit()
             conn.close()
+            response_cache.invalidate('social_media_daily_metrics')
             
-            self._set_headers()
-            self.wfile.write(json.dumps({'success': True, 'message': 'Daily metrics recorded', 'date': today}).encode())
+            self._send_json({'success': True, 'message': 'Daily metrics recorded', 'date': today})
         except Exception as e:
-            self._set_headers(500)
-            self.wfile.write(json.dumps({'success': False, 'error': str(e)}).encode())
+            self._send_json({'success': False, 'error': str(e)}, 500)
 
     def get_daily_metrics(self, query_params):
         """Retrieve daily metrics"""
@@ -1714,10 +1350,10 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             account_id = query_params.get('account_id', [None])[0]
             platform = query_params.get('platform', [None])[0]
             days = int(query_params.get('days', ['30'])[0])
+            points = downsampling.max_points(query_params)
             
             if not account_id or not platform:
-                self._set_headers(400)
-                self.wfile.write(json.dumps({'success': False, 'message': 'Missing parameters'}).encode())
+                self._send_json({'success': False, 'message': 'Missing parameters'}, 400)
                 return
 
             conn = self.get_db_connection()
@@ -1733,17 +1369,48 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             
             metrics = [dict(row) for row in cursor.fetchall()]
             conn.close()
-            
-            self._set_headers()
-            self.wfile.write(json.dumps({
+
+            # Rows kept by ?max_points= are picked on every charted column
+            series = ('followers', 'engagement_rate') + tuple(social_monthly.TOTALS.values())
+            response = {
                 'success': True,
-                'metrics': metrics,
-                'count': len(metrics),
+                'metrics': downsampling.downsample_rows(metrics, series, points),
                 'platform': platform
-            }).encode())
+            }
+            response['count'] = len(response['metrics'])
+            if len(response['metrics']) < len(metrics):
+                response['downsampled_from'] = len(metrics)
+            self._send_json(response)
+        except downsampling.DownsampleError as e:
+            self._send_json({'success': False, 'error': str(e)}, 400)
         except Exception as e:
-            self._set_headers(500)
-            self.wfile.write(json.dumps({'success': False, 'error': str(e)}).encode())
+            self._send_json({'success': False, 'error': str(e)}, 500)
+
+    def get_monthly_metrics(self, query_params):
+        """Retrieve monthly metrics, aggregated in the background from the daily ones"""
+        try:
+            account_id = query_params.get('account_id', [None])[0]
+            platform = query_params.get('platform', [None])[0]
+            months = int(query_params.get('months', ['12'])[0])
+            
+            if not account_id or not platform:
+                self._send_json({'success': False, 'message': 'Missing parameters'}, 400)
+                return
+
+            conn = self.get_db_connection()
+            cursor = conn.cursor()
+            trend = social_monthly.monthly_trend(cursor, account_id, platform, months)
+            conn.close()
+            
+            self._send_json({
+                'success': True,
+                'metrics': trend['months'],
+                'count': len(trend['months']),
+                'platform': platform,
+                'pending_months': trend['pending_months']
+            })
+        except Exception as e:
+            self._send_json({'success': False, 'error': str(e)}, 500)
 
     def get_performance_summary(self):
         """Get metrics performance summary"""
@@ -1753,8 +1420,7 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             platform = query_params.get('platform', [None])[0]
             
             if not account_id or not platform:
-                self._set_headers(400)
-                self.wfile.write(json.dumps({'success': False, 'message': 'Missing parameters'}).encode())
+                self._send_json({'success': False, 'message': 'Missing parameters'}, 400)
                 return
 
             conn = self.get_db_connection()
@@ -1770,8 +1436,7 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             
             if not latest:
                 conn.close()
-                self._set_headers(404)
-                self.wfile.write(json.dumps({'success': False, 'message': 'No data'}).encode())
+                self._send_json({'success': False, 'message': 'No data'}, 404)
                 return
             
             # Get 30-day trends
@@ -1795,8 +1460,7 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
                 growth_rate = 0
                 avg_engagement = 0
             
-            self._set_headers()
-            self.wfile.write(json.dumps({
+            self._send_json({
                 'success': True,
                 'summary': {
                     'platform': platform,
@@ -1808,18 +1472,16 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
                     'impressions_30d': sum(m['impressions'] for m in all_metrics),
                     'latest_update': latest['date']
                 }
-            }).encode())
+            })
         except Exception as e:
-            self._set_headers(500)
-            self.wfile.write(json.dumps({'success': False, 'error': str(e)}).encode())
+            self._send_json({'success': False, 'error': str(e)}, 500)
 
     def record_content_performance(self):
         """Record individual post/content performance"""
         try:
             content_length = int(self.headers.get('Content-Length', 0))
             if content_length == 0:
-                self._set_headers(400)
-                self.wfile.write(json.dumps({'success': False, 'message': 'No data'}).encode())
+                self._send_json({'success': False, 'message': 'No data'}, 400)
                 return
 
             post_data = self.rfile.read(content_length)
@@ -1853,11 +1515,9 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             conn.commit()
             conn.close()
             
-            self._set_headers()
-            self.wfile.write(json.dumps({'success': True, 'message': 'Content performance recorded'}).encode())
+            self._send_json({'success': True, 'message': 'Content performance recorded'})
         except Exception as e:
-            self._set_headers(500)
-            self.wfile.write(json.dumps({'success': False, 'error': str(e)}).encode())
+            self._send_json({'success': False, 'error': str(e)}, 500)
 
     def get_top_content(self, query_params):
         """Get top performing content"""
@@ -1867,8 +1527,7 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             limit = int(query_params.get('limit', ['10'])[0])
             
             if not account_id or not platform:
-                self._set_headers(400)
-                self.wfile.write(json.dumps({'success': False, 'message': 'Missing parameters'}).encode())
+                self._send_json({'success': False, 'message': 'Missing parameters'}, 400)
                 return
 
             conn = self.get_db_connection()
@@ -1883,23 +1542,20 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             content = [dict(row) for row in cursor.fetchall()]
             conn.close()
             
-            self._set_headers()
-            self.wfile.write(json.dumps({
+            self._send_json({
                 'success': True,
                 'top_content': content,
                 'count': len(content)
-            }).encode())
+            })
         except Exception as e:
-            self._set_headers(500)
-            self.wfile.write(json.dumps({'success': False, 'error': str(e)}).encode())
+            self._send_json({'success': False, 'error': str(e)}, 500)
 
     def record_audience_demographics(self):
         """Record audience demographic data"""
         try:
             content_length = int(self.headers.get('Content-Length', 0))
             if content_length == 0:
-                self._set_headers(400)
-                self.wfile.write(json.dumps({'success': False, 'message': 'No data'}).encode())
+                self._send_json({'success': False, 'message': 'No data'}, 400)
                 return
 
             post_data = self.rfile.read(content_length)
@@ -1936,11 +1592,41 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             conn.commit()
             conn.close()
             
-            self._set_headers()
-            self.wfile.write(json.dumps({'success': True, 'message': 'Demographics recorded'}).encode())
+            self._send_json({'success': True, 'message': 'Demographics recorded'})
         except Exception as e:
-            self._set_headers(500)
-            self.wfile.write(json.dumps({'success': False, 'error': str(e)}).encode())
+            self._send_json({'success': False, 'error': str(e)}, 500)
+
+    def add_daily_metrics_bulk(self):
+        """Record many days of social media metrics (JSON array or NDJSON)"""
+        self._ingest_bulk('daily_metrics')
+
+    def record_content_performance_bulk(self):
+        """Record many posts' performance (JSON array or NDJSON)"""
+        self._ingest_bulk('content_performance')
+
+    def record_audience_demographics_bulk(self):
+        """Record many audience demographic snapshots (JSON array or NDJSON)"""
+        self._ingest_bulk('audience_demographics')
+
+    def _ingest_bulk(self, kind):
+        """Stream the request body into kind's table; see bulk_ingest"""
+        try:
+            content_length = int(self.headers.get('Content-Length', 0))
+            if content_length == 0:
+                self._send_json({'success': False, 'message': 'No data'}, 400)
+                return
+
+            records = bulk_ingest.read_records(self.rfile, content_length, self.headers.get('Content-Type'))
+            conn = self.get_db_connection()
+            result = bulk_ingest.ingest(conn, kind, records)
+            conn.close()
+            if result.inserted:
+                response_cache.invalidate(bulk_ingest.SPECS[kind].table)
+
+            self._send_json(result.to_dict(), 400 if result.format_error is not None else 200)
+        except Exception as e:
+            self.close_connection = True
+            self._send_json({'success': False, 'error': str(e)}, 500)
 
     def get_audience_insights(self, query_params):
         """Get audience demographic insights"""
@@ -1949,8 +1635,7 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             platform = query_params.get('platform', [None])[0]
             
             if not account_id or not platform:
-                self._set_headers(400)
-                self.wfile.write(json.dumps({'success': False, 'message': 'Missing parameters'}).encode())
+                self._send_json({'success': False, 'message': 'Missing parameters'}, 400)
                 return
 
             conn = self.get_db_connection()
@@ -1966,26 +1651,22 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             conn.close()
             
             if not demographics:
-                self._set_headers(404)
-                self.wfile.write(json.dumps({'success': False, 'message': 'No data'}).encode())
+                self._send_json({'success': False, 'message': 'No data'}, 404)
                 return
             
-            self._set_headers()
-            self.wfile.write(json.dumps({
+            self._send_json({
                 'success': True,
                 'demographics': dict(demographics)
-            }).encode())
+            })
         except Exception as e:
-            self._set_headers(500)
-            self.wfile.write(json.dumps({'success': False, 'error': str(e)}).encode())
+            self._send_json({'success': False, 'error': str(e)}, 500)
 
     def calculate_campaign_roi(self):
         """Calculate campaign ROI"""
         try:
             content_length = int(self.headers.get('Content-Length', 0))
             if content_length == 0:
-                self._set_headers(400)
-                self.wfile.write(json.dumps({'success': False, 'message': 'No data'}).encode())
+                self._send_json({'success': False, 'message': 'No data'}, 400)
                 return
 
             post_data = self.rfile.read(content_length)
@@ -2026,27 +1707,25 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             
             conn.commit()
             conn.close()
+            response_cache.invalidate('campaign_social_metrics')
             
-            self._set_headers()
-            self.wfile.write(json.dumps({
+            self._send_json({
                 'success': True,
                 'roi': round(roi, 2),
                 'roas': round(roas, 2),
                 'conversion_rate': round(conversion_rate, 2),
                 'cost_per_conversion': round(cpc, 2),
                 'cost_per_reach': round(cpr, 4)
-            }).encode())
+            })
         except Exception as e:
-            self._set_headers(500)
-            self.wfile.write(json.dumps({'success': False, 'error': str(e)}).encode())
+            self._send_json({'success': False, 'error': str(e)}, 500)
 
     def figma_export(self):
         """Handle Figma export - receive design data and generate HTML/CSS files"""
         try:
             content_length = int(self.headers.get('Content-Length', 0))
             if content_length == 0:
-                self._set_headers(400)
-                self.wfile.write(json.dumps({'success': False, 'message': 'No data'}).encode())
+                self._send_json({'success': False, 'message': 'No data'}, 400)
                 return
 
             post_data = self.rfile.read(content_length)
@@ -2058,8 +1737,7 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             nodes = data.get('nodes', [])
 
             if not html_content:
-                self._set_headers(400)
-                self.wfile.write(json.dumps({'success': False, 'message': 'No HTML content'}).encode())
+                self._send_json({'success': False, 'message': 'No HTML content'}, 400)
                 return
 
             # Get the project root directory
@@ -2082,31 +1760,28 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
                     f.write(css_content)
 
             # Store metadata in database
-            conn = self.get_db_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('''
+            write_batcher.execute(DATABASE, '''
                 INSERT INTO figma_sync_config (file_path, last_sync, sync_direction, node_count)
                 VALUES (?, ?, 'export', ?)
             ''', (target_file, datetime.now().isoformat(), len(nodes)))
-            
-            conn.commit()
-            conn.close()
 
-            self._set_headers()
-            self.wfile.write(json.dumps({
+            self._send_json({
                 'success': True,
                 'message': f'Successfully exported to {target_file}',
                 'files': {
                     'html': html_path,
                     'css': css_path if css_content else None
                 }
-            }).encode())
+            })
+
+        except write_batcher.WriteQueueFull as e:
+            logger.warning(f"Figma export not recorded, write queue full: {e}")
+            self._send_json({'success': False, 'message': 'Server is busy. Please try again.'}, 503,
+                            headers={'Retry-After': '1'})
 
         except Exception as e:
             logger.error(f"Figma export error: {e}")
-            self._set_headers(500)
-            self.wfile.write(json.dumps({'success': False, 'message': str(e)}).encode())
+            self._send_json({'success': False, 'message': str(e)}, 500)
 
     def figma_import(self, query_params):
         """Handle Figma import - send HTML/CSS data to Figma"""
@@ -2128,8 +1803,7 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             html_path = os.path.join(project_root, html_file)
             
             if not os.path.exists(html_path):
-                self._set_headers(404)
-                self.wfile.write(json.dumps({'success': False, 'message': f'File not found: {html_file}'}).encode())
+                self._send_json({'success': False, 'message': f'File not found: {html_file}'}, 404)
                 return
 
             # Read HTML file
@@ -2181,18 +1855,16 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
                 }
             }
 
-            self._set_headers()
-            self.wfile.write(json.dumps({
+            self._send_json({
                 'html': html_content,
                 'css': css_content,
                 'designTokens': design_tokens,
                 'page': page
-            }).encode())
+            })
 
         except Exception as e:
             logger.error(f"Figma import error: {e}")
-            self._set_headers(500)
-            self.wfile.write(json.dumps({'success': False, 'message': str(e)}).encode())
+            self._send_json({'success': False, 'message': str(e)}, 500)
 
     def figma_import_all(self):
         """Handle Figma import all - send all pages HTML/CSS data"""
@@ -2207,6 +1879,22 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
                 'login': 'login.html'
             }
             
+            # The page files only change on deploys: reuse the encoded payload,
+            # and its compressed variants, until one of them does
+            signature = ['figma_import_all']
+            for html_file in pages.values():
+                for page_file in (html_file, html_file.replace('.html', '.css')):
+                    page_path = os.path.join(project_root, page_file)
+                    if os.path.exists(page_path):
+                        stat = os.stat(page_path)
+                        signature.append((page_file, stat.st_mtime_ns, stat.st_size))
+            cache_key = tuple(signature)
+
+            body = variant_cache.get(cache_key, 'identity')
+            if body is not None:
+                self._send_body(body, cache_key=cache_key)
+                return
+
             all_pages_data = {}
             
             for page_name, html_file in pages.items():
@@ -2258,26 +1946,25 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
                 }
             }
             
-            self._set_headers()
-            self.wfile.write(json.dumps({
+            body = json.dumps({
                 'pages': all_pages_data,
                 'designTokens': design_tokens,
                 'totalPages': len(all_pages_data),
                 'timestamp': datetime.now().isoformat()
-            }).encode())
+            }).encode()
+            variant_cache.put(cache_key, 'identity', body)
+            self._send_body(body, cache_key=cache_key)
             
         except Exception as e:
             logger.error(f"Figma import all error: {e}")
-            self._set_headers(500)
-            self.wfile.write(json.dumps({'success': False, 'message': str(e)}).encode())
+            self._send_json({'success': False, 'message': str(e)}, 500)
 
     def figma_save_config(self):
         """Save Figma sync configuration"""
         try:
             content_length = int(self.headers.get('Content-Length', 0))
             if content_length == 0:
-                self._set_headers(400)
-                self.wfile.write(json.dumps({'success': False, 'message': 'No data'}).encode())
+                self._send_json({'success': False, 'message': 'No data'}, 400)
                 return
 
             post_data = self.rfile.read(content_length)
@@ -2287,11 +1974,8 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             auto_sync = config.get('autoSync', False)
             watch_mode = config.get('watchMode', False)
 
-            conn = self.get_db_connection()
-            cursor = conn.cursor()
-            
             # Store config (using a simple key-value approach)
-            cursor.execute('''
+            write_batcher.execute(DATABASE, '''
                 INSERT OR REPLACE INTO figma_sync_config 
                 (file_path, last_sync, sync_direction, settings)
                 VALUES ('_config', ?, 'config', ?)
@@ -2303,35 +1987,33 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
                     'watchMode': watch_mode
                 })
             ))
-            
-            conn.commit()
-            conn.close()
 
-            self._set_headers()
-            self.wfile.write(json.dumps({
+            self._send_json({
                 'success': True,
                 'message': 'Configuration saved'
-            }).encode())
+            })
+
+        except write_batcher.WriteQueueFull as e:
+            logger.warning(f"Figma config not saved, write queue full: {e}")
+            self._send_json({'success': False, 'message': 'Server is busy. Please try again.'}, 503,
+                            headers={'Retry-After': '1'})
 
         except Exception as e:
             logger.error(f"Figma config save error: {e}")
-            self._set_headers(500)
-            self.wfile.write(json.dumps({'success': False, 'message': str(e)}).encode())
+            self._send_json({'success': False, 'message': str(e)}, 500)
 
     # ==================== SOCIAL MEDIA ENDPOINTS ====================
     
     def connect_social_account(self):
         """Connect a social media account to user"""
         if not SOCIAL_MEDIA_AVAILABLE:
-            self._set_headers(400)
-            self.wfile.write(json.dumps({'error': 'Social media module not available'}).encode())
+            self._send_json({'error': 'Social media module not available'}, 400)
             return
         
         try:
             content_length = int(self.headers.get('Content-Length', 0))
             if content_length == 0:
-                self._set_headers(400)
-                self.wfile.write(json.dumps({'error': 'No data'}).encode())
+                self._send_json({'error': 'No data'}, 400)
                 return
             
             post_data = self.rfile.read(content_length)
@@ -2342,8 +2024,7 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             access_token = data.get('access_token')
             
             if not all([user_id, platform, access_token]):
-                self._set_headers(400)
-                self.wfile.write(json.dumps({'error': 'Missing required fields: user_id, platform, access_token'}).encode())
+                self._send_json({'error': 'Missing required fields: user_id, platform, access_token'}, 400)
                 return
             
             # Verify token and get user info
@@ -2351,8 +2032,7 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             user_info = api.get_user_info()
             
             if not user_info:
-                self._set_headers(400)
-                self.wfile.write(json.dumps({'error': 'Invalid token or user not found'}).encode())
+                self._send_json({'error': 'Invalid token or user not found'}, 400)
                 return
             
             # Save account connection
@@ -2367,54 +2047,47 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             metrics = api.get_metrics()
             social_db.save_metrics(account_id, platform, metrics)
             
-            self._set_headers()
-            self.wfile.write(json.dumps({
+            self._send_json({
                 'success': True,
                 'account_id': account_id,
                 'platform': platform,
                 'username': user_info.get('username') or user_info.get('name'),
                 'metrics': metrics
-            }).encode())
+            })
         
         except Exception as e:
             logger.error(f"Connect account error: {e}")
-            self._set_headers(400)
-            self.wfile.write(json.dumps({'error': f'Authentication failed: {str(e)}'}).encode())
+            self._send_json({'error': f'Authentication failed: {str(e)}'}, 400)
     
     def get_social_accounts(self, query_params):
         """Get all social media accounts for a user"""
         if not SOCIAL_MEDIA_AVAILABLE:
-            self._set_headers(400)
-            self.wfile.write(json.dumps({'error': 'Social media module not available'}).encode())
+            self._send_json({'error': 'Social media module not available'}, 400)
             return
         
         try:
             user_id = query_params.get('user_id', [None])[0]
             
             if not user_id:
-                self._set_headers(400)
-                self.wfile.write(json.dumps({'error': 'user_id required'}).encode())
+                self._send_json({'error': 'user_id required'}, 400)
                 return
             
             social_db = SocialMediaDatabase()
             accounts = social_db.get_user_accounts(int(user_id))
             
-            self._set_headers()
-            self.wfile.write(json.dumps({
+            self._send_json({
                 'accounts': accounts,
                 'total': len(accounts)
-            }).encode())
+            })
         
         except Exception as e:
             logger.error(f"Get accounts error: {e}")
-            self._set_headers(500)
-            self.wfile.write(json.dumps({'error': str(e)}).encode())
+            self._send_json({'error': str(e)}, 500)
     
     def get_social_metrics(self, query_params):
         """Get metrics for a specific platform or all platforms"""
         if not SOCIAL_MEDIA_AVAILABLE:
-            self._set_headers(400)
-            self.wfile.write(json.dumps({'error': 'Social media module not available'}).encode())
+            self._send_json({'error': 'Social media module not available'}, 400)
             return
         
         try:
@@ -2422,57 +2095,49 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             platform = query_params.get('platform', [None])[0]
             
             if not user_id:
-                self._set_headers(400)
-                self.wfile.write(json.dumps({'error': 'user_id required'}).encode())
+                self._send_json({'error': 'user_id required'}, 400)
                 return
             
             social_db = SocialMediaDatabase()
             metrics = social_db.get_latest_metrics(int(user_id), platform)
             
-            self._set_headers()
             if platform:
                 result = metrics[0] if metrics else {}
             else:
                 result = {m.get('platform'): m for m in metrics}
             
-            self.wfile.write(json.dumps(result).encode())
+            self._send_json(result)
         
         except Exception as e:
             logger.error(f"Get metrics error: {e}")
-            self._set_headers(500)
-            self.wfile.write(json.dumps({'error': str(e)}).encode())
+            self._send_json({'error': str(e)}, 500)
     
     def get_social_dashboard(self, query_params):
         """Get dashboard summary for all social media accounts"""
         if not SOCIAL_MEDIA_AVAILABLE:
-            self._set_headers(400)
-            self.wfile.write(json.dumps({'error': 'Social media module not available'}).encode())
+            self._send_json({'error': 'Social media module not available'}, 400)
             return
         
         try:
             user_id = query_params.get('user_id', [None])[0]
             
             if not user_id:
-                self._set_headers(400)
-                self.wfile.write(json.dumps({'error': 'user_id required'}).encode())
+                self._send_json({'error': 'user_id required'}, 400)
                 return
             
             social_db = SocialMediaDatabase()
             summary = social_db.get_dashboard_summary(int(user_id))
             
-            self._set_headers()
-            self.wfile.write(json.dumps(summary).encode())
+            self._send_json(summary)
         
         except Exception as e:
             logger.error(f"Dashboard error: {e}")
-            self._set_headers(500)
-            self.wfile.write(json.dumps({'error': str(e)}).encode())
+            self._send_json({'error': str(e)}, 500)
     
     def get_top_social_content(self, query_params):
         """Get top performing content across all platforms"""
         if not SOCIAL_MEDIA_AVAILABLE:
-            self._set_headers(400)
-            self.wfile.write(json.dumps({'error': 'Social media module not available'}).encode())
+            self._send_json({'error': 'Social media module not available'}, 400)
             return
         
         try:
@@ -2480,8 +2145,7 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             limit = int(query_params.get('limit', [5])[0])
             
             if not user_id:
-                self._set_headers(400)
-                self.wfile.write(json.dumps({'error': 'user_id required'}).encode())
+                self._send_json({'error': 'user_id required'}, 400)
                 return
             
             social_db = SocialMediaDatabase()
@@ -2514,27 +2178,23 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
                     'engagement_rate': row[7]
                 })
             
-            self._set_headers()
-            self.wfile.write(json.dumps({'content': content}).encode())
+            self._send_json({'content': content})
         
         except Exception as e:
             logger.error(f"Top content error: {e}")
-            self._set_headers(500)
-            self.wfile.write(json.dumps({'error': str(e)}).encode())
+            self._send_json({'error': str(e)}, 500)
     
     def sync_social_metrics(self, query_params):
         """Manually sync metrics for all user accounts"""
         if not SOCIAL_MEDIA_AVAILABLE:
-            self._set_headers(400)
-            self.wfile.write(json.dumps({'error': 'Social media module not available'}).encode())
+            self._send_json({'error': 'Social media module not available'}, 400)
             return
         
         try:
             user_id = query_params.get('user_id', [None])[0]
             
             if not user_id:
-                self._set_headers(400)
-                self.wfile.write(json.dumps({'error': 'user_id required'}).encode())
+                self._send_json({'error': 'user_id required'}, 400)
                 return
             
             social_db = SocialMediaDatabase()
@@ -2565,31 +2225,27 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             
             conn.close()
             
-            self._set_headers()
-            self.wfile.write(json.dumps({
+            self._send_json({
                 'synced': synced,
                 'failed': failed,
                 'errors': errors,
                 'timestamp': datetime.now().isoformat()
-            }).encode())
+            })
         
         except Exception as e:
             logger.error(f"Sync error: {e}")
-            self._set_headers(500)
-            self.wfile.write(json.dumps({'error': str(e)}).encode())
+            self._send_json({'error': str(e)}, 500)
     
     def disconnect_social_account(self):
         """Disconnect a social media account"""
         if not SOCIAL_MEDIA_AVAILABLE:
-            self._set_headers(400)
-            self.wfile.write(json.dumps({'error': 'Social media module not available'}).encode())
+            self._send_json({'error': 'Social media module not available'}, 400)
             return
         
         try:
             content_length = int(self.headers.get('Content-Length', 0))
             if content_length == 0:
-                self._set_headers(400)
-                self.wfile.write(json.dumps({'error': 'No data'}).encode())
+                self._send_json({'error': 'No data'}, 400)
                 return
             
             post_data = self.rfile.read(content_length)
@@ -2599,8 +2255,7 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             platform = data.get('platform')
             
             if not all([user_id, platform]):
-                self._set_headers(400)
-                self.wfile.write(json.dumps({'error': 'Missing required fields'}).encode())
+                self._send_json({'error': 'Missing required fields'}, 400)
                 return
             
             social_db = SocialMediaDatabase()
@@ -2615,16 +2270,14 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             conn.commit()
             conn.close()
             
-            self._set_headers()
-            self.wfile.write(json.dumps({
+            self._send_json({
                 'success': True,
                 'message': f'{platform} account disconnected'
-            }).encode())
+            })
         
         except Exception as e:
             logger.error(f"Disconnect error: {e}")
-            self._set_headers(500)
-            self.wfile.write(json.dumps({'error': str(e)}).encode())
+            self._send_json({'error': str(e)}, 500)
     
     # ==================== ADS PLATFORMS ENDPOINTS ====================
     
@@ -2633,8 +2286,7 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
         try:
             content_length = int(self.headers.get('Content-Length', 0))
             if content_length == 0:
-                self._set_headers(400)
-                self.wfile.write(json.dumps({'success': False, 'message': 'No data'}).encode())
+                self._send_json({'success': False, 'message': 'No data'}, 400)
                 return
             
             post_data = self.rfile.read(content_length)
@@ -2644,8 +2296,7 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             session_id = self.headers.get('X-Session-ID')
             
             if not session_id:
-                self._set_headers(401)
-                self.wfile.write(json.dumps({'success': False, 'message': 'Not authenticated'}).encode())
+                self._send_json({'success': False, 'message': 'Not authenticated'}, 401)
                 return
             
             # Get user from session
@@ -2660,27 +2311,11 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             
             if not user:
                 conn.close()
-                self._set_headers(401)
-                self.wfile.write(json.dumps({'success': False, 'message': 'Invalid session'}).encode())
+                self._send_json({'success': False, 'message': 'Invalid session'}, 401)
                 return
             
             user_id = user['user_id']
             
-            # Create ads_platforms_config table if it doesn't exist
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS ads_platforms_config (
-                    config_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    platform TEXT NOT NULL,
-                    credentials TEXT NOT NULL,
-                    sync_enabled INTEGER DEFAULT 0,
-                    connected_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    last_sync TIMESTAMP,
-                    UNIQUE(user_id, platform),
-                    FOREIGN KEY (user_id) REFERENCES users(user_id)
-                )
-            ''')
-            
             # Store credentials (encrypted in production)
             credentials = {k: v for k, v in data.items() if k != 'platform'}
             credentials_json = json.dumps(credentials)
@@ -2696,25 +2331,22 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             
             logger.info(f"Ads platform {platform} connected for user {user_id}")
             
-            self._set_headers()
-            self.wfile.write(json.dumps({
+            self._send_json({
                 'success': True,
                 'message': f'{platform} connected successfully',
                 'platform': platform
-            }).encode())
+            })
             
         except Exception as e:
             logger.error(f"Connect ads platform error: {e}")
-            self._set_headers(500)
-            self.wfile.write(json.dumps({'success': False, 'message': str(e)}).encode())
+            self._send_json({'success': False, 'message': str(e)}, 500)
     
     def get_ads_platforms_status(self):
         """Get connection status for all ads platforms"""
         try:
             session_id = self.headers.get('X-Session-ID')
             if not session_id:
-                self._set_headers(401)
-                self.wfile.write(json.dumps({'success': False, 'message': 'Not authenticated'}).encode())
+                self._send_json({'success': False, 'message': 'Not authenticated'}, 401)
                 return
             
             conn = self.get_db_connection()
@@ -2728,8 +2360,7 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             
             if not user:
                 conn.close()
-                self._set_headers(401)
-                self.wfile.write(json.dumps({'success': False, 'message': 'Invalid session'}).encode())
+                self._send_json({'success': False, 'message': 'Invalid session'}, 401)
                 return
             
             user_id = user['user_id']
@@ -2755,24 +2386,21 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             
             conn.close()
             
-            self._set_headers()
-            self.wfile.write(json.dumps({
+            self._send_json({
                 'success': True,
                 'platforms': platforms
-            }).encode())
+            })
             
         except Exception as e:
             logger.error(f"Get ads platforms status error: {e}")
-            self._set_headers(500)
-            self.wfile.write(json.dumps({'success': False, 'message': str(e)}).encode())
+            self._send_json({'success': False, 'message': str(e)}, 500)
     
     def disconnect_ads_platform(self):
         """Disconnect an advertising platform"""
         try:
             content_length = int(self.headers.get('Content-Length', 0))
             if content_length == 0:
-                self._set_headers(400)
-                self.wfile.write(json.dumps({'success': False, 'message': 'No data'}).encode())
+                self._send_json({'success': False, 'message': 'No data'}, 400)
                 return
             
             post_data = self.rfile.read(content_length)
@@ -2781,8 +2409,7 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             session_id = self.headers.get('X-Session-ID')
             
             if not session_id:
-                self._set_headers(401)
-                self.wfile.write(json.dumps({'success': False, 'message': 'Not authenticated'}).encode())
+                self._send_json({'success': False, 'message': 'Not authenticated'}, 401)
                 return
             
             conn = self.get_db_connection()
@@ -2796,8 +2423,7 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             
             if not user:
                 conn.close()
-                self._set_headers(401)
-                self.wfile.write(json.dumps({'success': False, 'message': 'Invalid session'}).encode())
+                self._send_json({'success': False, 'message': 'Invalid session'}, 401)
                 return
             
             user_id = user['user_id']
@@ -2810,16 +2436,14 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             conn.commit()
             conn.close()
             
-            self._set_headers()
-            self.wfile.write(json.dumps({
+            self._send_json({
                 'success': True,
                 'message': f'{platform} disconnected successfully'
-            }).encode())
+            })
             
         except Exception as e:
             logger.error(f"Disconnect ads platform error: {e}")
-            self._set_headers(500)
-            self.wfile.write(json.dumps({'success': False, 'message': str(e)}).encode())
+            self._send_json({'success': False, 'message': str(e)}, 500)
     
     # ==================== NOTION CALENDAR ENDPOINTS ====================
     
@@ -2828,8 +2452,7 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
         try:
             content_length = int(self.headers.get('Content-Length', 0))
             if content_length == 0:
-                self._set_headers(400)
-                self.wfile.write(json.dumps({'success': False, 'message': 'No data'}).encode())
+                self._send_json({'success': False, 'message': 'No data'}, 400)
                 return
             
             post_data = self.rfile.read(content_length)
@@ -2842,13 +2465,11 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             session_id = self.headers.get('X-Session-ID')
             
             if not session_id:
-                self._set_headers(401)
-                self.wfile.write(json.dumps({'success': False, 'message': 'Not authenticated'}).encode())
+                self._send_json({'success': False, 'message': 'Not authenticated'}, 401)
                 return
             
             if not api_key or not database_id:
-                self._set_headers(400)
-                self.wfile.write(json.dumps({'success': False, 'message': 'API key and Database ID are required'}).encode())
+                self._send_json({'success': False, 'message': 'API key and Database ID are required'}, 400)
                 return
             
             # Get user from session
@@ -2863,28 +2484,11 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             
             if not user:
                 conn.close()
-                self._set_headers(401)
-                self.wfile.write(json.dumps({'success': False, 'message': 'Invalid session'}).encode())
+                self._send_json({'success': False, 'message': 'Invalid session'}, 401)
                 return
             
             user_id = user['user_id']
             
-            # Create notion_config table if it doesn't exist
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS notion_config (
-                    config_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    api_key TEXT NOT NULL,
-                    database_id TEXT NOT NULL,
-                    sync_enabled INTEGER DEFAULT 0,
-                    bidirectional INTEGER DEFAULT 0,
-                    connected_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    last_sync TIMESTAMP,
-                    UNIQUE(user_id),
-                    FOREIGN KEY (user_id) REFERENCES users(user_id)
-                )
-            ''')
-            
             # Test connection with Notion API
             try:
                 test_response = requests.get(
@@ -2898,11 +2502,10 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
                 
                 if test_response.status_code != 200:
                     conn.close()
-                    self._set_headers(400)
-                    self.wfile.write(json.dumps({
+                    self._send_json({
                         'success': False,
                         'message': 'Failed to connect to Notion. Please check your API key and Database ID.'
-                    }).encode())
+                    }, 400)
                     return
             except Exception as e:
                 logger.warning(f"Notion connection test warning: {e}")
@@ -2920,24 +2523,21 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             
             logger.info(f"Notion connected for user {user_id}")
             
-            self._set_headers()
-            self.wfile.write(json.dumps({
+            self._send_json({
                 'success': True,
                 'message': 'Notion Calendar connected successfully'
-            }).encode())
+            })
             
         except Exception as e:
             logger.error(f"Connect Notion error: {e}")
-            self._set_headers(500)
-            self.wfile.write(json.dumps({'success': False, 'message': str(e)}).encode())
+            self._send_json({'success': False, 'message': str(e)}, 500)
     
     def test_notion_connection(self):
         """Test Notion API connection"""
         try:
             session_id = self.headers.get('X-Session-ID')
             if not session_id:
-                self._set_headers(401)
-                self.wfile.write(json.dumps({'success': False, 'message': 'Not authenticated'}).encode())
+                self._send_json({'success': False, 'message': 'Not authenticated'}, 401)
                 return
             
             conn = self.get_db_connection()
@@ -2951,8 +2551,7 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             
             if not user:
                 conn.close()
-                self._set_headers(401)
-                self.wfile.write(json.dumps({'success': False, 'message': 'Invalid session'}).encode())
+                self._send_json({'success': False, 'message': 'Invalid session'}, 401)
                 return
             
             user_id = user['user_id']
@@ -2962,8 +2561,7 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             conn.close()
             
             if not config:
-                self._set_headers(404)
-                self.wfile.write(json.dumps({'success': False, 'message': 'Notion not configured'}).encode())
+                self._send_json({'success': False, 'message': 'Notion not configured'}, 404)
                 return
             
             # Test connection
@@ -2978,37 +2576,32 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
                 )
                 
                 if response.status_code == 200:
-                    self._set_headers()
-                    self.wfile.write(json.dumps({
+                    self._send_json({
                         'success': True,
                         'message': 'Notion connection successful',
                         'database_name': response.json().get('title', [{}])[0].get('plain_text', 'Unknown')
-                    }).encode())
+                    })
                 else:
-                    self._set_headers(400)
-                    self.wfile.write(json.dumps({
+                    self._send_json({
                         'success': False,
                         'message': f'Notion API error: {response.status_code}'
-                    }).encode())
+                    }, 400)
             except Exception as e:
-                self._set_headers(500)
-                self.wfile.write(json.dumps({
+                self._send_json({
                     'success': False,
                     'message': f'Connection test failed: {str(e)}'
-                }).encode())
+                }, 500)
                 
         except Exception as e:
             logger.error(f"Test Notion error: {e}")
-            self._set_headers(500)
-            self.wfile.write(json.dumps({'success': False, 'message': str(e)}).encode())
+            self._send_json({'success': False, 'message': str(e)}, 500)
     
     def get_notion_config(self):
         """Get Notion configuration"""
         try:
             session_id = self.headers.get('X-Session-ID')
             if not session_id:
-                self._set_headers(401)
-                self.wfile.write(json.dumps({'success': False, 'message': 'Not authenticated'}).encode())
+                self._send_json({'success': False, 'message': 'Not authenticated'}, 401)
                 return
             
             conn = self.get_db_connection()
@@ -3022,8 +2615,7 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             
             if not user:
                 conn.close()
-                self._set_headers(401)
-                self.wfile.write(json.dumps({'success': False, 'message': 'Invalid session'}).encode())
+                self._send_json({'success': False, 'message': 'Invalid session'}, 401)
                 return
             
             user_id = user['user_id']
@@ -3036,8 +2628,7 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             conn.close()
             
             if config:
-                self._set_headers()
-                self.wfile.write(json.dumps({
+                self._send_json({
                     'success': True,
                     'config': {
                         'database_id': config['database_id'],
@@ -3047,28 +2638,25 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
                         'connected_at': config['connected_at'],
                         'last_sync': config['last_sync']
                     }
-                }).encode())
+                })
             else:
-                self._set_headers()
-                self.wfile.write(json.dumps({
+                self._send_json({
                     'success': True,
                     'config': {
                         'connected': False
                     }
-                }).encode())
+                })
                 
         except Exception as e:
             logger.error(f"Get Notion config error: {e}")
-            self._set_headers(500)
-            self.wfile.write(json.dumps({'success': False, 'message': str(e)}).encode())
+            self._send_json({'success': False, 'message': str(e)}, 500)
     
     def get_notion_events(self):
         """Get events from Notion calendar database"""
         try:
             session_id = self.headers.get('X-Session-ID')
             if not session_id:
-                self._set_headers(401)
-                self.wfile.write(json.dumps({'success': False, 'message': 'Not authenticated'}).encode())
+                self._send_json({'success': False, 'message': 'Not authenticated'}, 401)
                 return
             
             conn = self.get_db_connection()
@@ -3082,8 +2670,7 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             
             if not user:
                 conn.close()
-                self._set_headers(401)
-                self.wfile.write(json.dumps({'success': False, 'message': 'Invalid session'}).encode())
+                self._send_json({'success': False, 'message': 'Invalid session'}, 401)
                 return
             
             user_id = user['user_id']
@@ -3093,8 +2680,7 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             conn.close()
             
             if not config:
-                self._set_headers(404)
-                self.wfile.write(json.dumps({'success': False, 'message': 'Notion not configured'}).encode())
+                self._send_json({'success': False, 'message': 'Notion not configured'}, 404)
                 return
             
             # Query Notion API for events
@@ -3131,38 +2717,33 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
                         }
                         events.append(event)
                     
-                    self._set_headers()
-                    self.wfile.write(json.dumps({
+                    self._send_json({
                         'success': True,
                         'events': events,
                         'count': len(events)
-                    }).encode())
+                    })
                 else:
-                    self._set_headers(400)
-                    self.wfile.write(json.dumps({
+                    self._send_json({
                         'success': False,
                         'message': f'Notion API error: {response.status_code}'
-                    }).encode())
+                    }, 400)
             except Exception as e:
                 logger.error(f"Get Notion events error: {e}")
-                self._set_headers(500)
-                self.wfile.write(json.dumps({
+                self._send_json({
                     'success': False,
                     'message': f'Failed to fetch events: {str(e)}'
-                }).encode())
+                }, 500)
                 
         except Exception as e:
             logger.error(f"Get Notion events error: {e}")
-            self._set_headers(500)
-            self.wfile.write(json.dumps({'success': False, 'message': str(e)}).encode())
+            self._send_json({'success': False, 'message': str(e)}, 500)
     
     def sync_event_to_notion(self):
         """Sync an event to Notion calendar"""
         try:
             content_length = int(self.headers.get('Content-Length', 0))
             if content_length == 0:
-                self._set_headers(400)
-                self.wfile.write(json.dumps({'success': False, 'message': 'No data'}).encode())
+                self._send_json({'success': False, 'message': 'No data'}, 400)
                 return
             
             post_data = self.rfile.read(content_length)
@@ -3170,8 +2751,7 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             session_id = self.headers.get('X-Session-ID')
             
             if not session_id:
-                self._set_headers(401)
-                self.wfile.write(json.dumps({'success': False, 'message': 'Not authenticated'}).encode())
+                self._send_json({'success': False, 'message': 'Not authenticated'}, 401)
                 return
             
             conn = self.get_db_connection()
@@ -3185,8 +2765,7 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             
             if not user:
                 conn.close()
-                self._set_headers(401)
-                self.wfile.write(json.dumps({'success': False, 'message': 'Invalid session'}).encode())
+                self._send_json({'success': False, 'message': 'Invalid session'}, 401)
                 return
             
             user_id = user['user_id']
@@ -3196,8 +2775,7 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
             conn.close()
             
             if not config:
-                self._set_headers(404)
-                self.wfile.write(json.dumps({'success': False, 'message': 'Notion not configured'}).encode())
+                self._send_json({'success': False, 'message': 'Notion not configured'}, 404)
                 return
             
             # Create page in Notion
@@ -3233,40 +2811,169 @@ class CampaignAnalyticsAPI(BaseHTTPRequestHandler):
                 )
                 
                 if response.status_code in [200, 201]:
-                    self._set_headers()
-                    self.wfile.write(json.dumps({
+                    self._send_json({
                         'success': True,
                         'message': 'Event synced to Notion',
                         'page_id': response.json().get('id')
-                    }).encode())
+                    })
                 else:
-                    self._set_headers(400)
-                    self.wfile.write(json.dumps({
+                    self._send_json({
                         'success': False,
                         'message': f'Notion API error: {response.status_code}'
-                    }).encode())
+                    }, 400)
             except Exception as e:
                 logger.error(f"Sync event to Notion error: {e}")
-                self._set_headers(500)
-                self.wfile.write(json.dumps({
+                self._send_json({
                     'success': False,
                     'message': f'Failed to sync event: {str(e)}'
-                }).encode())
+                }, 500)
                 
         except Exception as e:
             logger.error(f"Sync event to Notion error: {e}")
-            self._set_headers(500)
-            self.wfile.write(json.dumps({'success': False, 'message': str(e)}).encode())
-
-def run_server(port=8001):
+            self._send_json({'success': False, 'message': str(e)}, 500)
+
+# ==================== ROUTES ====================
+
+router = Router()
+api = CampaignAnalyticsAPI
+
+router.add('GET', '/api/health', api.health_check)
+router.add('GET', '/api/metrics/routes', api.get_route_metrics)
+router.add('GET', '/api/metrics/cache', api.get_cache_metrics)
+router.add('GET', '/api/metrics/db', api.get_db_metrics)
+router.add('GET', '/api/campaigns', api.get_campaigns, args=('params',),
+           middleware=versioned('campaigns', 'roi_metrics'))
+router.add('GET', '/api/kpis', api.get_kpis, args=('params',),
+           middleware=versioned('roi_metrics'))
+router.add('GET', '/api/social-media', api.get_social_media, args=('params',),
+           middleware=versioned('social_media_metrics', 'social_media_config'))
+router.add('GET', '/api/seo-metrics', api.get_seo_metrics, args=('params',),
+           middleware=versioned('seo_metrics'))
+router.add('GET', '/api/roi-trend', api.get_roi_trend, args=('params',),
+           middleware=versioned('roi_metrics'))
+router.add('GET', '/api/revenue-cost', api.get_revenue_cost, args=('params',),
+           middleware=versioned('roi_metrics'))
+router.add('GET', '/api/dashboard', api.get_dashboard, args=('params',),
+           middleware=versioned('roi_metrics', 'campaigns', 'seo_metrics', 'social_media_metrics', 'social_media_config'))
+router.add('GET', '/export-data', api.export_data, args=('params',))
+
+# Authentication
+router.add('POST', '/api/social-login', api.handle_social_login, upstream=True)
+router.add('POST', '/api/login', api.handle_login)
+router.add('POST', '/api/change-password', api.handle_change_password)
+
+# Social media configuration and metrics
+router.add('GET', '/api/social-media/accounts', api.get_social_media_accounts, args=('params',))
+router.add('GET', '/api/social-media/settings', api.get_social_media_settings, args=('params',))
+router.add('GET', '/api/social-media/audit', api.get_social_media_audit, args=('params',))
+router.add('GET', '/api/social-media/metrics/daily', api.get_daily_metrics, args=('params',),
+           middleware=versioned('social_media_daily_metrics'))
+router.add('GET', '/api/social-media/metrics/monthly', api.get_monthly_metrics, args=('params',),
+           middleware=versioned('social_media_monthly_metrics'))
+router.add('GET', '/api/social-media/metrics/summary', api.get_performance_summary,
+           middleware=versioned('social_media_daily_metrics'))
+router.add('GET', '/api/social-media/metrics/content', api.get_top_content, args=('params',))
+router.add('GET', '/api/social-media/metrics/audience', api.get_audience_insights, args=('params',))
+router.add('POST', '/api/social-media/account', api.add_social_media_account)
+router.add('POST', '/api/social-media/settings', api.update_social_media_settings)
+router.add('POST', '/api/social-media/disconnect', api.disconnect_social_media_account)
+router.add('POST', '/api/social-media/metrics/daily', api.add_daily_metrics)
+router.add('POST', '/api/social-media/metrics/performance', api.get_performance_summary)
+router.add('POST', '/api/social-media/metrics/content', api.record_content_performance)
+router.add('POST', '/api/social-media/metrics/audience', api.record_audience_demographics)
+router.add('POST', '/api/social-media/metrics/daily/bulk', api.add_daily_metrics_bulk, stream_body=True)
+router.add('POST', '/api/social-media/metrics/content/bulk', api.record_content_performance_bulk, stream_body=True)
+router.add('POST', '/api/social-media/metrics/audience/bulk', api.record_audience_demographics_bulk, stream_body=True)
+router.add('POST', '/api/social-media/metrics/roi', api.calculate_campaign_roi)
+
+# Figma
+router.add('GET', '/api/figma/import', api.figma_import, args=('params',))
+router.add('GET', '/api/figma/import-all', api.figma_import_all)
+router.add('POST', '/api/figma/export', api.figma_export)
+router.add('POST', '/api/figma/sync-config', api.figma_save_config)
+
+# Social media platform integration
+if SOCIAL_MEDIA_AVAILABLE:
+    router.add('GET', '/api/social/accounts', api.get_social_accounts, args=('params',))
+    router.add('GET', '/api/social/metrics', api.get_social_metrics, args=('params',))
+    router.add('GET', '/api/social/dashboard', api.get_social_dashboard, args=('params',))
+    router.add('GET', '/api/social/top-content', api.get_top_social_content, args=('params',))
+    router.add('POST', '/api/social/connect', api.connect_social_account, upstream=True)
+    router.add('POST', '/api/social/sync', api.sync_social_metrics, args=('params',), upstream=True)
+    router.add('POST', '/api/social/disconnect', api.disconnect_social_account)
+
+# Ads platforms
+router.add('POST', '/api/ads-platforms/connect', api.connect_ads_platform)
+router.add('POST', '/api/ads-platforms/status', api.get_ads_platforms_status)
+router.add('POST', '/api/ads-platforms/disconnect', api.disconnect_ads_platform)
+
+# Notion
+router.add('POST', '/api/notion/connect', api.connect_notion, upstream=True)
+router.add('POST', '/api/notion/test', api.test_notion_connection, upstream=True)
+router.add('POST', '/api/notion/config', api.get_notion_config)
+router.add('POST', '/api/notion/events', api.get_notion_events, upstream=True)
+router.add('POST', '/api/notion/sync-event', api.sync_event_to_notion, upstream=True)
+
+CampaignAnalyticsAPI.router = router
+
+
+def run_server(port=8001, threads=DEFAULT_THREADS, queue_size=DEFAULT_QUEUE_SIZE,
+               workers=DEFAULT_WORKERS, engine='threaded'):
     """Start the API server"""
     server_address = ('', port)
-    httpd = HTTPServer(server_address, CampaignAnalyticsAPI)
+
+    # WAL so dashboard reads don't wait on writes; checkpoints run in the background
+    journal_mode = db_config.configure_database(DATABASE)
+    checkpointer = db_config.start_checkpointer(DATABASE) if journal_mode == 'WAL' else None
+
+    # Bring the schema up to date here so requests never run DDL
+    applied = migrations.migrate(DATABASE)
+    conn = sqlite3.connect(DATABASE)
+    versioned_tables = tracked_tables(conn)
+    conn.close()
+
+    # Logins, audit entries and sync config are group-committed by one writer
+    batcher = write_batcher.start_batcher(DATABASE)
+
+    # Optional: KPIs, charts and social totals from numpy arrays (API_COLUMNAR_CACHE=1)
+    cache = columnar_cache.start_cache(DATABASE)
+
+    # Monthly social metrics are recomputed from the daily ones off the request path
+    aggregator = social_monthly.start_aggregator(DATABASE)
+
+    def build_server(reuse_port=False):
+        if engine == 'asyncio':
+            return AsyncHTTPServer(server_address, CampaignAnalyticsAPI, threads=threads, reuse_port=reuse_port)
+        return make_server(server_address, CampaignAnalyticsAPI, threads, queue_size, reuse_port=reuse_port)
+
+    if workers > 1:
+        supervisor = PreforkSupervisor(lambda: build_server(reuse_port=True), workers=workers)
+    else:
+        httpd = build_server()
 
     print(f"🎨 PVB Estudio Creativo Campaign Analytics API")
     print(f"{'=' * 60}")
     print(f"✅ Server running on http://localhost:{port}")
     print(f"📊 Database: {DATABASE}")
+    print(f"🗄️  Schema: version {migrations.current_version(DATABASE)} ({len(applied)} migration(s) applied)")
+    print(f"🏷️  ETags: {len(versioned_tables)} tables versioned")
+    profile = db_config.PRAGMA_PROFILE
+    print(f"💾 Storage: {journal_mode} journal, synchronous={profile['synchronous']}, "
+          f"checkpoints {'every ' + str(int(checkpointer.interval)) + 's' if checkpointer else 'off'}")
+    print(f"📝 Write batching: "
+          f"{'up to ' + str(batcher.batch_size) + ' writes per commit, synchronous=' + batcher.synchronous if batcher else 'off'}")
+    print(f"🧮 Columnar cache: "
+          f"{'loading ' + ', '.join(cache.tables) + ' in the background' if cache else 'off (SQLite only)'}")
+    print(f"📅 Monthly social metrics: "
+          f"{'aggregated every ' + str(int(aggregator.interval)) + 's' if aggregator else 'aggregation off'}")
+    if engine == 'asyncio':
+        print(f"🧵 Workers: asyncio engine, {threads} handler threads")
+    elif threads > 0:
+        print(f"🧵 Workers: {threads} threads, queue depth {queue_size}")
+    else:
+        print(f"🧵 Workers: single-threaded")
+    if workers > 1:
+        print(f"🔀 Processes: {workers} (SO_REUSEPORT)")
     print(f"{'=' * 60}")
     print(f"\n📡 API Endpoints:")
     print(f"  GET  /api/campaigns       - List all campaigns")
@@ -3289,16 +2996,46 @@ def run_server(port=8001):
     print(f"  POST /api/notion/sync-event   - Sync event to Notion")
     print(f"\n⌨️  Press Ctrl+C to stop the server\n")
 
+    if workers > 1:
+        supervisor.run()
+        if batcher:
+            batcher.stop()
+        if checkpointer:
+            checkpointer.stop()
+        if aggregator:
+            aggregator.stop()
+        print("\n\n⛔ Server stopped")
+        return
+
     try:
         httpd.serve_forever()
     except KeyboardInterrupt:
         print("\n\n⛔ Server stopped")
         httpd.server_close()
+        if batcher:
+            batcher.stop()
+        if checkpointer:
+            checkpointer.stop()
+        if aggregator:
+            aggregator.stop()
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='PVB Estudio Creativo Campaign Analytics API')
+    parser.add_argument('--port', type=int, default=8001, help='Port to listen on')
+    parser.add_argument('--threads', type=int, default=DEFAULT_THREADS,
+                        help='Worker threads (0 = single-threaded)')
+    parser.add_argument('--queue-size', type=int, default=DEFAULT_QUEUE_SIZE,
+                        help='Connections allowed to wait for a worker before returning 503')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help='Server processes sharing the port via SO_REUSEPORT')
+    parser.add_argument('--engine', choices=['threaded', 'asyncio'], default='threaded',
+                        help='Connection handling engine')
+    args = parser.parse_args()
+
     if not os.path.exists(DATABASE):
         print(f"❌ Database not found: {DATABASE}")
         print(f"💡 Run 'python3 init_database.py' first")
         exit(1)
 
-    run_server()
+    run_server(args.port, threads=args.threads, queue_size=args.queue_size,
+               workers=args.workers, engine=args.engine)
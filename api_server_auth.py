@@ -12,6 +12,28 @@ from http.server import HTTPServer, BaseHTTPRequestHandler
 from urllib.parse import urlparse, parse_qs
 from datetime import datetime, timedelta
 import os
+import argparse
+from concurrent_server import (
+    make_server, PreforkSupervisor,
+    DEFAULT_THREADS, DEFAULT_QUEUE_SIZE, DEFAULT_WORKERS, KeepAliveTimeoutMixin, ResponseMixin
+)
+from async_server import AsyncHTTPServer
+from compression import variant_cache
+from api_router import Router, require_session, json_body, versioned
+from data_versions import tracked_tables
+from response_cache import response_cache
+import dashboard_queries
+import campaign_listing
+import columnar_cache
+import downsampling
+import period_comparison
+import time_buckets
+from dashboard_queries import user_scope
+from single_flight import flights
+import db_pool
+import db_config
+import migrations
+import write_batcher
 
 DATABASE = 'shotlist_analytics.db'
 
@@ -23,75 +45,57 @@ def generate_session_id():
     """Generate a secure session ID"""
     return secrets.token_urlsafe(32)
 
-class AuthenticatedAPI(BaseHTTPRequestHandler):
+class AuthenticatedAPI(KeepAliveTimeoutMixin, ResponseMixin, BaseHTTPRequestHandler):
     """API Handler with Authentication"""
 
-    def _set_headers(self, status=200, content_type='application/json'):
-        """Set HTTP headers"""
-        self.send_response(status)
-        self.send_header('Content-type', content_type)
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type, X-Session-ID')
-        self.end_headers()
+    # Persistent connections: every response carries Content-Length, and an
+    # idle keep-alive connection is dropped after `idle_timeout` seconds
+    protocol_version = 'HTTP/1.1'
+
+    cors_allow_headers = 'Content-Type, X-Session-ID'
 
     def do_OPTIONS(self):
         """Handle OPTIONS request for CORS"""
-        self._set_headers()
+        self._send_body(b'')
 
     def do_POST(self):
         """Handle POST requests"""
-        parsed_path = urlparse(self.path)
-        path = parsed_path.path
-
-        if path == '/api/login':
-            self.handle_login()
-        elif path == '/api/logout':
-            self.handle_logout()
-        else:
-            self._set_headers(404)
-            self.wfile.write(json.dumps({'error': 'Endpoint not found'}).encode())
+        self.router.dispatch(self, 'POST')
 
     def do_GET(self):
         """Handle GET requests"""
-        parsed_path = urlparse(self.path)
-        path = parsed_path.path
-        params = parse_qs(parsed_path.query)
-
-        # Public endpoints (no auth required)
-        if path == '/api/verify-session':
-            self.verify_session()
-            return
-
-        # Protected endpoints - require authentication
-        user_id = self.authenticate_request()
-        if not user_id:
-            self._set_headers(401)
-            self.wfile.write(json.dumps({'error': 'Unauthorized', 'message': 'Please login first'}).encode())
-            return
-
-        # Route handling
-        if path == '/api/campaigns':
-            self.get_campaigns(params, user_id)
-        elif path == '/api/kpis':
-            self.get_kpis(params, user_id)
-        elif path == '/api/roi-trend':
-            self.get_roi_trend(params, user_id)
-        elif path == '/api/revenue-cost':
-            self.get_revenue_cost(params, user_id)
-        elif path == '/api/social-media':
-            self.get_social_media(params, user_id)
-        elif path == '/api/seo-metrics':
-            self.get_seo_metrics(params, user_id)
-        elif path == '/api/calendar':
-            self.get_calendar_events(params, user_id)
-        elif path == '/api/user-info':
-            self.get_user_info(user_id)
-        elif path == '/api/export':
-            self.export_data(params, user_id)
-        else:
-            self._set_headers(404)
-            self.wfile.write(json.dumps({'error': 'Endpoint not found'}).encode())
+        self.router.dispatch(self, 'GET')
+
+    def get_route_metrics(self):
+        """Per-route call counts and timings"""
+        self._send_json({
+            'success': True,
+            'routes': self.router.stats()
+        })
+
+    def get_cache_metrics(self):
+        """Response cache, compression cache and coalescing usage"""
+        self._send_json({
+            'success': True,
+            'responses': response_cache.stats(),
+            'compressed_variants': variant_cache.stats(),
+            'single_flight': flights.stats()
+        })
+
+    def get_db_metrics(self):
+        """Connection pool usage, journal mode, WAL checkpointing, write batching and the columnar cache"""
+        conn = self.get_db_connection()
+        storage = db_config.storage_stats(conn, DATABASE)
+        conn.close()
+        batcher = write_batcher.batcher
+        cache = columnar_cache.active()
+        self._send_json({
+            'success': True,
+            'pool': db_pool.pool.stats(),
+            'storage': storage,
+            'write_batcher': batcher.stats() if batcher is not None else None,
+            'columnar_cache': cache.stats() if cache is not None else None
+        })
 
     def authenticate_request(self):
         """Authenticate request using session ID"""
@@ -113,23 +117,18 @@ class AuthenticatedAPI(BaseHTTPRequestHandler):
 
         return result['user_id'] if result else None
 
-    def handle_login(self):
+    def handle_login(self, data):
         """Handle user login"""
         try:
-            content_length = int(self.headers['Content-Length'])
-            post_data = self.rfile.read(content_length)
-            data = json.loads(post_data.decode('utf-8'))
-
             username = data.get('username')
             password = data.get('password')
             remember_me = data.get('rememberMe', False)
 
             if not username or not password:
-                self._set_headers(400)
-                self.wfile.write(json.dumps({
+                self._send_json({
                     'success': False,
                     'message': 'Username and password required'
-                }).encode())
+                }, 400)
                 return
 
             conn = self.get_db_connection()
@@ -146,20 +145,18 @@ class AuthenticatedAPI(BaseHTTPRequestHandler):
             user = cursor.fetchone()
 
             if not user:
-                self._set_headers(401)
-                self.wfile.write(json.dumps({
+                self._send_json({
                     'success': False,
                     'message': 'Invalid username or password'
-                }).encode())
+                }, 401)
                 conn.close()
                 return
 
             if not user['is_active']:
-                self._set_headers(403)
-                self.wfile.write(json.dumps({
+                self._send_json({
                     'success': False,
                     'message': 'Account is inactive. Please contact support.'
-                }).encode())
+                }, 403)
                 conn.close()
                 return
 
@@ -168,28 +165,26 @@ class AuthenticatedAPI(BaseHTTPRequestHandler):
             expires_in_days = 30 if remember_me else 1
             expires_at = datetime.now() + timedelta(days=expires_in_days)
 
-            cursor.execute('''
-                INSERT INTO sessions (session_id, user_id, expires_at)
-                VALUES (?, ?, ?)
-            ''', (session_id, user['user_id'], expires_at.strftime('%Y-%m-%d %H:%M:%S')))
-
-            # Update last login
-            cursor.execute('''
-                UPDATE users SET last_login = datetime('now')
-                WHERE user_id = ?
-            ''', (user['user_id'],))
-
-            # Log activity
-            cursor.execute('''
-                INSERT INTO activity_log (user_id, action)
-                VALUES (?, ?)
-            ''', (user['user_id'], 'Login'))
-
-            conn.commit()
             conn.close()
 
-            self._set_headers(200)
-            self.wfile.write(json.dumps({
+            # Session, last login and activity are group-committed with other
+            # logins; the session is committed before the client can use it
+            write_batcher.write(DATABASE, [
+                ('''
+                    INSERT INTO sessions (session_id, user_id, expires_at)
+                    VALUES (?, ?, ?)
+                ''', (session_id, user['user_id'], expires_at.strftime('%Y-%m-%d %H:%M:%S'))),
+                ('''
+                    UPDATE users SET last_login = datetime('now')
+                    WHERE user_id = ?
+                ''', (user['user_id'],)),
+                ('''
+                    INSERT INTO activity_log (user_id, action)
+                    VALUES (?, ?)
+                ''', (user['user_id'], 'Login')),
+            ])
+
+            self._send_json({
                 'success': True,
                 'message': 'Login successful',
                 'session_id': session_id,
@@ -201,11 +196,13 @@ class AuthenticatedAPI(BaseHTTPRequestHandler):
                     'company_name': user['company_name'],
                     'role': user['role']
                 }
-            }).encode())
+            })
 
+        except write_batcher.WriteQueueFull:
+            self._send_json({'success': False, 'message': 'Server is busy. Please try again.'}, 503,
+                            headers={'Retry-After': '1'})
         except Exception as e:
-            self._set_headers(500)
-            self.wfile.write(json.dumps({'success': False, 'message': str(e)}).encode())
+            self._send_json({'success': False, 'message': str(e)}, 500)
 
     def handle_logout(self):
         """Handle user logout"""
@@ -218,22 +215,19 @@ class AuthenticatedAPI(BaseHTTPRequestHandler):
             conn.commit()
             conn.close()
 
-        self._set_headers(200)
-        self.wfile.write(json.dumps({'success': True, 'message': 'Logged out successfully'}).encode())
+        self._send_json({'success': True, 'message': 'Logged out successfully'})
 
     def verify_session(self):
         """Verify if session is valid"""
         session_id = self.headers.get('X-Session-ID')
 
         if not session_id:
-            self._set_headers(200)
-            self.wfile.write(json.dumps({'valid': False}).encode())
+            self._send_json({'valid': False})
             return
 
         user_id = self.authenticate_request()
 
-        self._set_headers(200)
-        self.wfile.write(json.dumps({'valid': bool(user_id)}).encode())
+        self._send_json({'valid': bool(user_id)})
 
     def get_user_info(self, user_id):
         """Get current user information"""
@@ -254,183 +248,49 @@ class AuthenticatedAPI(BaseHTTPRequestHandler):
 
             conn.close()
 
-            self._set_headers()
-            self.wfile.write(json.dumps({
+            self._send_json({
                 'user': dict(user),
                 'campaign_count': campaign_count
-            }).encode())
+            })
 
         except Exception as e:
-            self._set_headers(500)
-            self.wfile.write(json.dumps({'error': str(e)}).encode())
+            self._send_json({'error': str(e)}, 500)
 
     def get_db_connection(self):
-        """Create database connection"""
-        conn = sqlite3.connect(DATABASE)
-        conn.row_factory = sqlite3.Row
-        return conn
+        """Pooled database connection for this thread; close() hands it back"""
+        return db_pool.connect(DATABASE)
 
     def get_campaigns(self, params, user_id):
         """Get campaigns for authenticated user"""
         try:
             conn = self.get_db_connection()
             cursor = conn.cursor()
-
-            # Check if user is admin
-            cursor.execute('SELECT role FROM users WHERE user_id = ?', (user_id,))
-            user_role = cursor.fetchone()['role']
-
-            campaign_type = params.get('type', ['all'])[0]
-            status = params.get('status', ['all'])[0]
-
-            # Build query
-            if user_role == 'admin':
-                query = 'SELECT * FROM campaigns WHERE 1=1'
-                query_params = []
-            else:
-                query = 'SELECT * FROM campaigns WHERE user_id = ?'
-                query_params = [user_id]
-
-            if campaign_type != 'all':
-                query += ' AND campaign_type = ?'
-                query_params.append(campaign_type)
-
-            if status != 'all':
-                query += ' AND status = ?'
-                query_params.append(status)
-
-            query += ' ORDER BY created_at DESC'
-
-            cursor.execute(query, query_params)
-            rows = cursor.fetchall()
-
-            campaigns = []
-            for row in rows:
-                # Get ROI metrics
-                cursor.execute('''
-                    SELECT SUM(cost) as total_spent, SUM(revenue) as total_revenue
-                    FROM roi_metrics WHERE campaign_id = ?
-                ''', (row['campaign_id'],))
-                metrics = cursor.fetchone()
-
-                total_spent = metrics['total_spent'] or 0
-                total_revenue = metrics['total_revenue'] or 0
-                roi = ((total_revenue - total_spent) / total_spent * 100) if total_spent > 0 else 0
-
-                campaigns.append({
-                    'campaign_id': row['campaign_id'],
-                    'campaign_name': row['campaign_name'],
-                    'client_name': row['client_name'],
-                    'campaign_type': row['campaign_type'],
-                    'start_date': row['start_date'],
-                    'end_date': row['end_date'],
-                    'budget': row['budget'],
-                    'spent': round(total_spent, 2),
-                    'revenue': round(total_revenue, 2),
-                    'roi': round(roi, 2),
-                    'status': row['status']
-                })
-
+            page = campaign_listing.list_campaigns(cursor, params, user_scope(cursor, user_id))
             conn.close()
 
-            self._set_headers()
-            self.wfile.write(json.dumps({'campaigns': campaigns}).encode())
+            self._send_json(page)
 
+        except campaign_listing.ListingError as e:
+            conn.close()
+            self._send_json({'error': str(e)}, 400)
         except Exception as e:
-            self._set_headers(500)
-            self.wfile.write(json.dumps({'error': str(e)}).encode())
+            self._send_json({'error': str(e)}, 500)
 
     def get_kpis(self, params, user_id):
         """Get KPI metrics for user"""
         try:
             conn = self.get_db_connection()
             cursor = conn.cursor()
-
-            # Check if admin
-            cursor.execute('SELECT role FROM users WHERE user_id = ?', (user_id,))
-            is_admin = cursor.fetchone()['role'] == 'admin'
-
-            days = int(params.get('days', ['30'])[0])
-            campaign_id = params.get('campaign_id', ['all'])[0]
-
-            date_filter = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
-
-            # Build user filter
-            user_filter = '' if is_admin else ' AND c.user_id = ?'
-            base_params = [date_filter]
-            if not is_admin:
-                base_params.append(user_id)
-
-            if campaign_id != 'all':
-                user_filter += ' AND r.campaign_id = ?'
-                base_params.append(campaign_id)
-
-            # Get current metrics
-            cursor.execute(f'''
-                SELECT
-                    SUM(r.revenue) as total_revenue,
-                    SUM(r.cost) as total_cost,
-                    SUM(r.conversions) as total_conversions,
-                    AVG(r.roi_percentage) as avg_roi,
-                    AVG(r.roas) as avg_roas
-                FROM roi_metrics r
-                JOIN campaigns c ON r.campaign_id = c.campaign_id
-                WHERE r.date >= ?{user_filter}
-            ''', base_params)
-
-            current_metrics = cursor.fetchone()
-
-            # Get previous period
-            prev_date_start = (datetime.now() - timedelta(days=days*2)).strftime('%Y-%m-%d')
-            prev_params = [prev_date_start, date_filter]
-            if not is_admin:
-                prev_params.append(user_id)
-            if campaign_id != 'all':
-                prev_params.append(campaign_id)
-
-            cursor.execute(f'''
-                SELECT
-                    SUM(r.revenue) as total_revenue,
-                    SUM(r.conversions) as total_conversions,
-                    AVG(r.roi_percentage) as avg_roi,
-                    AVG(r.roas) as avg_roas
-                FROM roi_metrics r
-                JOIN campaigns c ON r.campaign_id = c.campaign_id
-                WHERE r.date >= ? AND r.date < ?{user_filter}
-            ''', prev_params)
-
-            prev_metrics = cursor.fetchone()
-
-            def calc_change(current, previous):
-                if previous and previous > 0:
-                    return round(((current - previous) / previous) * 100, 2)
-                return 0
-
-            total_revenue = current_metrics['total_revenue'] or 0
-            total_conversions = current_metrics['total_conversions'] or 0
-            avg_roi = current_metrics['avg_roi'] or 0
-            avg_roas = current_metrics['avg_roas'] or 0
-
-            prev_revenue = prev_metrics['total_revenue'] or 0
-            prev_conversions = prev_metrics['total_conversions'] or 0
-            prev_roi = prev_metrics['avg_roi'] or 0
-            prev_roas = prev_metrics['avg_roas'] or 0
-
-            kpis = {
-                'roi': {'value': round(avg_roi, 2), 'change': calc_change(avg_roi, prev_roi)},
-                'revenue': {'value': round(total_revenue, 2), 'change': calc_change(total_revenue, prev_revenue)},
-                'conversions': {'value': int(total_conversions), 'change': calc_change(total_conversions, prev_conversions)},
-                'roas': {'value': round(avg_roas, 2), 'change': calc_change(avg_roas, prev_roas)}
-            }
-
+            kpis = dashboard_queries.kpis(cursor, params, user_scope(cursor, user_id))
             conn.close()
 
-            self._set_headers()
-            self.wfile.write(json.dumps({'kpis': kpis}).encode())
+            self._send_json({'kpis': kpis})
 
+        except period_comparison.ComparisonError as e:
+            conn.close()
+            self._send_json({'error': str(e)}, 400)
         except Exception as e:
-            self._set_headers(500)
-            self.wfile.write(json.dumps({'error': str(e)}).encode())
+            self._send_json({'error': str(e)}, 500)
 
     def get_calendar_events(self, params, user_id):
         """Get calendar events for user"""
@@ -489,12 +349,10 @@ class AuthenticatedAPI(BaseHTTPRequestHandler):
 
             conn.close()
 
-            self._set_headers()
-            self.wfile.write(json.dumps({'events': events}).encode())
+            self._send_json({'events': events})
 
         except Exception as e:
-            self._set_headers(500)
-            self.wfile.write(json.dumps({'error': str(e)}).encode())
+            self._send_json({'error': str(e)}, 500)
 
     # Keeping existing methods from original API for consistency
     def get_roi_trend(self, params, user_id):
@@ -502,226 +360,78 @@ class AuthenticatedAPI(BaseHTTPRequestHandler):
         try:
             conn = self.get_db_connection()
             cursor = conn.cursor()
+            trend = dashboard_queries.roi_trend(cursor, params, user_scope(cursor, user_id))
+            conn.close()
 
-            cursor.execute('SELECT role FROM users WHERE user_id = ?', (user_id,))
-            is_admin = cursor.fetchone()['role'] == 'admin'
-
-            days = int(params.get('days', ['30'])[0])
-            campaign_id = params.get('campaign_id', ['all'])[0]
-            date_filter = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
-
-            user_filter = '' if is_admin else ' AND c.user_id = ?'
-            query_params = [date_filter]
-            if not is_admin:
-                query_params.append(user_id)
-            if campaign_id != 'all':
-                user_filter += ' AND r.campaign_id = ?'
-                query_params.append(campaign_id)
-
-            cursor.execute(f'''
-                SELECT r.date, AVG(r.roi_percentage) as roi
-                FROM roi_metrics r
-                JOIN campaigns c ON r.campaign_id = c.campaign_id
-                WHERE r.date >= ?{user_filter}
-                GROUP BY r.date
-                ORDER BY r.date
-            ''', query_params)
-
-            rows = cursor.fetchall()
-            trend = {
-                'labels': [row['date'] for row in rows],
-                'data': [round(row['roi'], 2) for row in rows]
-            }
+            self._send_json({'trend': trend})
 
+        except (time_buckets.BucketError, downsampling.DownsampleError) as e:
             conn.close()
-            self._set_headers()
-            self.wfile.write(json.dumps({'trend': trend}).encode())
-
+            self._send_json({'error': str(e)}, 400)
         except Exception as e:
-            self._set_headers(500)
-            self.wfile.write(json.dumps({'error': str(e)}).encode())
+            self._send_json({'error': str(e)}, 500)
 
     def get_revenue_cost(self, params, user_id):
         """Get revenue vs cost data for user"""
         try:
             conn = self.get_db_connection()
             cursor = conn.cursor()
+            data = dashboard_queries.revenue_cost(cursor, params, user_scope(cursor, user_id))
+            conn.close()
 
-            cursor.execute('SELECT role FROM users WHERE user_id = ?', (user_id,))
-            is_admin = cursor.fetchone()['role'] == 'admin'
-
-            days = int(params.get('days', ['30'])[0])
-            campaign_id = params.get('campaign_id', ['all'])[0]
-            date_filter = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
-
-            user_filter = '' if is_admin else ' AND c.user_id = ?'
-            query_params = [date_filter]
-            if not is_admin:
-                query_params.append(user_id)
-            if campaign_id != 'all':
-                user_filter += ' AND r.campaign_id = ?'
-                query_params.append(campaign_id)
-
-            cursor.execute(f'''
-                SELECT r.date, SUM(r.revenue) as revenue, SUM(r.cost) as cost
-                FROM roi_metrics r
-                JOIN campaigns c ON r.campaign_id = c.campaign_id
-                WHERE r.date >= ?{user_filter}
-                GROUP BY r.date
-                ORDER BY r.date
-            ''', query_params)
-
-            rows = cursor.fetchall()
-            data = {
-                'labels': [row['date'] for row in rows],
-                'revenue': [round(row['revenue'], 2) for row in rows],
-                'cost': [round(row['cost'], 2) for row in rows]
-            }
+            self._send_json({'data': data})
 
+        except (time_buckets.BucketError, downsampling.DownsampleError) as e:
             conn.close()
-            self._set_headers()
-            self.wfile.write(json.dumps({'data': data}).encode())
-
+            self._send_json({'error': str(e)}, 400)
         except Exception as e:
-            self._set_headers(500)
-            self.wfile.write(json.dumps({'error': str(e)}).encode())
+            self._send_json({'error': str(e)}, 500)
 
     def get_social_media(self, params, user_id):
         """Get social media metrics for user"""
         try:
             conn = self.get_db_connection()
             cursor = conn.cursor()
-
-            cursor.execute('SELECT role FROM users WHERE user_id = ?', (user_id,))
-            is_admin = cursor.fetchone()['role'] == 'admin'
-
-            days = int(params.get('days', ['30'])[0])
-            campaign_id = params.get('campaign_id', ['all'])[0]
-            date_filter = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
-
-            user_filter = '' if is_admin else ' AND c.user_id = ?'
-            query_params = [date_filter]
-            if not is_admin:
-                query_params.append(user_id)
-            if campaign_id != 'all':
-                user_filter += ' AND s.campaign_id = ?'
-                query_params.append(campaign_id)
-
-            cursor.execute(f'''
-                SELECT
-                    s.platform,
-                    SUM(s.impressions) as impressions,
-                    SUM(s.engagement) as engagement,
-                    SUM(s.reach) as reach,
-                    SUM(s.followers_gained) as followers,
-                    SUM(s.clicks) as clicks
-                FROM social_media_metrics s
-                JOIN campaigns c ON s.campaign_id = c.campaign_id
-                WHERE s.date >= ?{user_filter}
-                GROUP BY s.platform
-            ''', query_params)
-
-            rows = cursor.fetchall()
-            platforms = {}
-            for row in rows:
-                platforms[row['platform']] = {
-                    'impressions': row['impressions'],
-                    'engagement': row['engagement'],
-                    'reach': row['reach'],
-                    'followers': row['followers'],
-                    'clicks': row['clicks']
-                }
-
+            platforms = dashboard_queries.social_platforms(cursor, params, user_scope(cursor, user_id))
             conn.close()
-            self._set_headers()
-            self.wfile.write(json.dumps({'platforms': platforms}).encode())
+
+            self._send_json({'platforms': platforms})
 
         except Exception as e:
-            self._set_headers(500)
-            self.wfile.write(json.dumps({'error': str(e)}).encode())
+            self._send_json({'error': str(e)}, 500)
 
     def get_seo_metrics(self, params, user_id):
         """Get SEO metrics for user"""
         try:
             conn = self.get_db_connection()
             cursor = conn.cursor()
+            metrics = dashboard_queries.seo_metrics(cursor, params, user_scope(cursor, user_id))
+            conn.close()
 
-            cursor.execute('SELECT role FROM users WHERE user_id = ?', (user_id,))
-            is_admin = cursor.fetchone()['role'] == 'admin'
-
-            days = int(params.get('days', ['30'])[0])
-            date_filter = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
-
-            user_filter = '' if is_admin else ' AND c.user_id = ?'
-            query_params = [date_filter]
-            if not is_admin:
-                query_params.append(user_id)
-
-            cursor.execute(f'''
-                SELECT
-                    SUM(s.organic_traffic) as traffic,
-                    AVG(s.keyword_rankings) as keywords,
-                    SUM(s.backlinks) as backlinks,
-                    AVG(s.domain_authority) as domain_authority
-                FROM seo_metrics s
-                JOIN campaigns c ON s.campaign_id = c.campaign_id
-                WHERE s.date >= ?{user_filter}
-            ''', query_params)
-
-            current = cursor.fetchone()
-
-            # Get previous period
-            prev_date_start = (datetime.now() - timedelta(days=days*2)).strftime('%Y-%m-%d')
-            prev_params = [prev_date_start, date_filter]
-            if not is_admin:
-                prev_params.append(user_id)
+            self._send_json({'metrics': metrics})
 
-            cursor.execute(f'''
-                SELECT
-                    SUM(s.organic_traffic) as traffic,
-                    AVG(s.keyword_rankings) as keywords,
-                    SUM(s.backlinks) as backlinks
-                FROM seo_metrics s
-                JOIN campaigns c ON s.campaign_id = c.campaign_id
-                WHERE s.date >= ? AND s.date < ?{user_filter}
-            ''', prev_params)
-
-            prev = cursor.fetchone()
-
-            def calc_change(current, previous):
-                if previous and previous > 0:
-                    return round(((current - previous) / previous) * 100, 2)
-                return 0
-
-            metrics = {
-                'organic_traffic': {
-                    'value': int(current['traffic'] or 0),
-                    'change': calc_change(current['traffic'] or 0, prev['traffic'] or 0)
-                },
-                'keyword_rankings': {
-                    'value': int(current['keywords'] or 0),
-                    'change': int((current['keywords'] or 0) - (prev['keywords'] or 0))
-                },
-                'backlinks': {
-                    'value': int(current['backlinks'] or 0),
-                    'change': int((current['backlinks'] or 0) - (prev['backlinks'] or 0))
-                },
-                'domain_authority': {
-                    'value': int(current['domain_authority'] or 0),
-                    'change': 0
-                }
-            }
+        except period_comparison.ComparisonError as e:
+            conn.close()
+            self._send_json({'error': str(e)}, 400)
+        except Exception as e:
+            self._send_json({'error': str(e)}, 500)
 
+    def get_dashboard(self, params, user_id):
+        """All dashboard widgets for user in one response"""
+        try:
+            conn = self.get_db_connection()
+            cursor = conn.cursor()
+            widgets = dashboard_queries.dashboard(cursor, params, user_scope(cursor, user_id))
             conn.close()
-            self._set_headers()
-            self.wfile.write(json.dumps({'metrics': metrics}).encode())
+
+            self._send_json(widgets)
 
         except Exception as e:
-            self._set_headers(500)
-            self.wfile.write(json.dumps({'error': str(e)}).encode())
+            self._send_json({'error': str(e)}, 500)
 
     def export_data(self, params, user_id):
         """Export campaign data as CSV for user"""
+        conn = None
         try:
             conn = self.get_db_connection()
             cursor = conn.cursor()
@@ -732,6 +442,8 @@ class AuthenticatedAPI(BaseHTTPRequestHandler):
             user_filter = '' if is_admin else ' AND c.user_id = ?'
             query_params = [user_id] if not is_admin else []
 
+            # campaign_id breaks name ties so rows come straight off the
+            # campaign name and roi (campaign_id, date) indexes, unsorted
             cursor.execute(f'''
                 SELECT
                     c.campaign_name,
@@ -747,38 +459,124 @@ class AuthenticatedAPI(BaseHTTPRequestHandler):
                 FROM campaigns c
                 LEFT JOIN roi_metrics r ON c.campaign_id = r.campaign_id
                 WHERE 1=1{user_filter}
-                ORDER BY c.campaign_name, r.date
+                ORDER BY c.campaign_name, c.campaign_id, r.date
             ''', query_params)
+        except Exception as e:
+            if conn:
+                conn.close()
+            self._send_json({'error': str(e)}, 500)
+            return
 
-            rows = cursor.fetchall()
+        try:
+            self._send_stream(self._csv_chunks(cursor), content_type='text/csv', headers={
+                'Content-Disposition': 'attachment; filename=campaign_data.csv'
+            })
+        finally:
+            conn.close()
 
-            csv_data = 'Campaign,Client,Type,Budget,Status,Date,Revenue,Cost,Conversions,ROI\n'
+    def _csv_chunks(self, cursor, batch_size=500):
+        """Yield the export CSV a batch of rows at a time"""
+        yield b'Campaign,Client,Type,Budget,Status,Date,Revenue,Cost,Conversions,ROI\n'
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            csv_data = ''
             for row in rows:
                 csv_data += f"{row['campaign_name']},{row['client_name']},{row['campaign_type']},"
                 csv_data += f"{row['budget']},{row['status']},{row['date'] or ''},"
                 csv_data += f"{row['revenue'] or 0},{row['cost'] or 0},"
                 csv_data += f"{row['conversions'] or 0},{row['roi_percentage'] or 0}\n"
+            yield csv_data.encode()
+
+# ==================== ROUTES ====================
+
+router = Router()
+api = AuthenticatedAPI
+
+# Public endpoints (no auth required)
+router.add('POST', '/api/login', api.handle_login, args=('body',), middleware=(json_body,))
+router.add('POST', '/api/logout', api.handle_logout)
+router.add('GET', '/api/verify-session', api.verify_session)
+
+# Protected endpoints - require authentication
+protected = (require_session,)
+router.add('GET', '/api/campaigns', api.get_campaigns, args=('params', 'user_id'),
+           middleware=protected + versioned('campaigns', 'roi_metrics', 'users'))
+router.add('GET', '/api/kpis', api.get_kpis, args=('params', 'user_id'),
+           middleware=protected + versioned('roi_metrics', 'campaigns', 'users'))
+router.add('GET', '/api/roi-trend', api.get_roi_trend, args=('params', 'user_id'),
+           middleware=protected + versioned('roi_metrics', 'campaigns', 'users'))
+router.add('GET', '/api/revenue-cost', api.get_revenue_cost, args=('params', 'user_id'),
+           middleware=protected + versioned('roi_metrics', 'campaigns', 'users'))
+router.add('GET', '/api/social-media', api.get_social_media, args=('params', 'user_id'),
+           middleware=protected + versioned('social_media_metrics', 'campaigns', 'users'))
+router.add('GET', '/api/seo-metrics', api.get_seo_metrics, args=('params', 'user_id'),
+           middleware=protected + versioned('seo_metrics', 'campaigns', 'users'))
+router.add('GET', '/api/dashboard', api.get_dashboard, args=('params', 'user_id'),
+           middleware=protected + versioned('roi_metrics', 'campaigns', 'seo_metrics', 'social_media_metrics', 'users'))
+router.add('GET', '/api/calendar', api.get_calendar_events, args=('params', 'user_id'), middleware=protected)
+router.add('GET', '/api/user-info', api.get_user_info, args=('user_id',), middleware=protected)
+router.add('GET', '/api/export', api.export_data, args=('params', 'user_id'), middleware=protected)
+router.add('GET', '/api/metrics/routes', api.get_route_metrics, middleware=protected)
+router.add('GET', '/api/metrics/cache', api.get_cache_metrics, middleware=protected)
+router.add('GET', '/api/metrics/db', api.get_db_metrics, middleware=protected)
+
+AuthenticatedAPI.router = router
+
+def run_server(port=8001, threads=DEFAULT_THREADS, queue_size=DEFAULT_QUEUE_SIZE,
+               workers=DEFAULT_WORKERS, engine='threaded'):
+    """Start the API server"""
+    server_address = ('', port)
 
-            conn.close()
+    # WAL so dashboard reads don't wait on writes; checkpoints run in the background
+    journal_mode = db_config.configure_database(DATABASE)
+    checkpointer = db_config.start_checkpointer(DATABASE) if journal_mode == 'WAL' else None
 
-            self._set_headers(content_type='text/csv')
-            self.send_header('Content-Disposition', 'attachment; filename=campaign_data.csv')
-            self.wfile.write(csv_data.encode())
+    # Bring the schema up to date here so requests never run DDL
+    applied = migrations.migrate(DATABASE)
+    conn = sqlite3.connect(DATABASE)
+    versioned_tables = tracked_tables(conn)
+    conn.close()
 
-        except Exception as e:
-            self._set_headers(500)
-            self.wfile.write(json.dumps({'error': str(e)}).encode())
+    # Logins are group-committed by one writer
+    batcher = write_batcher.start_batcher(DATABASE)
 
-def run_server(port=8001):
-    """Start the API server"""
-    server_address = ('', port)
-    httpd = HTTPServer(server_address, AuthenticatedAPI)
+    # Optional: KPIs, charts and social totals from numpy arrays (API_COLUMNAR_CACHE=1)
+    cache = columnar_cache.start_cache(DATABASE)
+
+    def build_server(reuse_port=False):
+        if engine == 'asyncio':
+            return AsyncHTTPServer(server_address, AuthenticatedAPI, threads=threads, reuse_port=reuse_port)
+        return make_server(server_address, AuthenticatedAPI, threads, queue_size, reuse_port=reuse_port)
+
+    if workers > 1:
+        supervisor = PreforkSupervisor(lambda: build_server(reuse_port=True), workers=workers)
+    else:
+        httpd = build_server()
 
     print(f"🎨 SHOTLIST Campaign Analytics API (Authenticated)")
     print(f"{'=' * 60}")
     print(f"✅ Server running on http://localhost:{port}")
     print(f"📊 Database: {DATABASE}")
+    print(f"🗄️  Schema: version {migrations.current_version(DATABASE)} ({len(applied)} migration(s) applied)")
+    print(f"🏷️  ETags: {len(versioned_tables)} tables versioned")
+    profile = db_config.PRAGMA_PROFILE
+    print(f"💾 Storage: {journal_mode} journal, synchronous={profile['synchronous']}, "
+          f"checkpoints {'every ' + str(int(checkpointer.interval)) + 's' if checkpointer else 'off'}")
+    print(f"📝 Write batching: "
+          f"{'up to ' + str(batcher.batch_size) + ' writes per commit, synchronous=' + batcher.synchronous if batcher else 'off'}")
+    print(f"🧮 Columnar cache: "
+          f"{'loading ' + ', '.join(cache.tables) + ' in the background' if cache else 'off (SQLite only)'}")
     print(f"🔐 Authentication: ENABLED")
+    if engine == 'asyncio':
+        print(f"🧵 Workers: asyncio engine, {threads} handler threads")
+    elif threads > 0:
+        print(f"🧵 Workers: {threads} threads, queue depth {queue_size}")
+    else:
+        print(f"🧵 Workers: single-threaded")
+    if workers > 1:
+        print(f"🔀 Processes: {workers} (SO_REUSEPORT)")
     print(f"{'=' * 60}")
     print(f"\n📡 API Endpoints:")
     print(f"  POST /api/login           - User login")
@@ -795,16 +593,42 @@ def run_server(port=8001):
     print(f"  GET  /api/export          - Export data as CSV")
     print(f"\n⌨️  Press Ctrl+C to stop the server\n")
 
+    if workers > 1:
+        supervisor.run()
+        if batcher:
+            batcher.stop()
+        if checkpointer:
+            checkpointer.stop()
+        print("\n\n⛔ Server stopped")
+        return
+
     try:
         httpd.serve_forever()
     except KeyboardInterrupt:
         print("\n\n⛔ Server stopped")
         httpd.server_close()
+        if batcher:
+            batcher.stop()
+        if checkpointer:
+            checkpointer.stop()
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='SHOTLIST Campaign Analytics API (Authenticated)')
+    parser.add_argument('--port', type=int, default=8001, help='Port to listen on')
+    parser.add_argument('--threads', type=int, default=DEFAULT_THREADS,
+                        help='Worker threads (0 = single-threaded)')
+    parser.add_argument('--queue-size', type=int, default=DEFAULT_QUEUE_SIZE,
+                        help='Connections allowed to wait for a worker before returning 503')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help='Server processes sharing the port via SO_REUSEPORT')
+    parser.add_argument('--engine', choices=['threaded', 'asyncio'], default='threaded',
+                        help='Connection handling engine')
+    args = parser.parse_args()
+
     if not os.path.exists(DATABASE):
         print(f"❌ Database not found: {DATABASE}")
         print(f"💡 Run 'python3 init_database.py' and 'python3 setup_auth.py' first")
         exit(1)
 
-    run_server()
+    run_server(args.port, threads=args.threads, queue_size=args.queue_size,
+               workers=args.workers, engine=args.engine)
@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+asyncio serving engine for the SHOTLIST API servers
+Runs the existing request handler classes without tying an OS thread to
+every open connection
+"""
+
+import io
+import os
+import json
+import socket
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import db_pool
+from concurrent_server import DEFAULT_THREADS, DEFAULT_DRAIN_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+# Handlers that call third-party APIs (Notion, social platforms, OAuth) use
+# the blocking `requests` clients, so each in-flight upstream call holds one
+# of these threads until the provider answers. Making them awaitable would
+# mean async rewrites of every integration client; instead the pool is the
+# deliberate cap on concurrent upstream calls. At the 10 s client timeouts,
+# 32 threads sustain ~3 slow calls a second -- far more than connect, sync
+# and login traffic produce -- and once they and API_UPSTREAM_QUEUE waiting
+# requests are taken, further upstream requests get a 503 rather than
+# queueing behind a stalled provider.
+DEFAULT_UPSTREAM_THREADS = int(os.environ.get('API_UPSTREAM_THREADS', '32'))
+DEFAULT_UPSTREAM_QUEUE = int(os.environ.get('API_UPSTREAM_QUEUE', '32'))
+DEFAULT_IDLE_TIMEOUT = float(os.environ.get('API_IDLE_TIMEOUT', '75'))
+MAX_HEADER_SIZE = 64 * 1024
+# Largest body a handler reads into memory. Routes registered with
+# stream_body (the /bulk ingestion endpoints) read theirs incrementally
+# and are exempt.
+MAX_BODY_SIZE = int(os.environ.get('API_MAX_BODY_SIZE', str(50 * 1024 * 1024)))
+# Response bytes collected before a write goes out to the client
+WRITE_BUFFER_SIZE = 64 * 1024
+
+# Used for handler classes without a route registry: paths whose handlers
+# wait on third-party APIs (Notion, social platforms, OAuth providers). They
+# run on their own executor so a slow upstream can never starve the
+# SQLite-bound dashboard routes.
+UPSTREAM_PATH_PREFIXES = (
+    '/api/notion/',
+    '/api/social/connect',
+    '/api/social/sync',
+    '/api/social-login',
+    '/oauth/',
+)
+
+
+def run_handler(handler_class, rfile, wfile, client_address, server):
+    """Run one request through a BaseHTTPRequestHandler subclass
+
+    The handler reads the request from rfile and writes the response to
+    wfile. Returns close_connection.
+    """
+    handler = handler_class.__new__(handler_class)
+    handler.request = None
+    handler.client_address = client_address
+    handler.server = server
+    handler.rfile = rfile
+    handler.wfile = wfile
+    handler.close_connection = True
+    handler.handle_one_request()
+    return handler.close_connection
+
+
+def run_handler_in_memory(handler_class, raw_request, client_address, server):
+    """run_handler on memory buffers; returns (response_bytes, close_connection)"""
+    wfile = io.BytesIO()
+    close = run_handler(handler_class, io.BytesIO(raw_request), wfile, client_address, server)
+    return wfile.getvalue(), close
+
+
+class _LoopReader:
+    """A request on an asyncio StreamReader, as a blocking rfile for a handler thread
+
+    Used for stream_body routes. The head, already read by the event loop,
+    is served from memory; the body is fetched from the loop as the handler
+    reads it, never past the declared length.
+    """
+
+    def __init__(self, loop, reader, head, length):
+        self._loop = loop
+        self._reader = reader
+        self._head = io.BytesIO(head)
+        self.remaining = length
+
+    def readline(self, size=-1):
+        # Only the request line and headers are read line by line
+        return self._head.readline(size)
+
+    def read(self, size=-1):
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        parts = []
+        while size > 0:
+            data = asyncio.run_coroutine_threadsafe(self._reader.read(size), self._loop).result()
+            if not data:
+                self.remaining = 0
+                break
+            parts.append(data)
+            size -= len(data)
+            self.remaining -= len(data)
+        return b''.join(parts)
+
+
+class _LoopWriter:
+    """An asyncio StreamWriter as a blocking wfile for a handler thread
+
+    Writes are collected up to WRITE_BUFFER_SIZE and then sent, waiting
+    for the transport to drain, so a streamed export reaches the client
+    as it is produced and never sits whole in memory.
+    """
+
+    def __init__(self, loop, writer):
+        self._loop = loop
+        self._writer = writer
+        self._buffer = bytearray()
+
+    def write(self, data):
+        self._buffer += data
+        if len(self._buffer) >= WRITE_BUFFER_SIZE:
+            self.flush()
+        return len(data)
+
+    def flush(self):
+        if self._buffer:
+            data = bytes(self._buffer)
+            self._buffer.clear()
+            asyncio.run_coroutine_threadsafe(self._send(data), self._loop).result()
+
+    async def _send(self, data):
+        self._writer.write(data)
+        await self._writer.drain()
+
+
+def _simple_response(status, reason, content_type='text/plain', body=None, headers=''):
+    """Minimal response for requests that never reach a handler"""
+    body = reason.encode() if body is None else body
+    return (
+        f'HTTP/1.1 {status} {reason}\r\n'
+        f'Content-Type: {content_type}\r\n'
+        f'{headers}'
+        f'Content-Length: {len(body)}\r\n'
+        'Connection: close\r\n'
+        '\r\n'
+    ).encode() + body
+
+
+def _busy_response():
+    """503 for an upstream request arriving while every upstream slot is taken"""
+    body = json.dumps({
+        'error': 'Server busy',
+        'message': 'Too many requests in progress. Please retry shortly.'
+    }).encode()
+    return _simple_response(503, 'Service Unavailable', 'application/json', body,
+                            'Access-Control-Allow-Origin: *\r\nRetry-After: 1\r\n')
+
+
+def _request_line(head):
+    """(method, path) of the request line, ('', '') when it cannot be parsed"""
+    request_line = head.split(b'\r\n', 1)[0].decode('latin-1')
+    parts = request_line.split()
+    if len(parts) < 2:
+        return '', ''
+    return parts[0], parts[1].split('?', 1)[0]
+
+
+def _content_length(head):
+    """Body length declared in the request head
+
+    Returns None for requests this engine cannot frame (chunked bodies or a
+    malformed Content-Length).
+    """
+    length = 0
+    for line in head.split(b'\r\n')[1:]:
+        name, _, value = line.partition(b':')
+        name = name.strip().lower()
+        if name == b'transfer-encoding' and value.strip().lower() != b'identity':
+            return None
+        if name == b'content-length':
+            try:
+                length = int(value.strip())
+            except ValueError:
+                return None
+            if length < 0:
+                return None
+    return length
+
+
+class AsyncHTTPServer:
+    """asyncio front end for a BaseHTTPRequestHandler subclass
+
+    Connections, keep-alive waits and request framing live on the event
+    loop, so thousands of idle dashboard connections cost a coroutine each
+    rather than a thread. Each request is handed to the unchanged handler
+    class on an executor, which writes the response through the loop as it
+    goes (and, for stream_body routes, reads the body the same way).
+    SQLite-bound routes share a small pool sized for the database; routes
+    that call third-party APIs get a larger, bounded one of their own (see
+    DEFAULT_UPSTREAM_THREADS).
+
+    Exposes serve_forever()/shutdown()/server_close() like HTTPServer so it
+    can run standalone or inside PreforkSupervisor workers.
+    """
+
+    def __init__(self, server_address, handler_class, threads=DEFAULT_THREADS,
+                 upstream_threads=DEFAULT_UPSTREAM_THREADS, reuse_port=False,
+                 idle_timeout=DEFAULT_IDLE_TIMEOUT, upstream_queue=DEFAULT_UPSTREAM_QUEUE):
+        self.handler_class = handler_class
+        self.idle_timeout = idle_timeout
+        self.drain_timeout = DEFAULT_DRAIN_TIMEOUT
+        self.threads = max(threads, 1)
+        self.upstream_threads = max(upstream_threads, 1)
+        self.upstream_limit = self.upstream_threads + max(upstream_queue, 0)
+        self.upstream_calls = 0  # running or waiting upstream requests; event loop only
+        self.rejected = 0
+
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if reuse_port:
+            if not hasattr(socket, 'SO_REUSEPORT'):
+                raise OSError('SO_REUSEPORT is not supported on this platform')
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        self.socket.bind(server_address)
+        self.socket.listen(1024)
+        self.socket.setblocking(False)
+        self.server_address = self.socket.getsockname()
+
+        self.db_executor = ThreadPoolExecutor(self.threads, thread_name_prefix='api-db')
+        self.upstream_executor = ThreadPoolExecutor(self.upstream_threads, thread_name_prefix='api-upstream')
+
+        self._loop = None
+        self._stop = None
+        self._stopped = threading.Event()
+        self._connections = {}  # task -> True while a request is being handled
+
+    def serve_forever(self):
+        """Run the event loop until shutdown() is called"""
+        self._stopped.clear()
+        try:
+            asyncio.run(self._serve())
+        finally:
+            self._stopped.set()
+
+    def shutdown(self):
+        """Stop serve_forever(); safe to call from any other thread"""
+        if self._loop is not None and self._stop is not None:
+            self._loop.call_soon_threadsafe(self._stop.set)
+            self._stopped.wait()
+
+    def server_close(self):
+        """Release the listening socket and wait for running handlers"""
+        self.socket.close()
+        self.db_executor.shutdown(wait=True)
+        self.upstream_executor.shutdown(wait=True)
+
+    def stats(self):
+        """Open and busy connection counts"""
+        return {
+            'connections': len(self._connections),
+            'busy': sum(1 for busy in self._connections.values() if busy),
+            'threads': self.threads,
+            'upstream_calls': self.upstream_calls,
+            'upstream_limit': self.upstream_limit,
+            'rejected': self.rejected
+        }
+
+    async def _serve(self):
+        self._loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        server = await asyncio.start_server(
+            self._handle_connection, sock=self.socket, limit=MAX_HEADER_SIZE
+        )
+
+        await self._stop.wait()
+        server.close()
+
+        # Idle keep-alive connections can go now; busy ones get to finish
+        for task, busy in list(self._connections.items()):
+            if not busy:
+                task.cancel()
+        busy_tasks = [task for task in self._connections]
+        if busy_tasks:
+            await asyncio.wait(busy_tasks, timeout=self.drain_timeout)
+
+    async def _handle_connection(self, reader, writer):
+        task = asyncio.current_task()
+        self._connections[task] = False
+        peer = writer.get_extra_info('peername') or ('', 0)
+        client_address = tuple(peer[:2])
+
+        try:
+            while not self._stop.is_set():
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), self.idle_timeout)
+                except asyncio.LimitOverrunError:
+                    writer.write(_simple_response(431, 'Request Header Fields Too Large'))
+                    break
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    break
+
+                length = _content_length(head)
+                if length is None:
+                    writer.write(_simple_response(400, 'Bad Request'))
+                    break
+                method, path = _request_line(head)
+                upstream, stream_body = self._route_flags(method, path)
+                if length > MAX_BODY_SIZE and not stream_body:
+                    writer.write(_simple_response(413, 'Payload Too Large'))
+                    break
+                if upstream and self.upstream_calls >= self.upstream_limit:
+                    self.rejected += 1
+                    logger.warning(f"Upstream requests at their limit ({self.upstream_limit}), "
+                                   f"rejecting {client_address[0]}")
+                    writer.write(_busy_response())
+                    break
+
+                self._connections[task] = True
+                if stream_body:
+                    rfile = _LoopReader(self._loop, reader, head, length)
+                else:
+                    # Read here, so a slow upload never holds a handler thread
+                    try:
+                        body = await reader.readexactly(length) if length else b''
+                    except (asyncio.IncompleteReadError, ConnectionError):
+                        break
+                    rfile = io.BytesIO(head + body)
+                wfile = _LoopWriter(self._loop, writer)
+                if upstream:
+                    self.upstream_calls += 1
+                try:
+                    close = await self._loop.run_in_executor(
+                        self.upstream_executor if upstream else self.db_executor,
+                        self._dispatch, rfile, wfile, client_address
+                    )
+                finally:
+                    if upstream:
+                        self.upstream_calls -= 1
+                if close:
+                    break
+                # Skip whatever streamed body the handler left unread
+                while stream_body and rfile.remaining:
+                    data = await reader.read(min(rfile.remaining, WRITE_BUFFER_SIZE))
+                    if not data:
+                        break
+                    rfile.remaining -= len(data)
+                if stream_body and rfile.remaining:
+                    break
+                self._connections[task] = False
+        except asyncio.CancelledError:
+            pass
+        except ConnectionError:
+            pass
+        except Exception:
+            logger.exception(f"Connection error from {client_address[0]}")
+        finally:
+            self._connections.pop(task, None)
+            writer.close()
+
+    def _route_flags(self, method, path):
+        """(upstream, stream_body) of the route a request goes to"""
+        router = getattr(self.handler_class, 'router', None)
+        if router is None:
+            return path.startswith(UPSTREAM_PATH_PREFIXES), False
+        route = router.resolve(method, path)[0]
+        if route is None:
+            return False, False
+        return route.upstream, route.stream_body
+
+    def _dispatch(self, rfile, wfile, client_address):
+        """Executor side: run the handler, then return this thread's DB connections"""
+        try:
+            close = run_handler(self.handler_class, rfile, wfile, client_address, self)
+            wfile.flush()
+            return close
+        finally:
+            db_pool.release_thread()
@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+Bulk ingestion for the SHOTLIST social media metrics
+Streams records out of a JSON array or NDJSON request body, validates
+them one at a time and writes them with executemany in chunked
+transactions, reporting failures per record
+"""
+
+import os
+import re
+import json
+import codecs
+import sqlite3
+import logging
+from datetime import datetime, date
+
+logger = logging.getLogger(__name__)
+
+# Rows per executemany/commit, bytes per read, and error entries returned
+CHUNK_ROWS = int(os.environ.get('API_BULK_CHUNK_ROWS', '1000'))
+READ_SIZE = int(os.environ.get('API_BULK_READ_SIZE', str(64 * 1024)))
+MAX_REPORTED_ERRORS = int(os.environ.get('API_BULK_MAX_ERRORS', '1000'))
+MAX_RECORD_BYTES = int(os.environ.get('API_BULK_MAX_RECORD_BYTES', str(1024 * 1024)))
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+NDJSON_TYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl', 'application/x-jsonlines')
+
+
+class BulkFormatError(ValueError):
+    """The body can't be read any further; the servers answer 400"""
+
+    def __init__(self, message, index):
+        super().__init__(message)
+        self.index = index
+
+
+class RecordSpec:
+    """Columns of one bulk endpoint's table
+
+    columns is [(name, kind, default)] in insert order; kind is one of
+    'int', 'real', 'text' or 'date'. A default of None marks the column
+    as required; 'today' defaults a date column to the current day, as the
+    single-record endpoints do.
+    """
+
+    def __init__(self, table, columns, conflict='REPLACE'):
+        self.table = table
+        self.columns = columns
+        self.sql = (
+            f"INSERT OR {conflict} INTO {table} ({', '.join(name for name, _, _ in columns)}) "
+            f"VALUES ({', '.join('?' * len(columns))})"
+        )
+
+    def row(self, record):
+        """Insert parameters for record; raises ValueError naming the bad field"""
+        if not isinstance(record, dict):
+            raise ValueError('record must be a JSON object')
+
+        values = []
+        for name, kind, default in self.columns:
+            value = record.get(name)
+            if value is None or value == '':
+                if default is None:
+                    raise ValueError(f"missing required field '{name}'")
+                value = datetime.now().strftime('%Y-%m-%d') if default == 'today' else default
+            else:
+                value = _coerce(name, kind, value)
+            values.append(value)
+        return values
+
+
+def _coerce(name, kind, value):
+    if kind == 'int':
+        if isinstance(value, bool) or not isinstance(value, (int, str)):
+            raise ValueError(f"'{name}' must be an integer")
+        try:
+            return int(value)
+        except ValueError:
+            raise ValueError(f"'{name}' must be an integer")
+    if kind == 'real':
+        if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+            raise ValueError(f"'{name}' must be a number")
+        try:
+            return float(value)
+        except ValueError:
+            raise ValueError(f"'{name}' must be a number")
+    if kind == 'date':
+        try:
+            return date.fromisoformat(str(value)).isoformat()
+        except ValueError:
+            raise ValueError(f"'{name}' must be a YYYY-MM-DD date")
+    if isinstance(value, (list, dict)):
+        return json.dumps(value)
+    return str(value)
+
+
+SPECS = {
+    'daily_metrics': RecordSpec('social_media_daily_metrics', [
+        ('account_id', 'int', None),
+        ('platform', 'text', None),
+        ('date', 'date', 'today'),
+        ('followers', 'int', 0),
+        ('engagement_rate', 'real', 0),
+    ] + [(name, 'int', 0) for name in (
+        'reach', 'impressions', 'shares', 'comments', 'likes', 'clicks', 'saves',
+        'video_views', 'profile_visits', 'mentions',
+    )]),
+    'content_performance': RecordSpec('content_performance', [
+        ('account_id', 'int', None),
+        ('platform', 'text', None),
+        ('post_id', 'text', None),
+        ('post_type', 'text', 'post'),
+        ('caption', 'text', ''),
+        ('hashtags', 'text', ''),
+        ('posted_at', 'text', ''),
+        ('likes', 'int', 0),
+        ('comments', 'int', 0),
+        ('shares', 'int', 0),
+        ('saves', 'int', 0),
+        ('views', 'int', 0),
+        ('reach', 'int', 0),
+        ('engagement_rate', 'real', 0),
+    ]),
+    'audience_demographics': RecordSpec('audience_demographics', [
+        ('account_id', 'int', None),
+        ('platform', 'text', None),
+        ('date', 'date', 'today'),
+    ] + [(name, 'real', 0) for name in (
+        'age_13_17', 'age_18_24', 'age_25_34', 'age_35_44', 'age_45_54', 'age_55_64', 'age_65_plus',
+        'male_percentage', 'female_percentage',
+    )] + [
+        ('top_countries', 'text', ''),
+        ('top_cities', 'text', ''),
+    ]),
+}
+
+
+# ==================== READERS ====================
+
+def _chunks(stream, length, read_size):
+    """Decoded text of the next length bytes of stream, read_size at a time"""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    while length > 0:
+        data = stream.read(min(read_size, length))
+        if not data:
+            break
+        length -= len(data)
+        yield decoder.decode(data)
+    yield decoder.decode(b'', final=True)
+
+
+def iter_ndjson(stream, length, read_size=READ_SIZE):
+    """(index, record or ValueError) for each non-blank line
+
+    A line that isn't valid JSON is a failed record; the lines after it
+    are still read. A line longer than MAX_RECORD_BYTES raises
+    BulkFormatError.
+    """
+    index = 0
+    pending = ''
+    for text in _chunks(stream, length, read_size):
+        pending += text
+        *lines, pending = pending.split('\n')
+        for line in lines:
+            if line.strip():
+                yield index, _parse_line(line)
+                index += 1
+        if len(pending) > MAX_RECORD_BYTES:
+            raise BulkFormatError(f'line {index} is longer than {MAX_RECORD_BYTES} bytes', index)
+    if pending.strip():
+        yield index, _parse_line(pending)
+
+
+def _parse_line(line):
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        return ValueError(f'invalid JSON: {e}')
+
+
+def iter_json_array(stream, length, read_size=READ_SIZE):
+    """(index, record) for each element of a top-level JSON array
+
+    Elements are decoded as soon as they are complete, so memory holds
+    one read plus one element, not the whole body. Malformed JSON, or an
+    element larger than MAX_RECORD_BYTES, raises BulkFormatError: nothing
+    after it can be located.
+    """
+    decoder = json.JSONDecoder()
+    chunks = _chunks(stream, length, read_size)
+    buffer = ''
+    pos = 0
+    eof = False
+    index = 0
+    state = 'open'  # open -> first -> separator <-> value ... -> closed
+
+    def more():
+        nonlocal buffer, pos, eof
+        if len(buffer) - pos > MAX_RECORD_BYTES:
+            raise BulkFormatError(f'element {index} is malformed or larger than {MAX_RECORD_BYTES} bytes', index)
+        text = next(chunks, None)
+        if text is None:
+            eof = True
+        else:
+            buffer = buffer[pos:] + text
+            pos = 0
+
+    while True:
+        pos = _WHITESPACE.match(buffer, pos).end()
+        if pos == len(buffer):
+            if eof:
+                break
+            more()
+            continue
+        char = buffer[pos]
+
+        if state == 'open':
+            if char != '[':
+                raise BulkFormatError('body must be a JSON array', index)
+            pos += 1
+            state = 'first'
+        elif state == 'separator':
+            if char not in ',]':
+                raise BulkFormatError(f"expected ',' or ']' after element {index - 1}", index)
+            pos += 1
+            state = 'value' if char == ',' else 'closed'
+        elif state == 'first' and char == ']':
+            pos += 1
+            state = 'closed'
+        elif state in ('first', 'value'):
+            try:
+                record, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError as e:
+                if eof:
+                    raise BulkFormatError(f'invalid JSON in element {index}: {e.msg}', index)
+                more()
+                continue
+            if end == len(buffer) and not eof:
+                # A number or literal may continue in the next read
+                more()
+                continue
+            yield index, record
+            index += 1
+            pos = end
+            state = 'separator'
+        else:
+            raise BulkFormatError('unexpected data after the closing ]', index)
+
+    if state != 'closed':
+        raise BulkFormatError('body ended before the closing ]', index)
+
+
+def read_records(stream, length, content_type):
+    """Records from a request body: NDJSON by content type, else a JSON array"""
+    media_type = (content_type or '').split(';')[0].strip().lower()
+    if media_type in NDJSON_TYPES:
+        return iter_ndjson(stream, length)
+    return iter_json_array(stream, length)
+
+
+# ==================== INGESTION ====================
+
+class BulkResult:
+    """Counts and per-record errors of one bulk request"""
+
+    def __init__(self):
+        self.received = 0
+        self.inserted = 0
+        self.failed = 0
+        self.errors = []
+        self.format_error = None
+
+    def fail(self, index, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'index': index, 'error': message})
+
+    def to_dict(self):
+        result = {
+            'success': self.failed == 0 and self.format_error is None,
+            'received': self.received,
+            'inserted': self.inserted,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors)
+        }
+        if self.format_error is not None:
+            result['error'] = str(self.format_error)
+        return result
+
+
+def _write_chunk(conn, spec, chunk, result):
+    """Insert [(index, row)] in one transaction
+
+    A constraint failure rolls the chunk back and retries it row by row,
+    still in one transaction, so only the offending records fail.
+    """
+    try:
+        conn.executemany(spec.sql, [row for _, row in chunk])
+        conn.commit()
+        result.inserted += len(chunk)
+        return
+    except sqlite3.IntegrityError:
+        conn.rollback()
+
+    for index, row in chunk:
+        try:
+            conn.execute(spec.sql, row)
+            result.inserted += 1
+        except sqlite3.IntegrityError as e:
+            result.fail(index, str(e))
+    conn.commit()
+
+
+def ingest(conn, kind, records, chunk_rows=CHUNK_ROWS):
+    """Validate and insert records of kind ('daily_metrics', ...); returns a BulkResult
+
+    records yields (index, record) pairs, a record being a dict or the
+    ValueError that stopped it from parsing. Chunks committed before a
+    BulkFormatError stay written; the result says how far the body got.
+    """
+    spec = SPECS[kind]
+    result = BulkResult()
+    chunk = []
+    try:
+        for index, record in records:
+            result.received += 1
+            if isinstance(record, ValueError):
+                result.fail(index, str(record))
+                continue
+            try:
+                chunk.append((index, spec.row(record)))
+            except ValueError as e:
+                result.fail(index, str(e))
+                continue
+            if len(chunk) >= chunk_rows:
+                _write_chunk(conn, spec, chunk, result)
+                chunk = []
+    except BulkFormatError as e:
+        result.format_error = e
+
+    if chunk:
+        _write_chunk(conn, spec, chunk, result)
+    logger.info(
+        f"Bulk {kind}: {result.inserted} inserted, {result.failed} failed"
+        + (f", stopped at record {result.format_error.index}" if result.format_error else '')
+    )
+    return result
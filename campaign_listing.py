@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Campaign listing for the SHOTLIST API servers
+Campaigns with lifetime spend, revenue and ROI from one query, with
+filters, sorting on any column (computed ones included) and keyset
+pagination
+"""
+
+import json
+import base64
+import binascii
+
+MAX_PAGE_SIZE = 500
+
+# Sortable columns -> SQL over the listing's output. Nullable columns are
+# coalesced so keyset comparisons never meet a NULL.
+SORT_COLUMNS = {
+    'created_at': "COALESCE(created_at, '')",
+    'campaign_name': 'campaign_name',
+    'client_name': 'client_name',
+    'campaign_type': 'campaign_type',
+    'start_date': 'start_date',
+    'end_date': "COALESCE(end_date, '')",
+    'budget': 'budget',
+    'status': "COALESCE(status, '')",
+    'spent': 'spent',
+    'revenue': 'revenue',
+    'roi': 'roi',
+}
+
+# ?type=, ?status= and ?client= -> campaigns column
+FILTERS = (
+    ('type', 'campaign_type'),
+    ('status', 'status'),
+    ('client', 'client_name'),
+)
+
+
+class ListingError(ValueError):
+    """Invalid listing parameters; the servers answer 400"""
+
+
+def _param(params, name, default=None):
+    return params.get(name, [default])[0]
+
+
+def encode_cursor(sort, order, value, campaign_id):
+    """Opaque token for the page after the row with (value, campaign_id)"""
+    raw = json.dumps([sort, order, value, campaign_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, sort, order):
+    """(value, campaign_id) from a cursor issued for the same sort and order"""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        cursor_sort, cursor_order, value, campaign_id = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        raise ListingError('Invalid cursor')
+    if (cursor_sort, cursor_order) != (sort, order):
+        raise ListingError('Cursor was issued for a different sort order')
+    return value, campaign_id
+
+
+def _page_options(params):
+    sort = _param(params, 'sort', 'created_at')
+    if sort not in SORT_COLUMNS:
+        raise ListingError(f"Invalid sort '{sort}', expected one of {', '.join(SORT_COLUMNS)}")
+
+    order = _param(params, 'order', 'desc').lower()
+    if order not in ('asc', 'desc'):
+        raise ListingError(f"Invalid order '{order}', expected asc or desc")
+
+    limit = _param(params, 'limit')
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise ListingError(f"Invalid limit '{limit}'")
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ListingError(f'limit must be between 1 and {MAX_PAGE_SIZE}')
+
+    return sort, order, limit
+
+
+def list_campaigns(cursor, params, scope):
+    """One page of the campaign table
+
+    Lifetime spend and revenue are each campaign's latest running totals
+    in roi_campaign_prefix_sums, two index lookups per campaign however
+    many metric rows it has. Pages are ordered by ?sort= (default created_at) and ?order=
+    (default desc), ties in campaign_id order; ?limit= sets the page
+    size (default: everything) and ?cursor= continues from the
+    next_cursor of the previous page. Returns {'campaigns': [...],
+    'next_cursor': token or None}.
+    """
+    sort, order, limit = _page_options(params)
+    sort_sql = SORT_COLUMNS[sort]
+    direction = 'DESC' if order == 'desc' else 'ASC'
+
+    where = ''
+    args = []
+    if scope.restricted:
+        where += ' AND c.user_id = ?'
+        args.append(scope.user_id)
+    for name, column in FILTERS:
+        value = _param(params, name, 'all')
+        if value != 'all':
+            where += f' AND c.{column} = ?'
+            args.append(value)
+
+    keyset = ''
+    token = _param(params, 'cursor')
+    if token:
+        value, campaign_id = decode_cursor(token, sort, order)
+        after = '<' if order == 'desc' else '>'
+        keyset = f' WHERE {sort_sql} {after} ? OR ({sort_sql} = ? AND campaign_id > ?)'
+        args += [value, value, campaign_id]
+
+    page = ''
+    if limit is not None:
+        # One extra row tells whether there is a next page
+        page = ' LIMIT ?'
+        args.append(limit + 1)
+
+    cursor.execute(f'''
+        SELECT *, {sort_sql} AS sort_value FROM (
+            SELECT *,
+                CASE WHEN spent > 0 THEN CAST(revenue - spent AS REAL) / spent * 100 ELSE 0 END AS roi
+            FROM (
+                SELECT
+                    c.campaign_id, c.campaign_name, c.client_name, c.campaign_type,
+                    c.start_date, c.end_date, c.budget, c.status, c.created_at,
+                    COALESCE(p.cost, 0) AS spent,
+                    COALESCE(p.revenue, 0) AS revenue
+                FROM campaigns c
+                LEFT JOIN roi_campaign_prefix_sums p ON p.campaign_id = c.campaign_id AND p.date = (
+                    SELECT MAX(date) FROM roi_campaign_prefix_sums WHERE campaign_id = c.campaign_id
+                )
+                WHERE 1=1{where}
+            )
+        ){keyset}
+        ORDER BY {sort_sql} {direction}, campaign_id{page}
+    ''', args)
+    rows = cursor.fetchall()
+
+    next_cursor = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(sort, order, last['sort_value'], last['campaign_id'])
+
+    return {
+        'campaigns': [{
+            'campaign_id': row['campaign_id'],
+            'campaign_name': row['campaign_name'],
+            'client_name': row['client_name'],
+            'campaign_type': row['campaign_type'],
+            'start_date': row['start_date'],
+            'end_date': row['end_date'],
+            'budget': row['budget'],
+            'spent': round(row['spent'], 2),
+            'revenue': round(row['revenue'], 2),
+            'roi': round(row['roi'], 2),
+            'status': row['status']
+        } for row in rows],
+        'next_cursor': next_cursor
+    }
@@ -0,0 +1,453 @@
+#!/usr/bin/env python3
+"""
+In-memory columnar cache for the SHOTLIST dashboard queries
+roi_metrics and social_media_metrics held as per-column numpy arrays
+sorted by date, so KPIs, chart series and platform totals are array
+slices and sums instead of SQLite scans. Optional: enabled with
+API_COLUMNAR_CACHE=1 when numpy is installed; without it, or until the
+first load finishes, dashboard_queries reads SQLite as before.
+"""
+
+import os
+import time
+import sqlite3
+import logging
+import threading
+
+try:
+    import numpy
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.environ.get('API_COLUMNAR_CACHE', '0').lower() in ('1', 'true', 'yes', 'on')
+
+# Day number (days since 1970-01-01) of a YYYY-MM-DD date column
+_DAY = 'COALESCE(CAST(julianday({column}) - 2440587.5 AS INTEGER), -1)'
+
+
+class Table:
+    """A source table and the columns the cache keeps of it
+
+    columns maps array name -> (SQL over the source row, numpy dtype);
+    sums follow the daily rollups (NULL as 0) and counts count non-NULL
+    values, so results match the rollup queries. group, if set, is a text
+    column kept as integer codes for bincount group-bys.
+    """
+
+    def __init__(self, name, id_column, columns, group=None):
+        self.name = name
+        self.id_column = id_column
+        self.columns = columns
+        self.group = group
+
+    def select_sql(self, where=''):
+        columns = [self.id_column, _DAY.format(column='date'), 'campaign_id']
+        columns += [sql for sql, _ in self.columns.values()]
+        if self.group:
+            columns.append(self.group)
+        return f"SELECT {', '.join(columns)} FROM {self.name}{where}"
+
+    def dtype(self):
+        fields = [('id', 'i8'), ('day', 'i4'), ('campaign_id', 'i8')]
+        fields += [(name, kind) for name, (_, kind) in self.columns.items()]
+        if self.group:
+            fields.append(('group', 'U64'))
+        return numpy.dtype(fields)
+
+
+TABLES = {
+    'roi_metrics': Table('roi_metrics', 'roi_id', {
+        'revenue': ('COALESCE(revenue, 0)', 'f8'),
+        'cost': ('COALESCE(cost, 0)', 'f8'),
+        'conversions': ('COALESCE(conversions, 0)', 'i8'),
+        'roi_sum': ('COALESCE(roi_percentage, 0)', 'f8'),
+        'roi_count': ('roi_percentage IS NOT NULL', 'i4'),
+        'roas_sum': ('COALESCE(roas, 0)', 'f8'),
+        'roas_count': ('roas IS NOT NULL', 'i4'),
+    }),
+    'social_media_metrics': Table('social_media_metrics', 'metric_id', {
+        'impressions': ('COALESCE(impressions, 0)', 'i8'),
+        'engagement': ('COALESCE(engagement, 0)', 'i8'),
+        'reach': ('COALESCE(reach, 0)', 'i8'),
+        'followers': ('COALESCE(followers_gained, 0)', 'i8'),
+        'clicks': ('COALESCE(clicks, 0)', 'i8'),
+    }, group='platform'),
+}
+
+
+def day_number(day):
+    """Day number of a YYYY-MM-DD string"""
+    return int(numpy.datetime64(day, 'D').astype('int64'))
+
+
+def _day_labels(days):
+    return [str(day) for day in days.astype('datetime64[D]')]
+
+
+# Granularity (see time_buckets) -> first day of the bucket of each day number
+_BUCKET_STARTS = {
+    'day': lambda days: days,
+    # 1970-01-01 was a Thursday; weeks start on Monday
+    'week': lambda days: days - (days + 3) % 7,
+    'month': lambda days: days.astype('datetime64[D]').astype('datetime64[M]').astype('datetime64[D]').astype('int64'),
+    'quarter': lambda days: _quarter_starts(days),
+}
+
+
+def _quarter_starts(days):
+    months = days.astype('datetime64[D]').astype('datetime64[M]').astype('int64')
+    return (months - months % 3).astype('datetime64[M]').astype('datetime64[D]').astype('int64')
+
+
+class Snapshot:
+    """One table's arrays as of a data version; never modified once built"""
+
+    def __init__(self, table, arrays, version, groups=()):
+        self.table = table
+        self.arrays = arrays
+        self.version = version
+        self.groups = list(groups)
+        self.rows = len(arrays['day'])
+        self.high_water = int(arrays['id'].max()) if self.rows else 0
+
+    def __getitem__(self, name):
+        return self.arrays[name]
+
+    def bounds(self, start_day, end_day=None):
+        """(lo, hi) of the rows from start_day up to, not including, end_day"""
+        days = self.arrays['day']
+        # A needle of the array's own dtype; a Python int makes numpy cast the whole array
+        day = days.dtype.type
+        lo = int(days.searchsorted(day(start_day), 'left'))
+        hi = self.rows if end_day is None else int(days.searchsorted(day(end_day), 'left'))
+        return lo, max(lo, hi)
+
+    def selection(self, lo, hi, mask, name):
+        values = self.arrays[name][lo:hi]
+        return values if mask is None else values[mask]
+
+
+def _from_records(table, records, version, groups=()):
+    """Snapshot from structured records in date order"""
+    if len(records) and (numpy.diff(records['day']) < 0).any():
+        records = records[numpy.argsort(records['day'], kind='stable')]
+    arrays = {name: numpy.ascontiguousarray(records[name]) for name in ('id', 'day', 'campaign_id')}
+    for name in table.columns:
+        arrays[name] = numpy.ascontiguousarray(records[name])
+    if table.group:
+        groups = list(groups)
+        codes = {group: code for code, group in enumerate(groups)}
+        unique, inverse = numpy.unique(records['group'], return_inverse=True)
+        for group in unique.tolist():
+            if group not in codes:
+                codes[group] = len(groups)
+                groups.append(group)
+        lookup = numpy.array([codes[group] for group in unique.tolist()], dtype='i4')
+        arrays['group'] = lookup[inverse] if len(unique) else numpy.zeros(0, dtype='i4')
+    return Snapshot(table, arrays, version, groups)
+
+
+def _merge(snapshot, added):
+    """snapshot with the rows of added (a Snapshot sharing its groups) put in date order"""
+    if not added.rows:
+        return Snapshot(snapshot.table, snapshot.arrays, added.version, added.groups)
+    if not snapshot.rows or added['day'][0] >= snapshot['day'][-1]:
+        arrays = {name: numpy.concatenate((snapshot[name], added[name])) for name in snapshot.arrays}
+    else:
+        # Late-dated rows go in after the rows of their day, without re-sorting everything
+        positions = snapshot['day'].searchsorted(added['day'], 'right')
+        arrays = {name: numpy.insert(snapshot[name], positions, added[name]) for name in snapshot.arrays}
+    return Snapshot(snapshot.table, arrays, added.version, added.groups)
+
+
+class ColumnarCache:
+    """The cached tables of one database, loaded and refreshed off the request path
+
+    Each request checks the table's data version (see data_versions.py)
+    on its own cursor. When it moved, rows above the cached high-water
+    mark are appended, provided the version moved by exactly that many
+    rows, which proves nothing else was inserted, updated or deleted;
+    anything else drops the table and reloads it in the background, and
+    until then the caller falls back to SQLite.
+    """
+
+    def __init__(self, database, tables=TABLES):
+        self.database = database
+        self.tables = tables
+        self.loads = 0
+        self.appends = 0
+        self.appended_rows = 0
+        self.reloads = 0
+        self.last_load = None
+        self._snapshots = {}
+        self._loading = set()
+        self._refreshing = set()
+        self._orphan_memo = {}
+        self._lock = threading.Lock()
+
+    def start(self):
+        for name in self.tables:
+            self._load_in_background(name)
+        return self
+
+    def _connect(self):
+        conn = sqlite3.connect(self.database, isolation_level=None)
+        conn.execute('PRAGMA busy_timeout = 30000')
+        return conn
+
+    def _load_in_background(self, name):
+        with self._lock:
+            if name in self._loading:
+                return
+            self._loading.add(name)
+        threading.Thread(target=self._load, args=(name,), name=f'columnar-{name}', daemon=True).start()
+
+    def _load(self, name):
+        table = self.tables[name]
+        started = time.perf_counter()
+        try:
+            conn = self._connect()
+            try:
+                # One read transaction, so the rows match the version
+                conn.execute('BEGIN')
+                version = self._version(conn, name)
+                if version is None:
+                    raise LookupError('its writes are not counted in data_versions')
+                records = numpy.fromiter(conn.execute(table.select_sql(' ORDER BY date')), dtype=table.dtype())
+                conn.execute('COMMIT')
+            finally:
+                conn.close()
+            snapshot = _from_records(table, records, version)
+        except Exception as e:
+            logger.warning(f"Columnar cache could not load {name}: {e}")
+            with self._lock:
+                self._loading.discard(name)
+            return
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self._snapshots[name] = snapshot
+            self._loading.discard(name)
+            self.loads += 1
+            self.last_load = {'table': name, 'rows': snapshot.rows, 'seconds': round(elapsed, 2), 'at': time.time()}
+        logger.info(f"Columnar cache loaded {snapshot.rows} rows of {name} in {elapsed:.2f}s")
+
+    @staticmethod
+    def _version(cursor, name):
+        row = cursor.execute('SELECT version FROM data_versions WHERE table_name = ?', (name,)).fetchone()
+        return row[0] if row else None
+
+    def _append(self, snapshot):
+        """snapshot plus the rows inserted since, or None when other writes happened"""
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN')
+            version = self._version(conn, snapshot.table.name)
+            records = numpy.fromiter(
+                conn.execute(
+                    snapshot.table.select_sql(f' WHERE {snapshot.table.id_column} > ? ORDER BY date'),
+                    (snapshot.high_water,)
+                ),
+                dtype=snapshot.table.dtype()
+            )
+            conn.execute('COMMIT')
+        finally:
+            conn.close()
+        if version is None or version - snapshot.version != len(records):
+            return None
+        return _merge(snapshot, _from_records(snapshot.table, records, version, snapshot.groups))
+
+    def snapshot(self, cursor, name):
+        """The table's current Snapshot, or None while it is (re)loading
+
+        The rows to append are read without holding the lock, so other
+        tables and up-to-date snapshots stay readable meanwhile; requests
+        arriving while a table is being refreshed fall back to SQLite.
+        """
+        snapshot = self._snapshots.get(name)
+        if snapshot is None:
+            return None
+        version = self._version(cursor, name)
+        if version == snapshot.version:
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshots.get(name)
+            if snapshot is None or name in self._loading or name in self._refreshing:
+                return None
+            if version == snapshot.version:
+                return snapshot
+            self._refreshing.add(name)
+        try:
+            try:
+                refreshed = self._append(snapshot)
+            except Exception as e:
+                logger.warning(f"Columnar cache could not refresh {name}: {e}")
+                refreshed = None
+            with self._lock:
+                if refreshed is not None:
+                    self.appends += 1
+                    self.appended_rows += refreshed.rows - snapshot.rows
+                    self._snapshots[name] = refreshed
+                    return refreshed
+                del self._snapshots[name]
+                self.reloads += 1
+        finally:
+            with self._lock:
+                self._refreshing.discard(name)
+        self._load_in_background(name)
+        return None
+
+    def _orphans(self, cursor, snapshot):
+        """Campaign ids in snapshot without a campaigns row, kept until either changes"""
+        version = self._version(cursor, 'campaigns')
+        key = (snapshot.table.name, snapshot.version, version)
+        memo = self._orphan_memo.get(snapshot.table.name)
+        if memo is not None and memo[0] == key:
+            return memo[1]
+        existing = numpy.fromiter((row[0] for row in cursor.execute('SELECT campaign_id FROM campaigns')), dtype='i8')
+        orphans = numpy.setdiff1d(numpy.unique(snapshot['campaign_id']), existing)
+        self._orphan_memo[snapshot.table.name] = (key, orphans)
+        return orphans
+
+    def _mask(self, cursor, snapshot, lo, hi, campaigns, existing_only):
+        """Row mask over [lo, hi), None for every row
+
+        campaigns limits the rows to those ids; existing_only drops rows
+        whose campaign is gone, as joining campaigns in SQL does.
+        """
+        ids = snapshot['campaign_id'][lo:hi]
+        mask = None if campaigns is None else numpy.isin(ids, numpy.asarray(campaigns, dtype='i8'))
+        if existing_only:
+            orphans = self._orphans(cursor, snapshot)
+            if len(orphans):
+                kept = ~numpy.isin(ids, orphans)
+                mask = kept if mask is None else mask & kept
+        return mask
+
+    def compare(self, cursor, metrics, comparison, campaigns=None, existing_only=False):
+        """period_comparison.compare() over roi_metrics, or None when not cached
+
+        metrics are summed over the columns their sql names (e.g. r.roi_sum).
+        """
+        snapshot = self.snapshot(cursor, 'roi_metrics')
+        if snapshot is None or any(metric.aggregate != 'SUM' for metric in metrics):
+            return None
+        values = {}
+        for period, window in (('current', comparison.current), ('baseline', comparison.baseline)):
+            lo, hi = snapshot.bounds(
+                day_number(window.start), None if window.end is None else day_number(window.end)
+            )
+            mask = self._mask(cursor, snapshot, lo, hi, campaigns, existing_only)
+            for metric in metrics:
+                total = snapshot.selection(lo, hi, mask, metric.sql.rsplit('.', 1)[-1]).sum()
+                if metric.per is not None:
+                    per = snapshot.selection(lo, hi, mask, metric.per.rsplit('.', 1)[-1]).sum()
+                    total = total / per if per else 0
+                values.setdefault(metric.name, []).append(float(total))
+        return {name: tuple(pair) for name, pair in values.items()}
+
+    def roi_series(self, cursor, since, granularity='day', campaigns=None, existing_only=False):
+        """dashboard_queries.roi_series() rows from the cache, or None when not cached"""
+        snapshot = self.snapshot(cursor, 'roi_metrics')
+        if snapshot is None:
+            return None
+        lo, hi = snapshot.bounds(day_number(since))
+        mask = self._mask(cursor, snapshot, lo, hi, campaigns, existing_only)
+        days = snapshot.selection(lo, hi, mask, 'day').astype('int64')
+        if not len(days):
+            return []
+        # Rows are in date order, so each bucket is one run: reduceat over the run starts
+        buckets = _BUCKET_STARTS[granularity](days)
+        starts = numpy.flatnonzero(numpy.r_[True, buckets[1:] != buckets[:-1]])
+        labels = _day_labels(buckets[starts])
+        names = [name for name in snapshot.table.columns]
+        totals = {name: numpy.add.reduceat(snapshot.selection(lo, hi, mask, name), starts).tolist() for name in names}
+        return [
+            dict({'date': label}, **{name: totals[name][i] for name in names})
+            for i, label in enumerate(labels)
+        ]
+
+    def platform_totals(self, cursor, since, campaigns=None, existing_only=False):
+        """Per-platform social_media_metrics sums from since onwards, or None when not cached"""
+        snapshot = self.snapshot(cursor, 'social_media_metrics')
+        if snapshot is None:
+            return None
+        lo, hi = snapshot.bounds(day_number(since))
+        mask = self._mask(cursor, snapshot, lo, hi, campaigns, existing_only)
+        codes = snapshot.selection(lo, hi, mask, 'group')
+        size = len(snapshot.groups)
+        present = numpy.bincount(codes, minlength=size) > 0
+        totals = {
+            name: numpy.bincount(codes, weights=snapshot.selection(lo, hi, mask, name), minlength=size)
+            for name in snapshot.table.columns
+        }
+        return [
+            dict({'platform': snapshot.groups[code]}, **{name: int(totals[name][code]) for name in totals})
+            for code in sorted(numpy.flatnonzero(present), key=lambda code: snapshot.groups[code])
+        ]
+
+    @property
+    def ready(self):
+        return bool(self._snapshots)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'tables': {
+                    name: {
+                        'rows': snapshot.rows,
+                        'version': snapshot.version,
+                        'high_water': snapshot.high_water,
+                        'megabytes': round(sum(array.nbytes for array in snapshot.arrays.values()) / 2 ** 20, 1)
+                    }
+                    for name, snapshot in self._snapshots.items()
+                },
+                'loading': sorted(self._loading),
+                'refreshing': sorted(self._refreshing),
+                'loads': self.loads,
+                'appends': self.appends,
+                'appended_rows': self.appended_rows,
+                'reloads': self.reloads,
+                'last_load': self.last_load
+            }
+
+
+cache = None
+
+
+def start_cache(database, enabled=ENABLED):
+    """Start loading this process's cache; None when disabled or numpy is missing"""
+    global cache
+    if not enabled:
+        return None
+    if not NUMPY_AVAILABLE:
+        logger.warning("API_COLUMNAR_CACHE is set but numpy is not installed; reading SQLite")
+        return None
+    cache = ColumnarCache(database).start()
+    return cache
+
+
+def _after_fork():
+    # Loaded arrays are shared with the parent copy-on-write; loads that
+    # were still running are restarted, as their threads didn't survive
+    global cache
+    if cache is None:
+        return
+    inherited = cache
+    cache = ColumnarCache(inherited.database, inherited.tables)
+    cache._snapshots = dict(inherited._snapshots)
+    for name in inherited.tables:
+        if name not in cache._snapshots:
+            cache._load_in_background(name)
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork)
+
+
+def active():
+    """This process's cache, or None"""
+    return cache
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Response compression for the SHOTLIST API servers
+Accept-Encoding negotiation, gzip/brotli encoders for whole and streamed
+bodies, and a cache of compressed variants for content that hasn't changed
+"""
+
+import os
+import zlib
+import logging
+import threading
+from collections import OrderedDict
+
+# brotli is optional; without it clients are offered gzip only
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Compression defaults (override via environment)
+MIN_COMPRESS_SIZE = int(os.environ.get('API_COMPRESS_MIN_SIZE', '1024'))
+GZIP_LEVEL = int(os.environ.get('API_GZIP_LEVEL', '6'))
+BROTLI_QUALITY = int(os.environ.get('API_BROTLI_QUALITY', '5'))
+VARIANT_CACHE_BYTES = int(os.environ.get('API_COMPRESS_CACHE_BYTES', str(32 * 1024 * 1024)))
+
+COMPRESSIBLE_TYPES = ('application/json', 'text/')
+
+# Server preference when the client accepts several encodings equally
+_PREFERENCE = ('br', 'gzip') if BROTLI_AVAILABLE else ('gzip',)
+
+
+def compressible(content_type, size):
+    """Whether a body of this type and size is worth compressing"""
+    return size >= MIN_COMPRESS_SIZE and content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def negotiate(accept_encoding):
+    """Pick the response encoding for an Accept-Encoding header
+
+    Returns 'br', 'gzip' or None (identity).
+    """
+    if not accept_encoding:
+        return None
+
+    weights = {}
+    for item in accept_encoding.split(','):
+        coding, _, params = item.strip().partition(';')
+        coding = coding.strip().lower()
+        weight = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        if coding == 'x-gzip':
+            coding = 'gzip'
+        weights[coding] = weight
+
+    wildcard = weights.get('*', 0.0)
+    best, best_weight = None, 0.0
+    for coding in _PREFERENCE:
+        weight = weights.get(coding, wildcard)
+        if weight > best_weight:
+            best, best_weight = coding, weight
+    return best
+
+
+def compress(body, encoding):
+    """Encode a complete body"""
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    return compressor.compress(body) + compressor.flush()
+
+
+class StreamCompressor:
+    """Incremental encoder for bodies written in chunks"""
+
+    def __init__(self, encoding):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+            self._compress = self._compressor.process
+        else:
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+            self._compress = self._compressor.compress
+
+    def compress(self, data):
+        """Encoded bytes for data; may be empty while the encoder buffers"""
+        return self._compress(data)
+
+    def finish(self):
+        """Remaining encoded bytes, ending the stream"""
+        if self.encoding == 'br':
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+class VariantCache:
+    """LRU of encoded response bodies keyed by (content key, encoding)
+
+    The content key must change whenever the content does (e.g. it embeds
+    source file mtimes), so entries never need explicit invalidation.
+    Bounded by total stored bytes.
+    """
+
+    def __init__(self, max_bytes=VARIANT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, encoding):
+        with self._lock:
+            data = self._entries.get((key, encoding))
+            if data is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end((key, encoding))
+            self.hits += 1
+            return data
+
+    def put(self, key, encoding, data):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop((key, encoding), None)
+            if previous is not None:
+                self.size -= len(previous)
+            self._entries[(key, encoding)] = data
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.size,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+variant_cache = VariantCache()
+
+
+def encode(body, encoding, cache_key=None):
+    """Compress body, reusing the cached variant for cache_key if present"""
+    if cache_key is None:
+        return compress(body, encoding)
+
+    data = variant_cache.get(cache_key, encoding)
+    if data is None:
+        data = compress(body, encoding)
+        variant_cache.put(cache_key, encoding, data)
+    return data
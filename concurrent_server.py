@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+"""
+Concurrent serving modes for the SHOTLIST API servers
+Bounded worker-thread pool with pooled SQLite connections, a pre-fork
+supervisor running several server processes on one port, and the
+connection and response handling both servers' handlers share
+"""
+
+import os
+import json
+import time
+import queue
+import signal
+import socket
+import logging
+import threading
+from http.server import HTTPServer
+
+import db_pool
+from compression import compressible, negotiate, encode, StreamCompressor, MIN_COMPRESS_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Serving defaults (override via environment or command line)
+DEFAULT_THREADS = int(os.environ.get('API_THREADS', '16'))
+DEFAULT_QUEUE_SIZE = int(os.environ.get('API_QUEUE_SIZE', '64'))
+DEFAULT_WORKERS = int(os.environ.get('API_WORKERS', '1'))
+DEFAULT_DRAIN_TIMEOUT = float(os.environ.get('API_DRAIN_TIMEOUT', '10'))
+# An idle keep-alive connection holds its worker thread, and a browser opens
+# up to six per dashboard. One second spans the gaps within a dashboard's
+# burst of widget requests but frees the worker long before the next page
+# view or refresh, so idle tabs can't occupy the pool.
+DEFAULT_KEEPALIVE_TIMEOUT = float(os.environ.get('API_KEEPALIVE_TIMEOUT', '1'))
+# Longest wait for the next piece of a request already under way (a slow upload)
+DEFAULT_REQUEST_TIMEOUT = float(os.environ.get('API_REQUEST_TIMEOUT', '30'))
+
+
+class KeepAliveTimeoutMixin:
+    """BaseHTTPRequestHandler mixin: separate idle and in-request timeouts
+
+    A connection waiting for its next request is dropped after
+    idle_timeout seconds; once a request has started arriving, each read
+    may take up to the handler's `timeout` instead.
+    """
+
+    idle_timeout = DEFAULT_KEEPALIVE_TIMEOUT
+    timeout = DEFAULT_REQUEST_TIMEOUT
+
+    def handle_one_request(self):
+        # Engines that feed the handler from memory have no connection
+        connection = getattr(self, 'connection', None)
+        if connection is not None:
+            connection.settimeout(self.idle_timeout)
+            try:
+                self.rfile.peek(1)
+            except OSError:
+                self.close_connection = True
+                return
+            finally:
+                connection.settimeout(self.timeout)
+        super().handle_one_request()
+
+
+class ResponseMixin:
+    """BaseHTTPRequestHandler mixin: the servers' response writers
+
+    Every response goes through _send_head, which adds the CORS headers;
+    bodies are compressed when the client accepts it, and responses of
+    routes with conditional_get carry their ETag.
+    """
+
+    # Request headers browsers may send cross-origin
+    cors_allow_headers = 'Content-Type'
+
+    # Set by the conditional_get / cached middleware for the current request
+    response_etag = None
+    response_capture = None
+
+    def _send_head(self, status, content_type, headers):
+        """Write the status line and headers"""
+        self.send_response(status)
+        self.send_header('Content-type', content_type)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', self.cors_allow_headers)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+
+    def _send_body(self, body, status=200, content_type='application/json', headers=None, cache_key=None):
+        """Write a complete response with an already-serialized body
+
+        Bodies over the size threshold are gzip/brotli encoded when the
+        client accepts it. cache_key identifies content whose encoded
+        variants can be reused until the key changes.
+        """
+        if self.response_capture is not None:
+            self.response_capture.append((status, content_type, body))
+
+        headers = dict(headers or {})
+        etag = self.response_etag if status == 200 else None
+        if compressible(content_type, len(body)):
+            headers['Vary'] = 'Accept-Encoding'
+            encoding = negotiate(self.headers.get('Accept-Encoding'))
+            if encoding:
+                body = encode(body, encoding, cache_key)
+                headers['Content-Encoding'] = encoding
+                if etag:
+                    # Each encoding is a distinct representation
+                    etag = etag[:-1] + f'-{encoding}"'
+        if etag:
+            headers['ETag'] = etag
+            headers['Cache-Control'] = 'no-cache'
+        headers['Content-Length'] = str(len(body))
+        self._send_head(status, content_type, headers)
+        self.wfile.write(body)
+
+    def _send_not_modified(self, etag):
+        """Answer a conditional GET whose cached copy is still current"""
+        self.send_response(304)
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+
+    def _send_stream(self, chunks, status=200, content_type='application/json', headers=None):
+        """Write a response whose body is produced incrementally
+
+        Each chunk is compressed as it arrives and sent with chunked
+        transfer encoding, so large exports are never held in memory.
+        """
+        headers = dict(headers or {})
+        compressor = None
+        if compressible(content_type, MIN_COMPRESS_SIZE):
+            headers['Vary'] = 'Accept-Encoding'
+            encoding = negotiate(self.headers.get('Accept-Encoding'))
+            if encoding:
+                compressor = StreamCompressor(encoding)
+                headers['Content-Encoding'] = encoding
+
+        chunked = self.request_version == 'HTTP/1.1'
+        if chunked:
+            headers['Transfer-Encoding'] = 'chunked'
+        else:
+            headers['Connection'] = 'close'
+            self.close_connection = True
+        self._send_head(status, content_type, headers)
+
+        def write(data):
+            if not data:
+                return
+            if chunked:
+                self.wfile.write(f'{len(data):x}\r\n'.encode() + data + b'\r\n')
+            else:
+                self.wfile.write(data)
+
+        try:
+            for chunk in chunks:
+                write(compressor.compress(chunk) if compressor else chunk)
+            if compressor:
+                write(compressor.finish())
+        except Exception:
+            # Headers are gone; all we can do is cut the response short
+            self.close_connection = True
+            raise
+        if chunked:
+            self.wfile.write(b'0\r\n\r\n')
+
+    def _send_json(self, payload, status=200, headers=None):
+        """Serialize payload and write it as the response"""
+        self._send_body(json.dumps(payload).encode(), status, headers=headers)
+
+
+class ReusePortHTTPServer(HTTPServer):
+    """HTTPServer that can share its port with sibling processes (SO_REUSEPORT)"""
+
+    def __init__(self, server_address, handler_class, reuse_port=False):
+        self.reuse_port = reuse_port
+        super().__init__(server_address, handler_class)
+
+    def server_bind(self):
+        if self.reuse_port:
+            if not hasattr(socket, 'SO_REUSEPORT'):
+                raise OSError('SO_REUSEPORT is not supported on this platform')
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        super().server_bind()
+
+    def finish_request(self, request, client_address):
+        try:
+            super().finish_request(request, client_address)
+        finally:
+            # Return anything the handler left checked out of the DB pool
+            db_pool.release_thread()
+
+
+class BoundedThreadPoolHTTPServer(ReusePortHTTPServer):
+    """HTTPServer that hands accepted connections to a fixed pool of workers
+
+    Accepted connections wait in a queue of at most queue_size entries. When
+    the queue is full the connection is answered immediately with a 503 so a
+    burst of slow requests (Notion, social sync, large exports) cannot pile
+    up unbounded work behind it.
+    """
+
+    def __init__(self, server_address, handler_class,
+                 threads=DEFAULT_THREADS, queue_size=DEFAULT_QUEUE_SIZE,
+                 reuse_port=False):
+        super().__init__(server_address, handler_class, reuse_port=reuse_port)
+        self.threads = threads
+        self.queue_size = queue_size
+        self.drain_timeout = DEFAULT_DRAIN_TIMEOUT
+        self.rejected = 0
+        self._requests = queue.Queue(maxsize=queue_size)
+        self._workers = []
+
+        for index in range(threads):
+            worker = threading.Thread(
+                target=self._worker,
+                name=f'api-worker-{index}',
+                daemon=True
+            )
+            worker.start()
+            self._workers.append(worker)
+
+    def process_request(self, request, client_address):
+        """Queue the connection for a worker, or reject it when the queue is full"""
+        try:
+            self._requests.put_nowait((request, client_address))
+        except queue.Full:
+            self.rejected += 1
+            logger.warning(f"Request queue full ({self.queue_size}), rejecting {client_address[0]}")
+            self._reject(request)
+            self.shutdown_request(request)
+
+    def _worker(self):
+        """Serve queued connections until a shutdown sentinel arrives"""
+        while True:
+            item = self._requests.get()
+            if item is None:
+                break
+
+            request, client_address = item
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+        db_pool.close_thread()
+
+    def _reject(self, request):
+        """Answer a connection with 503 without reading the request"""
+        body = json.dumps({
+            'error': 'Server busy',
+            'message': 'Too many requests in progress. Please retry shortly.'
+        }).encode()
+        head = (
+            'HTTP/1.0 503 Service Unavailable\r\n'
+            'Content-Type: application/json\r\n'
+            'Access-Control-Allow-Origin: *\r\n'
+            'Retry-After: 1\r\n'
+            f'Content-Length: {len(body)}\r\n'
+            'Connection: close\r\n'
+            '\r\n'
+        ).encode()
+        try:
+            request.sendall(head + body)
+        except OSError:
+            pass
+
+    def stats(self):
+        """Current pool usage"""
+        return {
+            'threads': self.threads,
+            'queue_size': self.queue_size,
+            'queued': self._requests.qsize(),
+            'rejected': self.rejected
+        }
+
+    def server_close(self):
+        """Stop accepting, let workers drain the queue, then stop them"""
+        super().server_close()
+        for _ in self._workers:
+            self._requests.put(None)
+        deadline = time.monotonic() + self.drain_timeout
+        for worker in self._workers:
+            worker.join(timeout=max(0, deadline - time.monotonic()))
+
+
+def make_server(server_address, handler_class, threads=DEFAULT_THREADS,
+                queue_size=DEFAULT_QUEUE_SIZE, reuse_port=False):
+    """Build the HTTP server for the requested serving mode"""
+    if threads > 0:
+        return BoundedThreadPoolHTTPServer(
+            server_address, handler_class,
+            threads=threads, queue_size=queue_size, reuse_port=reuse_port
+        )
+
+    return ReusePortHTTPServer(server_address, handler_class, reuse_port=reuse_port)
+
+
+class PreforkSupervisor:
+    """Runs N server processes on one port and keeps them alive
+
+    Each child builds its own server with SO_REUSEPORT so the kernel spreads
+    incoming connections across processes. The parent restarts children that
+    die unexpectedly and, on SIGINT/SIGTERM, asks every child to stop
+    accepting and drain its in-flight requests before exiting.
+    """
+
+    # A child that dies this soon after starting counts towards a crash loop
+    MIN_UPTIME = 1.0
+    MAX_QUICK_CRASHES = 5
+
+    def __init__(self, server_factory, workers=DEFAULT_WORKERS,
+                 drain_timeout=DEFAULT_DRAIN_TIMEOUT):
+        self.server_factory = server_factory
+        self.workers = workers
+        self.drain_timeout = drain_timeout
+        self.children = {}  # pid -> (slot, started_at)
+        self.restarts = 0
+        self._stopping = False
+        self._quick_crashes = 0
+
+    def run(self):
+        """Fork the workers and supervise them until asked to stop"""
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, self._request_stop)
+
+        for slot in range(self.workers):
+            self._spawn(slot)
+
+        stop_deadline = None
+        while self.children:
+            if self._stopping and stop_deadline is None:
+                stop_deadline = time.monotonic() + self.drain_timeout
+                self._signal_children(signal.SIGTERM)
+
+            if stop_deadline is not None and time.monotonic() > stop_deadline:
+                logger.warning(f"Drain timeout reached, killing {len(self.children)} worker(s)")
+                self._signal_children(signal.SIGKILL)
+                stop_deadline = float('inf')
+
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+
+            if pid == 0:
+                time.sleep(0.2)
+                continue
+
+            child = self.children.pop(pid, None)
+            if child is None:
+                # Some other child of this process (e.g. a subprocess), not a worker
+                continue
+            slot, started_at = child
+            if self._stopping:
+                continue
+
+            logger.error(f"Worker {pid} (slot {slot}) exited with status {status}, restarting")
+            if time.monotonic() - started_at < self.MIN_UPTIME:
+                self._quick_crashes += 1
+                if self._quick_crashes >= self.MAX_QUICK_CRASHES:
+                    logger.error("Workers keep crashing on startup, shutting down")
+                    self._stopping = True
+                    continue
+                time.sleep(self.MIN_UPTIME)
+            else:
+                self._quick_crashes = 0
+
+            self.restarts += 1
+            self._spawn(slot)
+
+    def _spawn(self, slot):
+        pid = os.fork()
+        if pid == 0:
+            self._child_main()
+        self.children[pid] = (slot, time.monotonic())
+
+    def _child_main(self):
+        """Entry point of a forked worker process; never returns"""
+        exit_code = 0
+        try:
+            # Ctrl+C reaches the whole process group; only the parent reacts to it
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            httpd = self.server_factory()
+
+            def _terminate(signum, frame):
+                # shutdown() blocks until serve_forever returns, so it cannot
+                # run on the thread that is inside serve_forever
+                threading.Thread(target=httpd.shutdown, daemon=True).start()
+
+            signal.signal(signal.SIGTERM, _terminate)
+            try:
+                httpd.serve_forever()
+            finally:
+                httpd.server_close()
+        except Exception:
+            logger.exception("Worker process failed")
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+
+    def _request_stop(self, signum, frame):
+        self._stopping = True
+
+    def _signal_children(self, signum):
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
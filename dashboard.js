@@ -162,14 +162,25 @@ async function loadDashboardData() {
     showLoading();
 
     try {
-        await Promise.all([
-            loadKPIs(),
-            loadROITrend(),
-            loadRevenueCost(),
-            loadSocialMedia(),
-            loadSEOMetrics(),
-            loadCampaignsTable()
-        ]);
+        const days = document.getElementById('dateRange').value;
+        const campaignId = document.getElementById('campaignSelect').value;
+        const campaignType = document.getElementById('campaignType').value;
+
+        // Every widget in one round trip
+        const response = await fetch(`${API_BASE}/dashboard?days=${days}&campaign_id=${campaignId}&type=${campaignType}`, {
+            headers: getHeaders()
+        });
+        if (!response.ok) {
+            throw new Error(`Dashboard request failed (${response.status})`);
+        }
+        const dashboard = await response.json();
+
+        renderKPIs(dashboard.kpis);
+        renderROITrend(dashboard.roi_trend);
+        renderRevenueCost(dashboard.revenue_cost);
+        renderSocialMedia(dashboard.social_media);
+        renderSEOMetrics(dashboard.seo_metrics);
+        renderCampaignsTable(dashboard.campaigns);
 
         console.log('✅ Dashboard data loaded');
     } catch (error) {
@@ -188,8 +199,11 @@ async function loadKPIs() {
     const response = await fetch(`${API_BASE}/kpis?days=${days}&campaign_id=${campaignId}`, {
         headers: getHeaders()
     });
-    const data = await response.json();
+    renderKPIs(await response.json());
+}
 
+// Render KPI metrics
+function renderKPIs(data) {
     if (data.kpis) {
         // ROI
         document.getElementById('totalROI').textContent = `${data.kpis.roi.value}%`;
@@ -221,8 +235,11 @@ async function loadROITrend() {
     const response = await fetch(`${API_BASE}/roi-trend?days=${days}&campaign_id=${campaignId}`, {
         headers: getHeaders()
     });
-    const data = await response.json();
+    renderROITrend(await response.json());
+}
 
+// Render ROI trend chart
+function renderROITrend(data) {
     if (data.trend) {
         const ctx = document.getElementById('roiChart').getContext('2d');
 
@@ -277,8 +294,11 @@ async function loadRevenueCost() {
     const response = await fetch(`${API_BASE}/revenue-cost?days=${days}&campaign_id=${campaignId}`, {
         headers: getHeaders()
     });
-    const result = await response.json();
+    renderRevenueCost(await response.json());
+}
 
+// Render revenue vs cost chart
+function renderRevenueCost(result) {
     if (result.data) {
         const ctx = document.getElementById('revenueChart').getContext('2d');
 
@@ -340,8 +360,11 @@ async function loadSocialMedia() {
     const response = await fetch(`${API_BASE}/social-media?days=${days}&campaign_id=${campaignId}`, {
         headers: getHeaders()
     });
-    const data = await response.json();
+    renderSocialMedia(await response.json());
+}
 
+// Render social media metrics
+function renderSocialMedia(data) {
     if (data.platforms) {
         // Instagram
         if (data.platforms.instagram) {
@@ -380,8 +403,11 @@ async function loadSEOMetrics() {
     const response = await fetch(`${API_BASE}/seo-metrics?days=${days}`, {
         headers: getHeaders()
     });
-    const data = await response.json();
+    renderSEOMetrics(await response.json());
+}
 
+// Render SEO metrics
+function renderSEOMetrics(data) {
     if (data.metrics) {
         // Organic Traffic
         document.getElementById('organicTraffic').textContent = formatNumber(data.metrics.organic_traffic.value);
@@ -443,8 +469,11 @@ async function loadCampaignsTable() {
     const response = await fetch(`${API_BASE}/campaigns?type=${campaignType}`, {
         headers: getHeaders()
     });
-    const data = await response.json();
+    renderCampaignsTable(await response.json());
+}
 
+// Render campaigns table
+function renderCampaignsTable(data) {
     if (data.campaigns) {
         const tbody = document.getElementById('campaignsTableBody');
         tbody.innerHTML = '';
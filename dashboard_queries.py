@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+Dashboard widget queries shared by the SHOTLIST API servers
+Each widget is computed from a cursor, the request params and the caller's
+scope, so single-widget endpoints and /api/dashboard return the same data
+"""
+
+from datetime import datetime, timedelta
+
+import campaign_listing
+import columnar_cache
+import downsampling
+import period_comparison
+import time_buckets
+from period_comparison import Metric
+
+
+class Scope:
+    """Which campaigns' metrics the caller may see
+
+    join_campaigns joins metric rows to campaigns (dropping rows whose
+    campaign no longer exists); restricted additionally limits them to the
+    user's own campaigns.
+    """
+
+    def __init__(self, user_id=None, restricted=False, join_campaigns=False):
+        self.user_id = user_id
+        self.restricted = restricted
+        self.join_campaigns = join_campaigns or restricted
+
+
+def user_scope(cursor, user_id):
+    """Scope for an authenticated user: admins see every campaign"""
+    cursor.execute('SELECT role FROM users WHERE user_id = ?', (user_id,))
+    is_admin = cursor.fetchone()['role'] == 'admin'
+    return Scope(user_id, restricted=not is_admin, join_campaigns=True)
+
+
+def date_window(params):
+    """(start of current period, start of previous period) for ?days="""
+    days = int(params.get('days', ['30'])[0])
+    now = datetime.now()
+    return (
+        (now - timedelta(days=days)).strftime('%Y-%m-%d'),
+        (now - timedelta(days=days * 2)).strftime('%Y-%m-%d')
+    )
+
+
+def _metric_filter(alias, scope, params=None):
+    """(join, extra WHERE, args) applying scope and ?campaign_id= to a metrics table"""
+    join = f' JOIN campaigns c ON {alias}.campaign_id = c.campaign_id' if scope.join_campaigns else ''
+    where = ''
+    args = []
+    if scope.restricted:
+        where += ' AND c.user_id = ?'
+        args.append(scope.user_id)
+    if params is not None:
+        campaign_id = params.get('campaign_id', ['all'])[0]
+        if campaign_id != 'all':
+            where += f' AND {alias}.campaign_id = ?'
+            args.append(campaign_id)
+    return join, where, args
+
+
+def _cached_filter(cursor, scope, params=None):
+    """(campaign ids or None, existing_only): _metric_filter for the columnar cache"""
+    campaigns = None
+    if scope.restricted:
+        cursor.execute('SELECT campaign_id FROM campaigns WHERE user_id = ?', (scope.user_id,))
+        campaigns = [row[0] for row in cursor.fetchall()]
+    if params is not None:
+        campaign_id = params.get('campaign_id', ['all'])[0]
+        if campaign_id != 'all':
+            try:
+                wanted = int(campaign_id)
+            except ValueError:
+                wanted = None
+            campaigns = [wanted] if wanted is not None and (campaigns is None or wanted in campaigns) else []
+    # A user's own campaign ids all exist; otherwise only the join drops orphaned rows
+    return campaigns, scope.join_campaigns and not scope.restricted
+
+
+def _prefix_filter(scope, params=None):
+    """(SQL selecting campaign ids, args): _metric_filter for the roi prefix sums
+
+    The SQL is None when every row counts, i.e. the totals over all campaigns.
+    """
+    campaign_id = 'all' if params is None else params.get('campaign_id', ['all'])[0]
+    if scope.join_campaigns:
+        _, where, args = _metric_filter('c', scope, params)
+        return f'SELECT c.campaign_id FROM campaigns c WHERE 1=1{where}', args
+    if campaign_id != 'all':
+        return 'SELECT ? AS campaign_id', [campaign_id]
+    return None, []
+
+
+# ==================== ROI METRICS ====================
+
+def chart_granularity(params):
+    """Bucket size of the chart series for ?days= and ?granularity="""
+    return time_buckets.choose(params, int(params.get('days', ['30'])[0]))
+
+
+def roi_series(cursor, since, params, scope, granularity='day'):
+    """ROI totals per granularity bucket from since onwards; one scan feeds both charts
+
+    Reads the per-campaign daily rollup of roi_metrics (see rollups.py),
+    so the cost grows with days and campaigns, not metric rows. Coarser
+    buckets sum the per-date totals, which come out in date order, so
+    only one row per date is regrouped. A row's date is the first day of
+    its bucket; the first and last buckets can be partial. With the
+    columnar cache running, the same rows come from its arrays.
+    """
+    cache = columnar_cache.active()
+    if cache is not None:
+        rows = cache.roi_series(cursor, since, granularity, *_cached_filter(cursor, scope, params))
+        if rows is not None:
+            return rows
+
+    join, where, args = _metric_filter('r', scope, params)
+    daily = f'''
+        SELECT
+            r.date,
+            SUM(r.revenue) as revenue,
+            SUM(r.cost) as cost,
+            SUM(r.conversions) as conversions,
+            SUM(r.roi_sum) as roi_sum,
+            SUM(r.roi_count) as roi_count,
+            SUM(r.roas_sum) as roas_sum,
+            SUM(r.roas_count) as roas_count
+        FROM roi_daily_rollup r{join}
+        WHERE r.date >= ?{where}
+        GROUP BY r.date
+    '''
+    if granularity == 'day':
+        cursor.execute(daily + ' ORDER BY r.date', [since] + args)
+        return cursor.fetchall()
+
+    cursor.execute(f'''
+        SELECT
+            {time_buckets.bucket_sql(granularity, 'd.date')} as date,
+            SUM(d.revenue) as revenue,
+            SUM(d.cost) as cost,
+            SUM(d.conversions) as conversions,
+            SUM(d.roi_sum) as roi_sum,
+            SUM(d.roi_count) as roi_count,
+            SUM(d.roas_sum) as roas_sum,
+            SUM(d.roas_count) as roas_count
+        FROM ({daily}) d
+        GROUP BY 1
+        ORDER BY 1
+    ''', [since] + args)
+    return cursor.fetchall()
+
+
+# KPI cards over the roi rollup; ROI and ROAS average the per-row values
+KPI_METRICS = (
+    Metric('roi', 'r.roi_sum', per='r.roi_count', digits=2),
+    Metric('revenue', 'r.revenue', digits=2),
+    Metric('conversions', 'r.conversions'),
+    Metric('roas', 'r.roas_sum', per='r.roas_count', digits=2),
+)
+
+# Totals over every campaign are two lookups in roi_prefix_sums. For some
+# campaigns, roi_campaign_prefix_sums costs a few lookups per campaign and
+# the daily rollup one row per campaign and day, so the running totals only
+# pay off once the compared periods cover more than this many days.
+PREFIX_SUM_MIN_DAYS = 60
+
+
+def roi_trend_from_series(rows, granularity='day'):
+    """ROI line chart from roi_series() rows"""
+    return {
+        'granularity': granularity,
+        'labels': [row['date'] for row in rows],
+        'data': [round(row['roi_sum'] / row['roi_count'], 2) if row['roi_count'] else 0 for row in rows]
+    }
+
+
+def revenue_cost_from_series(rows, granularity='day'):
+    """Revenue vs cost bar chart from roi_series() rows"""
+    return {
+        'granularity': granularity,
+        'labels': [row['date'] for row in rows],
+        'revenue': [round(row['revenue'] or 0, 2) for row in rows],
+        'cost': [round(row['cost'] or 0, 2) for row in rows]
+    }
+
+
+def kpis(cursor, params, scope):
+    """KPI cards for the current period against the ?compare= baseline
+
+    Totals over every campaign come from roi_prefix_sums; for some
+    campaigns the columnar cache answers when it runs, then the per-campaign
+    running totals or the daily rollup, whichever reads less.
+    """
+    comparison = period_comparison.from_params(params)
+    campaigns, args = _prefix_filter(scope, params)
+    if campaigns is None:
+        values = period_comparison.compare_prefix_sums(cursor, 'roi_prefix_sums', KPI_METRICS, comparison)
+        return period_comparison.cards(KPI_METRICS, values)
+
+    cache = columnar_cache.active()
+    values = None
+    if cache is not None:
+        values = cache.compare(cursor, KPI_METRICS, comparison, *_cached_filter(cursor, scope, params))
+    if values is None and comparison.days() > PREFIX_SUM_MIN_DAYS:
+        values = period_comparison.compare_prefix_sums(
+            cursor, 'roi_campaign_prefix_sums', KPI_METRICS, comparison, campaigns, args
+        )
+    if values is None:
+        join, where, args = _metric_filter('r', scope, params)
+        values = period_comparison.compare(
+            cursor, 'roi_daily_rollup', 'r', KPI_METRICS, comparison, join, where, args
+        )
+    return period_comparison.cards(KPI_METRICS, values)
+
+
+def roi_trend(cursor, params, scope):
+    current_start, _ = date_window(params)
+    granularity = chart_granularity(params)
+    points = downsampling.max_points(params)
+    trend = roi_trend_from_series(roi_series(cursor, current_start, params, scope, granularity), granularity)
+    return downsampling.downsample_chart(trend, ('data',), points)
+
+
+def revenue_cost(cursor, params, scope):
+    current_start, _ = date_window(params)
+    granularity = chart_granularity(params)
+    points = downsampling.max_points(params)
+    data = revenue_cost_from_series(roi_series(cursor, current_start, params, scope, granularity), granularity)
+    return downsampling.downsample_chart(data, ('revenue', 'cost'), points)
+
+
+# ==================== OTHER WIDGETS ====================
+
+def campaigns(cursor, params, scope):
+    """Campaign table rows with lifetime spend, revenue and ROI"""
+    return campaign_listing.list_campaigns(cursor, params, scope)['campaigns']
+
+
+def social_platforms(cursor, params, scope, tracking_config=None):
+    """Per-platform social totals for the current period
+
+    tracking_config maps platform -> track_* flags; metrics a platform
+    doesn't track are reported as 0 and platforms that don't track
+    impressions are left out. Reads the daily rollup of social_media_metrics,
+    or the columnar cache when it runs.
+    """
+    current_start, _ = date_window(params)
+    cache = columnar_cache.active()
+    rows = None
+    if cache is not None:
+        rows = cache.platform_totals(cursor, current_start, *_cached_filter(cursor, scope, params))
+    if rows is None:
+        join, where, args = _metric_filter('s', scope, params)
+        cursor.execute(f'''
+            SELECT
+                s.platform,
+                SUM(s.impressions) as impressions,
+                SUM(s.engagement) as engagement,
+                SUM(s.reach) as reach,
+                SUM(s.followers_gained) as followers,
+                SUM(s.clicks) as clicks
+            FROM social_daily_rollup s{join}
+            WHERE s.date >= ?{where}
+            GROUP BY s.platform
+        ''', [current_start] + args)
+        rows = cursor.fetchall()
+
+    platforms = {}
+    for row in rows:
+        config = (tracking_config or {}).get(row['platform'], {})
+        if not config.get('track_impressions', True):
+            continue
+        platforms[row['platform']] = {
+            'impressions': row['impressions'],
+            'engagement': row['engagement'] if config.get('track_engagement', True) else 0,
+            'reach': row['reach'],
+            'followers': row['followers'] if config.get('track_followers', True) else 0,
+            'clicks': row['clicks'] if config.get('track_engagement', True) else 0
+        }
+    return platforms
+
+
+SEO_METRICS = (
+    Metric('organic_traffic', 's.organic_traffic'),
+    Metric('keyword_rankings', 's.keyword_rankings', aggregate='AVG', change='difference'),
+    Metric('backlinks', 's.backlinks', change='difference'),
+    Metric('domain_authority', 's.domain_authority', aggregate='AVG', change=None),
+)
+
+
+def seo_metrics(cursor, params, scope):
+    """SEO cards for the current period against the ?compare= baseline, in one scan"""
+    comparison = period_comparison.from_params(params)
+    join, where, args = _metric_filter('s', scope)
+    values = period_comparison.compare(cursor, 'seo_metrics', 's', SEO_METRICS, comparison, join, where, args)
+    return period_comparison.cards(SEO_METRICS, values)
+
+
+# ==================== DASHBOARD ====================
+
+def dashboard(cursor, params, scope, load_tracking_config=None):
+    """Every dashboard widget from one cursor
+
+    The ROI trend and revenue vs cost share one scan of the roi rollup;
+    the KPIs compare periods in another. Each widget is shaped like
+    the response of its own endpoint; a widget that fails reports
+    {'error': ...} without failing the others. load_tracking_config, if
+    given, is called for the social widget's tracking_config.
+    """
+    current_start, _ = date_window(params)
+    result = {}
+
+    try:
+        granularity = chart_granularity(params)
+        points = downsampling.max_points(params)
+        series = roi_series(cursor, current_start, params, scope, granularity)
+        result['roi_trend'] = {'trend': downsampling.downsample_chart(
+            roi_trend_from_series(series, granularity), ('data',), points
+        )}
+        result['revenue_cost'] = {'data': downsampling.downsample_chart(
+            revenue_cost_from_series(series, granularity), ('revenue', 'cost'), points
+        )}
+    except Exception as e:
+        result['roi_trend'] = result['revenue_cost'] = {'error': str(e)}
+
+    widgets = (
+        ('kpis', 'kpis', lambda: kpis(cursor, params, scope)),
+        ('social_media', 'platforms', lambda: social_platforms(
+            cursor, params, scope, load_tracking_config() if load_tracking_config else None
+        )),
+        ('seo_metrics', 'metrics', lambda: seo_metrics(cursor, params, scope)),
+        ('campaigns', 'campaigns', lambda: campaigns(cursor, params, scope)),
+    )
+    for name, key, compute in widgets:
+        try:
+            result[name] = {key: compute()}
+        except Exception as e:
+            result[name] = {'error': str(e)}
+
+    return result
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Per-table data versions for the SHOTLIST analytics database
+Triggers bump a write counter whenever a tracked table changes; the API
+derives ETags from these counters to answer unchanged polls with 304
+"""
+
+import hashlib
+import logging
+from datetime import date
+
+logger = logging.getLogger(__name__)
+
+
+def tracked_tables(conn):
+    """Tables whose writes are being counted"""
+    return [row[0] for row in conn.execute('SELECT table_name FROM data_versions ORDER BY table_name')]
+
+
+def get_versions(conn, tables):
+    """Current version of each table; tables without tracking report None"""
+    placeholders = ','.join('?' * len(tables))
+    rows = conn.execute(
+        f'SELECT table_name, version FROM data_versions WHERE table_name IN ({placeholders})',
+        tuple(tables)
+    ).fetchall()
+    versions = {row[0]: row[1] for row in rows}
+    return tuple(versions.get(table) for table in tables)
+
+
+def normalize_params(params):
+    """Order-independent, hashable form of a parse_qs dict"""
+    return tuple(sorted((key, tuple(values)) for key, values in params.items()))
+
+
+def compute_etag(path, params, scope, versions):
+    """Strong ETag for a response built from versioned tables
+
+    params is the parse_qs dict of the request; its order doesn't matter.
+    The current date is part of the tag because the analytics windows
+    ("last 30 days") move with it.
+    """
+    key = repr((path, normalize_params(params), scope, versions, date.today().isoformat()))
+    return '"' + hashlib.sha1(key.encode()).hexdigest() + '"'
+
+
+def matching_etag(if_none_match, etag):
+    """The If-None-Match entry that matches etag, or None
+
+    Tags may carry a -gzip/-br suffix added when the representation was
+    compressed; they still name the same underlying data.
+    """
+    if not if_none_match:
+        return None
+    if if_none_match.strip() == '*':
+        return etag
+
+    base = etag.strip('"')
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        tag = candidate.strip('"')
+        if tag == base or tag.rsplit('-', 1)[0] == base:
+            return '"' + tag + '"'
+    return None
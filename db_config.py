@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Storage configuration for the SHOTLIST analytics database
+WAL journaling, the per-connection pragma profile and a background WAL
+checkpointer with usage stats
+"""
+
+import os
+import time
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Journal mode is stored in the database file; WAL lets readers keep
+# reading while a writer commits instead of serializing on one lock
+JOURNAL_MODE = os.environ.get('API_DB_JOURNAL_MODE', 'WAL').upper()
+
+# Per-connection pragmas, tuned for a read-heavy dashboard (override via environment)
+PRAGMA_PROFILE = {
+    # NORMAL is safe under WAL: a power loss can drop the last commits but
+    # never corrupts the database
+    'synchronous': os.environ.get('API_DB_SYNCHRONOUS', 'NORMAL').upper(),
+    # Negative values are KiB: 16 MiB of page cache per connection
+    'cache_size': int(os.environ.get('API_DB_CACHE_SIZE', '-16384')),
+    'mmap_size': int(os.environ.get('API_DB_MMAP_SIZE', str(256 * 1024 * 1024))),
+    'temp_store': os.environ.get('API_DB_TEMP_STORE', 'MEMORY').upper(),
+    # Milliseconds a connection waits on a lock before "database is locked"
+    'busy_timeout': int(os.environ.get('API_DB_BUSY_TIMEOUT', '5000')),
+}
+
+# Background checkpointing
+CHECKPOINT_INTERVAL = float(os.environ.get('API_DB_CHECKPOINT_INTERVAL', '30'))
+WAL_TRUNCATE_BYTES = int(os.environ.get('API_DB_WAL_TRUNCATE_BYTES', str(64 * 1024 * 1024)))
+
+_CHOICES = {
+    'journal_mode': ('DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF'),
+    'synchronous': ('OFF', 'NORMAL', 'FULL', 'EXTRA'),
+    'temp_store': ('DEFAULT', 'FILE', 'MEMORY'),
+}
+
+
+def _check_choice(name, value):
+    if value not in _CHOICES[name]:
+        raise ValueError(f"Invalid {name} '{value}', expected one of {', '.join(_CHOICES[name])}")
+
+
+def apply_profile(conn, profile=None):
+    """Apply the pragma profile to a newly opened connection"""
+    profile = PRAGMA_PROFILE if profile is None else profile
+    _check_choice('synchronous', profile['synchronous'])
+    _check_choice('temp_store', profile['temp_store'])
+
+    conn.execute(f"PRAGMA busy_timeout = {int(profile['busy_timeout'])}")
+    conn.execute(f"PRAGMA synchronous = {profile['synchronous']}")
+    conn.execute(f"PRAGMA cache_size = {int(profile['cache_size'])}")
+    conn.execute(f"PRAGMA mmap_size = {int(profile['mmap_size'])}")
+    conn.execute(f"PRAGMA temp_store = {profile['temp_store']}")
+
+
+def configure_database(database, journal_mode=JOURNAL_MODE):
+    """Switch the database file to journal_mode; returns the mode in effect
+
+    Run once at startup, before serving. If the mode can't be changed (the
+    database is busy, or the filesystem doesn't support WAL) the current
+    mode is kept and a warning logged.
+    """
+    _check_choice('journal_mode', journal_mode)
+    conn = sqlite3.connect(database)
+    try:
+        conn.execute(f"PRAGMA busy_timeout = {int(PRAGMA_PROFILE['busy_timeout'])}")
+        mode = conn.execute(f'PRAGMA journal_mode = {journal_mode}').fetchone()[0].upper()
+    except sqlite3.OperationalError as e:
+        mode = conn.execute('PRAGMA journal_mode').fetchone()[0].upper()
+        logger.warning(f"Could not switch {database} to {journal_mode} ({e}), staying in {mode}")
+    finally:
+        conn.close()
+
+    if mode != journal_mode:
+        logger.warning(f"{database} is in {mode} journal mode, {journal_mode} was requested")
+    return mode
+
+
+def wal_size(database):
+    """Current size of the database's -wal file in bytes"""
+    try:
+        return os.path.getsize(database + '-wal')
+    except OSError:
+        return 0
+
+
+class WalCheckpointer:
+    """Checkpoints the WAL from a background thread
+
+    Every interval seconds a PASSIVE checkpoint copies committed pages back
+    into the database without waiting on readers or writers. When the WAL
+    file has grown past truncate_bytes (long-running readers kept earlier
+    checkpoints from finishing) a TRUNCATE checkpoint waits, up to the busy
+    timeout, for them and resets the file. One checkpointer per database
+    is enough, whatever the number of server processes.
+    """
+
+    def __init__(self, database, interval=CHECKPOINT_INTERVAL, truncate_bytes=WAL_TRUNCATE_BYTES):
+        self.database = database
+        self.interval = interval
+        self.truncate_bytes = truncate_bytes
+        self.checkpoints = 0
+        self.truncations = 0
+        self.failures = 0
+        self.busy = 0
+        self.last = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='wal-checkpointer', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        conn = sqlite3.connect(self.database)
+        apply_profile(conn)
+        try:
+            while not self._stop.wait(self.interval):
+                self.checkpoint(conn)
+            # Leave as little WAL behind as possible on shutdown
+            self.checkpoint(conn)
+        finally:
+            conn.close()
+
+    def checkpoint(self, conn):
+        """Run one checkpoint; returns (busy, wal_frames, checkpointed_frames)"""
+        mode = 'TRUNCATE' if wal_size(self.database) > self.truncate_bytes else 'PASSIVE'
+        started = time.perf_counter()
+        try:
+            busy, frames, checkpointed = conn.execute(f'PRAGMA wal_checkpoint({mode})').fetchone()
+        except sqlite3.Error as e:
+            with self._lock:
+                self.failures += 1
+            logger.warning(f"WAL checkpoint of {self.database} failed: {e}")
+            return None
+
+        with self._lock:
+            self.checkpoints += 1
+            if mode == 'TRUNCATE':
+                self.truncations += 1
+            if busy:
+                self.busy += 1
+            self.last = {
+                'mode': mode,
+                'busy': bool(busy),
+                'wal_frames': frames,
+                'checkpointed_frames': checkpointed,
+                'duration_ms': round((time.perf_counter() - started) * 1000, 2),
+                'at': time.time()
+            }
+
+        if mode == 'TRUNCATE' and busy:
+            logger.warning(
+                f"WAL for {self.database} is {wal_size(self.database)} bytes and readers "
+                f"blocked truncating it ({checkpointed}/{frames} frames checkpointed)"
+            )
+        return busy, frames, checkpointed
+
+    def stats(self):
+        with self._lock:
+            return {
+                'running': self._thread is not None and self._thread.is_alive(),
+                'interval': self.interval,
+                'checkpoints': self.checkpoints,
+                'truncations': self.truncations,
+                'busy': self.busy,
+                'failures': self.failures,
+                'last': self.last
+            }
+
+
+checkpointer = None
+
+
+def start_checkpointer(database, interval=CHECKPOINT_INTERVAL):
+    """Start this process's checkpointer; an interval of 0 disables it"""
+    global checkpointer
+    if interval <= 0:
+        return None
+    checkpointer = WalCheckpointer(database, interval=interval).start()
+    return checkpointer
+
+
+def _forget_checkpointer():
+    # The checkpointer thread doesn't survive fork; it keeps running in the parent
+    global checkpointer
+    checkpointer = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_forget_checkpointer)
+
+
+def storage_stats(conn, database):
+    """Journal mode, WAL size, pragma profile and this process's checkpointer"""
+    return {
+        'journal_mode': conn.execute('PRAGMA journal_mode').fetchone()[0].upper(),
+        'wal_bytes': wal_size(database),
+        'profile': PRAGMA_PROFILE,
+        'checkpointer': checkpointer.stats() if checkpointer is not None else None
+    }
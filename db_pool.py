@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+SQLite connection pool for the SHOTLIST API servers
+Long-lived, thread-affine connections with statement caching, the
+db_config pragma profile, health checks and detection of connections
+that are never handed back
+"""
+
+import os
+import sys
+import time
+import sqlite3
+import logging
+import threading
+import traceback
+
+import db_config
+
+logger = logging.getLogger(__name__)
+
+# Pool defaults (override via environment)
+STATEMENT_CACHE_SIZE = int(os.environ.get('API_DB_STATEMENT_CACHE', '256'))
+HEALTH_CHECK_INTERVAL = float(os.environ.get('API_DB_HEALTH_CHECK_INTERVAL', '30'))
+LEAK_TIMEOUT = float(os.environ.get('API_DB_LEAK_TIMEOUT', '60'))
+
+
+class PooledConnection(sqlite3.Connection):
+    """SQLite connection owned by one thread and shared by its callers
+
+    Every connect() from the owning thread returns the same connection and
+    takes a reference; close() drops it. When the last reference goes the
+    connection rolls back anything left uncommitted and stays open for the
+    thread's next caller.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool = None
+        self.database = None
+        self.owner = threading.current_thread()
+        self.file_id = None
+        self.refs = 0
+        self.acquired_at = None
+        self.acquired_by = None
+        self.leak_reported = False
+        self.last_checked = time.monotonic()
+        self.closed = False
+
+    def close(self):
+        """Hand the connection back to the pool"""
+        self.pool.release(self)
+
+    def really_close(self):
+        self.closed = True
+        super().close()
+
+
+def _file_id(database):
+    """(device, inode) of a database file, None for in-memory databases"""
+    if database == ':memory:' or database.startswith('file:'):
+        return None
+    try:
+        stat = os.stat(database)
+    except OSError:
+        return None
+    return (stat.st_dev, stat.st_ino)
+
+
+def _caller(depth=3):
+    """Where a connection was acquired, for leak reports"""
+    frame = sys._getframe(1)
+    while frame is not None and frame.f_code.co_filename == __file__:
+        frame = frame.f_back
+    frames = traceback.StackSummary.extract(
+        traceback.walk_stack(frame), limit=depth, lookup_lines=False
+    )
+    return ' <- '.join(f'{os.path.basename(f.filename)}:{f.lineno} {f.name}' for f in frames)
+
+
+class ConnectionPool:
+    """One connection per (thread, database, row factory)
+
+    Connections are opened on first use and reused for the life of the
+    thread, so requests skip the connect and schema parse and keep their
+    prepared statement cache. Before an idle connection is handed out
+    again it is health checked at most every health_check_interval
+    seconds; a connection that fails the check, or whose database file
+    was replaced on disk, is reopened.
+
+    Servers call release_thread() when a request ends. Any connection the
+    request left checked out is reported as a leak, rolled back and
+    returned. Connections held longer than leak_timeout by threads without
+    request boundaries are reported by check_leaks().
+    """
+
+    def __init__(self, statement_cache_size=STATEMENT_CACHE_SIZE,
+                 health_check_interval=HEALTH_CHECK_INTERVAL, leak_timeout=LEAK_TIMEOUT):
+        self.statement_cache_size = statement_cache_size
+        self.health_check_interval = health_check_interval
+        self.leak_timeout = leak_timeout
+        self.opened = 0
+        self.reused = 0
+        self.health_check_failures = 0
+        self.leaks = 0
+        self._local = threading.local()
+        self._connections = set()
+        self._inherited = []
+        self._lock = threading.Lock()
+
+    def connect(self, database, row_factory=sqlite3.Row):
+        """The calling thread's connection to database, opened on first use"""
+        slots = getattr(self._local, 'slots', None)
+        if slots is None:
+            slots = self._local.slots = {}
+
+        key = (database, row_factory)
+        conn = slots.get(key)
+        # close_all() may have closed it under the thread's feet
+        if conn is not None and (conn.closed or (conn.refs == 0 and not self._healthy(conn))):
+            self._discard(conn)
+            del slots[key]
+            conn = None
+
+        if conn is None:
+            conn = slots[key] = self._open(database, row_factory)
+        else:
+            with self._lock:
+                self.reused += 1
+
+        if conn.refs == 0:
+            conn.acquired_at = time.monotonic()
+            conn.acquired_by = _caller()
+            conn.leak_reported = False
+        conn.refs += 1
+        return conn
+
+    def release(self, conn):
+        """Drop one reference; the last one returns the connection"""
+        if conn.refs == 0:
+            return
+        conn.refs -= 1
+        if conn.refs == 0:
+            self._reset(conn)
+
+    def release_thread(self):
+        """End of a request: return whatever the calling thread still holds"""
+        for conn in getattr(self._local, 'slots', {}).values():
+            if conn.refs == 0:
+                continue
+            with self._lock:
+                self.leaks += 1
+            logger.warning(
+                f"Connection to {conn.database} acquired at {conn.acquired_by} "
+                f"was never closed ({conn.refs} open reference(s)), returning it to the pool"
+            )
+            conn.refs = 0
+            self._reset(conn)
+
+    def close_thread(self):
+        """Close the calling thread's connections for good"""
+        slots = getattr(self._local, 'slots', {})
+        for conn in slots.values():
+            self._discard(conn)
+        slots.clear()
+
+    def close_all(self):
+        """Close every pooled connection; only for shutdown"""
+        with self._lock:
+            connections = list(self._connections)
+            self._connections.clear()
+        for conn in connections:
+            self._close_quietly(conn)
+
+    def check_leaks(self):
+        """Report connections held longer than leak_timeout; returns them"""
+        now = time.monotonic()
+        held = []
+        with self._lock:
+            for conn in self._connections:
+                # Read once: the owning thread may return the connection meanwhile
+                acquired_at, acquired_by = conn.acquired_at, conn.acquired_by
+                if conn.refs and acquired_at is not None and now - acquired_at > self.leak_timeout:
+                    held.append((conn, now - acquired_at, acquired_by))
+
+        for conn, age, acquired_by in held:
+            if not conn.leak_reported:
+                conn.leak_reported = True
+                with self._lock:
+                    self.leaks += 1
+                logger.warning(
+                    f"Connection to {conn.database} held by {conn.owner.name} for "
+                    f"{age:.0f}s, acquired at {acquired_by}"
+                )
+        return [conn for conn, _, _ in held]
+
+    def stats(self):
+        self.check_leaks()
+        with self._lock:
+            return {
+                'open': len(self._connections),
+                'in_use': sum(1 for conn in self._connections if conn.refs),
+                'opened': self.opened,
+                'reused': self.reused,
+                'health_check_failures': self.health_check_failures,
+                'leaks': self.leaks,
+                'statement_cache_size': self.statement_cache_size
+            }
+
+    def _open(self, database, row_factory):
+        # Connections never leave their thread; check_same_thread is off so
+        # the pool itself can close connections of threads that have exited
+        conn = sqlite3.connect(
+            database,
+            factory=PooledConnection,
+            cached_statements=self.statement_cache_size,
+            check_same_thread=False
+        )
+        db_config.apply_profile(conn)
+        conn.row_factory = row_factory
+        conn.pool = self
+        conn.database = database
+        conn.file_id = _file_id(database)
+
+        with self._lock:
+            self.opened += 1
+            self._connections.add(conn)
+            dead = [c for c in self._connections if not c.owner.is_alive()]
+            for c in dead:
+                self._connections.discard(c)
+        for c in dead:
+            self._close_quietly(c)
+        return conn
+
+    def _healthy(self, conn):
+        now = time.monotonic()
+        if now - conn.last_checked < self.health_check_interval:
+            return True
+        conn.last_checked = now
+
+        try:
+            conn.execute('SELECT 1').fetchone()
+            healthy = _file_id(conn.database) == conn.file_id
+        except sqlite3.Error:
+            healthy = False
+
+        if not healthy:
+            with self._lock:
+                self.health_check_failures += 1
+            logger.warning(f"Pooled connection to {conn.database} failed its health check, reopening")
+        return healthy
+
+    def _reset(self, conn):
+        conn.acquired_at = None
+        conn.acquired_by = None
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            # Broken connection; make the next health check reopen it
+            conn.last_checked = float('-inf')
+
+    def _discard(self, conn):
+        with self._lock:
+            self._connections.discard(conn)
+        self._close_quietly(conn)
+
+    def _close_quietly(self, conn):
+        try:
+            conn.really_close()
+        except sqlite3.Error:
+            pass
+
+    def _after_fork(self):
+        """Forked child: never touch SQLite handles inherited from the parent"""
+        self._inherited.append((self._connections, getattr(self._local, 'slots', None)))
+        self._local = threading.local()
+        self._connections = set()
+        self._lock = threading.Lock()
+
+
+pool = ConnectionPool()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=pool._after_fork)
+
+
+def connect(database, row_factory=sqlite3.Row):
+    """Pooled connection for the calling thread; close() hands it back"""
+    return pool.connect(database, row_factory)
+
+
+def release_thread():
+    return pool.release_thread()
+
+
+def close_thread():
+    return pool.close_thread()
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Chart downsampling for the SHOTLIST API servers
+Largest-Triangle-Three-Buckets (LTTB): keeps max_points of a series,
+choosing in each bucket the point that spans the largest triangle with
+its neighbours, so peaks and troughs survive where plain averaging or
+every-nth sampling would flatten them. Series that share an x axis are
+downsampled together and keep the same points. Uses numpy when it is
+installed, plain Python otherwise; both pick the same points.
+
+Usage:
+    python3 downsampling.py                          # benchmark 1M points down to 1000
+    python3 downsampling.py --points 200000 --max-points 500 --series 2
+"""
+
+import time
+import random
+import argparse
+from datetime import date
+from itertools import accumulate
+
+try:
+    import numpy
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+MIN_POINTS = 3
+# Largest ?max_points= accepted, which bounds a downsampled response
+MAX_POINTS = 5000
+
+
+class DownsampleError(ValueError):
+    """Invalid downsampling parameters; the servers answer 400"""
+
+
+def max_points(params):
+    """?max_points= as an int, or None when downsampling wasn't asked for"""
+    value = params.get('max_points', [None])[0]
+    if value in (None, ''):
+        return None
+    try:
+        points = int(value)
+    except ValueError:
+        raise DownsampleError(f"Invalid max_points '{value}'")
+    if not MIN_POINTS <= points <= MAX_POINTS:
+        raise DownsampleError(f'max_points must be between {MIN_POINTS} and {MAX_POINTS}')
+    return points
+
+
+def day_numbers(labels):
+    """x positions for YYYY-MM-DD labels, so gaps between dates count"""
+    return [date.fromisoformat(str(label)[:10]).toordinal() for label in labels]
+
+
+def _normalized(series):
+    """Each series scaled to 0..1 (None and NaN as 0), so one with large values doesn't outweigh the rest"""
+    if NUMPY_AVAILABLE:
+        ys = numpy.asarray(series, dtype=float)
+        # asarray turns None into NaN
+        ys[numpy.isnan(ys)] = 0.0
+        low = ys.min(axis=1, keepdims=True)
+        span = ys.max(axis=1, keepdims=True) - low
+        span[span == 0] = 1.0
+        return (ys - low) / span
+    scaled = []
+    for values in series:
+        # value != value is NaN
+        values = [0.0 if value is None or value != value else float(value) for value in values]
+        low, high = min(values), max(values)
+        span = (high - low) or 1.0
+        scaled.append([(value - low) / span for value in values])
+    return scaled
+
+
+def _buckets(length, threshold):
+    """[start, end) of the threshold - 2 buckets between the first and last point"""
+    every = (length - 2) / (threshold - 2)
+    edges = [int(i * every) + 1 for i in range(threshold - 1)]
+    edges[-1] = length - 1
+    return list(zip(edges[:-1], edges[1:]))
+
+
+def _running_sums(values):
+    return [0.0] + list(accumulate(float(value) for value in values))
+
+
+def _lttb_python(x, series, threshold):
+    buckets = _buckets(len(x), threshold)
+    # Bucket averages from running sums, as the numpy version computes them
+    x_sums = _running_sums(x)
+    y_sums = [_running_sums(values) for values in series]
+    selected = [0]
+    a = 0
+    for i, (start, end) in enumerate(buckets):
+        if i + 1 < len(buckets):
+            next_start, next_end = buckets[i + 1]
+        else:
+            next_start, next_end = len(x) - 1, len(x)
+        count = next_end - next_start
+        avg_x = (x_sums[next_end] - x_sums[next_start]) / count
+        averages = [(sums[next_end] - sums[next_start]) / count for sums in y_sums]
+
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = 0.0
+            for values, avg_y in zip(series, averages):
+                area += abs((x[a] - avg_x) * (values[j] - values[a]) - (x[a] - x[j]) * (avg_y - values[a]))
+            if area > best_area:
+                best, best_area = j, area
+        selected.append(best)
+        a = best
+    selected.append(len(x) - 1)
+    return selected
+
+
+def _lttb_numpy(x, series, threshold):
+    x = numpy.asarray(x, dtype=float)
+    ys = series
+    buckets = _buckets(len(x), threshold)
+    # The average of every bucket's following bucket, from running sums;
+    # the last bucket is followed by the last point alone
+    starts = numpy.array([start for start, _ in buckets[1:]] + [len(x) - 1])
+    ends = numpy.array([end for _, end in buckets[1:]] + [len(x)])
+    x_sums = numpy.concatenate(([0.0], numpy.cumsum(x)))
+    y_sums = numpy.concatenate((numpy.zeros((len(ys), 1)), numpy.cumsum(ys, axis=1)), axis=1)
+    counts = ends - starts
+    avg_x = (x_sums[ends] - x_sums[starts]) / counts
+    avg_y = (y_sums[:, ends] - y_sums[:, starts]) / counts
+
+    selected = [0]
+    a = 0
+    for i, (start, end) in enumerate(buckets):
+        area = numpy.abs(
+            (x[a] - avg_x[i]) * (ys[:, start:end] - ys[:, a:a + 1])
+            - (x[a] - x[start:end]) * (avg_y[:, i:i + 1] - ys[:, a:a + 1])
+        ).sum(axis=0)
+        a = start + int(area.argmax())
+        selected.append(a)
+    selected.append(len(x) - 1)
+    return selected
+
+
+def lttb(x, series, threshold):
+    """Indices of the points to keep, at most threshold of them, in order
+
+    x is the shared axis (ascending numbers), series a list of value lists
+    as long as x. Series are compared after scaling each to 0..1. The first
+    and last points are always kept; with threshold at least len(x) every
+    index is returned.
+    """
+    if threshold < MIN_POINTS:
+        raise DownsampleError(f'max_points must be at least {MIN_POINTS}')
+    if threshold >= len(x):
+        return list(range(len(x)))
+    series = _normalized(series)
+    if NUMPY_AVAILABLE:
+        return _lttb_numpy(x, series, threshold)
+    return _lttb_python(x, series, threshold)
+
+
+def take(values, indices):
+    return [values[i] for i in indices]
+
+
+def downsample_chart(chart, series_keys, points):
+    """chart ({'labels': [...], key: [...]}) reduced to points points; None leaves it as is
+
+    Adds 'downsampled_from' with the original length when points were dropped.
+    """
+    if points is None or len(chart['labels']) <= points:
+        return chart
+    indices = lttb(day_numbers(chart['labels']), [chart[key] for key in series_keys], points)
+    reduced = dict(chart, labels=take(chart['labels'], indices), downsampled_from=len(chart['labels']))
+    for key in series_keys:
+        reduced[key] = take(chart[key], indices)
+    return reduced
+
+
+def downsample_rows(rows, columns, points, x_column='date'):
+    """Rows (dicts in date order, either direction) reduced to points rows; None leaves them"""
+    if points is None or len(rows) <= points:
+        return rows
+    descending = len(rows) > 1 and str(rows[0][x_column]) > str(rows[-1][x_column])
+    ordered = rows[::-1] if descending else rows
+    indices = lttb(day_numbers([row[x_column] for row in ordered]),
+                   [[row.get(column) for row in ordered] for column in columns], points)
+    kept = take(ordered, indices)
+    return kept[::-1] if descending else kept
+
+
+def _benchmark_series(points, count, seed):
+    """count noisy random walks with a few spikes, points long"""
+    rng = random.Random(seed)
+    series = []
+    for _ in range(count):
+        value, values = 1000.0, []
+        for i in range(points):
+            value += rng.gauss(0, 5)
+            values.append(value * (3 if rng.random() < 0.0005 else 1))
+        series.append(values)
+    return list(range(points)), series
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark LTTB downsampling')
+    parser.add_argument('--points', type=int, default=1_000_000, help='Length of each series')
+    parser.add_argument('--max-points', type=int, default=1000, help='Points to keep')
+    parser.add_argument('--series', type=int, default=1, help='Series sharing the x axis')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed')
+    args = parser.parse_args()
+
+    global NUMPY_AVAILABLE
+    print(f"📉 LTTB: {args.series} series x {args.points:,} points -> {args.max_points}")
+    started = time.perf_counter()
+    x, series = _benchmark_series(args.points, args.series, args.seed)
+    print(f"  generated in {time.perf_counter() - started:.2f}s")
+
+    numpy_found = NUMPY_AVAILABLE
+    results = {}
+    for name, use_numpy in (('numpy', True), ('python', False)):
+        if use_numpy and not numpy_found:
+            print("  ⚠️  numpy not installed, skipping the vectorized run")
+            continue
+        NUMPY_AVAILABLE = use_numpy
+        started = time.perf_counter()
+        results[name] = lttb(x, series, args.max_points)
+        print(f"  ✓ {name:<6} {(time.perf_counter() - started) * 1000:9.1f} ms, {len(results[name])} points")
+    NUMPY_AVAILABLE = numpy_found
+
+    if len(results) == 2:
+        same = results['numpy'] == results['python']
+        print(f"  {'✅' if same else '❌'} numpy and python picked {'the same' if same else 'different'} points")
+
+    kept = results.get('numpy') or results['python']
+    for values in series:
+        sample = take(values, kept)
+        covered = (max(sample) - min(sample)) / (max(values) - min(values)) * 100
+        print(f"  {covered:.1f}% of the series' range kept")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+"""
+Synthetic data for benchmarking the SHOTLIST analytics database
+Builds a fresh, fully migrated database with clients, campaigns and years
+of daily roi, social, SEO, paid ads and email metrics. The same arguments
+always produce the same data.
+
+Usage:
+    python3 generate_sample_data.py                                  # ~0.1M rows
+    python3 generate_sample_data.py --campaigns 50000 --years 3     # 10M+ rows
+    python3 generate_sample_data.py --seed 7 --end-date 2025-06-30 --database bench.db --force
+"""
+
+import os
+import sys
+import math
+import time
+import random
+import sqlite3
+import hashlib
+import logging
+import argparse
+from datetime import date, datetime, timedelta
+
+import db_config
+import migrations
+import rollups
+
+logger = logging.getLogger(__name__)
+
+DATABASE = 'shotlist_benchmark.db'
+
+# Rows per executemany/commit
+CHUNK_ROWS = 50000
+
+CAMPAIGN_TYPES = ('social_media', 'paid_ads', 'seo', 'email', 'content')
+CAMPAIGN_TYPE_WEIGHTS = (35, 25, 15, 15, 10)
+SOCIAL_PLATFORMS = ('instagram', 'facebook', 'twitter', 'linkedin', 'tiktok')
+SOCIAL_PLATFORM_WEIGHTS = (35, 25, 10, 15, 15)
+AD_PLATFORMS = ('google_ads', 'facebook_ads', 'instagram_ads', 'linkedin_ads')
+AD_PLATFORM_WEIGHTS = (45, 25, 20, 10)
+
+# Traffic by weekday, Monday first
+WEEKDAY_FACTOR = (1.0, 1.03, 1.05, 1.02, 0.96, 0.8, 0.76)
+
+INDUSTRIES = ('Tech', 'Retail', 'Fashion', 'Food', 'Health', 'Travel', 'Finance', 'Fitness',
+              'Beauty', 'Home', 'Auto', 'Education', 'Media', 'Gaming', 'Pet')
+NAME_WORDS = ('Blue', 'North', 'Bright', 'Urban', 'Peak', 'Nova', 'Summit', 'Harbor', 'Golden',
+              'Silver', 'Wild', 'Prime', 'Clear', 'Red', 'Green', 'Atlas', 'Echo', 'Lumen')
+NAME_SUFFIXES = ('Co', 'Labs', 'Studio', 'Group', 'Brands', 'Collective', 'Works', 'Inc')
+CAMPAIGN_THEMES = ('Spring Launch', 'Summer Sale', 'Back to School', 'Black Friday', 'Holiday',
+                   'Brand Awareness', 'Product Launch', 'Retargeting', 'Lead Gen', 'Newsletter',
+                   'Evergreen', 'Clearance', 'Loyalty', 'Webinar', 'App Install')
+
+# Tables the generator fills; their indexes and triggers are dropped during
+# the load and rebuilt once at the end, which is much faster than keeping
+# them current row by row
+LOADED_TABLES = ('users', 'campaigns', 'roi_metrics', 'social_media_metrics', 'seo_metrics',
+                 'paid_ads_metrics', 'email_metrics')
+
+
+def _hash(password):
+    return hashlib.sha256(password.encode()).hexdigest()
+
+
+class Client:
+    """A client account; scale sizes its budgets (a few clients spend most)"""
+
+    def __init__(self, index, rng, signed_up):
+        self.index = index
+        self.name = f"{rng.choice(NAME_WORDS)} {rng.choice(INDUSTRIES)} {rng.choice(NAME_SUFFIXES)}"
+        self.scale = rng.paretovariate(1.5)
+        self.created_at = signed_up - timedelta(days=rng.randint(0, 90), seconds=rng.randrange(86400))
+        self.user_id = None
+
+    def user_row(self):
+        slug = ''.join(c for c in self.name.lower() if c.isalnum())
+        email = f'client{self.index}@{slug}.example.com'
+        password = _hash('demo123')
+        return (f'client{self.index}', email, f'{self.name} Client', self.name, password, password,
+                'client', 'email', self.created_at.strftime('%Y-%m-%d %H:%M:%S'))
+
+
+class Campaign:
+    """One campaign and the daily metric rows it produces
+
+    Each campaign draws from its own generator seeded from the run seed and
+    its position, so its rows don't depend on what else is generated.
+    """
+
+    def __init__(self, campaign_id, client, seed, first_day, last_day):
+        rng = self.rng = random.Random(seed * 1000003 + campaign_id)
+        self.campaign_id = campaign_id
+        self.client = client
+        self.campaign_type = rng.choices(CAMPAIGN_TYPES, CAMPAIGN_TYPE_WEIGHTS)[0]
+        theme = rng.choice(CAMPAIGN_THEMES)
+
+        span = (last_day - first_day).days
+        self.start = first_day + timedelta(days=rng.randrange(max(span - 14, 1)))
+        self.duration = min(max(int(rng.lognormvariate(math.log(90), 0.6)), 14), 730)
+        self.end = self.start + timedelta(days=self.duration - 1)
+        if self.end <= last_day:
+            self.status = 'completed'
+            self.last = self.end
+        else:
+            self.status = 'paused' if rng.random() < 0.15 else 'active'
+            # Paused campaigns stopped reporting a while ago
+            self.last = last_day - timedelta(days=rng.randint(3, 30)) if self.status == 'paused' else last_day
+        self.created_at = datetime.combine(self.start, datetime.min.time()) - timedelta(
+            days=rng.randint(1, 21), seconds=rng.randrange(86400))
+        self.name = f'{client.name} {theme} {self.start.year}'
+
+        self.budget = round(client.scale * rng.lognormvariate(math.log(15000), 0.8), 2)
+        self.daily_cost = self.budget / self.duration
+        self.roas = rng.lognormvariate(math.log(2.5), 0.45)
+        self.order_value = rng.lognormvariate(math.log(80), 0.5)
+        self.leads_per_conversion = rng.uniform(2, 6)
+
+        if self.campaign_type in ('social_media', 'content'):
+            count = rng.choices((1, 2, 3), (50, 35, 15))[0]
+            self.platforms = self._pick(SOCIAL_PLATFORMS, SOCIAL_PLATFORM_WEIGHTS, count)
+            self.cpm = rng.lognormvariate(math.log(7), 0.4)
+            self.engagement_rate = rng.betavariate(2, 50)
+            # Content campaigns are mostly organic
+            self.paid_share = 0.15 if self.campaign_type == 'content' else 1.0
+        elif self.campaign_type == 'paid_ads':
+            self.platforms = self._pick(AD_PLATFORMS, AD_PLATFORM_WEIGHTS, rng.choices((1, 2), (60, 40))[0])
+            self.cpc = rng.lognormvariate(math.log(1.2), 0.5)
+            self.ctr = rng.uniform(0.8, 4.0)
+            self.quality_score = rng.uniform(4, 9.5)
+        elif self.campaign_type == 'seo':
+            self.traffic = rng.lognormvariate(math.log(800), 0.9) * client.scale
+            self.domain_authority = rng.randint(10, 60)
+            self.backlinks = rng.randint(50, 5000)
+            self.keywords = rng.randint(20, 400)
+        else:
+            self.list_size = int(rng.lognormvariate(math.log(20000), 1.0) * client.scale)
+            self.send_days = set(rng.sample(range(7), rng.choice((1, 1, 2, 3))))
+            self.open_rate = rng.uniform(0.12, 0.35)
+
+    def _pick(self, choices, weights, count):
+        picked = []
+        while len(picked) < count:
+            platform = self.rng.choices(choices, weights)[0]
+            if platform not in picked:
+                picked.append(platform)
+        return picked
+
+    def row(self):
+        return (self.campaign_id, self.name, self.client.name, self.campaign_type, self.start.isoformat(),
+                self.end.isoformat(), self.budget, self.status,
+                self.created_at.strftime('%Y-%m-%d %H:%M:%S'), self.client.user_id)
+
+    def emit(self, day, out):
+        """Append this campaign's rows for day to out[table]"""
+        rng = self.rng
+        iso = day.isoformat()
+        age = (day - self.start).days
+        weekday = WEEKDAY_FACTOR[day.weekday()]
+        # Performance ramps up over the first weeks and tires towards the end
+        ramp = min(1.0, 0.55 + age / 30) * (1 - 0.25 * age / self.duration)
+
+        cost = self.daily_cost * weekday * rng.gammavariate(8, 1 / 8)
+        revenue = cost * self.roas * ramp * rng.lognormvariate(0, 0.3)
+        conversions = int(revenue / self.order_value + rng.random())
+        leads = int(conversions * self.leads_per_conversion + rng.random())
+        out['roi_metrics'].append((
+            self.campaign_id, iso, round(revenue, 2), round(cost, 2), conversions, leads,
+            round((revenue - cost) / cost * 100, 2) if cost else 0,
+            round(revenue / cost, 2) if cost else 0,
+            round(cost / conversions, 2) if conversions else 0,
+            round(cost / leads, 2) if leads else 0,
+            round(conversions / leads * 100, 2) if leads else 0,
+        ))
+
+        if self.campaign_type in ('social_media', 'content'):
+            for share, platform in zip(_split(rng, len(self.platforms)), self.platforms):
+                spend = cost * share * self.paid_share
+                impressions = int(cost * share / self.cpm * 1000 * ramp * rng.lognormvariate(0, 0.25))
+                reach = int(impressions * rng.uniform(0.45, 0.8))
+                engagement = int(reach * self.engagement_rate * rng.lognormvariate(0, 0.3))
+                out['social_media_metrics'].append((
+                    self.campaign_id, platform, iso, impressions, reach, engagement,
+                    int(engagement * 0.72), int(engagement * 0.09), int(engagement * 0.07),
+                    int(engagement * 0.12 + reach * 0.004), int(engagement * rng.uniform(0.01, 0.04)),
+                    round(spend, 2),
+                ))
+        elif self.campaign_type == 'paid_ads':
+            for share, platform in zip(_split(rng, len(self.platforms)), self.platforms):
+                spend = cost * share
+                cpc = self.cpc * rng.lognormvariate(0, 0.15)
+                clicks = int(spend / cpc)
+                ctr = self.ctr * rng.lognormvariate(0, 0.1)
+                impressions = int(clicks / ctr * 100)
+                ad_conversions = int(clicks * rng.uniform(0.01, 0.06) * ramp)
+                out['paid_ads_metrics'].append((
+                    self.campaign_id, platform, iso, impressions, clicks, round(spend, 2), ad_conversions,
+                    round(clicks / impressions * 100, 2) if impressions else 0,
+                    round(spend / clicks, 2) if clicks else 0,
+                    round(spend / impressions * 1000, 2) if impressions else 0,
+                    round(min(10, max(1, self.quality_score + rng.gauss(0, 0.3))), 1),
+                ))
+        elif self.campaign_type == 'seo':
+            # Organic traffic compounds as rankings improve
+            growth = 1 + 1.5 * (1 - math.exp(-age / 120))
+            traffic = int(self.traffic * growth * weekday * rng.lognormvariate(0, 0.15))
+            self.backlinks += rng.choice((0, 0, 1, 2, 3))
+            out['seo_metrics'].append((
+                self.campaign_id, iso, traffic, int(self.keywords * growth),
+                self.backlinks, min(100, self.domain_authority + age // 60),
+                min(100, self.domain_authority - 5 + age // 45),
+                round(rng.uniform(35, 65), 2), rng.randint(60, 240), round(rng.uniform(1.5, 4), 2),
+                int(traffic * rng.uniform(0.01, 0.03)),
+            ))
+        elif day.weekday() in self.send_days:
+            sent = int(self.list_size * (1 + age / 365 * 0.2))
+            delivered = int(sent * rng.uniform(0.95, 0.995))
+            opens = int(delivered * self.open_rate * rng.lognormvariate(0, 0.1))
+            clicks = int(opens * rng.uniform(0.08, 0.18))
+            out['email_metrics'].append((
+                self.campaign_id, iso, sent, delivered, opens, clicks,
+                int(delivered * rng.uniform(0.001, 0.004)), sent - delivered,
+                round(opens / delivered * 100, 2) if delivered else 0,
+                round(clicks / delivered * 100, 2) if delivered else 0,
+                int(clicks * rng.uniform(0.02, 0.08)),
+            ))
+
+
+def _split(rng, parts):
+    """parts random shares summing to 1"""
+    if parts == 1:
+        return (1.0,)
+    weights = [rng.uniform(0.5, 1.5) for _ in range(parts)]
+    total = sum(weights)
+    return [weight / total for weight in weights]
+
+
+INSERTS = {
+    'roi_metrics': '''
+        INSERT INTO roi_metrics (campaign_id, date, revenue, cost, conversions, leads,
+            roi_percentage, roas, cpa, cpl, conversion_rate)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''',
+    'social_media_metrics': '''
+        INSERT INTO social_media_metrics (campaign_id, platform, date, impressions, reach, engagement,
+            likes, comments, shares, clicks, followers_gained, spend)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''',
+    'seo_metrics': '''
+        INSERT INTO seo_metrics (campaign_id, date, organic_traffic, keyword_rankings, backlinks,
+            domain_authority, page_authority, bounce_rate, avg_session_duration, pages_per_session, conversions)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''',
+    'paid_ads_metrics': '''
+        INSERT INTO paid_ads_metrics (campaign_id, platform, date, impressions, clicks, spend, conversions,
+            ctr, cpc, cpm, quality_score)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''',
+    'email_metrics': '''
+        INSERT INTO email_metrics (campaign_id, date, emails_sent, emails_delivered, opens, clicks,
+            unsubscribes, bounces, open_rate, click_rate, conversions)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''',
+}
+
+
+def _drop_derived(conn):
+    """Drop the loaded tables' indexes and triggers; returns their SQL"""
+    placeholders = ','.join('?' * len(LOADED_TABLES))
+    derived = conn.execute(f'''
+        SELECT type, name, sql FROM sqlite_master
+        WHERE type IN ('index', 'trigger') AND sql IS NOT NULL AND tbl_name IN ({placeholders})
+    ''', LOADED_TABLES).fetchall()
+    for kind, name, _ in derived:
+        conn.execute(f'DROP {kind.upper()} {name}')
+    return [sql for _, _, sql in derived]
+
+
+def generate(database=DATABASE, clients=25, campaigns=500, years=2, seed=42, end_date=None, progress=None):
+    """Create database and fill it; returns {table: rows}
+
+    database must not exist yet. Metrics are written day by day across all
+    running campaigns, the order production data arrives in.
+    """
+    last_day = end_date or date.today()
+    first_day = last_day - timedelta(days=int(365 * years))
+    rng = random.Random(seed)
+
+    migrations.migrate(database)
+    conn = sqlite3.connect(database)
+    # A crash halfway leaves a database to delete anyway, so skip the journal
+    conn.execute('PRAGMA journal_mode = OFF')
+    conn.execute('PRAGMA synchronous = OFF')
+    conn.execute('PRAGMA cache_size = -262144')
+    conn.execute('PRAGMA temp_store = MEMORY')
+    derived = _drop_derived(conn)
+    counts = dict.fromkeys(['users', 'campaigns'] + list(INSERTS), 0)
+
+    admin = _hash('admin123')
+    signed_up = datetime.combine(first_day, datetime.min.time())
+    conn.execute('''
+        INSERT INTO users (username, email, full_name, password, password_hash, role, provider, created_at)
+        VALUES ('admin', 'admin@shotlist.com', 'Admin User', ?, ?, 'admin', 'email', ?)
+    ''', (admin, admin, (signed_up - timedelta(days=120)).strftime('%Y-%m-%d %H:%M:%S')))
+    accounts = [Client(index, rng, signed_up) for index in range(1, clients + 1)]
+    for client in accounts:
+        client.user_id = conn.execute('''
+            INSERT INTO users (username, email, full_name, company_name, password, password_hash, role,
+                provider, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', client.user_row()).lastrowid
+    counts['users'] = clients + 1
+
+    weights = [client.scale for client in accounts]
+    running = sorted(
+        (Campaign(campaign_id, rng.choices(accounts, weights)[0], seed, first_day, last_day)
+         for campaign_id in range(1, campaigns + 1)),
+        key=lambda campaign: campaign.start
+    )
+    conn.executemany('''
+        INSERT INTO campaigns (campaign_id, campaign_name, client_name, campaign_type, start_date,
+            end_date, budget, status, created_at, user_id)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', [campaign.row() for campaign in sorted(running, key=lambda campaign: campaign.campaign_id)])
+    counts['campaigns'] = campaigns
+    conn.commit()
+
+    out = {table: [] for table in INSERTS}
+
+    def flush(force=False):
+        for table, rows in out.items():
+            if rows and (force or len(rows) >= CHUNK_ROWS):
+                conn.executemany(INSERTS[table], rows)
+                counts[table] += len(rows)
+                rows.clear()
+        conn.commit()
+
+    pending = iter(running)
+    upcoming = next(pending, None)
+    active = []
+    day = first_day
+    while day <= last_day:
+        while upcoming is not None and upcoming.start <= day:
+            active.append(upcoming)
+            upcoming = next(pending, None)
+        active = [campaign for campaign in active if campaign.last >= day]
+        for campaign in active:
+            campaign.emit(day, out)
+        if any(len(rows) >= CHUNK_ROWS for rows in out.values()):
+            flush()
+            if progress:
+                progress(day, counts)
+        day += timedelta(days=1)
+    flush(force=True)
+
+    for sql in derived:
+        conn.execute(sql)
+    placeholders = ','.join('?' * len(LOADED_TABLES))
+    conn.execute(f'UPDATE data_versions SET version = version + 1 WHERE table_name IN ({placeholders})',
+                 LOADED_TABLES)
+    conn.commit()
+    conn.close()
+
+    # The triggers weren't there during the load: rebuild the rollups, then
+    # leave the database as the servers expect it
+    db_config.configure_database(database)
+    rollups.rebuild(database)
+    conn = sqlite3.connect(database)
+    conn.execute('ANALYZE')
+    conn.close()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SHOTLIST synthetic benchmark data')
+    parser.add_argument('--database', default=DATABASE, help='SQLite database file to create')
+    parser.add_argument('--clients', type=int, default=25, help='Client accounts')
+    parser.add_argument('--campaigns', type=int, default=500, help='Campaigns across all clients')
+    parser.add_argument('--years', type=float, default=2, help='Years of daily metrics')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed')
+    parser.add_argument('--end-date', type=date.fromisoformat,
+                        help='Last day of data (YYYY-MM-DD, default today); fix it to get the same data on any day')
+    parser.add_argument('--force', action='store_true', help='Replace the database if it exists')
+    args = parser.parse_args()
+
+    if args.clients < 1 or args.campaigns < 1 or args.years <= 0:
+        parser.error('--clients, --campaigns and --years must be positive')
+    if os.path.exists(args.database):
+        if not args.force:
+            parser.error(f'{args.database} exists; pass --force to replace it')
+        for path in (args.database, args.database + '-wal', args.database + '-shm'):
+            if os.path.exists(path):
+                os.remove(path)
+
+    print(f"🧪 Generating {args.database}: {args.clients} clients, {args.campaigns} campaigns, "
+          f"{args.years:g} years, seed {args.seed}")
+    started = time.perf_counter()
+
+    def progress(day, counts):
+        rows = sum(counts.values())
+        print(f"  … {day.isoformat()}  {rows:,} rows  "
+              f"({rows / (time.perf_counter() - started):,.0f} rows/s)", end='\r', file=sys.stderr)
+
+    counts = generate(args.database, args.clients, args.campaigns, args.years, args.seed, args.end_date, progress)
+    elapsed = time.perf_counter() - started
+    print(' ' * 60, end='\r', file=sys.stderr)
+    for table, rows in counts.items():
+        print(f"  ✓ {table:<22} {rows:>12,}")
+    total = sum(counts.values())
+    print(f"✅ {total:,} rows in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s)")
+
+
+if __name__ == '__main__':
+    main()
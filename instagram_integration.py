@@ -6,10 +6,11 @@ Handles Instagram account linking and metrics fetching
 import requests
 import json
 import os
-import sqlite3
 from datetime import datetime, timedelta
 import logging
 
+import db_pool
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -173,74 +174,12 @@ class InstagramDatabase:
     """Database operations for Instagram integration"""
     
     def __init__(self, db_path="shotlist_analytics.db"):
-        """Initialize database connection"""
+        """Initialize database connection (tables are created by migrations.py)"""
         self.db_path = db_path
-        self.create_tables()
     
     def get_connection(self):
-        """Get database connection"""
-        return sqlite3.connect(self.db_path)
-    
-    def create_tables(self):
-        """Create Instagram-related tables"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # Instagram accounts table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS instagram_accounts (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL UNIQUE,
-                instagram_id TEXT UNIQUE,
-                username TEXT,
-                access_token TEXT,
-                refresh_token TEXT,
-                token_expires_at TIMESTAMP,
-                connected_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                last_sync TIMESTAMP,
-                sync_status TEXT DEFAULT 'pending',
-                FOREIGN KEY (user_id) REFERENCES users(id)
-            )
-        ''')
-        
-        # Instagram metrics cache
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS instagram_metrics (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                instagram_account_id INTEGER NOT NULL,
-                followers INTEGER,
-                following INTEGER,
-                media_count INTEGER,
-                engagement_rate REAL,
-                reach INTEGER,
-                impressions INTEGER,
-                profile_views INTEGER,
-                saved_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (instagram_account_id) REFERENCES instagram_accounts(id)
-            )
-        ''')
-        
-        # Instagram media performance
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS instagram_media (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                instagram_account_id INTEGER NOT NULL,
-                media_id TEXT UNIQUE,
-                caption TEXT,
-                media_type TEXT,
-                likes INTEGER,
-                comments INTEGER,
-                reach INTEGER,
-                impressions INTEGER,
-                engagement_rate REAL,
-                posted_at TIMESTAMP,
-                synced_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (instagram_account_id) REFERENCES instagram_accounts(id)
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
+        """Get pooled database connection; close() hands it back"""
+        return db_pool.connect(self.db_path, row_factory=None)
     
     def save_account(self, user_id, instagram_data):
         """Save Instagram account connection"""
@@ -401,6 +340,8 @@ class InstagramDatabase:
 # Example usage
 if __name__ == "__main__":
     # Initialize database
+    from migrations import migrate
+    migrate()
     db = InstagramDatabase()
     
     # Example: Link Instagram account for user
@@ -0,0 +1,1075 @@
+#!/usr/bin/env python3
+"""
+Schema migrations for the SHOTLIST analytics database
+Ordered, versioned schema changes recorded in a schema_version table. The
+servers apply pending migrations once at startup; requests never run DDL.
+
+Usage:
+    python3 migrations.py              # apply pending migrations
+    python3 migrations.py --status     # list migrations and whether they ran
+    python3 migrations.py --to 4       # apply up to version 4
+"""
+
+import os
+import sqlite3
+import logging
+import argparse
+
+logger = logging.getLogger(__name__)
+
+DATABASE = 'shotlist_analytics.db'
+
+# Migrations are written to be safe on databases created before this module
+# existed (CREATE ... IF NOT EXISTS, columns added only when missing), so an
+# existing database is brought under version control by simply migrating it.
+#
+# A shipped migration must build the same schema forever, so everything it
+# creates is spelled out in this module: table lists, columns and the
+# generated trigger SQL below. The modules that read those tables
+# (data_versions, rollups, social_monthly) are free to change; a schema
+# change they need is a new migration.
+
+
+def _columns(cursor, table):
+    """Column names of table, empty if it doesn't exist"""
+    return {row[1] for row in cursor.execute(f'PRAGMA table_info({table})')}
+
+
+def _add_missing_columns(cursor, table, columns):
+    """ALTER TABLE ADD COLUMN for each (name, definition) not yet in table"""
+    existing = _columns(cursor, table)
+    for name, definition in columns:
+        if name not in existing:
+            cursor.execute(f'ALTER TABLE {table} ADD COLUMN {name} {definition}')
+
+
+def _create_index(cursor, name, table, columns, unique=False):
+    """CREATE INDEX IF NOT EXISTS, skipped when table lacks the columns
+
+    Columns may carry a sort order, e.g. 'created_at DESC'.
+    """
+    names = [column.split()[0] for column in columns]
+    if not set(names) <= _columns(cursor, table):
+        logger.warning(f"Skipping index {name}: {table} has no {', '.join(names)} column")
+        return
+    cursor.execute(
+        f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {name} "
+        f"ON {table}({', '.join(columns)})"
+    )
+
+
+# ==================== SCHEMA HELPERS ====================
+# Used by shipped migrations: never change what they generate. A migration
+# that needs different SQL gets a helper of its own.
+
+def _track_writes(cursor, tables):
+    """data_versions rows and the triggers counting writes to each table
+
+    Tables that don't exist in this database are skipped.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS data_versions (
+            table_name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    existing = {row[0] for row in cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    for table in tables:
+        if table not in existing:
+            continue
+        cursor.execute('INSERT OR IGNORE INTO data_versions (table_name) VALUES (?)', (table,))
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS data_version_{table}_{event.lower()}
+                AFTER {event} ON {table}
+                BEGIN
+                    UPDATE data_versions SET version = version + 1 WHERE table_name = '{table}';
+                END
+            ''')
+
+
+def _create_rollup_table(cursor, table, source, keys, sums, counts):
+    """CREATE TABLE for a rollup; False when source lacks the columns it sums
+
+    Sums take the declared type of the column they sum. Databases whose
+    social_media_metrics is the account-level table from the social sync
+    module get the empty table but no triggers.
+    """
+    source_types = {row[1]: row[2] for row in cursor.execute(f'PRAGMA table_info({source})')}
+    columns = [f'{key} {kind} NOT NULL' for key, kind in keys.items()]
+    columns += [
+        f"{column} {source_types.get(column_of) or 'REAL'} NOT NULL DEFAULT 0"
+        for column, column_of in sums.items()
+    ]
+    columns += [f'{column} INTEGER NOT NULL DEFAULT 0' for column in list(counts) + ['row_count']]
+    cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS {table} (
+                {', '.join(columns)},
+                PRIMARY KEY ({', '.join(keys)})
+            ) WITHOUT ROWID
+        ''')
+    missing = (set(keys) | set(sums.values()) | set(counts.values())) - set(source_types)
+    if missing:
+        logger.warning(f"Not maintaining {table}: {source} has no {', '.join(sorted(missing))} column")
+        return False
+    return True
+
+
+def _row_values(row, sums, counts):
+    """A source row's contribution to each rollup value column"""
+    values = [f'COALESCE({row}.{source}, 0)' for source in sums.values()]
+    values += [f'({row}.{source} IS NOT NULL)' for source in counts.values()]
+    return values + ['1']
+
+
+def _install_rollup(cursor, table, source, keys, sums, counts=None, index=None):
+    """Rollup table summing source per keys, its triggers and its initial rows"""
+    counts = counts or {}
+    value_columns = list(sums) + list(counts) + ['row_count']
+    ready = _create_rollup_table(cursor, table, source, keys, sums, counts)
+    if index:
+        name, columns = index
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table}({', '.join(columns)})")
+    if not ready:
+        return
+
+    def apply(row, sign):
+        values = [f'{row}.{key}' for key in keys] + [sign + value for value in _row_values(row, sums, counts)]
+        updates = ', '.join(f'{column} = {column} + excluded.{column}' for column in value_columns)
+        return f'''
+            INSERT INTO {table} ({', '.join(list(keys) + value_columns)})
+            VALUES ({', '.join(values)})
+            ON CONFLICT ({', '.join(keys)}) DO UPDATE SET {updates};
+        '''
+
+    match = ' AND '.join(f'{key} = OLD.{key}' for key in keys)
+    add = apply('NEW', '+')
+    remove = apply('OLD', '-') + f'DELETE FROM {table} WHERE {match} AND row_count <= 0;'
+    for event, body in (('insert', add), ('update', f'{remove} {add}'), ('delete', remove)):
+        cursor.execute(
+            f'CREATE TRIGGER IF NOT EXISTS {table}_{event} AFTER {event.upper()} ON {source} BEGIN {body} END'
+        )
+
+    aggregates = [f'COALESCE(SUM({column_of}), 0)' for column_of in sums.values()]
+    aggregates += [f'COUNT({column_of})' for column_of in counts.values()]
+    cursor.execute(f'DELETE FROM {table}')
+    cursor.execute(f'''
+        INSERT INTO {table} ({', '.join(list(keys) + value_columns)})
+        SELECT {', '.join(list(keys) + aggregates)}, COUNT(*) FROM {source}
+        GROUP BY {', '.join(keys)}
+    ''')
+
+
+def _install_prefix_sums(cursor, table, source, partition, sums, counts):
+    """Running totals of source per partition and day, their triggers and initial rows
+
+    A source row adds itself to its day, which starts from the previous
+    day's totals when new, and to every later day of its partition.
+    """
+    keys = dict(partition, date='DATE')
+    value_columns = list(sums) + list(counts) + ['row_count']
+    if not _create_rollup_table(cursor, table, source, keys, sums, counts):
+        return
+
+    def same(row, alias=''):
+        return ''.join(f' AND {alias}{key} = {row}.{key}' for key in partition)
+
+    def previous(row):
+        return f'(SELECT MAX(date) FROM {table} WHERE date < {row}.date{same(row)})'
+
+    def apply(row, sign):
+        values = _row_values(row, sums, counts)
+        updates = ', '.join(f'{column} = {column} {sign} {value}' for column, value in zip(value_columns, values))
+        later = f'''
+            UPDATE {table} SET {updates}
+            WHERE date {'>' if sign == '+' else '>='} {row}.date{same(row)};
+        '''
+        if sign == '-':
+            return later
+        carried = [f'COALESCE(p.{column}, 0) + {value}' for column, value in zip(value_columns, values)]
+        return f'''
+            INSERT INTO {table} ({', '.join(list(keys) + value_columns)})
+            SELECT {', '.join([f'{row}.{key}' for key in keys] + carried)}
+            FROM (SELECT 1)
+            LEFT JOIN {table} p ON p.date = {previous(row)}{same(row, 'p.')}
+            WHERE 1 ON CONFLICT ({', '.join(keys)}) DO UPDATE SET {updates};
+        ''' + later
+
+    # A day goes once no source rows are left on it
+    prune = f'''
+            DELETE FROM {table}
+            WHERE date = OLD.date{same('OLD')} AND row_count = COALESCE(
+                (SELECT row_count FROM {table} WHERE date = {previous('OLD')}{same('OLD')}), 0
+            );
+        '''
+    add = apply('NEW', '+')
+    remove = apply('OLD', '-') + prune
+    for event, body in (('insert', add), ('update', f'{remove} {add}'), ('delete', remove)):
+        cursor.execute(
+            f'CREATE TRIGGER IF NOT EXISTS {table}_{event} AFTER {event.upper()} ON {source} BEGIN {body} END'
+        )
+
+    running = [f'SUM(COALESCE(SUM({column_of}), 0)) OVER w' for column_of in sums.values()]
+    running += [f'SUM(COUNT({column_of})) OVER w' for column_of in counts.values()]
+    window = f"PARTITION BY {', '.join(partition)} " if partition else ''
+    cursor.execute(f'DELETE FROM {table}')
+    cursor.execute(f'''
+        INSERT INTO {table} ({', '.join(list(keys) + value_columns)})
+        SELECT {', '.join(list(keys) + running)}, SUM(COUNT(*)) OVER w FROM {source}
+        GROUP BY {', '.join(keys)}
+        WINDOW w AS ({window}ORDER BY date)
+    ''')
+
+
+# ==================== MIGRATIONS ====================
+
+def _analytics_tables(cursor):
+    """Campaigns and their per-channel daily metrics"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS campaigns (
+            campaign_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            campaign_name TEXT NOT NULL,
+            client_name TEXT NOT NULL,
+            campaign_type TEXT NOT NULL, -- 'social_media', 'seo', 'email', 'paid_ads', 'content'
+            start_date DATE NOT NULL,
+            end_date DATE,
+            budget DECIMAL(10, 2) NOT NULL,
+            status TEXT DEFAULT 'active', -- 'active', 'paused', 'completed'
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS social_media_metrics (
+            metric_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            campaign_id INTEGER NOT NULL,
+            platform TEXT NOT NULL, -- 'instagram', 'facebook', 'twitter', 'linkedin', 'tiktok'
+            date DATE NOT NULL,
+            impressions INTEGER DEFAULT 0,
+            reach INTEGER DEFAULT 0,
+            engagement INTEGER DEFAULT 0,
+            likes INTEGER DEFAULT 0,
+            comments INTEGER DEFAULT 0,
+            shares INTEGER DEFAULT 0,
+            clicks INTEGER DEFAULT 0,
+            followers_gained INTEGER DEFAULT 0,
+            spend DECIMAL(10, 2) DEFAULT 0,
+            FOREIGN KEY (campaign_id) REFERENCES campaigns(campaign_id)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS seo_metrics (
+            metric_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            campaign_id INTEGER NOT NULL,
+            date DATE NOT NULL,
+            organic_traffic INTEGER DEFAULT 0,
+            keyword_rankings INTEGER DEFAULT 0,
+            backlinks INTEGER DEFAULT 0,
+            domain_authority INTEGER DEFAULT 0,
+            page_authority INTEGER DEFAULT 0,
+            bounce_rate DECIMAL(5, 2) DEFAULT 0,
+            avg_session_duration INTEGER DEFAULT 0, -- in seconds
+            pages_per_session DECIMAL(5, 2) DEFAULT 0,
+            conversions INTEGER DEFAULT 0,
+            FOREIGN KEY (campaign_id) REFERENCES campaigns(campaign_id)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS roi_metrics (
+            roi_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            campaign_id INTEGER NOT NULL,
+            date DATE NOT NULL,
+            revenue DECIMAL(10, 2) DEFAULT 0,
+            cost DECIMAL(10, 2) DEFAULT 0,
+            conversions INTEGER DEFAULT 0,
+            leads INTEGER DEFAULT 0,
+            roi_percentage DECIMAL(10, 2) DEFAULT 0,
+            roas DECIMAL(10, 2) DEFAULT 0, -- Return on Ad Spend
+            cpa DECIMAL(10, 2) DEFAULT 0, -- Cost Per Acquisition
+            cpl DECIMAL(10, 2) DEFAULT 0, -- Cost Per Lead
+            conversion_rate DECIMAL(5, 2) DEFAULT 0,
+            FOREIGN KEY (campaign_id) REFERENCES campaigns(campaign_id)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS email_metrics (
+            metric_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            campaign_id INTEGER NOT NULL,
+            date DATE NOT NULL,
+            emails_sent INTEGER DEFAULT 0,
+            emails_delivered INTEGER DEFAULT 0,
+            opens INTEGER DEFAULT 0,
+            clicks INTEGER DEFAULT 0,
+            unsubscribes INTEGER DEFAULT 0,
+            bounces INTEGER DEFAULT 0,
+            open_rate DECIMAL(5, 2) DEFAULT 0,
+            click_rate DECIMAL(5, 2) DEFAULT 0,
+            conversions INTEGER DEFAULT 0,
+            FOREIGN KEY (campaign_id) REFERENCES campaigns(campaign_id)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS paid_ads_metrics (
+            metric_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            campaign_id INTEGER NOT NULL,
+            platform TEXT NOT NULL, -- 'google_ads', 'facebook_ads', 'instagram_ads', 'linkedin_ads'
+            date DATE NOT NULL,
+            impressions INTEGER DEFAULT 0,
+            clicks INTEGER DEFAULT 0,
+            spend DECIMAL(10, 2) DEFAULT 0,
+            conversions INTEGER DEFAULT 0,
+            ctr DECIMAL(5, 2) DEFAULT 0, -- Click Through Rate
+            cpc DECIMAL(10, 2) DEFAULT 0, -- Cost Per Click
+            cpm DECIMAL(10, 2) DEFAULT 0, -- Cost Per Mille (1000 impressions)
+            quality_score DECIMAL(3, 1) DEFAULT 0,
+            FOREIGN KEY (campaign_id) REFERENCES campaigns(campaign_id)
+        )
+    ''')
+
+    _create_index(cursor, 'idx_campaigns_status', 'campaigns', ['status'])
+    _create_index(cursor, 'idx_campaigns_type', 'campaigns', ['campaign_type'])
+    # Databases that got the account-level social_media_metrics from the
+    # social sync module first have no campaign_id/date to index
+    _create_index(cursor, 'idx_social_campaign', 'social_media_metrics', ['campaign_id'])
+    _create_index(cursor, 'idx_social_date', 'social_media_metrics', ['date'])
+    _create_index(cursor, 'idx_seo_campaign', 'seo_metrics', ['campaign_id'])
+    _create_index(cursor, 'idx_seo_date', 'seo_metrics', ['date'])
+    _create_index(cursor, 'idx_roi_campaign', 'roi_metrics', ['campaign_id'])
+    _create_index(cursor, 'idx_roi_date', 'roi_metrics', ['date'])
+
+
+def _accounts(cursor):
+    """Users, sessions and sign-in bookkeeping"""
+    # The email/OAuth dashboard and the client portal grew separate users
+    # tables (email + password vs username + password_hash). New databases
+    # get one table with both sets of columns; older ones gain the columns
+    # they're missing.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            user_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE,
+            email TEXT NOT NULL UNIQUE,
+            full_name TEXT,
+            company_name TEXT,
+            password TEXT,
+            password_hash TEXT,
+            role TEXT DEFAULT 'client', -- 'admin', 'client', 'viewer'
+            provider TEXT DEFAULT 'email',
+            oauth_id TEXT,
+            is_active INTEGER DEFAULT 1,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_login TIMESTAMP
+        )
+    ''')
+    _add_missing_columns(cursor, 'users', [
+        ('username', 'TEXT'),
+        ('company_name', 'TEXT'),
+        ('password', 'TEXT'),
+        ('password_hash', 'TEXT'),
+        ('provider', "TEXT DEFAULT 'email'"),
+        ('oauth_id', 'TEXT'),
+    ])
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sessions (
+            session_id TEXT PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            expires_at TIMESTAMP NOT NULL,
+            FOREIGN KEY (user_id) REFERENCES users(user_id)
+        )
+    ''')
+
+    # OAuth states for CSRF protection
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS oauth_states (
+            state TEXT PRIMARY KEY,
+            provider TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS login_attempts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            email TEXT NOT NULL,
+            attempt_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            success INTEGER DEFAULT 0,
+            ip_address TEXT,
+            user_agent TEXT
+        )
+    ''')
+
+    _create_index(cursor, 'idx_users_username', 'users', ['username'])
+    _create_index(cursor, 'idx_users_email', 'users', ['email'])
+    _create_index(cursor, 'idx_sessions_user', 'sessions', ['user_id'])
+    _create_index(cursor, 'idx_sessions_expires', 'sessions', ['expires_at'])
+
+
+def _client_portal(cursor):
+    """Campaign ownership, calendar events and the activity log"""
+    _add_missing_columns(cursor, 'campaigns', [
+        ('user_id', 'INTEGER REFERENCES users(user_id)'),
+    ])
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS campaign_events (
+            event_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            campaign_id INTEGER,
+            event_title TEXT NOT NULL,
+            event_description TEXT,
+            event_type TEXT NOT NULL, -- 'campaign_start', 'campaign_end', 'milestone', 'meeting', 'deadline'
+            event_date DATE NOT NULL,
+            event_time TIME,
+            duration_minutes INTEGER,
+            status TEXT DEFAULT 'scheduled', -- 'scheduled', 'in_progress', 'completed', 'cancelled'
+            priority TEXT DEFAULT 'medium', -- 'low', 'medium', 'high'
+            reminder_enabled INTEGER DEFAULT 1,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(user_id),
+            FOREIGN KEY (campaign_id) REFERENCES campaigns(campaign_id)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS activity_log (
+            log_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            action TEXT NOT NULL,
+            details TEXT,
+            ip_address TEXT,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(user_id)
+        )
+    ''')
+
+    _create_index(cursor, 'idx_campaigns_user', 'campaigns', ['user_id'])
+    _create_index(cursor, 'idx_events_user', 'campaign_events', ['user_id'])
+    _create_index(cursor, 'idx_events_date', 'campaign_events', ['event_date'])
+    _create_index(cursor, 'idx_activity_user', 'activity_log', ['user_id'])
+
+
+def _social_accounts(cursor):
+    """Connected social media accounts, per-user settings and their audit trail"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS social_media_accounts (
+            account_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            platform TEXT NOT NULL,
+            username TEXT NOT NULL,
+            account_email TEXT,
+            access_token TEXT,
+            refresh_token TEXT,
+            token_expires_at TIMESTAMP,
+            is_connected INTEGER DEFAULT 1,
+            connection_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_sync TIMESTAMP,
+            sync_frequency TEXT DEFAULT 'daily',
+            FOREIGN KEY (user_id) REFERENCES users(user_id),
+            UNIQUE(user_id, platform, username)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS social_media_settings (
+            setting_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            auto_post INTEGER DEFAULT 0,
+            auto_schedule INTEGER DEFAULT 0,
+            analytics_enabled INTEGER DEFAULT 1,
+            notifications_enabled INTEGER DEFAULT 1,
+            sync_followers INTEGER DEFAULT 1,
+            sync_engagement INTEGER DEFAULT 1,
+            sync_analytics INTEGER DEFAULT 1,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(user_id),
+            UNIQUE(user_id)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS social_media_audit (
+            audit_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            account_id INTEGER NOT NULL,
+            action TEXT NOT NULL,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            ip_address TEXT,
+            status TEXT,
+            details TEXT,
+            FOREIGN KEY (account_id) REFERENCES social_media_accounts(account_id)
+        )
+    ''')
+
+
+def _social_metrics(cursor):
+    """Daily, monthly, campaign, content and audience metrics per social account"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS social_media_daily_metrics (
+            metric_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            account_id INTEGER NOT NULL,
+            platform TEXT NOT NULL,
+            date DATE NOT NULL,
+            followers INTEGER DEFAULT 0,
+            engagement_rate REAL DEFAULT 0,
+            reach INTEGER DEFAULT 0,
+            impressions INTEGER DEFAULT 0,
+            shares INTEGER DEFAULT 0,
+            comments INTEGER DEFAULT 0,
+            likes INTEGER DEFAULT 0,
+            clicks INTEGER DEFAULT 0,
+            saves INTEGER DEFAULT 0,
+            video_views INTEGER DEFAULT 0,
+            profile_visits INTEGER DEFAULT 0,
+            mentions INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (account_id) REFERENCES social_media_accounts(account_id),
+            UNIQUE(account_id, platform, date)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS social_media_monthly_metrics (
+            monthly_metric_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            account_id INTEGER NOT NULL,
+            platform TEXT NOT NULL,
+            year INTEGER NOT NULL,
+            month INTEGER NOT NULL,
+            total_followers INTEGER DEFAULT 0,
+            avg_engagement_rate REAL DEFAULT 0,
+            total_reach INTEGER DEFAULT 0,
+            total_impressions INTEGER DEFAULT 0,
+            total_shares INTEGER DEFAULT 0,
+            total_comments INTEGER DEFAULT 0,
+            total_likes INTEGER DEFAULT 0,
+            total_clicks INTEGER DEFAULT 0,
+            total_saves INTEGER DEFAULT 0,
+            total_video_views INTEGER DEFAULT 0,
+            total_profile_visits INTEGER DEFAULT 0,
+            total_mentions INTEGER DEFAULT 0,
+            growth_rate REAL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (account_id) REFERENCES social_media_accounts(account_id),
+            UNIQUE(account_id, platform, year, month)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS campaign_social_metrics (
+            campaign_metric_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            account_id INTEGER NOT NULL,
+            campaign_id TEXT,
+            platform TEXT NOT NULL,
+            start_date DATE NOT NULL,
+            end_date DATE NOT NULL,
+            total_reach INTEGER DEFAULT 0,
+            total_impressions INTEGER DEFAULT 0,
+            total_engagement INTEGER DEFAULT 0,
+            engagement_rate REAL DEFAULT 0,
+            conversion_rate REAL DEFAULT 0,
+            cost_per_engagement REAL DEFAULT 0,
+            cost_per_reach REAL DEFAULT 0,
+            revenue_generated REAL DEFAULT 0,
+            roi REAL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (account_id) REFERENCES social_media_accounts(account_id)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS platform_specific_metrics (
+            platform_metric_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            account_id INTEGER NOT NULL,
+            platform TEXT NOT NULL,
+            date DATE NOT NULL,
+            metric_key TEXT NOT NULL,
+            metric_value TEXT,
+            metric_type TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (account_id) REFERENCES social_media_accounts(account_id)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS audience_demographics (
+            demographic_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            account_id INTEGER NOT NULL,
+            platform TEXT NOT NULL,
+            date DATE NOT NULL,
+            age_13_17 REAL DEFAULT 0,
+            age_18_24 REAL DEFAULT 0,
+            age_25_34 REAL DEFAULT 0,
+            age_35_44 REAL DEFAULT 0,
+            age_45_54 REAL DEFAULT 0,
+            age_55_64 REAL DEFAULT 0,
+            age_65_plus REAL DEFAULT 0,
+            male_percentage REAL DEFAULT 0,
+            female_percentage REAL DEFAULT 0,
+            top_countries TEXT,
+            top_cities TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (account_id) REFERENCES social_media_accounts(account_id)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS content_performance (
+            content_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            account_id INTEGER NOT NULL,
+            platform TEXT NOT NULL,
+            post_id TEXT NOT NULL,
+            post_type TEXT,
+            caption TEXT,
+            hashtags TEXT,
+            posted_at TIMESTAMP,
+            likes INTEGER DEFAULT 0,
+            comments INTEGER DEFAULT 0,
+            shares INTEGER DEFAULT 0,
+            saves INTEGER DEFAULT 0,
+            views INTEGER DEFAULT 0,
+            reach INTEGER DEFAULT 0,
+            engagement_rate REAL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (account_id) REFERENCES social_media_accounts(account_id),
+            UNIQUE(account_id, platform, post_id)
+        )
+    ''')
+
+
+def _social_sync(cursor):
+    """Content and daily analytics pulled by the platform sync"""
+    # The sync module's account-level social_media_metrics shares its name
+    # with the campaign-level analytics table created in migration 1, which
+    # takes precedence on new databases
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS social_media_content (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            account_id INTEGER NOT NULL,
+            platform TEXT NOT NULL,
+            content_id TEXT UNIQUE,
+            content_type TEXT,
+            caption TEXT,
+            likes INTEGER DEFAULT 0,
+            comments INTEGER DEFAULT 0,
+            shares INTEGER DEFAULT 0,
+            reach INTEGER DEFAULT 0,
+            impressions INTEGER DEFAULT 0,
+            engagement_rate REAL DEFAULT 0,
+            posted_at TIMESTAMP,
+            synced_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (account_id) REFERENCES social_media_accounts(id)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS social_media_daily_analytics (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            account_id INTEGER NOT NULL,
+            platform TEXT NOT NULL,
+            date DATE,
+            followers_added INTEGER DEFAULT 0,
+            posts_count INTEGER DEFAULT 0,
+            total_engagement INTEGER DEFAULT 0,
+            total_reach INTEGER DEFAULT 0,
+            top_content TEXT,
+            synced_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(account_id, date),
+            FOREIGN KEY (account_id) REFERENCES social_media_accounts(id)
+        )
+    ''')
+
+
+def _instagram(cursor):
+    """Instagram Graph API account links, metrics and media"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS instagram_accounts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL UNIQUE,
+            instagram_id TEXT UNIQUE,
+            username TEXT,
+            access_token TEXT,
+            refresh_token TEXT,
+            token_expires_at TIMESTAMP,
+            connected_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_sync TIMESTAMP,
+            sync_status TEXT DEFAULT 'pending',
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS instagram_metrics (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            instagram_account_id INTEGER NOT NULL,
+            followers INTEGER,
+            following INTEGER,
+            media_count INTEGER,
+            engagement_rate REAL,
+            reach INTEGER,
+            impressions INTEGER,
+            profile_views INTEGER,
+            saved_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (instagram_account_id) REFERENCES instagram_accounts(id)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS instagram_media (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            instagram_account_id INTEGER NOT NULL,
+            media_id TEXT UNIQUE,
+            caption TEXT,
+            media_type TEXT,
+            likes INTEGER,
+            comments INTEGER,
+            reach INTEGER,
+            impressions INTEGER,
+            engagement_rate REAL,
+            posted_at TIMESTAMP,
+            synced_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (instagram_account_id) REFERENCES instagram_accounts(id)
+        )
+    ''')
+
+
+def _integrations(cursor):
+    """Settings for dashboard tracking, ad platforms, Notion and Figma sync"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS social_media_config (
+            platform TEXT PRIMARY KEY,
+            access_token TEXT,
+            track_impressions INTEGER,
+            track_engagement INTEGER,
+            track_followers INTEGER
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ads_platforms_config (
+            config_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            platform TEXT NOT NULL,
+            credentials TEXT NOT NULL,
+            sync_enabled INTEGER DEFAULT 0,
+            connected_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_sync TIMESTAMP,
+            UNIQUE(user_id, platform),
+            FOREIGN KEY (user_id) REFERENCES users(user_id)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS notion_config (
+            config_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            api_key TEXT NOT NULL,
+            database_id TEXT NOT NULL,
+            sync_enabled INTEGER DEFAULT 0,
+            bidirectional INTEGER DEFAULT 0,
+            connected_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_sync TIMESTAMP,
+            UNIQUE(user_id),
+            FOREIGN KEY (user_id) REFERENCES users(user_id)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS figma_sync_config (
+            config_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            file_path TEXT NOT NULL,
+            last_sync TIMESTAMP,
+            sync_direction TEXT CHECK(sync_direction IN ('export', 'import', 'config')),
+            node_count INTEGER DEFAULT 0,
+            settings TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(file_path)
+        )
+    ''')
+
+
+def _data_versions(cursor):
+    """Write counters behind the analytics ETags and response cache"""
+    _track_writes(cursor, (
+        'campaigns',
+        'roi_metrics',
+        'seo_metrics',
+        'social_media_metrics',
+        'social_media_config',
+        'social_media_daily_metrics',
+        'social_media_monthly_metrics',
+        'campaign_social_metrics',
+        'users',
+    ))
+
+
+def _query_indexes(cursor):
+    """Composite and covering indexes matching the handlers' query plans
+
+    Each index serves a filter + ORDER BY/GROUP BY the handlers issue, so
+    the rows come back in order without a temp B-tree sort; test_query_plans.py
+    keeps them honest. Single-column indexes they make redundant are dropped.
+    """
+    # Dashboard ROI series: date range, optionally one campaign, grouped by
+    # date. The metric columns make both indexes covering.
+    roi_columns = ['revenue', 'cost', 'conversions', 'roi_percentage', 'roas']
+    _create_index(cursor, 'idx_roi_date_metrics', 'roi_metrics', ['date', 'campaign_id'] + roi_columns)
+    _create_index(cursor, 'idx_roi_campaign_date', 'roi_metrics', ['campaign_id', 'date'] + roi_columns)
+    cursor.execute('DROP INDEX IF EXISTS idx_roi_date')
+    cursor.execute('DROP INDEX IF EXISTS idx_roi_campaign')
+
+    # Per-campaign lookups of a client's social and SEO metrics within the window
+    _create_index(cursor, 'idx_social_campaign_date', 'social_media_metrics', ['campaign_id', 'date'])
+    _create_index(cursor, 'idx_seo_campaign_date', 'seo_metrics', ['campaign_id', 'date'])
+    cursor.execute('DROP INDEX IF EXISTS idx_social_campaign')
+    cursor.execute('DROP INDEX IF EXISTS idx_seo_campaign')
+
+    # Campaign table (newest first, by owner/type/status) and CSV export (by
+    # name). Descending keys keep campaigns created together in id order.
+    _create_index(cursor, 'idx_campaigns_created', 'campaigns', ['created_at DESC'])
+    _create_index(cursor, 'idx_campaigns_user_created', 'campaigns', ['user_id', 'created_at DESC'])
+    _create_index(cursor, 'idx_campaigns_type_created', 'campaigns', ['campaign_type', 'created_at DESC'])
+    _create_index(cursor, 'idx_campaigns_status_created', 'campaigns', ['status', 'created_at DESC'])
+    _create_index(cursor, 'idx_campaigns_name', 'campaigns', ['campaign_name'])
+    _create_index(cursor, 'idx_campaigns_user_name', 'campaigns', ['user_id', 'campaign_name'])
+    cursor.execute('DROP INDEX IF EXISTS idx_campaigns_user')
+    cursor.execute('DROP INDEX IF EXISTS idx_campaigns_type')
+    cursor.execute('DROP INDEX IF EXISTS idx_campaigns_status')
+
+    # Calendar month, for everyone (admins) or one user, in event order
+    _create_index(cursor, 'idx_events_date_time', 'campaign_events', ['event_date', 'event_time'])
+    _create_index(cursor, 'idx_events_user_date', 'campaign_events', ['user_id', 'event_date', 'event_time'])
+    cursor.execute('DROP INDEX IF EXISTS idx_events_user')
+    cursor.execute('DROP INDEX IF EXISTS idx_events_date')
+
+    # Social account metrics: latest demographics, top posts, audit trail
+    _create_index(cursor, 'idx_audience_account_date', 'audience_demographics', ['account_id', 'platform', 'date'])
+    _create_index(cursor, 'idx_content_engagement', 'content_performance',
+                  ['account_id', 'platform', 'engagement_rate'])
+    _create_index(cursor, 'idx_audit_account_time', 'social_media_audit', ['account_id', 'timestamp'])
+
+
+_ROI_SUMS = {
+    'revenue': 'revenue',
+    'cost': 'cost',
+    'conversions': 'conversions',
+    'roi_sum': 'roi_percentage',
+    'roas_sum': 'roas',
+}
+_ROI_COUNTS = {'roi_count': 'roi_percentage', 'roas_count': 'roas'}
+
+
+def _daily_rollups(cursor):
+    """Per-day roi and social metric rollups the dashboard aggregates read"""
+    _install_rollup(
+        cursor, 'roi_daily_rollup', 'roi_metrics',
+        keys={'date': 'DATE', 'campaign_id': 'INTEGER'},
+        sums=_ROI_SUMS,
+        counts=_ROI_COUNTS,
+        index=('idx_roi_rollup_campaign_date', ['campaign_id', 'date']),
+    )
+    _install_rollup(
+        cursor, 'social_daily_rollup', 'social_media_metrics',
+        keys={'date': 'DATE', 'campaign_id': 'INTEGER', 'platform': 'TEXT'},
+        sums={column: column for column in (
+            'impressions', 'reach', 'engagement', 'likes', 'comments', 'shares', 'clicks',
+            'followers_gained', 'spend',
+        )},
+        index=('idx_social_rollup_campaign_date', ['campaign_id', 'date']),
+    )
+
+
+def _social_monthly(cursor):
+    """Dirty-month queue behind the monthly social metrics aggregation"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS social_media_monthly_dirty (
+            account_id INTEGER NOT NULL,
+            platform TEXT NOT NULL,
+            year INTEGER NOT NULL,
+            month INTEGER NOT NULL,
+            PRIMARY KEY (account_id, platform, year, month)
+        ) WITHOUT ROWID
+    ''')
+
+    # OR IGNORE also skips rows whose date strftime can't parse
+    month_of = "CAST(strftime('%Y', {row}.date) AS INTEGER), CAST(strftime('%m', {row}.date) AS INTEGER)"
+    mark = '''
+        INSERT OR IGNORE INTO social_media_monthly_dirty (account_id, platform, year, month)
+        VALUES ({row}.account_id, {row}.platform, {month});
+    '''
+    new = mark.format(row='NEW', month=month_of.format(row='NEW'))
+    old = mark.format(row='OLD', month=month_of.format(row='OLD'))
+    for event, body in (('INSERT', new), ('UPDATE', old + new), ('DELETE', old)):
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS social_monthly_dirty_{event.lower()}
+            AFTER {event} ON social_media_daily_metrics
+            BEGIN {body} END
+        ''')
+
+    # Every month already there starts out dirty, so the first aggregation backfills
+    cursor.execute(f'''
+        INSERT OR IGNORE INTO social_media_monthly_dirty (account_id, platform, year, month)
+        SELECT DISTINCT account_id, platform, {month_of.format(row='d')}
+        FROM social_media_daily_metrics d
+    ''')
+    _track_writes(cursor, ('social_media_monthly_metrics',))
+
+
+def _prefix_sums(cursor):
+    """Running totals of roi_metrics for two-lookup date range totals"""
+    for table, partition in (('roi_prefix_sums', {}), ('roi_campaign_prefix_sums', {'campaign_id': 'INTEGER'})):
+        _install_prefix_sums(cursor, table, 'roi_metrics', partition, _ROI_SUMS, _ROI_COUNTS)
+
+
+
+def _user_visibility_version(cursor):
+    """Count only the users writes that change what a user may see
+
+    Every login updates last_login, which bumped the users version and
+    with it every analytics ETag and cached response. Responses depend on
+    users through role, which decides whose campaigns a user sees, so
+    updates now count only when role or is_active (rare, and an access
+    change too) actually changes; added and removed users still count.
+    """
+    columns = [column for column in ('role', 'is_active') if column in _columns(cursor, 'users')]
+    cursor.execute('DROP TRIGGER IF EXISTS data_version_users_update')
+    tracked = cursor.execute("SELECT 1 FROM data_versions WHERE table_name = 'users'").fetchone()
+    if not columns or not tracked:
+        return
+    changed = ' OR '.join(f'OLD.{column} IS NOT NEW.{column}' for column in columns)
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS data_version_users_visibility
+        AFTER UPDATE OF {', '.join(columns)} ON users
+        WHEN {changed}
+        BEGIN
+            UPDATE data_versions SET version = version + 1 WHERE table_name = 'users';
+        END
+    ''')
+
+# (version, name, apply) in the order they must run. Append new migrations;
+# never edit or renumber one that has shipped.
+MIGRATIONS = [
+    (1, 'analytics_tables', _analytics_tables),
+    (2, 'accounts', _accounts),
+    (3, 'client_portal', _client_portal),
+    (4, 'social_accounts', _social_accounts),
+    (5, 'social_metrics', _social_metrics),
+    (6, 'social_sync', _social_sync),
+    (7, 'instagram', _instagram),
+    (8, 'integrations', _integrations),
+    (9, 'data_versions', _data_versions),
+    (10, 'query_indexes', _query_indexes),
+    (11, 'daily_rollups', _daily_rollups),
+    (12, 'social_monthly', _social_monthly),
+    (13, 'prefix_sums', _prefix_sums),
+    (14, 'user_visibility_version', _user_visibility_version),
+]
+
+
+# ==================== RUNNER ====================
+
+def _connect(database):
+    # Autocommit mode: the runner issues BEGIN/COMMIT itself so each
+    # migration's DDL and its schema_version row commit together
+    conn = sqlite3.connect(database, isolation_level=None)
+    conn.execute('PRAGMA busy_timeout = 30000')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    return conn
+
+
+def _applied_versions(conn):
+    return {row[0] for row in conn.execute('SELECT version FROM schema_version')}
+
+
+def current_version(database=DATABASE):
+    """Highest applied migration version, 0 for an unmigrated database"""
+    conn = _connect(database)
+    try:
+        return conn.execute('SELECT MAX(version) FROM schema_version').fetchone()[0] or 0
+    finally:
+        conn.close()
+
+
+def migrate(database=DATABASE, target=None):
+    """Apply pending migrations up to target (default: all); returns them
+
+    Each migration runs in its own transaction together with its
+    schema_version row. Several processes may start at once: a migration
+    another process applied in the meantime is skipped.
+    """
+    conn = _connect(database)
+    try:
+        applied = []
+        done = _applied_versions(conn)
+        for version, name, apply in MIGRATIONS:
+            if target is not None and version > target:
+                break
+            if version in done:
+                continue
+
+            cursor = conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            try:
+                if cursor.execute('SELECT 1 FROM schema_version WHERE version = ?', (version,)).fetchone():
+                    cursor.execute('ROLLBACK')
+                    continue
+                apply(cursor)
+                cursor.execute('INSERT INTO schema_version (version, name) VALUES (?, ?)', (version, name))
+                cursor.execute('COMMIT')
+            except Exception:
+                cursor.execute('ROLLBACK')
+                logger.exception(f"Migration {version} ({name}) failed")
+                raise
+
+            logger.info(f"Applied migration {version}: {name}")
+            applied.append((version, name))
+        return applied
+    finally:
+        conn.close()
+
+
+def status(database=DATABASE):
+    """[(version, name, applied_at or None)] for every known migration"""
+    conn = _connect(database)
+    try:
+        applied_at = dict(conn.execute('SELECT version, applied_at FROM schema_version'))
+    finally:
+        conn.close()
+    return [(version, name, applied_at.get(version)) for version, name, _ in MIGRATIONS]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SHOTLIST database schema migrations')
+    parser.add_argument('--database', default=DATABASE, help='SQLite database file')
+    parser.add_argument('--status', action='store_true', help='List migrations without applying them')
+    parser.add_argument('--to', type=int, dest='target', help='Apply migrations up to this version')
+    args = parser.parse_args()
+
+    if args.status:
+        print(f"🗄️  Schema migrations for {args.database}")
+        for version, name, applied_at in status(args.database):
+            mark = f"✅ {applied_at}" if applied_at else "⏳ pending"
+            print(f"  {version:>3}  {name:<24} {mark}")
+        return
+
+    if not os.path.exists(args.database):
+        print(f"🆕 Creating {args.database}")
+    applied = migrate(args.database, args.target)
+    for version, name in applied:
+        print(f"  ✓ {version}: {name}")
+    print(f"✅ {args.database} is at schema version {current_version(args.database)} "
+          f"({len(applied)} migration(s) applied)")
+
+
+if __name__ == '__main__':
+    main()
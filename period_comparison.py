@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Period-over-period comparisons for the SHOTLIST dashboard
+Any list of metrics over a dated table, for the current period and a
+baseline period, from one query using conditional aggregation. The
+baseline is chosen by ?compare=: the previous period (default), the same
+period a year earlier, or a custom date range.
+"""
+
+from datetime import date, datetime, timedelta
+
+
+class ComparisonError(ValueError):
+    """Invalid comparison parameters; the servers answer 400"""
+
+
+def calc_change(current, previous):
+    """Percent change, 0 when there is no previous value"""
+    if previous and previous > 0:
+        return round(((current - previous) / previous) * 100, 2)
+    return 0
+
+
+class Window:
+    """Dates from start (YYYY-MM-DD) up to, not including, end; end None is open"""
+
+    def __init__(self, start, end=None):
+        self.start = start
+        self.end = end
+
+    def condition(self, column):
+        """(SQL, args) true for rows of column inside the window"""
+        if self.end is None:
+            return f'{column} >= ?', [self.start]
+        return f'{column} >= ? AND {column} < ?', [self.start, self.end]
+
+    def to_dict(self):
+        return {'start': self.start, 'end': self.end}
+
+    def days(self):
+        """Length in days; an open window runs through today"""
+        end = date.fromisoformat(self.end) if self.end else datetime.now().date() + timedelta(days=1)
+        return (end - date.fromisoformat(self.start)).days
+
+
+class Comparison:
+    """The current window and the baseline it is compared with"""
+
+    def __init__(self, mode, current, baseline):
+        self.mode = mode
+        self.current = current
+        self.baseline = baseline
+
+    def days(self):
+        """Days the two windows cover together"""
+        return self.current.days() + self.baseline.days()
+
+
+def _day(value):
+    return value.strftime('%Y-%m-%d')
+
+
+def _parse_day(params, name):
+    value = params.get(name, [None])[0]
+    if not value:
+        raise ComparisonError(f'compare=custom needs {name} (YYYY-MM-DD)')
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ComparisonError(f"Invalid {name} '{value}', expected YYYY-MM-DD")
+
+
+def _year_earlier(day):
+    try:
+        return day.replace(year=day.year - 1)
+    except ValueError:
+        # 29 February
+        return day.replace(year=day.year - 1, day=28)
+
+
+def _previous_period(now, days, params):
+    """The days days just before the current period"""
+    return Window(_day(now - timedelta(days=days * 2)), _day(now - timedelta(days=days)))
+
+
+def _same_period_last_year(now, days, params):
+    """The current period shifted back one year"""
+    start = _year_earlier((now - timedelta(days=days)).date())
+    end = _year_earlier(now.date()) + timedelta(days=1)
+    return Window(_day(start), _day(end))
+
+
+def _custom_baseline(now, days, params):
+    """?baseline_start= to ?baseline_end=, both days included"""
+    start = _parse_day(params, 'baseline_start')
+    end = _parse_day(params, 'baseline_end')
+    if end < start:
+        raise ComparisonError('baseline_end is before baseline_start')
+    return Window(_day(start), _day(end + timedelta(days=1)))
+
+
+# ?compare= -> function(now, days, params) returning the baseline Window
+MODES = {
+    'previous': _previous_period,
+    'year': _same_period_last_year,
+    'custom': _custom_baseline,
+}
+
+
+def from_params(params, now=None):
+    """Comparison for ?days= (default 30) and ?compare= (default previous)
+
+    The current period runs from days ago onwards, as the dashboard's
+    other widgets do.
+    """
+    now = now or datetime.now()
+    try:
+        days = int(params.get('days', ['30'])[0])
+    except ValueError:
+        raise ComparisonError(f"Invalid days '{params['days'][0]}'")
+    if days < 1:
+        raise ComparisonError('days must be at least 1')
+
+    mode = params.get('compare', ['previous'])[0]
+    if mode not in MODES:
+        raise ComparisonError(f"Invalid compare '{mode}', expected one of {', '.join(MODES)}")
+    return Comparison(mode, Window(_day(now - timedelta(days=days))), MODES[mode](now, days, params))
+
+
+class Metric:
+    """One compared value
+
+    Aggregated with aggregate ('SUM' or 'AVG') over sql; with per, the
+    value is SUM(sql) / SUM(per), e.g. an average kept as sum and count in
+    a rollup. change is 'percent', 'difference' or None (always 0), and
+    digits rounds the value (None: whole number).
+    """
+
+    def __init__(self, name, sql, aggregate='SUM', per=None, change='percent', digits=None):
+        self.name = name
+        self.sql = sql
+        self.aggregate = aggregate
+        self.per = per
+        self.change = change
+        self.digits = digits
+
+    def partial_columns(self, period):
+        """The metric's aggregates over one period's rows
+
+        With per the sum and its divisor are carried separately; a metric
+        without a change needs no baseline, so its baseline is NULL.
+        """
+        columns = [(f'{self.aggregate}({self.sql})', self.name)]
+        if self.per is not None:
+            columns.append((f'SUM({self.per})', f'{self.name}_per'))
+        if period == 'baseline' and self.change is None:
+            return [f'NULL AS {name}' for _, name in columns]
+        return [f'{sql} AS {name}' for sql, name in columns]
+
+    def period_columns(self, period):
+        """The partial aggregates of the period's branch"""
+        condition = f"period = '{period}'"
+        columns = [f'SUM(CASE WHEN {condition} THEN {self.name} END) AS {period}_{self.name}']
+        if self.per is not None:
+            columns.append(f'SUM(CASE WHEN {condition} THEN {self.name}_per END) AS {period}_{self.name}_per')
+        return columns
+
+    def value(self, row, period):
+        value = row[f'{period}_{self.name}'] or 0
+        if self.per is not None:
+            per = row[f'{period}_{self.name}_per']
+            value = value / per if per else 0
+        return value
+
+    def card(self, current, baseline):
+        """{'value', 'change'} as the dashboard cards show them"""
+        if self.change == 'percent':
+            change = calc_change(current, baseline)
+        elif self.change == 'difference':
+            change = int(current - baseline) if self.digits is None else round(current - baseline, self.digits)
+        else:
+            change = 0
+        value = int(current) if self.digits is None else round(current, self.digits)
+        return {'value': value, 'change': change}
+
+
+def compare(cursor, table, alias, metrics, comparison, join='', where='', args=()):
+    """{metric name: (current, baseline)} from one query over table
+
+    Each period is one UNION ALL branch that aggregates its own index
+    range, so no row pays for a CASE per metric and periods a year apart
+    don't scan the months between them; the outer query folds the two
+    branch rows into one with conditional aggregation. join, where and
+    args narrow the rows as in dashboard_queries' _metric_filter; rows are
+    matched to periods on {alias}.date.
+    """
+    branches = []
+    branch_args = []
+    for period, window in (('current', comparison.current), ('baseline', comparison.baseline)):
+        condition, condition_args = window.condition(f'{alias}.date')
+        partial = ', '.join(column for metric in metrics for column in metric.partial_columns(period))
+        branches.append(f'''
+            SELECT '{period}' AS period, {partial}
+            FROM {table} {alias}{join}
+            WHERE {condition}{where}
+        ''')
+        branch_args += condition_args + list(args)
+
+    select = [column for metric in metrics for period in ('current', 'baseline')
+              for column in metric.period_columns(period)]
+    cursor.execute(f'''
+        SELECT {', '.join(select)}
+        FROM ({' UNION ALL '.join(branches)})
+    ''', branch_args)
+    row = cursor.fetchone()
+    return {metric.name: (metric.value(row, 'current'), metric.value(row, 'baseline')) for metric in metrics}
+
+
+def _column(sql):
+    """Column a metric's sql names, e.g. roi_sum for r.roi_sum"""
+    return sql.rsplit('.', 1)[-1]
+
+
+def compare_prefix_sums(cursor, table, metrics, comparison, campaigns=None, args=()):
+    """compare() from running totals (see rollups.PrefixSums)
+
+    Each period's total is the last row before its end minus the last row
+    before its start, two index lookups however long the period is. With
+    campaigns (SQL selecting campaign_id, with args), table is per campaign
+    and the lookups are made, and summed, for each selected campaign;
+    without, table is over every campaign. Metrics must be SUMs.
+    """
+    if campaigns is None:
+        source, same = '(SELECT 1) ids', ''
+    else:
+        source, same = f'({campaigns}) ids', ' AND campaign_id = ids.campaign_id'
+    joins = []
+    join_args = []
+    for period, window in (('current', comparison.current), ('baseline', comparison.baseline)):
+        for bound, day in (('end', window.end), ('start', window.start)):
+            alias = f'{period}_{bound}'
+            before = ''
+            if day is not None:
+                before = ' AND date < ?'
+                join_args.append(day)
+            last = f'(SELECT MAX(date) FROM {table} WHERE 1=1{before}{same})'
+            joins.append(f'LEFT JOIN {table} {alias} ON {alias}.date = {last}'
+                         + (f' AND {alias}.campaign_id = ids.campaign_id' if campaigns is not None else ''))
+
+    select = []
+    for metric in metrics:
+        columns = [(_column(metric.sql), metric.name)]
+        if metric.per is not None:
+            columns.append((_column(metric.per), f'{metric.name}_per'))
+        for period in ('current', 'baseline'):
+            select += [
+                f'SUM(COALESCE({period}_end.{column}, 0) - COALESCE({period}_start.{column}, 0)) AS {period}_{name}'
+                for column, name in columns
+            ]
+    cursor.execute(f'''
+        SELECT {', '.join(select)}
+        FROM {source}
+        {' '.join(joins)}
+    ''', list(args) + join_args)
+    row = cursor.fetchone()
+    return {metric.name: (metric.value(row, 'current'), metric.value(row, 'baseline')) for metric in metrics}
+
+
+def cards(metrics, values):
+    """Dashboard cards from compare() values"""
+    return {metric.name: metric.card(*values[metric.name]) for metric in metrics}
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+In-process cache for read-only analytics responses
+LRU over serialized response bodies, bounded by memory, with entries tied
+to the data versions of the tables they were built from
+"""
+
+import os
+import logging
+import threading
+from datetime import date
+from collections import OrderedDict
+
+from data_versions import normalize_params
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_BYTES = int(os.environ.get('API_RESPONSE_CACHE_BYTES', str(16 * 1024 * 1024)))
+
+# Rough per-entry bookkeeping cost (key tuple, entry tuple, dict slots)
+_ENTRY_OVERHEAD = 512
+
+
+def response_key(path, params, scope):
+    """Cache key for a request: route, normalized query, visibility scope, day
+
+    The day is included because the "last N days" windows move with it.
+    """
+    return (path, normalize_params(params), scope, date.today().isoformat())
+
+
+class ResponseCache:
+    """LRU of (status, content_type, body) keyed by response_key()
+
+    Each entry remembers the tables it was built from and their data
+    versions at the time. A lookup whose current versions differ is a
+    miss, which keeps entries correct against writes made by other server
+    processes or offline scripts. Writers in this process also call
+    invalidate() so dependent entries are dropped right away instead of
+    waiting to be evicted.
+    """
+
+    def __init__(self, max_bytes=RESPONSE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_bytes // 8
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()  # key -> (tables, versions, status, content_type, body)
+        self._by_table = {}            # table -> set of keys
+        self._lock = threading.Lock()
+
+    def get(self, key, versions):
+        """Cached (status, content_type, body) for key at versions, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[1] != versions:
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2:]
+
+    def put(self, key, tables, versions, status, content_type, body):
+        """Store a response built from tables at versions"""
+        cost = len(body) + _ENTRY_OVERHEAD
+        if cost > self.max_entry_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (tuple(tables), versions, status, content_type, body)
+            self.size += cost
+            for table in tables:
+                self._by_table.setdefault(table, set()).add(key)
+
+            while self.size > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, *tables):
+        """Drop every entry built from any of tables; returns how many"""
+        with self._lock:
+            keys = set()
+            for table in tables:
+                keys |= self._by_table.get(table, set())
+            for key in keys:
+                self._remove(key)
+            self.invalidations += len(keys)
+        if keys:
+            logger.debug(f"Response cache: invalidated {len(keys)} entries for {', '.join(tables)}")
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_table.clear()
+            self.size = 0
+
+    def _remove(self, key):
+        tables, _, _, _, body = self._entries.pop(key)
+        self.size -= len(body) + _ENTRY_OVERHEAD
+        for table in tables:
+            keys = self._by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_table[table]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.size,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Daily rollups for the SHOTLIST analytics database
+roi_metrics and social_media_metrics summed per campaign and day (and
+platform), kept current by triggers, so dashboard aggregates read one row
+per day instead of every metric row. Running totals of roi_metrics (prefix
+sums) answer a date range total with two lookups instead of a range scan.
+
+Usage:
+    python3 rollups.py --rebuild                      # recompute every rollup
+    python3 rollups.py --rebuild --since 2025-01-01   # backfill from a date
+    python3 rollups.py --check                        # compare rollups with their source
+"""
+
+import sqlite3
+import logging
+import argparse
+
+logger = logging.getLogger(__name__)
+
+DATABASE = 'shotlist_analytics.db'
+
+
+class Rollup:
+    """A rollup table: source rows summed per key
+
+    sums maps rollup column -> source column, added up with NULLs as 0;
+    counts maps rollup column -> source column whose non-NULL values are
+    counted, so averages over the source rows stay exact. Every rollup
+    also has row_count; a key whose row_count drops to 0 is removed, so
+    days without source rows never show up. The tables and the triggers
+    maintaining them are created by migrations.py; these definitions
+    rebuild and check them.
+    """
+
+    def __init__(self, table, source, keys, sums, counts=None):
+        self.table = table
+        self.source = source
+        self.keys = keys
+        self.sums = sums
+        self.counts = counts or {}
+
+    @property
+    def value_columns(self):
+        return list(self.sums) + list(self.counts) + ['row_count']
+
+    def source_columns(self):
+        return set(self.keys) | set(self.sums.values()) | set(self.counts.values())
+
+    def aggregate_sql(self, since=None):
+        """SELECT computing the rollup rows from the source"""
+        columns = list(self.keys)
+        columns += [f'COALESCE(SUM({source}), 0)' for source in self.sums.values()]
+        columns += [f'COUNT({source})' for source in self.counts.values()]
+        columns.append('COUNT(*)')
+        where = ' WHERE date >= ?' if since else ''
+        return f'''
+            SELECT {', '.join(columns)} FROM {self.source}{where}
+            GROUP BY {', '.join(self.keys)}
+        '''
+
+
+class PrefixSums(Rollup):
+    """Running totals of a source's columns, per partition and day
+
+    Each row holds the sums and counts over the partition's source rows
+    dated up to and including its date, so the total over a date range is
+    the difference of two rows: the last one before the range ends and the
+    last one before it starts. A source row on the partition's latest day
+    updates one row; a backdated one also adds itself to every later day
+    of its partition.
+    """
+
+    def __init__(self, table, source, partition, sums, counts=None):
+        super().__init__(table, source, dict(partition, date='DATE'), sums, counts)
+        self.partition = list(partition)
+
+    def aggregate_sql(self, since=None):
+        """SELECT computing the running totals from the source"""
+        columns = list(self.keys)
+        columns += [f'SUM(COALESCE(SUM({source}), 0)) OVER w' for source in self.sums.values()]
+        columns += [f'SUM(COUNT({source})) OVER w' for source in self.counts.values()]
+        columns.append('SUM(COUNT(*)) OVER w')
+        partition = f"PARTITION BY {', '.join(self.partition)} " if self.partition else ''
+        # Totals include the days before since, so those are left out afterwards
+        where = ' WHERE date >= ?' if since else ''
+        return f'''
+            SELECT * FROM (
+                SELECT {', '.join(columns)} FROM {self.source}
+                GROUP BY {', '.join(self.keys)}
+                WINDOW w AS ({partition}ORDER BY date)
+            ){where}
+        '''
+
+
+ROI_SUMS = {
+    'revenue': 'revenue',
+    'cost': 'cost',
+    'conversions': 'conversions',
+    'roi_sum': 'roi_percentage',
+    'roas_sum': 'roas',
+}
+ROI_COUNTS = {'roi_count': 'roi_percentage', 'roas_count': 'roas'}
+
+ROLLUPS = (
+    Rollup(
+        'roi_daily_rollup', 'roi_metrics',
+        keys={'date': 'DATE', 'campaign_id': 'INTEGER'},
+        sums=ROI_SUMS,
+        counts=ROI_COUNTS,
+    ),
+    Rollup(
+        'social_daily_rollup', 'social_media_metrics',
+        keys={'date': 'DATE', 'campaign_id': 'INTEGER', 'platform': 'TEXT'},
+        sums={
+            'impressions': 'impressions',
+            'reach': 'reach',
+            'engagement': 'engagement',
+            'likes': 'likes',
+            'comments': 'comments',
+            'shares': 'shares',
+            'clicks': 'clicks',
+            'followers_gained': 'followers_gained',
+            'spend': 'spend',
+        },
+    ),
+)
+
+# roi_metrics running totals over every campaign, and per campaign
+PREFIX_SUMS = (
+    PrefixSums('roi_prefix_sums', 'roi_metrics', {}, ROI_SUMS, ROI_COUNTS),
+    PrefixSums('roi_campaign_prefix_sums', 'roi_metrics', {'campaign_id': 'INTEGER'}, ROI_SUMS, ROI_COUNTS),
+)
+
+
+def _source_types(cursor, rollup):
+    """Declared type of each column of the source table"""
+    return {row[1]: row[2] for row in cursor.execute(f'PRAGMA table_info({rollup.source})')}
+
+
+def _source_ready(cursor, rollup):
+    """Whether the source table has the columns the rollup sums
+
+    Databases whose social_media_metrics is the account-level table from
+    the social sync module have no campaign metrics to roll up.
+    """
+    missing = rollup.source_columns() - set(_source_types(cursor, rollup))
+    if missing:
+        logger.warning(f"Not maintaining {rollup.table}: {rollup.source} has no {', '.join(sorted(missing))} column")
+        return False
+    return True
+
+
+def _refill(cursor, rollup, since=None):
+    args = [since] if since else []
+    where = ' WHERE date >= ?' if since else ''
+    cursor.execute(f'DELETE FROM {rollup.table}{where}', args)
+    cursor.execute(
+        f"INSERT INTO {rollup.table} ({', '.join(list(rollup.keys) + rollup.value_columns)}) "
+        + rollup.aggregate_sql(since),
+        args
+    )
+    return cursor.rowcount
+
+
+def rebuild(database=DATABASE, since=None, rollups=ROLLUPS + PREFIX_SUMS):
+    """Recompute rollups from their source tables; returns {table: rows}
+
+    For backfills and bulk loads that bypassed the triggers. since
+    (YYYY-MM-DD) limits the rebuild to that date onwards. Each rollup is
+    replaced in one transaction, so readers see either the old or the new
+    rows, and the source's data version is bumped so cached responses
+    built from the old rollup are dropped.
+    """
+    conn = sqlite3.connect(database, isolation_level=None)
+    conn.execute('PRAGMA busy_timeout = 30000')
+    try:
+        rebuilt = {}
+        for rollup in rollups:
+            cursor = conn.cursor()
+            if not _source_ready(cursor, rollup):
+                continue
+            cursor.execute('BEGIN IMMEDIATE')
+            try:
+                rebuilt[rollup.table] = _refill(cursor, rollup, since)
+                cursor.execute(
+                    'UPDATE data_versions SET version = version + 1 WHERE table_name = ?', (rollup.source,)
+                )
+                cursor.execute('COMMIT')
+            except Exception:
+                cursor.execute('ROLLBACK')
+                raise
+            logger.info(f"Rebuilt {rollup.table}: {rebuilt[rollup.table]} rows")
+        return rebuilt
+    finally:
+        conn.close()
+
+
+def check(database=DATABASE, rollups=ROLLUPS + PREFIX_SUMS):
+    """{table: [keys whose rollup row differs from the source]}"""
+    conn = sqlite3.connect(database)
+    try:
+        drift = {}
+        for rollup in rollups:
+            if not _source_ready(conn.cursor(), rollup):
+                continue
+            width = len(rollup.keys)
+            expected = {tuple(row[:width]): row[width:] for row in conn.execute(rollup.aggregate_sql())}
+            actual = {
+                tuple(row[:width]): row[width:]
+                for row in conn.execute(
+                    f"SELECT {', '.join(list(rollup.keys) + rollup.value_columns)} FROM {rollup.table}"
+                )
+            }
+            drift[rollup.table] = sorted(
+                key for key in expected.keys() | actual.keys()
+                if key not in expected or key not in actual
+                or any(abs(a - b) > 0.005 for a, b in zip(expected[key], actual[key]))
+            )
+        return drift
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SHOTLIST daily rollups')
+    parser.add_argument('--database', default=DATABASE, help='SQLite database file')
+    parser.add_argument('--rebuild', action='store_true', help='Recompute the rollups from their source tables')
+    parser.add_argument('--since', help='Only rebuild from this date (YYYY-MM-DD)')
+    parser.add_argument('--check', action='store_true', help='Compare the rollups with their source tables')
+    args = parser.parse_args()
+
+    if not args.rebuild and not args.check:
+        parser.error('nothing to do: pass --rebuild and/or --check')
+
+    if args.rebuild:
+        print(f"🔄 Rebuilding rollups in {args.database}" + (f" from {args.since}" if args.since else ''))
+        for table, rows in rebuild(args.database, args.since).items():
+            print(f"  ✓ {table}: {rows} rows")
+
+    if args.check:
+        clean = True
+        for table, keys in check(args.database).items():
+            if keys:
+                clean = False
+                print(f"  ❌ {table}: {len(keys)} row(s) out of date, e.g. {keys[0]}")
+            else:
+                print(f"  ✅ {table} matches its source")
+        if not clean:
+            print("Run with --rebuild to recompute them")
+            raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
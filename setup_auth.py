@@ -10,6 +10,8 @@ import secrets
 from datetime import datetime, timedelta
 import random
 
+from migrations import migrate
+
 DATABASE = 'shotlist_analytics.db'
 
 def hash_password(password):
@@ -20,87 +22,10 @@ def create_auth_tables():
     """Create authentication and calendar tables"""
     print("🔐 Setting up authentication system...")
 
-    conn = sqlite3.connect(DATABASE)
-    cursor = conn.cursor()
-
-    # Create users table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            user_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            password_hash TEXT NOT NULL,
-            email TEXT UNIQUE NOT NULL,
-            full_name TEXT NOT NULL,
-            company_name TEXT,
-            role TEXT DEFAULT 'client',
-            is_active INTEGER DEFAULT 1,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            last_login TIMESTAMP
-        )
-    ''')
-
-    # Create sessions table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS sessions (
-            session_id TEXT PRIMARY KEY,
-            user_id INTEGER NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            expires_at TIMESTAMP NOT NULL,
-            FOREIGN KEY (user_id) REFERENCES users(user_id)
-        )
-    ''')
-
-    # Add user_id to campaigns if it doesn't exist
-    try:
-        cursor.execute('ALTER TABLE campaigns ADD COLUMN user_id INTEGER REFERENCES users(user_id)')
-    except sqlite3.OperationalError:
-        pass  # Column already exists
+    # Users, sessions, campaign ownership, events and activity log
+    migrate(DATABASE)
 
-    # Create campaign events table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS campaign_events (
-            event_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            campaign_id INTEGER,
-            event_title TEXT NOT NULL,
-            event_description TEXT,
-            event_type TEXT NOT NULL,
-            event_date DATE NOT NULL,
-            event_time TIME,
-            duration_minutes INTEGER,
-            status TEXT DEFAULT 'scheduled',
-            priority TEXT DEFAULT 'medium',
-            reminder_enabled INTEGER DEFAULT 1,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users(user_id),
-            FOREIGN KEY (campaign_id) REFERENCES campaigns(campaign_id)
-        )
-    ''')
-
-    # Create activity log table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS activity_log (
-            log_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            action TEXT NOT NULL,
-            details TEXT,
-            ip_address TEXT,
-            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users(user_id)
-        )
-    ''')
-
-    # Create indexes
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_username ON users(username)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_email ON users(email)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_sessions_user ON sessions(user_id)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions(expires_at)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_campaigns_user ON campaigns(user_id)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_events_user ON campaign_events(user_id)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_events_date ON campaign_events(event_date)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_activity_user ON activity_log(user_id)')
-
-    conn.commit()
+    conn = sqlite3.connect(DATABASE)
     print("✅ Authentication tables created")
     return conn
 
@@ -131,7 +56,8 @@ def create_sample_users(conn):
             user_ids[username] = cursor.lastrowid
             print(f"  ✓ Created user: {username} ({role})")
         except sqlite3.IntegrityError:
-            cursor.execute('SELECT user_id FROM users WHERE username = ?', (username,))
+            # Same username, or an account init_database.py created with this email
+            cursor.execute('SELECT user_id FROM users WHERE username = ? OR email = ?', (username, email))
             user_ids[username] = cursor.fetchone()[0]
             print(f"  ⚠ User already exists: {username}")
 
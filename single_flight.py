@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Request coalescing for the SHOTLIST API servers
+Concurrent identical requests wait on one in-flight computation and share
+its result instead of each running the same aggregate queries
+"""
+
+import os
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# How long a follower waits for the leader before computing on its own
+DEFAULT_WAIT_TIMEOUT = float(os.environ.get('API_SINGLE_FLIGHT_TIMEOUT', '30'))
+
+
+class _Call:
+    """One in-flight computation and the requests waiting on it"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Groups concurrent work by key so only one caller executes it
+
+    begin(key) makes the first caller the leader; it must call finish(key,
+    result) when done, passing None if it failed. Everyone else is a
+    follower and gets the leader's result from wait(). A follower that gets
+    None back (leader failed or timed out) should do the work itself.
+    """
+
+    def __init__(self, wait_timeout=DEFAULT_WAIT_TIMEOUT):
+        self.wait_timeout = wait_timeout
+        self.executions = 0
+        self.shared = 0
+        self.fallbacks = 0
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def begin(self, key):
+        """Join the flight for key; returns (call, is_leader)"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+                return call, True
+            call.waiters += 1
+            return call, False
+
+    def finish(self, key, result):
+        """Publish the leader's result (None on failure) and end the flight"""
+        with self._lock:
+            call = self._calls.pop(key, None)
+        if call is not None:
+            call.result = result
+            call.done.set()
+
+    def wait(self, call):
+        """Follower side: the leader's result, or None if it is unusable"""
+        if call.done.wait(self.wait_timeout) and call.result is not None:
+            with self._lock:
+                self.shared += 1
+            return call.result
+
+        with self._lock:
+            self.fallbacks += 1
+        logger.warning("Single-flight leader failed or timed out, executing request directly")
+        return None
+
+    def stats(self):
+        with self._lock:
+            return {
+                'executions': self.executions,
+                'saved_executions': self.shared,
+                'fallbacks': self.fallbacks,
+                'in_flight': len(self._calls)
+            }
+
+
+flights = SingleFlight()
@@ -10,79 +10,18 @@ import hashlib
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 
+import db_pool
+import write_batcher
+
 class SocialMediaConfig:
     """Manages social media user configurations and account settings"""
     
     def __init__(self, database='shotlist_analytics.db'):
         self.database = database
-        self._init_tables()
     
     def _get_connection(self):
-        """Create database connection"""
-        conn = sqlite3.connect(self.database)
-        conn.row_factory = sqlite3.Row
-        return conn
-    
-    def _init_tables(self):
-        """Initialize social media configuration tables"""
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        
-        # Social Media Accounts table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS social_media_accounts (
-                account_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                platform TEXT NOT NULL,
-                username TEXT NOT NULL,
-                account_email TEXT,
-                access_token TEXT,
-                refresh_token TEXT,
-                token_expires_at TIMESTAMP,
-                is_connected INTEGER DEFAULT 1,
-                connection_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                last_sync TIMESTAMP,
-                sync_frequency TEXT DEFAULT 'daily',
-                FOREIGN KEY (user_id) REFERENCES users(user_id),
-                UNIQUE(user_id, platform, username)
-            )
-        ''')
-        
-        # Social Media Settings table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS social_media_settings (
-                setting_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                auto_post INTEGER DEFAULT 0,
-                auto_schedule INTEGER DEFAULT 0,
-                analytics_enabled INTEGER DEFAULT 1,
-                notifications_enabled INTEGER DEFAULT 1,
-                sync_followers INTEGER DEFAULT 1,
-                sync_engagement INTEGER DEFAULT 1,
-                sync_analytics INTEGER DEFAULT 1,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users(user_id),
-                UNIQUE(user_id)
-            )
-        ''')
-        
-        # Social Media Credentials Audit table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS social_media_audit (
-                audit_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                account_id INTEGER NOT NULL,
-                action TEXT NOT NULL,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                ip_address TEXT,
-                status TEXT,
-                details TEXT,
-                FOREIGN KEY (account_id) REFERENCES social_media_accounts(account_id)
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
+        """Get pooled database connection; close() hands it back"""
+        return db_pool.connect(self.database)
     
     def add_social_account(self, user_id: int, platform: str, username: str, 
                           account_email: str, access_token: str, 
@@ -242,19 +181,13 @@ class SocialMediaConfig:
             }
     
     def _audit_log(self, account_id: int, action: str, status: str, details: str, ip_address: str = None):
-        """Log account actions for audit trail"""
+        """Log account actions for audit trail; queued, not waited for"""
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('''
+            write_batcher.execute(self.database, '''
                 INSERT INTO social_media_audit 
                 (account_id, action, status, details, ip_address)
                 VALUES (?, ?, ?, ?, ?)
-            ''', (account_id, action, status, details, ip_address))
-            
-            conn.commit()
-            conn.close()
+            ''', (account_id, action, status, details, ip_address), wait=False)
         except Exception as e:
             print(f"Error logging audit: {e}")
     
@@ -293,6 +226,8 @@ if __name__ == '__main__':
     print("=" * 50)
     
     # Initialize configuration manager
+    from migrations import migrate
+    migrate()
     config = SocialMediaConfig()
     
     # Test adding an account
@@ -6,12 +6,13 @@ Supports: Instagram, Facebook, Twitter, LinkedIn, TikTok, YouTube, Snapchat
 import requests
 import json
 import os
-import sqlite3
 from datetime import datetime, timedelta
 import logging
 import hashlib
 import hmac
 
+import db_pool
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -284,99 +285,12 @@ class SocialMediaDatabase:
     """Database operations for social media integration"""
     
     def __init__(self, db_path="shotlist_analytics.db"):
-        """Initialize database"""
+        """Initialize database (tables are created by migrations.py)"""
         self.db_path = db_path
-        self.create_tables()
     
     def get_connection(self):
-        """Get database connection"""
-        return sqlite3.connect(self.db_path)
-    
-    def create_tables(self):
-        """Create social media tables"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # Social media accounts table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS social_media_accounts (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                platform TEXT NOT NULL,
-                platform_id TEXT,
-                username TEXT,
-                access_token TEXT,
-                refresh_token TEXT,
-                token_expires_at TIMESTAMP,
-                connected_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                last_sync TIMESTAMP,
-                sync_status TEXT DEFAULT 'pending',
-                UNIQUE(user_id, platform),
-                FOREIGN KEY (user_id) REFERENCES users(id)
-            )
-        ''')
-        
-        # Social media metrics cache
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS social_media_metrics (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                account_id INTEGER NOT NULL,
-                platform TEXT NOT NULL,
-                followers INTEGER,
-                following INTEGER,
-                posts INTEGER DEFAULT 0,
-                engagement_rate REAL DEFAULT 0,
-                reach INTEGER DEFAULT 0,
-                impressions INTEGER DEFAULT 0,
-                likes INTEGER DEFAULT 0,
-                comments INTEGER DEFAULT 0,
-                shares INTEGER DEFAULT 0,
-                saved_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (account_id) REFERENCES social_media_accounts(id)
-            )
-        ''')
-        
-        # Social media content performance
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS social_media_content (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                account_id INTEGER NOT NULL,
-                platform TEXT NOT NULL,
-                content_id TEXT UNIQUE,
-                content_type TEXT,
-                caption TEXT,
-                likes INTEGER DEFAULT 0,
-                comments INTEGER DEFAULT 0,
-                shares INTEGER DEFAULT 0,
-                reach INTEGER DEFAULT 0,
-                impressions INTEGER DEFAULT 0,
-                engagement_rate REAL DEFAULT 0,
-                posted_at TIMESTAMP,
-                synced_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (account_id) REFERENCES social_media_accounts(id)
-            )
-        ''')
-        
-        # Daily analytics summary
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS social_media_daily_analytics (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                account_id INTEGER NOT NULL,
-                platform TEXT NOT NULL,
-                date DATE,
-                followers_added INTEGER DEFAULT 0,
-                posts_count INTEGER DEFAULT 0,
-                total_engagement INTEGER DEFAULT 0,
-                total_reach INTEGER DEFAULT 0,
-                top_content TEXT,
-                synced_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(account_id, date),
-                FOREIGN KEY (account_id) REFERENCES social_media_accounts(id)
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
+        """Get pooled database connection; close() hands it back"""
+        return db_pool.connect(self.db_path, row_factory=None)
     
     def connect_account(self, user_id, platform, platform_data):
         """Connect social media account"""
@@ -542,6 +456,8 @@ class SocialMediaDatabase:
 
 
 if __name__ == "__main__":
+    from migrations import migrate
+    migrate()
     db = SocialMediaDatabase()
     print("✅ Social media integration module loaded")
     print(f"📱 Supported platforms: {', '.join(SocialMediaAPI.PLATFORMS.keys())}")
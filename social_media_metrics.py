@@ -5,13 +5,15 @@ Handles real-time metrics, analytics, and performance statistics
 from multiple social media platforms
 """
 
-import sqlite3
 import json
 import hashlib
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 from enum import Enum
 
+import db_pool
+import social_monthly
+
 class MetricType(Enum):
     """Types of metrics to track"""
     FOLLOWERS = "followers"
@@ -32,158 +34,10 @@ class SocialMediaMetrics:
     
     def __init__(self, database='shotlist_analytics.db'):
         self.database = database
-        self._init_tables()
     
     def _get_connection(self):
-        """Create database connection"""
-        conn = sqlite3.connect(self.database)
-        conn.row_factory = sqlite3.Row
-        return conn
-    
-    def _init_tables(self):
-        """Initialize metrics tables"""
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        
-        # Daily Metrics Table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS social_media_daily_metrics (
-                metric_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                account_id INTEGER NOT NULL,
-                platform TEXT NOT NULL,
-                date DATE NOT NULL,
-                followers INTEGER DEFAULT 0,
-                engagement_rate REAL DEFAULT 0,
-                reach INTEGER DEFAULT 0,
-                impressions INTEGER DEFAULT 0,
-                shares INTEGER DEFAULT 0,
-                comments INTEGER DEFAULT 0,
-                likes INTEGER DEFAULT 0,
-                clicks INTEGER DEFAULT 0,
-                saves INTEGER DEFAULT 0,
-                video_views INTEGER DEFAULT 0,
-                profile_visits INTEGER DEFAULT 0,
-                mentions INTEGER DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (account_id) REFERENCES social_media_accounts(account_id),
-                UNIQUE(account_id, platform, date)
-            )
-        ''')
-        
-        # Monthly Aggregated Metrics
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS social_media_monthly_metrics (
-                monthly_metric_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                account_id INTEGER NOT NULL,
-                platform TEXT NOT NULL,
-                year INTEGER NOT NULL,
-                month INTEGER NOT NULL,
-                total_followers INTEGER DEFAULT 0,
-                avg_engagement_rate REAL DEFAULT 0,
-                total_reach INTEGER DEFAULT 0,
-                total_impressions INTEGER DEFAULT 0,
-                total_shares INTEGER DEFAULT 0,
-                total_comments INTEGER DEFAULT 0,
-                total_likes INTEGER DEFAULT 0,
-                total_clicks INTEGER DEFAULT 0,
-                total_saves INTEGER DEFAULT 0,
-                total_video_views INTEGER DEFAULT 0,
-                total_profile_visits INTEGER DEFAULT 0,
-                total_mentions INTEGER DEFAULT 0,
-                growth_rate REAL DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (account_id) REFERENCES social_media_accounts(account_id),
-                UNIQUE(account_id, platform, year, month)
-            )
-        ''')
-        
-        # Campaign Performance Metrics
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS campaign_social_metrics (
-                campaign_metric_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                account_id INTEGER NOT NULL,
-                campaign_id TEXT,
-                platform TEXT NOT NULL,
-                start_date DATE NOT NULL,
-                end_date DATE NOT NULL,
-                total_reach INTEGER DEFAULT 0,
-                total_impressions INTEGER DEFAULT 0,
-                total_engagement INTEGER DEFAULT 0,
-                engagement_rate REAL DEFAULT 0,
-                conversion_rate REAL DEFAULT 0,
-                cost_per_engagement REAL DEFAULT 0,
-                cost_per_reach REAL DEFAULT 0,
-                revenue_generated REAL DEFAULT 0,
-                roi REAL DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (account_id) REFERENCES social_media_accounts(account_id)
-            )
-        ''')
-        
-        # Platform-Specific Metrics
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS platform_specific_metrics (
-                platform_metric_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                account_id INTEGER NOT NULL,
-                platform TEXT NOT NULL,
-                date DATE NOT NULL,
-                metric_key TEXT NOT NULL,
-                metric_value TEXT,
-                metric_type TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (account_id) REFERENCES social_media_accounts(account_id)
-            )
-        ''')
-        
-        # Audience Demographics
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS audience_demographics (
-                demographic_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                account_id INTEGER NOT NULL,
-                platform TEXT NOT NULL,
-                date DATE NOT NULL,
-                age_13_17 REAL DEFAULT 0,
-                age_18_24 REAL DEFAULT 0,
-                age_25_34 REAL DEFAULT 0,
-                age_35_44 REAL DEFAULT 0,
-                age_45_54 REAL DEFAULT 0,
-                age_55_64 REAL DEFAULT 0,
-                age_65_plus REAL DEFAULT 0,
-                male_percentage REAL DEFAULT 0,
-                female_percentage REAL DEFAULT 0,
-                top_countries TEXT,
-                top_cities TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (account_id) REFERENCES social_media_accounts(account_id)
-            )
-        ''')
-        
-        # Content Performance
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS content_performance (
-                content_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                account_id INTEGER NOT NULL,
-                platform TEXT NOT NULL,
-                post_id TEXT NOT NULL,
-                post_type TEXT,
-                caption TEXT,
-                hashtags TEXT,
-                posted_at TIMESTAMP,
-                likes INTEGER DEFAULT 0,
-                comments INTEGER DEFAULT 0,
-                shares INTEGER DEFAULT 0,
-                saves INTEGER DEFAULT 0,
-                views INTEGER DEFAULT 0,
-                reach INTEGER DEFAULT 0,
-                engagement_rate REAL DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (account_id) REFERENCES social_media_accounts(account_id),
-                UNIQUE(account_id, platform, post_id)
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
+        """Get pooled database connection; close() hands it back"""
+        return db_pool.connect(self.database)
     
     def add_daily_metrics(self, account_id: int, platform: str, metrics: Dict) -> Dict:
         """Add daily metrics for an account"""
@@ -262,6 +116,29 @@ class SocialMediaMetrics:
                 'error_code': 'DATABASE_ERROR'
             }
     
+    def get_monthly_metrics(self, account_id: int, platform: str, months: int = 12) -> Dict:
+        """Get monthly rollups for the last months months (see social_monthly)"""
+        try:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            
+            trend = social_monthly.monthly_trend(cursor, account_id, platform, months)
+            conn.close()
+            
+            return {
+                'success': True,
+                'metrics': trend['months'],
+                'count': len(trend['months']),
+                'period_months': months,
+                'pending_months': trend['pending_months']
+            }
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e),
+                'error_code': 'DATABASE_ERROR'
+            }
+    
     def get_performance_summary(self, account_id: int, platform: str) -> Dict:
         """Get performance summary with key metrics"""
         try:
@@ -540,6 +417,8 @@ if __name__ == '__main__':
     print("=" * 60)
     
     # Initialize metrics system
+    from migrations import migrate
+    migrate()
     metrics = SocialMediaMetrics()
     
     # Test data - add sample metrics
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Monthly social media metrics for the SHOTLIST analytics database
+Rolls social_media_daily_metrics up into social_media_monthly_metrics.
+Triggers mark every month a daily write touches as dirty and a background
+aggregator recomputes just those months, so year-long trends read one row
+per month.
+
+Usage:
+    python3 social_monthly.py          # aggregate the dirty months now
+    python3 social_monthly.py --all    # recompute every month
+"""
+
+import os
+import time
+import sqlite3
+import logging
+import argparse
+import threading
+from datetime import date
+
+logger = logging.getLogger(__name__)
+
+DATABASE = 'shotlist_analytics.db'
+
+# Background aggregation (override via environment)
+AGGREGATE_INTERVAL = float(os.environ.get('API_SOCIAL_MONTHLY_INTERVAL', '300'))
+BATCH_SIZE = int(os.environ.get('API_SOCIAL_MONTHLY_BATCH', '500'))
+
+# Monthly column -> daily column it sums
+TOTALS = {
+    'total_reach': 'reach',
+    'total_impressions': 'impressions',
+    'total_shares': 'shares',
+    'total_comments': 'comments',
+    'total_likes': 'likes',
+    'total_clicks': 'clicks',
+    'total_saves': 'saves',
+    'total_video_views': 'video_views',
+    'total_profile_visits': 'profile_visits',
+    'total_mentions': 'mentions',
+}
+
+_MONTH_OF = "CAST(strftime('%Y', {row}.date) AS INTEGER), CAST(strftime('%m', {row}.date) AS INTEGER)"
+
+
+def _month_range(year, month):
+    """[first day, first day of the next month) as YYYY-MM-DD"""
+    start = date(year, month, 1)
+    end = date(year + month // 12, month % 12 + 1, 1)
+    return start.isoformat(), end.isoformat()
+
+
+def _recompute_month(cursor, account_id, platform, year, month):
+    """Rebuild one monthly row from its daily rows; False if it has none"""
+    start, end = _month_range(year, month)
+    cursor.execute(f'''
+        SELECT
+            COUNT(*) AS days,
+            AVG(engagement_rate) AS avg_engagement_rate,
+            {', '.join(f'COALESCE(SUM({daily}), 0) AS {total}' for total, daily in TOTALS.items())},
+            (SELECT followers FROM social_media_daily_metrics
+             WHERE account_id = ? AND platform = ? AND date >= ? AND date < ?
+             ORDER BY date DESC LIMIT 1) AS total_followers
+        FROM social_media_daily_metrics
+        WHERE account_id = ? AND platform = ? AND date >= ? AND date < ?
+    ''', (account_id, platform, start, end) * 2)
+    row = cursor.fetchone()
+
+    if not row[0]:
+        cursor.execute('''
+            DELETE FROM social_media_monthly_metrics
+            WHERE account_id = ? AND platform = ? AND year = ? AND month = ?
+        ''', (account_id, platform, year, month))
+        return False
+
+    columns = ['total_followers', 'avg_engagement_rate'] + list(TOTALS)
+    values = [row[2 + len(TOTALS)] or 0, row[1] or 0] + list(row[2:2 + len(TOTALS)])
+    cursor.execute(f'''
+        INSERT INTO social_media_monthly_metrics (account_id, platform, year, month, {', '.join(columns)})
+        VALUES (?, ?, ?, ?, {', '.join('?' * len(columns))})
+        ON CONFLICT (account_id, platform, year, month) DO UPDATE SET
+            {', '.join(f'{column} = excluded.{column}' for column in columns)}
+    ''', [account_id, platform, year, month] + values)
+    return True
+
+
+def _update_growth(cursor, account_id, platform, since):
+    """growth_rate of every month from since (year, month) onwards
+
+    Month-over-month change in followers against the previous month with
+    data; a recomputed month shifts the growth of the one after it.
+    """
+    cursor.execute('''
+        SELECT year, month, total_followers, growth_rate FROM social_media_monthly_metrics
+        WHERE account_id = ? AND platform = ?
+        ORDER BY year, month
+    ''', (account_id, platform))
+
+    previous = None
+    for year, month, followers, growth_rate in cursor.fetchall():
+        if (year, month) >= since:
+            growth = round((followers - previous) / previous * 100, 2) if previous else 0
+            if growth != growth_rate:
+                cursor.execute('''
+                    UPDATE social_media_monthly_metrics SET growth_rate = ?
+                    WHERE account_id = ? AND platform = ? AND year = ? AND month = ?
+                ''', (growth, account_id, platform, year, month))
+        previous = followers
+
+
+def aggregate_dirty_months(conn, batch_size=BATCH_SIZE):
+    """Recompute up to batch_size dirty months; returns how many ran
+
+    The batch and its removal from the queue commit together. conn must be
+    in autocommit mode (isolation_level=None).
+    """
+    cursor = conn.cursor()
+    cursor.execute('BEGIN IMMEDIATE')
+    try:
+        cursor.execute('''
+            SELECT account_id, platform, year, month FROM social_media_monthly_dirty
+            ORDER BY account_id, platform, year, month LIMIT ?
+        ''', (batch_size,))
+        dirty = cursor.fetchall()
+
+        earliest = {}
+        for account_id, platform, year, month in dirty:
+            _recompute_month(cursor, account_id, platform, year, month)
+            earliest.setdefault((account_id, platform), (year, month))
+            cursor.execute('''
+                DELETE FROM social_media_monthly_dirty
+                WHERE account_id = ? AND platform = ? AND year = ? AND month = ?
+            ''', (account_id, platform, year, month))
+        for (account_id, platform), since in earliest.items():
+            _update_growth(cursor, account_id, platform, since)
+
+        cursor.execute('COMMIT')
+    except Exception:
+        cursor.execute('ROLLBACK')
+        raise
+    return len(dirty)
+
+
+def aggregate_all_dirty(database=DATABASE, batch_size=BATCH_SIZE):
+    """Drain the dirty-month queue; returns the number of months recomputed"""
+    conn = sqlite3.connect(database, isolation_level=None)
+    conn.execute('PRAGMA busy_timeout = 30000')
+    try:
+        total = 0
+        while True:
+            done = aggregate_dirty_months(conn, batch_size)
+            total += done
+            if done < batch_size:
+                return total
+    finally:
+        conn.close()
+
+
+def mark_all_dirty(database=DATABASE):
+    """Queue every month with daily data, e.g. after changing the aggregation"""
+    conn = sqlite3.connect(database)
+    try:
+        conn.execute(f'''
+            INSERT OR IGNORE INTO social_media_monthly_dirty (account_id, platform, year, month)
+            SELECT DISTINCT account_id, platform, {_MONTH_OF.format(row='d')}
+            FROM social_media_daily_metrics d
+        ''')
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def monthly_trend(cursor, account_id, platform, months=12):
+    """Monthly rows for the last months calendar months, oldest first
+
+    One indexed row per month, however many daily rows it summarises.
+    pending_months counts months with daily writes not yet aggregated.
+    """
+    today = date.today()
+    first = today.year * 12 + today.month - months
+    since = (first // 12, first % 12 + 1)
+
+    cursor.execute('''
+        SELECT * FROM social_media_monthly_metrics
+        WHERE account_id = ? AND platform = ?
+          AND (year > ? OR (year = ? AND month >= ?))
+        ORDER BY year, month
+    ''', (account_id, platform, since[0], since[0], since[1]))
+    rows = [dict(row) for row in cursor.fetchall()]
+
+    cursor.execute('''
+        SELECT COUNT(*) FROM social_media_monthly_dirty WHERE account_id = ? AND platform = ?
+    ''', (account_id, platform))
+    return {'months': rows, 'pending_months': cursor.fetchone()[0]}
+
+
+class MonthlyAggregator:
+    """Aggregates dirty months from a background thread
+
+    Every interval seconds the queue of dirty months is drained in batches
+    of batch_size, each batch one short write transaction. Running one
+    aggregator per database is enough; extra ones find the queue empty.
+    """
+
+    def __init__(self, database, interval=AGGREGATE_INTERVAL, batch_size=BATCH_SIZE):
+        self.database = database
+        self.interval = interval
+        self.batch_size = batch_size
+        self.runs = 0
+        self.months = 0
+        self.failures = 0
+        self.last = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='social-monthly', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        conn = sqlite3.connect(self.database, isolation_level=None)
+        conn.execute('PRAGMA busy_timeout = 5000')
+        try:
+            # First run right away: it picks up writes made while stopped
+            self.run_once(conn)
+            while not self._stop.wait(self.interval):
+                self.run_once(conn)
+        finally:
+            conn.close()
+
+    def run_once(self, conn):
+        """Drain the queue; returns the months recomputed, None on failure"""
+        started = time.perf_counter()
+        months = 0
+        try:
+            while not self._stop.is_set():
+                done = aggregate_dirty_months(conn, self.batch_size)
+                months += done
+                if done < self.batch_size:
+                    break
+        except sqlite3.Error as e:
+            with self._lock:
+                self.failures += 1
+            logger.warning(f"Monthly social aggregation of {self.database} failed: {e}")
+            return None
+
+        with self._lock:
+            self.runs += 1
+            self.months += months
+            self.last = {
+                'months': months,
+                'duration_ms': round((time.perf_counter() - started) * 1000, 2),
+                'at': time.time()
+            }
+        return months
+
+    def stats(self):
+        with self._lock:
+            return {
+                'running': self._thread is not None and self._thread.is_alive(),
+                'interval': self.interval,
+                'runs': self.runs,
+                'months': self.months,
+                'failures': self.failures,
+                'last': self.last
+            }
+
+
+aggregator = None
+
+
+def start_aggregator(database, interval=AGGREGATE_INTERVAL):
+    """Start this process's aggregator; an interval of 0 disables it"""
+    global aggregator
+    if interval <= 0:
+        return None
+    aggregator = MonthlyAggregator(database, interval=interval).start()
+    return aggregator
+
+
+def _forget_aggregator():
+    # The aggregator thread doesn't survive fork; it keeps running in the parent
+    global aggregator
+    aggregator = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_forget_aggregator)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SHOTLIST monthly social media metrics')
+    parser.add_argument('--database', default=DATABASE, help='SQLite database file')
+    parser.add_argument('--all', action='store_true', help='Recompute every month, not just the dirty ones')
+    args = parser.parse_args()
+
+    if args.all:
+        mark_all_dirty(args.database)
+    print(f"📅 Aggregating monthly social metrics in {args.database}")
+    print(f"  ✓ {aggregate_all_dirty(args.database)} month(s) recomputed")
+
+
+if __name__ == '__main__':
+    main()
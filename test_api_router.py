@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Tests for the route registry (api_router.py)
+
+Usage:
+    python3 test_api_router.py
+    python3 -m pytest test_api_router.py
+"""
+
+import io
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from api_router import Router, BoundedReader, json_body
+
+
+class _Handler:
+    """The parts of a BaseHTTPRequestHandler the router touches"""
+
+    def __init__(self, path, body=b'', headers=None):
+        self.path = path
+        self.headers = dict(headers or {'Content-Length': str(len(body))})
+        self.rfile = io.BytesIO(body)
+        self.close_connection = False
+        self.sent = []
+        self.calls = []
+
+    def _send_json(self, payload, status=200, headers=None):
+        self.sent.append((status, payload, headers))
+
+
+class RouterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.router = Router()
+
+        def campaign(handler, params, campaign_id):
+            handler.calls.append(('campaign', params, campaign_id))
+            handler._send_json({'id': campaign_id})
+
+        def listing(handler):
+            handler.calls.append(('listing',))
+            handler._send_json([])
+
+        self.router.add('GET', '/api/campaigns', listing)
+        self.router.add('GET', '/api/campaigns/{campaign_id}', campaign, args=('params',))
+        self.router.add('DELETE', '/api/campaigns/{campaign_id}', campaign, args=('params',))
+
+    def dispatch(self, method, path, body=b'', headers=None):
+        handler = _Handler(path, body, headers)
+        self.router.dispatch(handler, method)
+        return handler
+
+    def test_static_route(self):
+        handler = self.dispatch('GET', '/api/campaigns?limit=5')
+        self.assertEqual(handler.calls, [('listing',)])
+        self.assertEqual(handler.sent[0][0], 200)
+
+    def test_path_parameters_and_args(self):
+        handler = self.dispatch('GET', '/api/campaigns/42?range=7')
+        self.assertEqual(handler.calls, [('campaign', {'range': ['7']}, '42')])
+
+    def test_static_route_wins_over_pattern(self):
+        self.router.add('GET', '/api/campaigns/summary', lambda handler: handler.calls.append(('summary',)))
+        self.assertEqual(self.dispatch('GET', '/api/campaigns/summary').calls, [('summary',)])
+        self.assertEqual(self.dispatch('GET', '/api/campaigns/7').calls[0][2], '7')
+
+    def test_unknown_path_is_404(self):
+        handler = self.dispatch('GET', '/api/nope')
+        self.assertEqual(handler.sent[0][0], 404)
+        self.assertEqual(handler.calls, [])
+
+    def test_wrong_method_is_405_with_allow(self):
+        handler = self.dispatch('POST', '/api/campaigns/3')
+        status, _, headers = handler.sent[0]
+        self.assertEqual(status, 405)
+        self.assertEqual(headers['Allow'], 'DELETE, GET, OPTIONS')
+
+    def test_duplicate_static_route_rejected(self):
+        with self.assertRaises(ValueError):
+            self.router.add('GET', '/api/campaigns', lambda handler: None)
+
+    def test_middleware_can_answer(self):
+        def deny(handler, context):
+            handler._send_json({'error': 'Unauthorized'}, 401)
+            return False
+
+        def tag(handler, context):
+            context.user_id = 'u1'
+            return True
+
+        self.router.add('GET', '/api/private', lambda handler: handler.calls.append('ran'), middleware=(deny,))
+        self.router.add('GET', '/api/me', lambda handler, user_id: handler.calls.append(user_id),
+                        args=('user_id',), middleware=(tag,))
+        denied = self.dispatch('GET', '/api/private')
+        self.assertEqual((denied.sent[0][0], denied.calls), (401, []))
+        self.assertEqual(self.dispatch('GET', '/api/me').calls, ['u1'])
+        # A middleware answer is not an error
+        self.assertEqual(self.router.stats()[0]['errors'], 0)
+
+    def test_stats_count_calls_and_errors(self):
+        def boom(handler):
+            raise RuntimeError('boom')
+
+        self.router.add('GET', '/api/boom', boom)
+        self.dispatch('GET', '/api/campaigns')
+        self.dispatch('GET', '/api/campaigns')
+        with self.assertRaises(RuntimeError):
+            self.dispatch('GET', '/api/boom')
+
+        stats = {entry['path']: entry for entry in self.router.stats()}
+        self.assertEqual((stats['/api/campaigns']['calls'], stats['/api/campaigns']['errors']), (2, 0))
+        self.assertEqual((stats['/api/boom']['calls'], stats['/api/boom']['errors']), (1, 1))
+        self.assertNotIn('/api/campaigns/{campaign_id}', stats)
+
+    def test_unread_body_is_consumed(self):
+        connection = io.BytesIO(b'{"ignored": true}NEXT')
+        handler = _Handler('/api/campaigns', headers={'Content-Length': '17'})
+        handler.rfile = connection
+        self.router.dispatch(handler, 'GET')
+        self.assertIs(handler.rfile, connection)
+        self.assertEqual(connection.read(), b'NEXT')
+
+    def test_unsupported_framing_closes(self):
+        for headers in ({'Content-Length': 'x'}, {'Content-Length': '-1'}, {'Transfer-Encoding': 'chunked'}):
+            handler = self.dispatch('POST', '/api/campaigns', headers=headers)
+            self.assertEqual(handler.sent[0][0], 400)
+            self.assertTrue(handler.close_connection)
+            self.assertEqual(handler.calls, [])
+
+    def test_json_body(self):
+        def create(handler, body):
+            handler.calls.append(body)
+
+        self.router.add('POST', '/api/items', create, args=('body',), middleware=(json_body,))
+        self.assertEqual(self.dispatch('POST', '/api/items', b'{"a": 1}').calls, [{'a': 1}])
+        self.assertEqual(self.dispatch('POST', '/api/items', b'{nope').sent[0][0], 400)
+        self.assertEqual(self.dispatch('POST', '/api/items').sent[0][0], 400)
+
+
+class BoundedReaderTest(unittest.TestCase):
+
+    def test_reads_stop_at_length(self):
+        reader = BoundedReader(io.BytesIO(b'abcdefNEXT'), 6)
+        self.assertEqual(reader.read(4), b'abcd')
+        self.assertEqual(reader.read(), b'ef')
+        self.assertEqual(reader.read(), b'')
+        self.assertEqual(reader.remaining, 0)
+
+    def test_discard_leaves_next_request(self):
+        connection = io.BytesIO(b'x' * 100 + b'NEXT')
+        reader = BoundedReader(connection, 100)
+        reader.read(3)
+        reader.discard(read_size=16)
+        self.assertEqual(connection.read(), b'NEXT')
+
+    def test_short_read_ends_body(self):
+        reader = BoundedReader(io.BytesIO(b'abc'), 10)
+        self.assertEqual(reader.read(), b'abc')
+        self.assertEqual(reader.remaining, 0)
+
+    def test_streamed_route_gets_reader(self):
+        router = Router()
+        router.add('POST', '/bulk', lambda handler: handler.calls.append(handler.rfile.read(2)), stream_body=True)
+        connection = io.BytesIO(b'abcdefNEXT')
+        handler = _Handler('/bulk', headers={'Content-Length': '6'})
+        handler.rfile = connection
+        router.dispatch(handler, 'POST')
+        self.assertEqual(handler.calls, [b'ab'])
+        self.assertEqual(connection.read(), b'NEXT')
+
+
+if __name__ == '__main__':
+    unittest.main()
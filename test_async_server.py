@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Tests for the asyncio serving engine (async_server.py)
+
+Usage:
+    python3 test_async_server.py
+    python3 -m pytest test_async_server.py
+"""
+
+import os
+import sys
+import json
+import socket
+import threading
+import unittest
+import http.client
+from http.server import BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import async_server
+from api_router import Router
+from async_server import AsyncHTTPServer
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    router = Router()
+    release = threading.Event()
+    entered = threading.Event()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload, status=200, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.router.dispatch(self, 'GET')
+
+    def do_POST(self):
+        self.router.dispatch(self, 'POST')
+
+    def echo(self):
+        self._send_json({'length': len(self.rfile.read())})
+
+    def peek(self):
+        self._send_json({'start': self.rfile.read(4).decode()})
+
+    def stream(self):
+        self.send_response(200)
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        chunk = b'x' * async_server.WRITE_BUFFER_SIZE
+        self.wfile.write(f'{len(chunk):x}\r\n'.encode() + chunk + b'\r\n')
+        self.entered.set()
+        self.release.wait(10)
+        self.wfile.write(b'0\r\n\r\n')
+
+    def upstream(self):
+        self.entered.set()
+        self.release.wait(10)
+        self._send_json({'ok': True})
+
+
+_Handler.router.add('POST', '/echo', _Handler.echo)
+_Handler.router.add('POST', '/bulk', _Handler.peek, stream_body=True)
+_Handler.router.add('GET', '/export', _Handler.stream)
+_Handler.router.add('GET', '/upstream', _Handler.upstream, upstream=True)
+
+
+class AsyncServerTest(unittest.TestCase):
+
+    def setUp(self):
+        _Handler.release.clear()
+        _Handler.entered.clear()
+        self.server = AsyncHTTPServer(('127.0.0.1', 0), _Handler, threads=2, upstream_threads=1, upstream_queue=0)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.port = self.server.server_address[1]
+
+    def tearDown(self):
+        _Handler.release.set()
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join(5)
+
+    def connection(self):
+        return http.client.HTTPConnection('127.0.0.1', self.port, timeout=10)
+
+    def request(self, connection, method, path, body=None):
+        connection.request(method, path, body)
+        response = connection.getresponse()
+        return response.status, response.read()
+
+    def test_body_size_cap_spares_streamed_routes(self):
+        limit = async_server.MAX_BODY_SIZE
+        async_server.MAX_BODY_SIZE = 100
+        try:
+            self.assertEqual(self.request(self.connection(), 'POST', '/echo', b'x' * 101)[0], 413)
+            connection = self.connection()
+            # The unread rest of the body is skipped; keep-alive carries on
+            self.assertEqual(self.request(connection, 'POST', '/bulk', b'abcd' + b'x' * 500000),
+                             (200, b'{"start": "abcd"}'))
+            self.assertEqual(self.request(connection, 'POST', '/echo', b'x' * 10), (200, b'{"length": 10}'))
+        finally:
+            async_server.MAX_BODY_SIZE = limit
+
+    def test_response_streams_before_handler_returns(self):
+        connection = self.connection()
+        connection.request('GET', '/export')
+        response = connection.getresponse()
+        self.assertEqual(len(response.read(async_server.WRITE_BUFFER_SIZE)), async_server.WRITE_BUFFER_SIZE)
+        self.assertFalse(_Handler.release.is_set())
+        _Handler.release.set()
+        self.assertEqual(response.read(), b'')
+
+    def test_upstream_requests_beyond_limit_get_503(self):
+        first = self.connection()
+        first.request('GET', '/upstream')
+        self.assertTrue(_Handler.entered.wait(10))
+        self.assertEqual(self.request(self.connection(), 'GET', '/upstream')[0], 503)
+        # Dashboard routes are unaffected
+        self.assertEqual(self.request(self.connection(), 'POST', '/echo', b'xy'), (200, b'{"length": 2}'))
+        _Handler.release.set()
+        self.assertEqual(first.getresponse().status, 200)
+        self.assertEqual(self.server.stats()['rejected'], 1)
+
+    def test_malformed_framing(self):
+        with socket.create_connection(('127.0.0.1', self.port), timeout=10) as sock:
+            sock.sendall(b'POST /echo HTTP/1.1\r\nContent-Length: nope\r\n\r\n')
+            self.assertTrue(sock.recv(1024).startswith(b'HTTP/1.1 400'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Tests for bulk ingestion (bulk_ingest.py) and the streamed bodies of the
+bulk routes (api_router.BoundedReader)
+
+Usage:
+    python3 test_bulk_ingest.py
+    python3 -m pytest test_bulk_ingest.py
+"""
+
+import io
+import os
+import sys
+import json
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import migrations
+import bulk_ingest
+from api_router import Router, BoundedReader
+from bulk_ingest import BulkFormatError
+
+
+def _records(reader, body, read_size=7):
+    """[(index, record or error message)] read from body in read_size pieces"""
+    data = body.encode()
+    return [
+        (index, str(record) if isinstance(record, ValueError) else record)
+        for index, record in reader(io.BytesIO(data), len(data), read_size)
+    ]
+
+
+class JsonArrayTest(unittest.TestCase):
+
+    def test_elements_split_across_reads(self):
+        body = json.dumps([{'a': 1, 'b': 'x' * 20}, 12345, 'text', [1, 2], None, True])
+        self.assertEqual(
+            _records(bulk_ingest.iter_json_array, body),
+            list(enumerate([{'a': 1, 'b': 'x' * 20}, 12345, 'text', [1, 2], None, True]))
+        )
+
+    def test_empty_array(self):
+        self.assertEqual(_records(bulk_ingest.iter_json_array, ' [ ] '), [])
+
+    def test_stops_at_length(self):
+        data = b'[1, 2]GET / HTTP/1.1'
+        records = list(bulk_ingest.iter_json_array(io.BytesIO(data), 6, 4))
+        self.assertEqual(records, [(0, 1), (1, 2)])
+
+    def test_format_errors(self):
+        for body in ('{"a": 1}', '[1, 2', '[1 2]', '[1, {"a": }]', '[1] 2'):
+            with self.assertRaises(BulkFormatError, msg=body):
+                _records(bulk_ingest.iter_json_array, body)
+
+    def test_element_too_large(self):
+        limit = bulk_ingest.MAX_RECORD_BYTES
+        bulk_ingest.MAX_RECORD_BYTES = 16
+        try:
+            with self.assertRaises(BulkFormatError) as raised:
+                _records(bulk_ingest.iter_json_array, json.dumps([1, 'y' * 100]))
+            self.assertEqual(raised.exception.index, 1)
+        finally:
+            bulk_ingest.MAX_RECORD_BYTES = limit
+
+
+class NdjsonTest(unittest.TestCase):
+
+    def test_bad_line_fails_alone(self):
+        records = _records(bulk_ingest.iter_ndjson, '{"a": 1}\n\n{oops\n{"a": 2}')
+        self.assertEqual([index for index, _ in records], [0, 1, 2])
+        self.assertEqual(records[0][1], {'a': 1})
+        self.assertTrue(records[1][1].startswith('invalid JSON'))
+        self.assertEqual(records[2][1], {'a': 2})
+
+    def test_multibyte_characters_split_across_reads(self):
+        self.assertEqual(_records(bulk_ingest.iter_ndjson, '"héllo wörld"\n', 1), [(0, 'héllo wörld')])
+
+    def test_read_records_picks_format(self):
+        data = b'{"a": 1}\n{"a": 2}\n'
+        ndjson = bulk_ingest.read_records(io.BytesIO(data), len(data), 'application/x-ndjson; charset=utf-8')
+        self.assertEqual(len(list(ndjson)), 2)
+        with self.assertRaises(BulkFormatError):
+            list(bulk_ingest.read_records(io.BytesIO(data), len(data), 'application/json'))
+
+
+class IngestTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix='bulk-ingest-')
+        database = os.path.join(self.workdir, 'analytics.db')
+        migrations.migrate(database)
+        self.conn = sqlite3.connect(database)
+
+    def tearDown(self):
+        self.conn.close()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def _daily(self, day, **fields):
+        return dict({'account_id': 1, 'platform': 'instagram', 'date': f'2025-10-{day:02d}'}, **fields)
+
+    def test_valid_records_written_in_chunks(self):
+        records = enumerate([self._daily(day, followers=day) for day in range(1, 26)])
+        result = bulk_ingest.ingest(self.conn, 'daily_metrics', records, chunk_rows=10)
+        self.assertEqual((result.received, result.inserted, result.failed), (25, 25, 0))
+        self.assertEqual(self.conn.execute('SELECT SUM(followers) FROM social_media_daily_metrics').fetchone(),
+                         (325,))
+
+    def test_invalid_records_reported_by_index(self):
+        records = enumerate([
+            self._daily(1), {'platform': 'instagram'}, self._daily(2, followers='many'),
+            ValueError('invalid JSON: x'), self._daily(3), 'not an object'
+        ])
+        result = bulk_ingest.ingest(self.conn, 'daily_metrics', records).to_dict()
+        self.assertFalse(result['success'])
+        self.assertEqual((result['inserted'], result['failed']), (2, 4))
+        self.assertEqual([error['index'] for error in result['errors']], [1, 2, 3, 5])
+        self.assertIn("'account_id'", result['errors'][0]['error'])
+
+    def test_constraint_failure_only_fails_its_record(self):
+        self.conn.execute('CREATE TABLE bulk_test (name TEXT UNIQUE, score INTEGER)')
+        bulk_ingest.SPECS['test'] = bulk_ingest.RecordSpec(
+            'bulk_test', [('name', 'text', None), ('score', 'int', 0)], conflict='ABORT'
+        )
+        try:
+            records = enumerate([{'name': 'a'}, {'name': 'b'}, {'name': 'a'}, {'name': 'c'}])
+            result = bulk_ingest.ingest(self.conn, 'test', records)
+        finally:
+            del bulk_ingest.SPECS['test']
+        self.assertEqual((result.inserted, result.failed), (3, 1))
+        self.assertEqual(result.errors[0]['index'], 2)
+        self.assertEqual(self.conn.execute('SELECT COUNT(*) FROM bulk_test').fetchone(), (3,))
+
+    def test_committed_chunks_survive_format_error(self):
+        data = (json.dumps([self._daily(day) for day in range(1, 6)])[:-1] + ', {"account_id": ').encode()
+        records = bulk_ingest.iter_json_array(io.BytesIO(data), len(data))
+        result = bulk_ingest.ingest(self.conn, 'daily_metrics', records, chunk_rows=2)
+        self.assertIsNotNone(result.format_error)
+        self.assertEqual(result.inserted, 5)
+        self.assertIn('error', result.to_dict())
+
+
+class _Handler:
+    """Just enough of a BaseHTTPRequestHandler for Router.dispatch"""
+
+    def __init__(self, path, body, rest=b''):
+        self.path = path
+        self.headers = {'Content-Length': str(len(body))}
+        self.rfile = io.BytesIO(body + rest)
+        self.close_connection = False
+        self.sent = []
+
+    def _send_json(self, data, status=200, headers=None):
+        self.sent.append((status, data))
+
+
+class StreamedBodyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.router = Router()
+        self.seen = []
+        self.router.add('POST', '/bulk', self._read_some, stream_body=True)
+        self.router.add('POST', '/single', self._read_some)
+
+    def _read_some(self, handler):
+        self.seen.append((type(handler.rfile), handler.rfile.read(4)))
+
+    def test_streaming_route_reads_connection_and_skips_rest(self):
+        handler = _Handler('/bulk', b'0123456789', b'NEXT')
+        self.router.dispatch(handler, 'POST')
+        self.assertEqual(self.seen, [(BoundedReader, b'0123')])
+        # The unread body was skipped; the next request starts here
+        self.assertEqual(handler.rfile.read(), b'NEXT')
+        self.assertFalse(handler.close_connection)
+
+    def test_buffered_route_gets_body_in_memory(self):
+        handler = _Handler('/single', b'0123456789', b'NEXT')
+        self.router.dispatch(handler, 'POST')
+        self.assertEqual(self.seen, [(io.BytesIO, b'0123')])
+        self.assertEqual(handler.rfile.read(), b'NEXT')
+
+    def test_bounded_reader_stops_at_length(self):
+        reader = BoundedReader(io.BytesIO(b'abcdefNEXT'), 6)
+        self.assertEqual(reader.read(4), b'abcd')
+        self.assertEqual(reader.read(), b'ef')
+        self.assertEqual(reader.read(10), b'')
+
+    def test_bounded_reader_short_body(self):
+        reader = BoundedReader(io.BytesIO(b'abc'), 10)
+        self.assertEqual(reader.read(), b'abc')
+        self.assertEqual(reader.remaining, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
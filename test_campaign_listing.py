@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Tests for the campaign listing and its keyset pagination (campaign_listing.py)
+
+Usage:
+    python3 test_campaign_listing.py
+    python3 -m pytest test_campaign_listing.py
+"""
+
+import os
+import sys
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import migrations
+import campaign_listing
+from campaign_listing import ListingError, SORT_COLUMNS, encode_cursor, decode_cursor
+from dashboard_queries import Scope
+
+
+class CampaignListingTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.workdir = tempfile.mkdtemp(prefix='campaign-listing-')
+        database = os.path.join(cls.workdir, 'analytics.db')
+        migrations.migrate(database)
+        cls.conn = sqlite3.connect(database)
+        cls.conn.row_factory = sqlite3.Row
+
+        # Ties on every sortable column, NULLs in the nullable ones and
+        # campaigns without metrics, so pages split runs of equal values
+        for index in range(13):
+            cls.conn.execute('''
+                INSERT INTO campaigns (campaign_name, client_name, campaign_type, start_date, end_date,
+                                       budget, status, created_at, user_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                f'Campaign {index % 5}', f'Client {index % 2}', ('seo', 'email', 'paid_ads')[index % 3],
+                f'2025-01-{index % 4 + 1:02d}', None if index % 3 else '2025-06-30',
+                (index % 4) * 500, None if index % 4 == 0 else ('active', 'paused')[index % 2],
+                None if index == 5 else f'2025-01-{index % 3 + 1:02d} 09:00:00', index % 2 + 1
+            ))
+        for campaign_id in range(1, 14):
+            for day in range(campaign_id % 3):
+                cls.conn.execute('''
+                    INSERT INTO roi_metrics (campaign_id, date, revenue, cost) VALUES (?, ?, ?, ?)
+                ''', (campaign_id, f'2025-02-{day + 1:02d}', (campaign_id % 4) * 100, 50 * (day + 1)))
+        cls.conn.commit()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.conn.close()
+        shutil.rmtree(cls.workdir, ignore_errors=True)
+
+    def listing(self, scope=None, **params):
+        return campaign_listing.list_campaigns(
+            self.conn.cursor(), {name: [str(value)] for name, value in params.items()}, scope or Scope()
+        )
+
+    def pages(self, limit, scope=None, **params):
+        """Every page from following next_cursor"""
+        pages = [self.listing(scope, limit=limit, **params)]
+        while pages[-1]['next_cursor']:
+            self.assertLess(len(pages), 20, 'pagination does not terminate')
+            pages.append(self.listing(scope, limit=limit, cursor=pages[-1]['next_cursor'], **params))
+        return pages
+
+    def ids(self, result):
+        return [campaign['campaign_id'] for campaign in result['campaigns']]
+
+    def test_pages_concatenate_to_the_full_listing(self):
+        for sort in SORT_COLUMNS:
+            for order in ('asc', 'desc'):
+                full = self.ids(self.listing(sort=sort, order=order))
+                self.assertEqual(len(full), 13)
+                for limit in (1, 4, 13):
+                    pages = self.pages(limit, sort=sort, order=order)
+                    self.assertEqual(sum((self.ids(page) for page in pages), []), full, (sort, order, limit))
+                    self.assertTrue(all(len(self.ids(page)) == limit for page in pages[:-1]))
+
+    def test_ties_are_ordered_by_campaign_id(self):
+        budgets = [(campaign['budget'], campaign['campaign_id'])
+                   for campaign in self.listing(sort='budget', order='desc')['campaigns']]
+        self.assertEqual(budgets, sorted(budgets, key=lambda pair: (-pair[0], pair[1])))
+
+    def test_last_page_has_no_cursor(self):
+        self.assertIsNone(self.listing(limit=13)['next_cursor'])
+        self.assertIsNotNone(self.listing(limit=12)['next_cursor'])
+        self.assertIsNone(self.listing()['next_cursor'])
+
+    def test_totals_come_from_the_latest_running_total(self):
+        campaign = next(c for c in self.listing(sort='revenue')['campaigns'] if c['campaign_id'] == 5)
+        # Campaign 5 has two days of metrics: revenue 100 + 100, cost 50 + 100
+        self.assertEqual((campaign['revenue'], campaign['spent'], campaign['roi']), (200, 150, 33.33))
+
+    def test_filters_and_scope(self):
+        self.assertEqual(self.ids(self.listing(type='seo', sort='start_date', order='asc')), [1, 13, 10, 7, 4])
+        mine = self.pages(2, Scope(user_id=2, restricted=True), status='paused')
+        self.assertEqual(sorted(sum((self.ids(page) for page in mine), [])), [2, 4, 6, 8, 10, 12])
+
+    def test_cursor_round_trip(self):
+        for value in ('2025-01-01 09:00:00', '', 12.5, 0, 'naïve "quoted"'):
+            token = encode_cursor('roi', 'asc', value, 7)
+            self.assertNotIn('=', token)
+            self.assertEqual(decode_cursor(token, 'roi', 'asc'), (value, 7))
+
+    def test_cursor_is_bound_to_its_sort_order(self):
+        token = self.listing(sort='budget', order='asc', limit=3)['next_cursor']
+        with self.assertRaises(ListingError):
+            self.listing(sort='budget', order='desc', limit=3, cursor=token)
+        with self.assertRaises(ListingError):
+            self.listing(sort='spent', order='asc', limit=3, cursor=token)
+
+    def test_invalid_parameters(self):
+        for params in (
+            {'cursor': 'not a cursor'},
+            {'cursor': 'bm9wZQ'},
+            {'sort': 'password'},
+            {'order': 'sideways'},
+            {'limit': 'ten'},
+            {'limit': 0},
+            {'limit': campaign_listing.MAX_PAGE_SIZE + 1},
+        ):
+            with self.assertRaises(ListingError, msg=params):
+                self.listing(**params)
+
+
+if __name__ == '__main__':
+    unittest.main()
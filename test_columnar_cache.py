@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Tests for the numpy columnar cache (columnar_cache.py)
+Cached KPIs, chart series and platform totals are checked against the
+SQLite queries they replace, before and after appends and reloads.
+
+Usage:
+    python3 test_columnar_cache.py
+    python3 -m pytest test_columnar_cache.py
+"""
+
+import os
+import sys
+import time
+import random
+import shutil
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import migrations
+import columnar_cache
+import dashboard_queries as dq
+
+PARAMS = ({'days': ['30']}, {'days': ['7'], 'compare': ['year']}, {'days': ['90'], 'campaign_id': ['2']})
+SCOPES = (dq.Scope(), dq.Scope(join_campaigns=True), dq.Scope(1, restricted=True))
+
+
+def _seed(database, rows=300, seed=3):
+    """Three campaigns of two users, plus rows of a deleted campaign"""
+    conn = sqlite3.connect(database)
+    for user_id in (1, 1, 2):
+        conn.execute('''
+            INSERT INTO campaigns (campaign_name, client_name, campaign_type, start_date, budget, user_id)
+            VALUES ('Launch', 'Client', 'seo', date('now', '-120 days'), 1000, ?)
+        ''', (user_id,))
+    rng = random.Random(seed)
+    for _ in range(rows):
+        _insert_roi(conn, rng, rng.choice((1, 2, 3, 9)), rng.randint(0, 120))
+        conn.execute('''
+            INSERT INTO social_media_metrics (campaign_id, platform, date, impressions, engagement, reach, clicks)
+            VALUES (?, ?, date('now', ?), ?, ?, ?, ?)
+        ''', (rng.choice((1, 2, 3)), rng.choice(('instagram', 'tiktok')), f'-{rng.randint(0, 120)} days',
+              rng.randint(0, 1000), rng.randint(0, 100), rng.randint(0, 800), rng.randint(0, 50)))
+    conn.commit()
+    conn.close()
+
+
+def _insert_roi(conn, rng, campaign_id, days_ago):
+    conn.execute('''
+        INSERT INTO roi_metrics (campaign_id, date, revenue, cost, conversions, roi_percentage, roas)
+        VALUES (?, date('now', ?), ?, ?, ?, ?, ?)
+    ''', (campaign_id, f'-{days_ago} days', round(rng.random() * 500, 2), round(rng.random() * 200, 2),
+          rng.randint(0, 9), rng.choice((None, round(rng.random() * 100, 2))), round(rng.random() * 4, 2)))
+
+
+@unittest.skipUnless(columnar_cache.NUMPY_AVAILABLE, 'numpy not installed')
+class ColumnarCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix='columnar-cache-')
+        self.database = os.path.join(self.workdir, 'analytics.db')
+        migrations.migrate(self.database)
+        _seed(self.database)
+        self.conn = sqlite3.connect(self.database)
+        self.conn.row_factory = sqlite3.Row
+        self.cache = columnar_cache.ColumnarCache(self.database).start()
+        self._wait_loaded()
+
+    def tearDown(self):
+        columnar_cache.cache = None
+        self.conn.close()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def _wait_loaded(self):
+        deadline = time.time() + 30
+        while len(self.cache.stats()['tables']) < len(self.cache.tables) or self.cache.stats()['loading']:
+            self.assertLess(time.time(), deadline, 'cache did not load')
+            time.sleep(0.01)
+
+    def _widgets(self, cache):
+        """Every cached widget for every scope and params, with cache (or None) active"""
+        columnar_cache.cache = cache
+        cursor = self.conn.cursor()
+        results = []
+        for scope in SCOPES:
+            for params in PARAMS:
+                since, _ = dq.date_window(params)
+                results.append(dq.kpis(cursor, params, scope))
+                for granularity in ('day', 'week', 'month'):
+                    results.append([dict(row) for row in dq.roi_series(cursor, since, params, scope, granularity)])
+                results.append(dq.social_platforms(cursor, params, scope))
+        return results
+
+    def assertClose(self, expected, actual, path='result'):
+        if isinstance(expected, dict):
+            self.assertEqual(sorted(expected), sorted(actual), path)
+            for key in expected:
+                self.assertClose(expected[key], actual[key], f'{path}.{key}')
+        elif isinstance(expected, (list, tuple)):
+            self.assertEqual(len(expected), len(actual), path)
+            for i, (a, b) in enumerate(zip(expected, actual)):
+                self.assertClose(a, b, f'{path}[{i}]')
+        elif isinstance(expected, float) or isinstance(actual, float):
+            self.assertAlmostEqual(expected, actual, places=6, msg=path)
+        else:
+            self.assertEqual(expected, actual, path)
+
+    def assertMatchesSqlite(self):
+        self.assertClose(self._widgets(None), self._widgets(self.cache))
+
+    def test_matches_sqlite(self):
+        self.assertMatchesSqlite()
+
+    def test_inserts_are_appended(self):
+        rng = random.Random(5)
+        for days_ago in (0, 3, 40):
+            _insert_roi(self.conn, rng, 1, days_ago)
+        self.conn.commit()
+        self.assertMatchesSqlite()
+        stats = self.cache.stats()
+        self.assertEqual((stats['appends'], stats['appended_rows'], stats['reloads']), (1, 3, 0))
+
+    def test_update_reloads(self):
+        self.conn.execute('UPDATE roi_metrics SET revenue = revenue + 100 WHERE roi_id = 1')
+        self.conn.commit()
+        self.assertIsNone(self.cache.snapshot(self.conn.cursor(), 'roi_metrics'))
+        self._wait_loaded()
+        self.assertEqual(self.cache.stats()['reloads'], 1)
+        self.assertMatchesSqlite()
+
+    def test_refresh_reads_outside_the_lock(self):
+        """While one table's new rows are read, cached reads go on"""
+        reading = threading.Event()
+        release = threading.Event()
+        append = self.cache._append
+
+        def slow_append(snapshot):
+            reading.set()
+            release.wait(10)
+            return append(snapshot)
+
+        self.cache._append = slow_append
+        _insert_roi(self.conn, random.Random(1), 1, 0)
+        self.conn.commit()
+        refreshed = []
+        thread = threading.Thread(
+            target=lambda: refreshed.append(self.cache.snapshot(sqlite3.connect(self.database), 'roi_metrics'))
+        )
+        thread.start()
+        try:
+            self.assertTrue(reading.wait(10))
+            cursor = self.conn.cursor()
+            self.assertIsNotNone(self.cache.snapshot(cursor, 'social_media_metrics'))
+            # The refreshing table falls back to SQLite instead of waiting
+            self.assertIsNone(self.cache.snapshot(cursor, 'roi_metrics'))
+            self.assertEqual(self.cache.stats()['refreshing'], ['roi_metrics'])
+        finally:
+            release.set()
+            thread.join()
+        self.assertIsNotNone(refreshed[0])
+        self.assertEqual(self.cache.stats()['refreshing'], [])
+        self.assertMatchesSqlite()
+
+
+if __name__ == '__main__':
+    unittest.main()
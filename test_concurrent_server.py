@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Tests for the bounded worker pool and keep-alive timeouts (concurrent_server.py)
+
+Usage:
+    python3 test_concurrent_server.py
+    python3 -m pytest test_concurrent_server.py
+"""
+
+import os
+import sys
+import time
+import signal
+import socket
+import threading
+import unittest
+import gzip
+from unittest import mock
+import http.client
+from http.server import BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from async_server import run_handler_in_memory
+from concurrent_server import BoundedThreadPoolHTTPServer, KeepAliveTimeoutMixin, ResponseMixin, PreforkSupervisor
+
+
+class _Handler(KeepAliveTimeoutMixin, BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    idle_timeout = 0.2
+    timeout = 2
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._reply(b'ok')
+
+    def do_POST(self):
+        self._reply(self.rfile.read(int(self.headers['Content-Length'])))
+
+    def _reply(self, body):
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class KeepAliveTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = BoundedThreadPoolHTTPServer(('127.0.0.1', 0), _Handler, threads=1, queue_size=4)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.port = self.server.server_address[1]
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join(5)
+
+    def get(self, connection):
+        connection.request('GET', '/')
+        response = connection.getresponse()
+        return response.status, response.read()
+
+    def test_connection_reused_within_idle_timeout(self):
+        connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=5)
+        for _ in range(3):
+            self.assertEqual(self.get(connection), (200, b'ok'))
+        self.assertIsNotNone(connection.sock)
+
+    def test_idle_connection_gives_worker_back(self):
+        idle = http.client.HTTPConnection('127.0.0.1', self.port, timeout=5)
+        self.assertEqual(self.get(idle), (200, b'ok'))
+        # The only worker is held by the idle connection until idle_timeout
+        started = time.monotonic()
+        self.assertEqual(self.get(http.client.HTTPConnection('127.0.0.1', self.port, timeout=5)), (200, b'ok'))
+        self.assertLess(time.monotonic() - started, 1.5)
+
+    def test_slow_request_outlasts_idle_timeout(self):
+        with socket.create_connection(('127.0.0.1', self.port), timeout=5) as sock:
+            sock.sendall(b'POST / HTTP/1.1\r\nContent-Length: 4\r\n\r\nab')
+            time.sleep(0.5)
+            sock.sendall(b'cd')
+            response = b''
+            while not response.endswith(b'abcd'):
+                data = sock.recv(1024)
+                self.assertTrue(data, response)
+                response += data
+            self.assertTrue(response.startswith(b'HTTP/1.1 200'))
+
+
+
+class _Api(ResponseMixin, BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    cors_allow_headers = 'Content-Type, X-Session-ID'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.response_etag = '"v1"'
+        if self.path == '/stream':
+            self._send_stream(iter([b'[1,', b'2]']))
+        elif self.headers.get('If-None-Match') == '"v1"':
+            self._send_not_modified('"v1"')
+        else:
+            self._send_json({'values': list(range(500))})
+
+
+class ResponseMixinTest(unittest.TestCase):
+
+    def get(self, path, **headers):
+        raw = f'GET {path} HTTP/1.1\r\nHost: localhost\r\n'
+        raw += ''.join(f"{name.replace('_', '-')}: {value}\r\n" for name, value in headers.items())
+        response, _ = run_handler_in_memory(_Api, (raw + '\r\n').encode(), ('127.0.0.1', 0), None)
+        head, _, body = response.partition(b'\r\n\r\n')
+        lines = head.decode().split('\r\n')
+        return int(lines[0].split()[1]), dict(line.split(': ', 1) for line in lines[1:]), body
+
+    def test_cors_headers_from_class(self):
+        status, headers, _ = self.get('/')
+        self.assertEqual(status, 200)
+        self.assertEqual(headers['Access-Control-Allow-Headers'], 'Content-Type, X-Session-ID')
+        self.assertEqual(headers['Access-Control-Allow-Origin'], '*')
+
+    def test_compressed_body_gets_its_own_etag(self):
+        status, headers, body = self.get('/', Accept_Encoding='gzip')
+        self.assertEqual((status, headers['Content-Encoding'], headers['ETag']), (200, 'gzip', '"v1-gzip"'))
+        self.assertEqual(gzip.decompress(body), b'{"values": [' + ', '.join(map(str, range(500))).encode() + b']}')
+
+    def test_not_modified(self):
+        status, headers, body = self.get('/', If_None_Match='"v1"')
+        self.assertEqual((status, headers['ETag'], body), (304, '"v1"', b''))
+
+    def test_stream_is_chunked(self):
+        status, headers, body = self.get('/stream')
+        self.assertEqual((status, headers['Transfer-Encoding']), (200, 'chunked'))
+        self.assertEqual(body, b'3\r\n[1,\r\n2\r\n2]\r\n0\r\n\r\n')
+
+
+
+class _FakeSupervisor(PreforkSupervisor):
+    """Hands out made-up worker pids instead of forking"""
+
+    def _spawn(self, slot):
+        self.children[1000 + slot] = (slot, time.monotonic())
+
+    def _signal_children(self, signum):
+        pass
+
+
+class PreforkSupervisorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.handlers = {signum: signal.getsignal(signum) for signum in (signal.SIGINT, signal.SIGTERM)}
+
+    def tearDown(self):
+        for signum, handler in self.handlers.items():
+            signal.signal(signum, handler)
+
+    def test_unrelated_child_exit_is_ignored(self):
+        supervisor = _FakeSupervisor(object, workers=2)
+        # waitpid(-1) also reaps children the supervisor did not spawn
+        exits = iter([(99999, 0), (1000, 0), (1001, 0)])
+
+        def waitpid(pid, options):
+            result = next(exits)
+            if result[0] == 1000:
+                supervisor._stopping = True
+            return result
+
+        with mock.patch('concurrent_server.os.waitpid', waitpid):
+            supervisor.run()
+        self.assertEqual((supervisor.children, supervisor.restarts), ({}, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
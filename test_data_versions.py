@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Tests for the per-table data versions behind ETags (data_versions.py)
+
+Usage:
+    python3 test_data_versions.py
+    python3 -m pytest test_data_versions.py
+"""
+
+import os
+import sys
+import json
+import shutil
+import sqlite3
+import hashlib
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import db_pool
+import migrations
+from async_server import run_handler_in_memory
+from data_versions import compute_etag, get_versions, matching_etag
+from response_cache import response_cache
+
+DATABASE = 'shotlist_analytics.db'
+PASSWORD = 'etag-check-1'
+
+
+def _request(handler_class, method, path, body=None, headers=None):
+    """(status, {header: value}, body) of a request run in memory"""
+    data = json.dumps(body).encode() if body is not None else b''
+    head = f'{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(data)}\r\n'
+    for name, value in (headers or {}).items():
+        head += f'{name}: {value}\r\n'
+    raw, _ = run_handler_in_memory(handler_class, (head + '\r\n').encode() + data, ('127.0.0.1', 0), None)
+    head, _, body = raw.partition(b'\r\n\r\n')
+    lines = head.decode().split('\r\n')
+    fields = dict(line.split(': ', 1) for line in lines[1:])
+    return int(lines[0].split()[1]), fields, body
+
+
+class EtagTest(unittest.TestCase):
+
+    def test_etag_ignores_param_order(self):
+        first = compute_etag('/api/kpis', {'days': ['7'], 'compare': ['year']}, 1, (3, 4))
+        self.assertEqual(first, compute_etag('/api/kpis', {'compare': ['year'], 'days': ['7']}, 1, (3, 4)))
+        self.assertNotEqual(first, compute_etag('/api/kpis', {'days': ['7'], 'compare': ['year']}, 2, (3, 4)))
+        self.assertNotEqual(first, compute_etag('/api/kpis', {'days': ['7'], 'compare': ['year']}, 1, (3, 5)))
+
+    def test_matching_etag(self):
+        etag = '"abc"'
+        self.assertEqual(matching_etag('"abc"', etag), '"abc"')
+        self.assertEqual(matching_etag('"x", W/"abc-gzip"', etag), '"abc-gzip"')
+        self.assertEqual(matching_etag('*', etag), etag)
+        self.assertIsNone(matching_etag('"abcd"', etag))
+        self.assertIsNone(matching_etag(None, etag))
+
+
+class UserVersionTest(unittest.TestCase):
+    """Only writes that change what a user may see move the users version"""
+
+    @classmethod
+    def setUpClass(cls):
+        # The servers use the default database path, so run them in a scratch directory
+        cls.cwd = os.getcwd()
+        cls.workdir = tempfile.mkdtemp(prefix='data-versions-')
+        os.chdir(cls.workdir)
+        migrations.migrate(DATABASE)
+        conn = sqlite3.connect(DATABASE)
+        digest = hashlib.sha256(PASSWORD.encode()).hexdigest()
+        for username, role in (('admin', 'admin'), ('client', 'client')):
+            conn.execute('''
+                INSERT INTO users (username, email, password, password_hash, full_name, role, provider)
+                VALUES (?, ?, ?, ?, ?, ?, 'email')
+            ''', (username, f'{username}@example.com', digest, digest, username.title(), role))
+        conn.executescript('''
+            INSERT INTO campaigns (campaign_name, client_name, campaign_type, start_date, budget, user_id)
+            VALUES ('Launch', 'Client', 'seo', date('now', '-60 days'), 1000, 2);
+            INSERT INTO roi_metrics (campaign_id, date, revenue, cost, conversions, roi_percentage, roas)
+            VALUES (1, date('now', '-1 day'), 200, 100, 3, 100, 2);
+        ''')
+        conn.commit()
+        conn.close()
+
+        import api_server_auth
+        cls.api = api_server_auth.AuthenticatedAPI
+
+    @classmethod
+    def tearDownClass(cls):
+        db_pool.pool.close_all()
+        os.chdir(cls.cwd)
+        shutil.rmtree(cls.workdir, ignore_errors=True)
+
+    def setUp(self):
+        response_cache.clear()
+        self.conn = sqlite3.connect(DATABASE)
+
+    def tearDown(self):
+        self.conn.close()
+        db_pool.release_thread()
+
+    def users_version(self):
+        return get_versions(self.conn, ['users'])[0]
+
+    def login(self, username):
+        status, _, body = _request(self.api, 'POST', '/api/login', {'username': username, 'password': PASSWORD})
+        self.assertEqual(status, 200)
+        return json.loads(body)['session_id']
+
+    def get(self, session, path='/api/kpis?days=30', etag=None):
+        headers = {'X-Session-ID': session}
+        if etag:
+            headers['If-None-Match'] = etag
+        return _request(self.api, 'GET', path, headers=headers)
+
+    def set_role(self, username, role):
+        self.conn.execute('UPDATE users SET role = ? WHERE username = ?', (role, username))
+        self.conn.commit()
+
+    def test_last_login_update_is_not_counted(self):
+        version = self.users_version()
+        self.conn.execute("UPDATE users SET last_login = datetime('now'), full_name = 'Renamed'")
+        self.conn.execute("UPDATE users SET role = role, is_active = is_active")
+        self.conn.commit()
+        self.assertEqual(self.users_version(), version)
+
+    def test_role_and_account_changes_are_counted(self):
+        version = self.users_version()
+        self.set_role('client', 'viewer')
+        self.set_role('client', 'client')
+        self.conn.execute("UPDATE users SET is_active = 0 WHERE username = 'admin'")
+        self.conn.execute("UPDATE users SET is_active = 1 WHERE username = 'admin'")
+        self.conn.execute("INSERT INTO users (username, email, password, role) VALUES ('new', 'new@example.com', 'x', 'client')")
+        self.conn.execute("DELETE FROM users WHERE username = 'new'")
+        self.conn.commit()
+        self.assertEqual(self.users_version(), version + 6)
+
+    def test_login_keeps_earlier_etag_valid(self):
+        session = self.login('client')
+        status, headers, _ = self.get(session)
+        self.assertEqual(status, 200)
+        etag = headers['ETag']
+
+        # Logins of this and other users write users.last_login
+        self.login('admin')
+        self.login('client')
+        status, headers, body = self.get(session, etag=etag)
+        self.assertEqual((status, body), (304, b''))
+        self.assertEqual(headers['ETag'], etag)
+
+    def test_login_keeps_cached_response(self):
+        session = self.login('client')
+        status, _, first = self.get(session)
+        self.assertEqual(status, 200)
+        hits = response_cache.stats()['hits']
+
+        self.login('admin')
+        # No If-None-Match: answered from response_cache, not recomputed
+        status, _, second = self.get(session)
+        self.assertEqual((status, second), (200, first))
+        self.assertEqual(response_cache.stats()['hits'], hits + 1)
+
+    def test_role_change_invalidates_etag(self):
+        session = self.login('client')
+        etag = self.get(session)[1]['ETag']
+        self.set_role('admin', 'viewer')
+        try:
+            status, headers, _ = self.get(session, etag=etag)
+        finally:
+            self.set_role('admin', 'admin')
+        self.assertEqual(status, 200)
+        self.assertNotEqual(headers['ETag'], etag)
+
+
+if __name__ == '__main__':
+    unittest.main()
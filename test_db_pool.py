@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Tests for the SQLite connection pool (db_pool.py)
+
+Usage:
+    python3 test_db_pool.py
+    python3 -m pytest test_db_pool.py
+"""
+
+import os
+import sys
+import shutil
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from db_pool import ConnectionPool
+
+
+class ConnectionPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix='db-pool-')
+        self.database = os.path.join(self.workdir, 'analytics.db')
+        conn = sqlite3.connect(self.database)
+        conn.execute('CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)')
+        conn.commit()
+        conn.close()
+        self.pool = ConnectionPool(health_check_interval=0, leak_timeout=0)
+
+    def tearDown(self):
+        self.pool.close_all()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def in_thread(self, function):
+        result = []
+        thread = threading.Thread(target=lambda: result.append(function()))
+        thread.start()
+        thread.join(5)
+        return result[0]
+
+    def count(self):
+        conn = sqlite3.connect(self.database)
+        try:
+            return conn.execute('SELECT COUNT(*) FROM items').fetchone()[0]
+        finally:
+            conn.close()
+
+    def test_thread_reuses_its_connection(self):
+        first = self.pool.connect(self.database)
+        first.close()
+        second = self.pool.connect(self.database)
+        second.close()
+        self.assertIs(first, second)
+        self.assertEqual((self.pool.opened, self.pool.reused), (1, 1))
+
+    def test_threads_get_their_own_connection(self):
+        mine = self.pool.connect(self.database)
+        theirs = self.in_thread(lambda: self.pool.connect(self.database))
+        self.assertIsNot(mine, theirs)
+        self.assertEqual(self.pool.opened, 2)
+        mine.close()
+
+    def test_row_factory_is_part_of_the_key(self):
+        rows = self.pool.connect(self.database)
+        tuples = self.pool.connect(self.database, row_factory=None)
+        self.assertIsNot(rows, tuples)
+        self.assertIsInstance(rows.execute('SELECT 1 AS one').fetchone(), sqlite3.Row)
+        self.assertEqual(tuples.execute('SELECT 1').fetchone(), (1,))
+        rows.close()
+        tuples.close()
+
+    def test_nested_callers_share_a_reference_count(self):
+        outer = self.pool.connect(self.database)
+        inner = self.pool.connect(self.database)
+        self.assertIs(outer, inner)
+        outer.execute("INSERT INTO items (name) VALUES ('kept')")
+        inner.close()
+        # Still referenced by the outer caller: the transaction survives
+        self.assertTrue(outer.in_transaction)
+        outer.commit()
+        outer.close()
+        self.assertEqual(self.count(), 1)
+
+    def test_last_close_rolls_back(self):
+        conn = self.pool.connect(self.database)
+        conn.execute("INSERT INTO items (name) VALUES ('dropped')")
+        conn.close()
+        self.assertFalse(conn.in_transaction)
+        self.assertEqual(self.count(), 0)
+
+    def test_release_thread_returns_leaked_connection(self):
+        conn = self.pool.connect(self.database)
+        conn.execute("INSERT INTO items (name) VALUES ('leaked')")
+        with self.assertLogs('db_pool', 'WARNING'):
+            self.pool.release_thread()
+        self.assertEqual((conn.refs, self.pool.leaks), (0, 1))
+        self.assertEqual(self.count(), 0)
+        self.assertIs(self.pool.connect(self.database), conn)
+        conn.close()
+
+    def test_check_leaks_reports_once(self):
+        conn = self.pool.connect(self.database)
+        with self.assertLogs('db_pool', 'WARNING'):
+            self.assertEqual(self.pool.check_leaks(), [conn])
+        self.assertEqual(self.pool.check_leaks(), [conn])
+        self.assertEqual(self.pool.leaks, 1)
+        conn.close()
+        self.assertEqual(self.pool.check_leaks(), [])
+
+    def test_replaced_database_is_reopened(self):
+        conn = self.pool.connect(self.database)
+        conn.close()
+        replacement = os.path.join(self.workdir, 'replacement.db')
+        shutil.copy(self.database, replacement)
+        os.replace(replacement, self.database)
+
+        with self.assertLogs('db_pool', 'WARNING'):
+            reopened = self.pool.connect(self.database)
+        self.assertIsNot(reopened, conn)
+        self.assertEqual(self.pool.health_check_failures, 1)
+        self.assertEqual(self.pool.stats()['open'], 1)
+        reopened.close()
+
+    def test_close_thread(self):
+        conn = self.pool.connect(self.database)
+        conn.close()
+        self.pool.close_thread()
+        self.assertEqual(self.pool.stats()['open'], 0)
+        with self.assertRaises(sqlite3.ProgrammingError):
+            conn.execute('SELECT 1')
+
+    def test_connect_after_close_all_reopens(self):
+        conn = self.pool.connect(self.database)
+        conn.close()
+        self.pool.close_all()
+        reopened = self.pool.connect(self.database)
+        self.assertIsNot(reopened, conn)
+        self.assertEqual(reopened.execute('SELECT COUNT(*) FROM items').fetchone()[0], 0)
+        reopened.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Tests for the LTTB chart downsampling (downsampling.py)
+
+Usage:
+    python3 test_downsampling.py
+    python3 -m pytest test_downsampling.py
+"""
+
+import os
+import sys
+import random
+import unittest
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import downsampling
+
+
+def _both_paths(function, *args):
+    """(numpy result, pure-Python result) of function(*args)"""
+    found = downsampling.NUMPY_AVAILABLE
+    try:
+        results = []
+        for use_numpy in (True, False):
+            downsampling.NUMPY_AVAILABLE = use_numpy and found
+            results.append(function(*args))
+        return results
+    finally:
+        downsampling.NUMPY_AVAILABLE = found
+
+
+class LttbTest(unittest.TestCase):
+
+    def test_keeps_first_last_and_at_most_threshold(self):
+        x = list(range(100))
+        kept = downsampling.lttb(x, [[random.Random(1).random() for _ in x]], 10)
+        self.assertEqual(len(kept), 10)
+        self.assertEqual((kept[0], kept[-1]), (0, 99))
+        self.assertEqual(kept, sorted(set(kept)))
+
+    def test_short_series_returned_whole(self):
+        self.assertEqual(downsampling.lttb([1, 2, 3], [[5, 6, 7]], 10), [0, 1, 2])
+
+    def test_keeps_spike(self):
+        x = list(range(200))
+        values = [1.0] * 200
+        values[137] = 50.0
+        self.assertIn(137, downsampling.lttb(x, [values], 20))
+
+    def test_threshold_below_minimum(self):
+        with self.assertRaises(downsampling.DownsampleError):
+            downsampling.lttb(list(range(10)), [list(range(10))], 2)
+
+    @unittest.skipUnless(downsampling.NUMPY_AVAILABLE, 'numpy not installed')
+    def test_numpy_and_python_pick_same_points(self):
+        rng = random.Random(7)
+        x = list(range(2000))
+        series = [[rng.gauss(0, 1) for _ in x] for _ in range(3)]
+        numpy_kept, python_kept = _both_paths(downsampling.lttb, x, series, 57)
+        self.assertEqual(numpy_kept, python_kept)
+
+    @unittest.skipUnless(downsampling.NUMPY_AVAILABLE, 'numpy not installed')
+    def test_none_counts_as_zero_on_both_paths(self):
+        x = list(range(20))
+        series = [[i * (-1) ** i if i % 4 else None for i in x], [float('nan') if i == 3 else i for i in x]]
+        numpy_kept, python_kept = _both_paths(downsampling.lttb, x, series, 6)
+        self.assertEqual(numpy_kept, python_kept)
+        zeros = [[i * (-1) ** i if i % 4 else 0 for i in x], [0 if i == 3 else i for i in x]]
+        self.assertEqual(numpy_kept, downsampling.lttb(x, zeros, 6))
+
+
+class MaxPointsTest(unittest.TestCase):
+
+    def test_absent_or_empty(self):
+        self.assertIsNone(downsampling.max_points({}))
+        self.assertIsNone(downsampling.max_points({'max_points': ['']}))
+
+    def test_parsed(self):
+        self.assertEqual(downsampling.max_points({'max_points': ['500']}), 500)
+
+    def test_invalid(self):
+        for value in ('abc', '2', str(downsampling.MAX_POINTS + 1)):
+            with self.assertRaises(downsampling.DownsampleError):
+                downsampling.max_points({'max_points': [value]})
+
+
+class ChartTest(unittest.TestCase):
+
+    def setUp(self):
+        start = date(2024, 1, 1)
+        self.labels = [(start + timedelta(days=i)).isoformat() for i in range(100)]
+
+    def test_chart_series_stay_aligned(self):
+        chart = {'labels': self.labels, 'revenue': list(range(100)), 'cost': [None] * 100}
+        reduced = downsampling.downsample_chart(chart, ('revenue', 'cost'), 10)
+        self.assertEqual(reduced['downsampled_from'], 100)
+        self.assertEqual(len(reduced['labels']), 10)
+        for label, revenue in zip(reduced['labels'], reduced['revenue']):
+            self.assertEqual(self.labels.index(label), revenue)
+
+    def test_chart_untouched_without_points(self):
+        chart = {'labels': self.labels, 'data': list(range(100))}
+        self.assertIs(downsampling.downsample_chart(chart, ('data',), None), chart)
+        self.assertIs(downsampling.downsample_chart(chart, ('data',), 100), chart)
+
+    def test_descending_rows_stay_descending(self):
+        rows = [{'date': label, 'followers': i} for i, label in enumerate(self.labels)][::-1]
+        kept = downsampling.downsample_rows(rows, ('followers',), 10)
+        self.assertEqual(len(kept), 10)
+        self.assertEqual(kept[0], rows[0])
+        self.assertEqual(kept[-1], rows[-1])
+        self.assertEqual([row['date'] for row in kept], sorted((row['date'] for row in kept), reverse=True))
+
+
+if __name__ == '__main__':
+    unittest.main()
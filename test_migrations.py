@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Tests for the schema migrations (migrations.py)
+
+Usage:
+    python3 test_migrations.py
+    python3 -m pytest test_migrations.py
+"""
+
+import os
+import re
+import sys
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import rollups
+import migrations
+
+
+def _schema(database):
+    """{name: SQL with whitespace normalized} of every table, index and trigger"""
+    conn = sqlite3.connect(database)
+    try:
+        return {
+            name: re.sub(r'\s+', ' ', sql or '').strip()
+            for name, sql in conn.execute("SELECT name, sql FROM sqlite_master WHERE name != 'sqlite_sequence'")
+        }
+    finally:
+        conn.close()
+
+
+class MigrationsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix='migrations-')
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def database(self, name='analytics.db'):
+        return os.path.join(self.workdir, name)
+
+    def test_versions_are_sequential(self):
+        self.assertEqual([version for version, _, _ in migrations.MIGRATIONS],
+                         list(range(1, len(migrations.MIGRATIONS) + 1)))
+
+    def test_migrate_is_idempotent(self):
+        database = self.database()
+        applied = migrations.migrate(database)
+        self.assertEqual(len(applied), len(migrations.MIGRATIONS))
+        schema = _schema(database)
+        self.assertEqual(migrations.migrate(database), [])
+        self.assertEqual(_schema(database), schema)
+        self.assertEqual(migrations.current_version(database), len(migrations.MIGRATIONS))
+
+    def test_stepwise_matches_fresh(self):
+        fresh, stepwise = self.database('fresh.db'), self.database('stepwise.db')
+        migrations.migrate(fresh)
+        for target in (1, 8, 11, None):
+            migrations.migrate(stepwise, target)
+        self.assertEqual(_schema(stepwise), _schema(fresh))
+
+    def test_target_stops_early(self):
+        database = self.database()
+        self.assertEqual([version for version, _ in migrations.migrate(database, 8)], list(range(1, 9)))
+        self.assertEqual(migrations.current_version(database), 8)
+        self.assertNotIn('data_versions', _schema(database))
+        pending = [version for version, _, applied_at in migrations.status(database) if applied_at is None]
+        self.assertEqual(pending, list(range(9, len(migrations.MIGRATIONS) + 1)))
+
+    def test_backfills_existing_rows(self):
+        database = self.database()
+        migrations.migrate(database, 10)
+        conn = sqlite3.connect(database)
+        conn.executemany(
+            'INSERT INTO roi_metrics (campaign_id, date, revenue, roi_percentage) VALUES (?, ?, ?, ?)',
+            [(1, '2025-01-01', 10, None), (1, '2025-01-01', 5, 20), (2, '2025-01-03', 7, 40)]
+        )
+        conn.commit()
+        migrations.migrate(database)
+        self.assertEqual(
+            conn.execute('SELECT date, revenue, roi_count, row_count FROM roi_prefix_sums ORDER BY date').fetchall(),
+            [('2025-01-01', 15, 1, 2), ('2025-01-03', 22, 2, 3)]
+        )
+        conn.close()
+        self.assertEqual(rollups.check(database), {
+            rollup.table: [] for rollup in rollups.ROLLUPS + rollups.PREFIX_SUMS
+        })
+
+    def test_rollup_definitions_match_schema(self):
+        """rollups.py rebuilds and checks the tables the migrations created"""
+        database = self.database()
+        migrations.migrate(database)
+        conn = sqlite3.connect(database)
+        try:
+            for rollup in rollups.ROLLUPS + rollups.PREFIX_SUMS:
+                columns = [row[1] for row in conn.execute(f'PRAGMA table_info({rollup.table})')]
+                self.assertEqual(columns, list(rollup.keys) + rollup.value_columns, rollup.table)
+        finally:
+            conn.close()
+        self.assertTrue(all(rows == 0 for rows in rollups.rebuild(database).values()))
+
+    def test_failed_migration_rolls_back(self):
+        database = self.database()
+
+        def broken(cursor):
+            cursor.execute('CREATE TABLE half_done (id INTEGER)')
+            raise sqlite3.OperationalError('boom')
+
+        shipped = migrations.MIGRATIONS
+        migrations.MIGRATIONS = shipped[:2] + [(3, 'broken', broken)]
+        try:
+            with self.assertRaises(sqlite3.OperationalError):
+                migrations.migrate(database)
+        finally:
+            migrations.MIGRATIONS = shipped
+        self.assertEqual(migrations.current_version(database), 2)
+        self.assertNotIn('half_done', _schema(database))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Tests for period-over-period comparisons (period_comparison.py)
+
+Usage:
+    python3 test_period_comparison.py
+    python3 -m pytest test_period_comparison.py
+"""
+
+import os
+import sys
+import sqlite3
+import unittest
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import period_comparison
+from period_comparison import ComparisonError, Comparison, Metric, Window, from_params
+
+NOW = datetime(2025, 3, 31, 15, 30)
+
+
+def _windows(params, now=NOW):
+    comparison = from_params(params, now)
+    return comparison.mode, comparison.current.to_dict(), comparison.baseline.to_dict()
+
+
+class BaselineTest(unittest.TestCase):
+
+    def test_previous_period_is_the_default(self):
+        self.assertEqual(_windows({}), (
+            'previous',
+            {'start': '2025-03-01', 'end': None},
+            {'start': '2025-01-30', 'end': '2025-03-01'},
+        ))
+
+    def test_previous_period_touches_current(self):
+        _, current, baseline = _windows({'days': ['7'], 'compare': ['previous']})
+        self.assertEqual(baseline['end'], current['start'])
+        self.assertEqual(Window(**baseline).days(), 7)
+
+    def test_same_period_last_year(self):
+        self.assertEqual(_windows({'days': ['7'], 'compare': ['year']}), (
+            'year',
+            {'start': '2025-03-24', 'end': None},
+            {'start': '2024-03-24', 'end': '2024-04-01'},
+        ))
+
+    def test_last_year_of_a_leap_day(self):
+        _, _, baseline = _windows({'days': ['1'], 'compare': ['year']}, datetime(2024, 2, 29, 12))
+        self.assertEqual(baseline, {'start': '2023-02-28', 'end': '2023-03-01'})
+
+    def test_custom_baseline_includes_its_end_day(self):
+        _, _, baseline = _windows({
+            'compare': ['custom'], 'baseline_start': ['2024-12-01'], 'baseline_end': ['2024-12-31']
+        })
+        self.assertEqual(baseline, {'start': '2024-12-01', 'end': '2025-01-01'})
+        self.assertEqual(Window(**baseline).days(), 31)
+
+    def test_invalid_parameters(self):
+        for params in (
+            {'days': ['x']},
+            {'days': ['0']},
+            {'compare': ['quarter']},
+            {'compare': ['custom']},
+            {'compare': ['custom'], 'baseline_start': ['2024-12-01']},
+            {'compare': ['custom'], 'baseline_start': ['2024-12-01'], 'baseline_end': ['12/31/2024']},
+            {'compare': ['custom'], 'baseline_start': ['2024-12-31'], 'baseline_end': ['2024-12-01']},
+        ):
+            with self.assertRaises(ComparisonError, msg=params):
+                from_params(params, NOW)
+
+    def test_comparison_error_is_a_value_error(self):
+        self.assertTrue(issubclass(ComparisonError, ValueError))
+
+    def test_window_condition(self):
+        self.assertEqual(Window('2025-01-01').condition('r.date'), ('r.date >= ?', ['2025-01-01']))
+        self.assertEqual(Window('2025-01-01', '2025-02-01').condition('date'),
+                         ('date >= ? AND date < ?', ['2025-01-01', '2025-02-01']))
+
+
+class CompareTest(unittest.TestCase):
+
+    METRICS = (
+        Metric('traffic', 's.traffic'),
+        Metric('rank', 's.rank', aggregate='AVG', change='difference', digits=1),
+        Metric('rate', 's.hits', per='s.visits', digits=2),
+        Metric('authority', 's.authority', aggregate='AVG', change=None),
+    )
+
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('CREATE TABLE stats (campaign_id INTEGER, date DATE, traffic INTEGER, '
+                          'rank REAL, hits INTEGER, visits INTEGER, authority INTEGER)')
+        self.conn.executemany('INSERT INTO stats VALUES (?, ?, ?, ?, ?, ?, ?)', [
+            (1, '2025-01-31', 1000, 1, 1, 1, 99),   # before the baseline
+            (1, '2025-02-01', 100, 10, 1, 4, 20),
+            (2, '2025-02-20', 300, 20, 1, 4, 30),
+            (1, '2025-03-01', 150, 6, 3, 4, 40),
+            (1, '2025-03-15', 250, 4, 5, 6, 50),
+            (2, '2025-03-20', 50, 2, 0, 0, 60),
+        ])
+        self.comparison = Comparison('previous', Window('2025-03-01'), Window('2025-02-01', '2025-03-01'))
+
+    def tearDown(self):
+        self.conn.close()
+
+    def test_both_periods_in_one_query(self):
+        values = period_comparison.compare(self.conn.cursor(), 'stats', 's', self.METRICS, self.comparison)
+        self.assertEqual(values['traffic'], (450, 400))
+        self.assertEqual(values['rank'], (4, 15))
+        self.assertEqual(values['rate'], (8 / 10, 2 / 8))
+        # Metrics without a change don't compute a baseline
+        self.assertEqual(values['authority'], (50, 0))
+
+    def test_filter_applies_to_both_periods(self):
+        values = period_comparison.compare(self.conn.cursor(), 'stats', 's', self.METRICS, self.comparison,
+                                           where=' AND s.campaign_id = ?', args=(2,))
+        self.assertEqual(values['traffic'], (50, 300))
+        self.assertEqual(values['rate'], (0, 0.25))
+
+    def test_empty_periods(self):
+        comparison = Comparison('custom', Window('2026-01-01'), Window('2020-01-01', '2020-02-01'))
+        values = period_comparison.compare(self.conn.cursor(), 'stats', 's', self.METRICS, comparison)
+        self.assertEqual(values, {'traffic': (0, 0), 'rank': (0, 0), 'rate': (0, 0), 'authority': (0, 0)})
+
+    def test_cards(self):
+        values = period_comparison.compare(self.conn.cursor(), 'stats', 's', self.METRICS, self.comparison)
+        self.assertEqual(period_comparison.cards(self.METRICS, values), {
+            'traffic': {'value': 450, 'change': 12.5},
+            'rank': {'value': 4.0, 'change': -11.0},
+            'rate': {'value': 0.8, 'change': 220.0},
+            'authority': {'value': 50, 'change': 0},
+        })
+
+    def test_calc_change_without_baseline(self):
+        self.assertEqual(period_comparison.calc_change(10, 0), 0)
+        self.assertEqual(period_comparison.calc_change(10, None), 0)
+        self.assertEqual(period_comparison.calc_change(5, 10), -50.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
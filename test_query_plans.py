@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Query plan regression tests for the SHOTLIST API servers
+Runs the request handlers in memory against a freshly migrated database,
+records every SQL statement they issue and checks its EXPLAIN QUERY PLAN:
+a full table scan or a temp B-tree sort fails the suite unless it is listed
+in ACCEPTED_PLANS with the reason it is fine.
+
+Usage:
+    python3 test_query_plans.py
+    python3 -m pytest test_query_plans.py
+"""
+
+import os
+import re
+import sys
+import json
+import shutil
+import sqlite3
+import hashlib
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import db_pool
+import migrations
+from async_server import run_handler_in_memory
+from response_cache import response_cache
+
+DATABASE = 'shotlist_analytics.db'
+PASSWORD = 'plan-check-1'
+
+FULL_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)$')
+TEMP_BTREE = 'USE TEMP B-TREE'
+
+# (statement regex, plan detail regex, why the plan is acceptable)
+ACCEPTED_PLANS = [
+    (r'^SELECT \* FROM social_media_config$', r'^SCAN social_media_config$',
+     'the tracking config is always read whole: one row per platform'),
+    (r'FROM roi_daily_rollup r JOIN campaigns c .* AND c\.user_id = ', r'^USE TEMP B-TREE FOR GROUP BY$',
+     "a client's series merges the date-ordered runs of their own campaigns; "
+     "the sort holds one row per date"),
+    (r'FROM \( SELECT r\.date, .* FROM roi_daily_rollup r.* GROUP BY r\.date \) d GROUP BY 1',
+     r'^(?:SCAN d|USE TEMP B-TREE FOR GROUP BY)$',
+     'weekly, monthly and quarterly chart buckets regroup the per-date totals: one row per date'),
+    (r'FROM social_daily_rollup s .*GROUP BY s\.platform', r'^USE TEMP B-TREE FOR GROUP BY$',
+     'grouping by platform sorts at most one row per platform'),
+    (r'FROM campaigns c LEFT JOIN roi_campaign_prefix_sums p ON p\.campaign_id = c\.campaign_id', r'^SCAN c$',
+     'the unfiltered listing totals every campaign in scope; each one is two primary key lookups'),
+    (r'FROM campaigns c LEFT JOIN roi_campaign_prefix_sums p ON p\.campaign_id = c\.campaign_id',
+     r'^USE TEMP B-TREE FOR (?:RIGHT PART OF )?ORDER BY$',
+     'listings sort on computed totals: one row per campaign, bounded by LIMIT when paginated'),
+    (r'\) ids LEFT JOIN roi_(?:campaign_)?prefix_sums current_end ', r'^SCAN (?:ids|c)$',
+     'running totals are looked up per campaign in scope, or once from a single row for every campaign'),
+]
+
+# Requests covering the database-backed handlers that don't call third-party
+# APIs. Auth server requests run once as the admin and once as the client.
+AUTH_REQUESTS = [
+    ('GET', '/api/verify-session', None),
+    ('GET', '/api/user-info', None),
+    ('GET', '/api/campaigns', None),
+    ('GET', '/api/campaigns?type=seo', None),
+    ('GET', '/api/campaigns?status=active', None),
+    ('GET', '/api/campaigns?type=seo&status=active', None),
+    ('GET', '/api/campaigns?sort=roi&limit=1', None),
+    ('GET', '/api/kpis', None),
+    ('GET', '/api/kpis?campaign_id=1', None),
+    ('GET', '/api/kpis?compare=year', None),
+    ('GET', '/api/kpis?days=7', None),
+    ('GET', '/api/roi-trend?days=90', None),
+    ('GET', '/api/roi-trend?days=365', None),
+    ('GET', '/api/revenue-cost?days=90&max_points=10', None),
+    ('GET', '/api/revenue-cost?days=1000&granularity=quarter', None),
+    ('GET', '/api/revenue-cost?campaign_id=1', None),
+    ('GET', '/api/social-media', None),
+    ('GET', '/api/seo-metrics', None),
+    ('GET', '/api/seo-metrics?compare=custom&baseline_start=2024-01-01&baseline_end=2024-01-31', None),
+    ('GET', '/api/dashboard', None),
+    ('GET', '/api/dashboard?campaign_id=1', None),
+    ('GET', '/api/calendar', None),
+    ('GET', '/api/export', None),
+]
+
+PLAIN_REQUESTS = [
+    ('GET', '/api/campaigns', None),
+    ('GET', '/api/campaigns?type=seo', None),
+    ('GET', '/api/campaigns?status=active', None),
+    ('GET', '/api/campaigns?client=Client&sort=spent&order=asc', None),
+    ('GET', '/api/campaigns?sort=campaign_name&limit=1', None),
+    ('GET', '/api/campaigns?sort=campaign_name&limit=1&cursor=WyJjYW1wYWlnbl9uYW1lIiwiZGVzYyIsIkxhdW5jaCIsMV0', None),
+    ('GET', '/api/kpis', None),
+    ('GET', '/api/kpis?campaign_id=1', None),
+    ('GET', '/api/kpis?compare=year', None),
+    ('GET', '/api/roi-trend', None),
+    ('GET', '/api/roi-trend?days=365&granularity=month', None),
+    ('GET', '/api/revenue-cost?campaign_id=1', None),
+    ('GET', '/api/social-media', None),
+    ('GET', '/api/seo-metrics', None),
+    ('GET', '/api/seo-metrics?compare=custom&baseline_start=2024-01-01&baseline_end=2024-01-31', None),
+    ('GET', '/api/dashboard', None),
+    ('GET', '/export-data', None),
+    ('GET', '/api/social-media/accounts?user_id=2', None),
+    ('GET', '/api/social-media/settings?user_id=2', None),
+    ('GET', '/api/social-media/audit?account_id=1', None),
+    ('GET', '/api/social-media/metrics/daily?account_id=1&platform=instagram', None),
+    ('GET', '/api/social-media/metrics/daily?account_id=1&platform=instagram&max_points=3', None),
+    ('GET', '/api/social-media/metrics/monthly?account_id=1&platform=instagram', None),
+    ('GET', '/api/social-media/metrics/summary?account_id=1&platform=instagram', None),
+    ('GET', '/api/social-media/metrics/content?account_id=1&platform=instagram', None),
+    ('GET', '/api/social-media/metrics/audience?account_id=1&platform=instagram', None),
+    ('POST', '/api/social-media/settings', {'user_id': 2, 'auto_post': 1}),
+    ('POST', '/api/social-media/metrics/daily', {'account_id': 1, 'platform': 'instagram', 'followers': 10}),
+    ('POST', '/api/social-media/metrics/content', {'account_id': 1, 'platform': 'instagram', 'post_id': 'p2'}),
+    ('POST', '/api/social-media/metrics/daily/bulk', [{'account_id': 1, 'platform': 'instagram', 'date': '2025-01-01'}]),
+    ('POST', '/api/social-media/metrics/content/bulk', [{'account_id': 1, 'platform': 'instagram', 'post_id': 'p3'}]),
+    ('POST', '/api/social-media/metrics/audience/bulk', [{'account_id': 1, 'platform': 'instagram'}]),
+    ('POST', '/api/ads-platforms/status', {}),
+    ('POST', '/api/notion/config', {}),
+    ('POST', '/api/social-media/disconnect', {'account_id': 1}),
+]
+
+statements = []
+responses = []
+_workdir = None
+_cwd = None
+
+
+def _seed(database):
+    """Two users and one row in each table the handlers read"""
+    conn = sqlite3.connect(database)
+    digest = hashlib.sha256(PASSWORD.encode()).hexdigest()
+    for username, role in (('admin', 'admin'), ('client', 'client')):
+        conn.execute('''
+            INSERT INTO users (username, email, password, password_hash, full_name, role, provider)
+            VALUES (?, ?, ?, ?, ?, ?, 'email')
+        ''', (username, f'{username}@example.com', digest, digest, username.title(), role))
+
+    conn.executescript('''
+        INSERT INTO campaigns (campaign_name, client_name, campaign_type, start_date, budget, user_id)
+        VALUES ('Launch', 'Client', 'seo', date('now', '-60 days'), 1000, 2);
+        INSERT INTO roi_metrics (campaign_id, date, revenue, cost, conversions, roi_percentage, roas)
+        VALUES (1, date('now', '-1 day'), 200, 100, 3, 100, 2);
+        INSERT INTO seo_metrics (campaign_id, date, organic_traffic, keyword_rankings, backlinks, domain_authority)
+        VALUES (1, date('now', '-1 day'), 50, 10, 5, 20);
+        INSERT INTO social_media_metrics (campaign_id, platform, date, impressions, engagement, reach)
+        VALUES (1, 'instagram', date('now', '-1 day'), 100, 10, 80);
+        INSERT INTO campaign_events (campaign_id, user_id, event_title, event_type, event_date)
+        VALUES (1, 2, 'Kickoff', 'meeting', date('now'));
+        INSERT INTO social_media_accounts (user_id, platform, username, access_token)
+        VALUES (2, 'instagram', 'client', 'token');
+        INSERT INTO social_media_audit (account_id, action, status) VALUES (1, 'connect', 'success');
+        INSERT INTO social_media_daily_metrics (account_id, platform, date, followers)
+        VALUES (1, 'instagram', date('now', '-1 day'), 10);
+        INSERT INTO content_performance (account_id, platform, post_id, engagement_rate)
+        VALUES (1, 'instagram', 'p1', 4.5);
+        INSERT INTO audience_demographics (account_id, platform, date) VALUES (1, 'instagram', date('now'));
+        INSERT INTO social_media_config (platform, track_impressions, track_engagement, track_followers)
+        VALUES ('instagram', 1, 1, 1);
+    ''')
+    conn.commit()
+    conn.close()
+
+
+def _record_statements():
+    """Trace every connection the pool opens from here on"""
+    open_connection = db_pool.pool._open
+
+    def traced_open(database, row_factory):
+        conn = open_connection(database, row_factory)
+        conn.set_trace_callback(statements.append)
+        return conn
+
+    db_pool.pool._open = traced_open
+
+
+def _request(handler_class, method, path, body=None, session=None):
+    # A cached response would skip the queries
+    response_cache.clear()
+    data = json.dumps(body).encode() if body is not None else b''
+    head = f'{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(data)}\r\n'
+    if session:
+        head += f'X-Session-ID: {session}\r\n'
+    raw, _ = run_handler_in_memory(handler_class, (head + '\r\n').encode() + data, ('127.0.0.1', 0), None)
+    status_line, _, rest = raw.partition(b'\r\n')
+    status = int(status_line.split()[1])
+    responses.append((method, path, status))
+    return status, rest.partition(b'\r\n\r\n')[2]
+
+
+def setUpModule():
+    global _workdir, _cwd
+    # The servers and social media modules use the default database path
+    # and log file, so run them in a scratch directory
+    _cwd = os.getcwd()
+    _workdir = tempfile.mkdtemp(prefix='query-plans-')
+    os.chdir(_workdir)
+
+    migrations.migrate(DATABASE)
+    _seed(DATABASE)
+    _record_statements()
+
+    import api_server
+    import api_server_auth
+
+    sessions = []
+    for username in ('admin', 'client'):
+        _, body = _request(api_server_auth.AuthenticatedAPI, 'POST', '/api/login',
+                           {'username': username, 'password': PASSWORD})
+        sessions.append(json.loads(body)['session_id'])
+    for session in sessions:
+        for method, path, body in AUTH_REQUESTS:
+            _request(api_server_auth.AuthenticatedAPI, method, path, body, session)
+    _request(api_server_auth.AuthenticatedAPI, 'POST', '/api/logout', session=sessions[1])
+
+    _, body = _request(api_server.CampaignAnalyticsAPI, 'POST', '/api/login',
+                       {'email': 'client@example.com', 'password': PASSWORD})
+    session = json.loads(body)['session_id']
+    for method, path, body in PLAIN_REQUESTS:
+        _request(api_server.CampaignAnalyticsAPI, method, path, body, session)
+
+    db_pool.release_thread()
+
+
+def tearDownModule():
+    db_pool.pool.close_all()
+    os.chdir(_cwd)
+    shutil.rmtree(_workdir, ignore_errors=True)
+
+
+def _plans():
+    """{statement: [plan details]} for every distinct statement recorded"""
+    distinct = []
+    for sql in statements:
+        sql = ' '.join(sql.split())
+        if sql.split(' ', 1)[0].upper() in ('BEGIN', 'COMMIT', 'ROLLBACK', 'PRAGMA', 'SAVEPOINT', 'RELEASE'):
+            continue
+        if sql not in distinct:
+            distinct.append(sql)
+
+    conn = sqlite3.connect(DATABASE)
+    try:
+        return {sql: [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql)] for sql in distinct}
+    finally:
+        conn.close()
+
+
+def _accepted(sql, detail):
+    for sql_pattern, plan_pattern, _ in ACCEPTED_PLANS:
+        if re.search(sql_pattern, sql) and re.search(plan_pattern, detail):
+            return True
+    return False
+
+
+def _violations(predicate):
+    found = []
+    for sql, plan in _plans().items():
+        bad = [detail for detail in plan if predicate(detail) and not _accepted(sql, detail)]
+        if bad:
+            found.append(f"{sql}\n    " + '\n    '.join(plan))
+    return found
+
+
+class QueryPlanTest(unittest.TestCase):
+
+    def test_handlers_ran(self):
+        """Every request was served, so its queries were recorded"""
+        failed = [f'{method} {path} -> {status}' for method, path, status in responses if status >= 500]
+        self.assertEqual(failed, [])
+        self.assertTrue(any(sql.lstrip().startswith('SELECT') for sql in statements))
+
+    def test_no_full_table_scans(self):
+        violations = _violations(lambda detail: FULL_SCAN.match(detail) and detail != 'SCAN CONSTANT ROW')
+        self.assertEqual(violations, [], 'Full table scans:\n' + '\n'.join(violations))
+
+    def test_no_temp_btree_sorts(self):
+        violations = _violations(lambda detail: TEMP_BTREE in detail)
+        self.assertEqual(violations, [], 'Temp B-tree sorts:\n' + '\n'.join(violations))
+
+    def test_accepted_plans_still_occur(self):
+        """Drop ACCEPTED_PLANS entries once no statement needs them"""
+        plans = _plans()
+        for sql_pattern, plan_pattern, reason in ACCEPTED_PLANS:
+            self.assertTrue(
+                any(re.search(sql_pattern, sql) and any(re.search(plan_pattern, d) for d in plan)
+                    for sql, plan in plans.items()),
+                f'No statement needs the exception for {sql_pattern!r} ({reason})'
+            )
+
+
+if __name__ == '__main__':
+    unittest.main()
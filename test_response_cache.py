@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Tests for the in-process response cache (response_cache.py)
+
+Usage:
+    python3 test_response_cache.py
+    python3 -m pytest test_response_cache.py
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from response_cache import ResponseCache, response_key, _ENTRY_OVERHEAD
+
+
+def _key(path, **params):
+    return response_key(path, {name: [value] for name, value in params.items()}, None)
+
+
+class ResponseCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = ResponseCache(max_bytes=8 * (1024 + _ENTRY_OVERHEAD))
+
+    def put(self, key, tables=('roi_metrics',), versions=(1,), body=b'x' * 1024):
+        self.cache.put(key, tables, versions, 200, 'application/json', body)
+
+    def test_hit_at_same_versions(self):
+        key = _key('/api/kpis', days='30')
+        self.assertIsNone(self.cache.get(key, (1,)))
+        self.put(key, body=b'{}')
+        self.assertEqual(self.cache.get(key, (1,)), (200, 'application/json', b'{}'))
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_key_ignores_param_order(self):
+        self.assertEqual(
+            response_key('/api/kpis', {'a': ['1'], 'b': ['2']}, 'user'),
+            response_key('/api/kpis', {'b': ['2'], 'a': ['1']}, 'user')
+        )
+        self.assertNotEqual(
+            response_key('/api/kpis', {}, 'user'),
+            response_key('/api/kpis', {}, 'other')
+        )
+
+    def test_version_change_is_a_miss(self):
+        key = _key('/api/kpis')
+        self.put(key)
+        self.assertIsNone(self.cache.get(key, (2,)))
+        # The stale entry is dropped, not kept around
+        self.assertEqual(self.cache.stats()['entries'], 0)
+        self.assertEqual(self.cache.size, 0)
+
+    def test_invalidate_drops_dependent_entries(self):
+        roi, social, both = _key('/roi'), _key('/social'), _key('/both')
+        self.put(roi, tables=('roi_metrics',))
+        self.put(social, tables=('social_media_metrics',))
+        self.put(both, tables=('roi_metrics', 'social_media_metrics'), versions=(1, 1))
+
+        self.assertEqual(self.cache.invalidate('roi_metrics'), 2)
+        self.assertIsNone(self.cache.get(roi, (1,)))
+        self.assertIsNone(self.cache.get(both, (1, 1)))
+        self.assertIsNotNone(self.cache.get(social, (1,)))
+        self.assertEqual(self.cache.invalidate('roi_metrics'), 0)
+
+    def test_lru_eviction_by_bytes(self):
+        keys = [_key('/api/kpis', page=str(page)) for page in range(8)]
+        for key in keys:
+            self.put(key)
+        # Touch the oldest so the second oldest is evicted instead
+        self.assertIsNotNone(self.cache.get(keys[0], (1,)))
+        self.put(_key('/api/kpis', page='8'))
+
+        self.assertIsNone(self.cache.get(keys[1], (1,)))
+        self.assertIsNotNone(self.cache.get(keys[0], (1,)))
+        self.assertEqual(self.cache.evictions, 1)
+        self.assertLessEqual(self.cache.size, self.cache.max_bytes)
+
+    def test_oversized_entry_not_stored(self):
+        key = _key('/api/export')
+        self.put(key, body=b'x' * self.cache.max_entry_bytes)
+        self.assertIsNone(self.cache.get(key, (1,)))
+        self.assertEqual(self.cache.size, 0)
+
+    def test_replacing_entry_keeps_size_exact(self):
+        key = _key('/api/kpis')
+        self.put(key, body=b'x' * 100)
+        self.put(key, body=b'x' * 300)
+        self.assertEqual(self.cache.size, 300 + _ENTRY_OVERHEAD)
+        self.cache.clear()
+        self.assertEqual((self.cache.size, self.cache.stats()['entries']), (0, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Tests for the trigger-maintained daily rollups (rollups.py)
+
+Usage:
+    python3 test_rollups.py
+    python3 -m pytest test_rollups.py
+"""
+
+import os
+import sys
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import rollups
+import migrations
+import period_comparison
+from dashboard_queries import KPI_METRICS
+from period_comparison import Comparison, Window
+
+
+class RollupTestCase(unittest.TestCase):
+    """A freshly migrated database with a connection in autocommit mode"""
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix='rollups-')
+        self.database = os.path.join(self.workdir, 'analytics.db')
+        migrations.migrate(self.database)
+        self.conn = sqlite3.connect(self.database, isolation_level=None)
+
+    def tearDown(self):
+        self.conn.close()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def add_roi(self, campaign_id, date, revenue, cost=0, roi=None):
+        return self.conn.execute(
+            'INSERT INTO roi_metrics (campaign_id, date, revenue, cost, roi_percentage) VALUES (?, ?, ?, ?, ?)',
+            (campaign_id, date, revenue, cost, roi)
+        ).lastrowid
+
+    def add_social(self, campaign_id, platform, date, impressions, clicks=None):
+        return self.conn.execute(
+            'INSERT INTO social_media_metrics (campaign_id, platform, date, impressions, clicks) VALUES (?, ?, ?, ?, ?)',
+            (campaign_id, platform, date, impressions, clicks)
+        ).lastrowid
+
+    def assertNoDrift(self):
+        drift = rollups.check(self.database)
+        self.assertEqual(set(drift), {rollup.table for rollup in rollups.ROLLUPS + rollups.PREFIX_SUMS})
+        self.assertEqual({table: keys for table, keys in drift.items() if keys}, {})
+
+
+class DailyRollupTest(RollupTestCase):
+
+    def roi_rows(self):
+        return self.conn.execute('''
+            SELECT date, campaign_id, revenue, cost, roi_sum, roi_count, row_count
+            FROM roi_daily_rollup ORDER BY date, campaign_id
+        ''').fetchall()
+
+    def test_inserts_sum_per_day_and_campaign(self):
+        self.add_roi(1, '2025-03-01', 10, 2, roi=50)
+        self.add_roi(1, '2025-03-01', 5, 1)
+        self.add_roi(2, '2025-03-01', 7)
+        self.add_roi(1, '2025-03-02', 3)
+        self.assertEqual(self.roi_rows(), [
+            ('2025-03-01', 1, 15, 3, 50, 1, 2),
+            ('2025-03-01', 2, 7, 0, 0, 0, 1),
+            ('2025-03-02', 1, 3, 0, 0, 0, 1),
+        ])
+        self.assertNoDrift()
+
+    def test_update_of_values(self):
+        row = self.add_roi(1, '2025-03-01', 10, roi=20)
+        self.add_roi(1, '2025-03-01', 5)
+        self.conn.execute('UPDATE roi_metrics SET revenue = 100, roi_percentage = NULL WHERE rowid = ?', (row,))
+        self.assertEqual(self.roi_rows(), [('2025-03-01', 1, 105, 0, 0, 0, 2)])
+        self.assertNoDrift()
+
+    def test_update_moving_row_to_another_key(self):
+        row = self.add_roi(1, '2025-03-01', 10)
+        self.add_roi(1, '2025-03-02', 5)
+        self.conn.execute("UPDATE roi_metrics SET date = '2025-03-02', campaign_id = 2 WHERE rowid = ?", (row,))
+        # The emptied day disappears instead of lingering as zeros
+        self.assertEqual(self.roi_rows(), [
+            ('2025-03-02', 1, 5, 0, 0, 0, 1),
+            ('2025-03-02', 2, 10, 0, 0, 0, 1),
+        ])
+        self.assertNoDrift()
+
+    def test_delete_removes_empty_keys(self):
+        first = self.add_roi(1, '2025-03-01', 10)
+        second = self.add_roi(1, '2025-03-01', 5)
+        self.conn.execute('DELETE FROM roi_metrics WHERE rowid = ?', (first,))
+        self.assertEqual(self.roi_rows(), [('2025-03-01', 1, 5, 0, 0, 0, 1)])
+        self.conn.execute('DELETE FROM roi_metrics WHERE rowid = ?', (second,))
+        self.assertEqual(self.roi_rows(), [])
+        self.assertNoDrift()
+
+    def test_social_rollup_per_platform(self):
+        row = self.add_social(1, 'instagram', '2025-03-01', 100, clicks=4)
+        self.add_social(1, 'instagram', '2025-03-01', 50)
+        self.add_social(1, 'tiktok', '2025-03-01', 30, clicks=1)
+        self.conn.execute("UPDATE social_media_metrics SET platform = 'tiktok' WHERE rowid = ?", (row,))
+        self.assertEqual(self.conn.execute('''
+            SELECT platform, impressions, clicks, row_count FROM social_daily_rollup ORDER BY platform
+        ''').fetchall(), [('instagram', 50, 0, 1), ('tiktok', 130, 5, 2)])
+        self.assertNoDrift()
+
+    def test_mixed_writes_leave_no_drift(self):
+        rows = [self.add_roi(day % 3 + 1, f'2025-03-{day % 7 + 1:02d}', day, day / 2, roi=day or None)
+                for day in range(40)]
+        for row in rows[::3]:
+            self.conn.execute('UPDATE roi_metrics SET revenue = revenue * 2, date = ? WHERE rowid = ?',
+                              ('2025-02-28', row))
+        self.conn.execute('DELETE FROM roi_metrics WHERE rowid IN (%s)' % ','.join(map(str, rows[1::4])))
+        self.add_social(1, 'instagram', '2025-03-01', 10)
+        self.assertNoDrift()
+
+    def test_check_reports_and_rebuild_repairs(self):
+        self.add_roi(1, '2025-03-01', 10)
+        self.add_roi(1, '2025-03-05', 20)
+        self.conn.execute("UPDATE roi_daily_rollup SET revenue = 0 WHERE date = '2025-03-05'")
+        self.conn.execute("DELETE FROM roi_daily_rollup WHERE date = '2025-03-01'")
+        self.assertEqual(rollups.check(self.database)['roi_daily_rollup'], [('2025-03-01', 1), ('2025-03-05', 1)])
+
+        version = self.conn.execute("SELECT version FROM data_versions WHERE table_name = 'roi_metrics'").fetchone()[0]
+        rebuilt = rollups.rebuild(self.database, since='2025-03-03', rollups=rollups.ROLLUPS)
+        self.assertEqual(rebuilt['roi_daily_rollup'], 1)
+        self.assertEqual(rollups.check(self.database)['roi_daily_rollup'], [('2025-03-01', 1)])
+        rollups.rebuild(self.database, rollups=rollups.ROLLUPS)
+        self.assertNoDrift()
+        # Cached responses built from the old rollup are invalidated
+        self.assertGreater(
+            self.conn.execute("SELECT version FROM data_versions WHERE table_name = 'roi_metrics'").fetchone()[0],
+            version
+        )
+
+
+class PrefixSumsTest(RollupTestCase):
+
+    def running(self, table='roi_prefix_sums', where=''):
+        return self.conn.execute(f'SELECT date, revenue, row_count FROM {table}{where} ORDER BY date').fetchall()
+
+    def test_backdated_insert_updates_later_days(self):
+        self.add_roi(1, '2025-03-01', 10)
+        self.add_roi(1, '2025-03-05', 20)
+        self.add_roi(2, '2025-03-03', 5)
+        self.assertEqual(self.running(), [('2025-03-01', 10, 1), ('2025-03-03', 15, 2), ('2025-03-05', 35, 3)])
+        self.assertEqual(self.running('roi_campaign_prefix_sums', ' WHERE campaign_id = 1'),
+                         [('2025-03-01', 10, 1), ('2025-03-05', 30, 2)])
+        self.assertNoDrift()
+
+    def test_update_moving_row_between_days_and_campaigns(self):
+        row = self.add_roi(1, '2025-03-01', 10)
+        self.add_roi(1, '2025-03-04', 20)
+        self.conn.execute("UPDATE roi_metrics SET date = '2025-03-06', campaign_id = 2 WHERE rowid = ?", (row,))
+        # The day the row left has no rows of its own any more
+        self.assertEqual(self.running(), [('2025-03-04', 20, 1), ('2025-03-06', 30, 2)])
+        self.assertEqual(self.running('roi_campaign_prefix_sums', ' WHERE campaign_id = 2'), [('2025-03-06', 10, 1)])
+        self.assertNoDrift()
+
+    def test_delete_of_latest_and_earliest_day(self):
+        first = self.add_roi(1, '2025-03-01', 10)
+        self.add_roi(1, '2025-03-02', 20)
+        last = self.add_roi(1, '2025-03-03', 30)
+        self.conn.execute('DELETE FROM roi_metrics WHERE rowid = ?', (last,))
+        self.conn.execute('DELETE FROM roi_metrics WHERE rowid = ?', (first,))
+        self.assertEqual(self.running(), [('2025-03-02', 20, 1)])
+        self.assertNoDrift()
+
+    def test_range_totals_match_the_rollup(self):
+        for day in range(60):
+            self.add_roi(day % 4 + 1, f'2025-{day // 28 + 1:02d}-{day % 28 + 1:02d}', day * 3, day, roi=day % 5 or None)
+        self.conn.row_factory = sqlite3.Row
+        cursor = self.conn.cursor()
+        windows = [
+            Comparison('previous', Window('2025-02-01'), Window('2025-01-04', '2025-02-01')),
+            Comparison('custom', Window('2025-01-10', '2025-01-20'), Window('2024-01-01', '2024-02-01')),
+            Comparison('custom', Window('2025-03-01'), Window('2025-01-01', '2025-01-02')),
+        ]
+        for comparison in windows:
+            expected = period_comparison.compare(cursor, 'roi_daily_rollup', 'r', KPI_METRICS, comparison)
+            self.assertEqual(
+                period_comparison.compare_prefix_sums(cursor, 'roi_prefix_sums', KPI_METRICS, comparison),
+                expected
+            )
+            expected = period_comparison.compare(cursor, 'roi_daily_rollup', 'r', KPI_METRICS, comparison,
+                                                 where=' AND r.campaign_id IN (1, 3)')
+            self.assertEqual(
+                period_comparison.compare_prefix_sums(
+                    cursor, 'roi_campaign_prefix_sums', KPI_METRICS, comparison,
+                    'SELECT ? AS campaign_id UNION ALL SELECT ?', (1, 3)
+                ),
+                expected
+            )
+
+
+if __name__ == '__main__':
+    unittest.main()
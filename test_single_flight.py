@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Tests for request coalescing (single_flight.py)
+
+Usage:
+    python3 test_single_flight.py
+    python3 -m pytest test_single_flight.py
+"""
+
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from single_flight import SingleFlight
+
+
+class SingleFlightTest(unittest.TestCase):
+
+    def setUp(self):
+        self.flights = SingleFlight(wait_timeout=5)
+
+    def _followers(self, key, count):
+        """Start count follower threads on key; returns (threads, results)"""
+        results = []
+        calls = [self.flights.begin(key) for _ in range(count)]
+        self.assertTrue(all(not leader for _, leader in calls))
+        threads = [threading.Thread(target=lambda call=call: results.append(self.flights.wait(call)))
+                   for call, _ in calls]
+        for thread in threads:
+            thread.start()
+        return threads, results
+
+    def test_followers_share_leader_result(self):
+        _, leader = self.flights.begin('k')
+        self.assertTrue(leader)
+        threads, results = self._followers('k', 3)
+        self.flights.finish('k', 'result')
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ['result'] * 3)
+        self.assertEqual(self.flights.stats(), {
+            'executions': 1, 'saved_executions': 3, 'fallbacks': 0, 'in_flight': 0
+        })
+
+    def test_failed_leader_makes_followers_fall_back(self):
+        self.flights.begin('k')
+        threads, results = self._followers('k', 2)
+        self.flights.finish('k', None)
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [None, None])
+        self.assertEqual(self.flights.stats()['fallbacks'], 2)
+
+    def test_timed_out_follower_falls_back(self):
+        flights = SingleFlight(wait_timeout=0.01)
+        flights.begin('k')
+        call, leader = flights.begin('k')
+        self.assertFalse(leader)
+        self.assertIsNone(flights.wait(call))
+        self.assertEqual(flights.stats()['in_flight'], 1)
+
+    def test_keys_are_independent_and_flights_end(self):
+        self.assertTrue(self.flights.begin('a')[1])
+        self.assertTrue(self.flights.begin('b')[1])
+        self.flights.finish('a', 1)
+        self.assertTrue(self.flights.begin('a')[1])
+        self.assertEqual(self.flights.stats()['executions'], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Tests for the chart time buckets (time_buckets.py)
+
+Usage:
+    python3 test_time_buckets.py
+    python3 -m pytest test_time_buckets.py
+"""
+
+import os
+import sys
+import sqlite3
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import time_buckets
+from time_buckets import BucketError, choose
+
+
+class ChooseTest(unittest.TestCase):
+
+    def test_auto_picks_finest_that_fits(self):
+        self.assertEqual(choose({}, 30), 'day')
+        self.assertEqual(choose({'granularity': ['auto']}, 119), 'day')
+        self.assertEqual(choose({}, 365), 'week')
+        self.assertEqual(choose({}, 1095), 'month')
+        self.assertEqual(choose({}, 100000), 'quarter')
+
+    def test_explicit_granularity_is_honored(self):
+        self.assertEqual(choose({'granularity': ['day']}, 365), 'day')
+        self.assertEqual(choose({'granularity': ['day']}, 3650), 'day')
+        self.assertEqual(choose({'granularity': ['quarter']}, 7), 'quarter')
+
+    def test_invalid_granularity(self):
+        with self.assertRaises(BucketError):
+            choose({'granularity': ['hour']}, 30)
+
+
+class BucketSqlTest(unittest.TestCase):
+
+    def bucket(self, granularity, day):
+        conn = sqlite3.connect(':memory:')
+        try:
+            sql = time_buckets.bucket_sql(granularity, ':day')
+            return conn.execute(f'SELECT {sql}', {'day': day}).fetchone()[0]
+        finally:
+            conn.close()
+
+    def test_day(self):
+        self.assertEqual(self.bucket('day', '2025-03-05'), '2025-03-05')
+
+    def test_week_starts_monday(self):
+        # 2025-03-03 is a Monday
+        for day in ('2025-03-03', '2025-03-05', '2025-03-09'):
+            self.assertEqual(self.bucket('week', day), '2025-03-03')
+        self.assertEqual(self.bucket('week', '2025-03-10'), '2025-03-10')
+
+    def test_month(self):
+        self.assertEqual(self.bucket('month', '2025-03-31'), '2025-03-01')
+
+    def test_quarter(self):
+        for day, start in (('2025-01-01', '2025-01-01'), ('2025-03-31', '2025-01-01'),
+                           ('2025-05-15', '2025-04-01'), ('2025-12-31', '2025-10-01')):
+            self.assertEqual(self.bucket('quarter', day), start)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Tests for group-committed writes and their back-pressure (write_batcher.py)
+
+Usage:
+    python3 test_write_batcher.py
+    python3 -m pytest test_write_batcher.py
+"""
+
+import os
+import sys
+import json
+import shutil
+import sqlite3
+import hashlib
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import db_pool
+import migrations
+import write_batcher
+from async_server import run_handler_in_memory
+from write_batcher import WriteBatcher, WriteQueueFull
+
+PASSWORD = 'batch-check-1'
+
+
+def _blocked(batcher):
+    """Hold the writer inside its next flush until the returned event is set"""
+    release = threading.Event()
+    entered = threading.Event()
+    flush = batcher._flush
+
+    def held_flush(conn, batch):
+        entered.set()
+        release.wait(10)
+        flush(conn, batch)
+
+    batcher._flush = held_flush
+    return entered, release
+
+
+class WriteBatcherTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix='write-batcher-')
+        self.database = os.path.join(self.workdir, 'analytics.db')
+        conn = sqlite3.connect(self.database)
+        conn.execute('CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT NOT NULL)')
+        conn.commit()
+        conn.close()
+        self.batcher = None
+
+    def tearDown(self):
+        if self.batcher is not None:
+            self.batcher.stop()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def start(self, **options):
+        self.batcher = WriteBatcher(self.database, **options)
+        return self.batcher
+
+    def names(self):
+        conn = sqlite3.connect(self.database)
+        try:
+            return [row[0] for row in conn.execute('SELECT name FROM items ORDER BY id')]
+        finally:
+            conn.close()
+
+    def insert(self, name):
+        return [('INSERT INTO items (name) VALUES (?)', (name,))]
+
+    def test_waiting_submit_is_committed(self):
+        self.start().start()
+        write = self.batcher.submit(self.insert('a'))
+        self.assertTrue(write.done)
+        self.assertEqual(self.names(), ['a'])
+
+    def test_queued_writes_share_a_commit(self):
+        self.start()
+        entered, release = _blocked(self.batcher)
+        self.batcher.start()
+        first = self.batcher.submit(self.insert('first'), wait=False)
+        self.assertTrue(entered.wait(5))
+        rest = [self.batcher.submit(self.insert(str(index)), wait=False) for index in range(5)]
+        release.set()
+        for write in [first] + rest:
+            write.wait(5)
+
+        stats = self.batcher.stats()
+        self.assertEqual((stats['batches'], stats['writes'], stats['largest_batch']), (2, 6, 5))
+        self.assertEqual(self.names(), ['first', '0', '1', '2', '3', '4'])
+
+    def test_failed_write_rolls_back_alone(self):
+        self.start()
+        entered, release = _blocked(self.batcher)
+        self.batcher.start()
+        self.batcher.submit(self.insert('warmup'), wait=False)
+        self.assertTrue(entered.wait(5))
+        good = self.batcher.submit(self.insert('good'), wait=False)
+        bad = self.batcher.submit(self.insert('half') + self.insert(None), wait=False)
+        release.set()
+
+        good.wait(5)
+        with self.assertRaises(sqlite3.IntegrityError):
+            bad.wait(5)
+        self.assertEqual(self.names(), ['warmup', 'good'])
+        self.assertEqual(self.batcher.stats()['failed_writes'], 1)
+
+    def test_full_queue_raises_after_timeout(self):
+        self.start(queue_size=1, queue_timeout=0.05)
+        entered, release = _blocked(self.batcher)
+        self.batcher.start()
+        held = self.batcher.submit(self.insert('held'), wait=False)
+        self.assertTrue(entered.wait(5))
+        queued = self.batcher.submit(self.insert('queued'), wait=False)
+
+        with self.assertRaises(WriteQueueFull):
+            self.batcher.submit(self.insert('rejected'), wait=False)
+        self.assertEqual(self.batcher.stats()['rejected'], 1)
+
+        release.set()
+        held.wait(5)
+        queued.wait(5)
+        self.assertEqual(self.names(), ['held', 'queued'])
+
+    def test_blocked_submit_proceeds_when_queue_drains(self):
+        self.start(queue_size=1, queue_timeout=5)
+        entered, release = _blocked(self.batcher)
+        self.batcher.start()
+        self.batcher.submit(self.insert('held'), wait=False)
+        self.assertTrue(entered.wait(5))
+        self.batcher.submit(self.insert('queued'), wait=False)
+
+        threading.Timer(0.1, release.set).start()
+        self.batcher.submit(self.insert('waited'))
+        self.assertEqual(self.names(), ['held', 'queued', 'waited'])
+        self.assertEqual(self.batcher.stats()['rejected'], 0)
+
+    def test_stop_flushes_queue(self):
+        self.start().start()
+        writes = [self.batcher.submit(self.insert(str(index)), wait=False) for index in range(20)]
+        self.batcher.stop()
+        self.assertTrue(all(write.done for write in writes))
+        self.assertEqual(len(self.names()), 20)
+        self.assertFalse(self.batcher.running)
+
+    def test_write_without_batcher_commits_directly(self):
+        self.assertIsNone(write_batcher.write(self.database, self.insert('direct')))
+        db_pool.release_thread()
+        self.assertEqual(self.names(), ['direct'])
+
+
+class ServerBackPressureTest(unittest.TestCase):
+    """Logins answer 503 with Retry-After while the write queue is full"""
+
+    @classmethod
+    def setUpClass(cls):
+        # The servers use the default database path, so run them in a scratch directory
+        cls.cwd = os.getcwd()
+        cls.workdir = tempfile.mkdtemp(prefix='write-batcher-server-')
+        os.chdir(cls.workdir)
+        database = 'shotlist_analytics.db'
+        migrations.migrate(database)
+        conn = sqlite3.connect(database)
+        digest = hashlib.sha256(PASSWORD.encode()).hexdigest()
+        conn.execute('''
+            INSERT INTO users (username, email, password, password_hash, full_name, role, provider)
+            VALUES ('client', 'client@example.com', ?, ?, 'Client', 'client', 'email')
+        ''', (digest, digest))
+        conn.commit()
+        conn.close()
+
+        import api_server
+        import api_server_auth
+        cls.servers = (api_server, api_server_auth)
+
+    @classmethod
+    def tearDownClass(cls):
+        db_pool.pool.close_all()
+        os.chdir(cls.cwd)
+        shutil.rmtree(cls.workdir, ignore_errors=True)
+
+    def setUp(self):
+        self.saved = (write_batcher.batcher, write_batcher._database)
+        self.batcher = WriteBatcher('shotlist_analytics.db', queue_size=1, queue_timeout=0.05)
+        entered, self.release = _blocked(self.batcher)
+        self.batcher.start()
+        self.batcher.submit([('SELECT 1', ())], wait=False)
+        self.assertTrue(entered.wait(5))
+        self.batcher.submit([('SELECT 1', ())], wait=False)
+        write_batcher.batcher, write_batcher._database = self.batcher, 'shotlist_analytics.db'
+
+    def tearDown(self):
+        write_batcher.batcher, write_batcher._database = self.saved
+        self.release.set()
+        self.batcher.stop()
+        db_pool.release_thread()
+
+    def login(self, handler_class, credentials):
+        data = json.dumps(credentials).encode()
+        raw, _ = run_handler_in_memory(handler_class, (
+            f'POST /api/login HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(data)}\r\n\r\n'
+        ).encode() + data, ('127.0.0.1', 0), None)
+        head, _, body = raw.partition(b'\r\n\r\n')
+        return int(head.split()[1]), head, json.loads(body)
+
+    def test_plain_server_login(self):
+        api_server = self.servers[0]
+        status, head, body = self.login(api_server.CampaignAnalyticsAPI,
+                                        {'email': 'client@example.com', 'password': PASSWORD})
+        self.assertEqual((status, body['error_code']), (503, 'SERVER_BUSY'))
+        self.assertIn(b'Retry-After: 1', head)
+
+    def test_auth_server_login(self):
+        api_server_auth = self.servers[1]
+        status, head, body = self.login(api_server_auth.AuthenticatedAPI,
+                                        {'username': 'client', 'password': PASSWORD})
+        self.assertEqual((status, body['success']), (503, False))
+        self.assertIn(b'Retry-After: 1', head)
+
+    def test_sessions_not_written(self):
+        self.test_plain_server_login()
+        conn = sqlite3.connect('shotlist_analytics.db')
+        try:
+            self.assertEqual(conn.execute('SELECT COUNT(*) FROM sessions').fetchone()[0], 0)
+        finally:
+            conn.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Time buckets for the SHOTLIST chart series
+Chart series are summed per day, week, month or quarter in SQL, with the
+granularity picked from ?granularity= or, by default, from the length of
+the range, so an automatic series has at most MAX_POINTS points
+"""
+
+MAX_POINTS = 120
+
+# Granularity -> (SQL for the first day of the bucket holding {column},
+# approximate days per bucket). Weeks start on Monday.
+GRANULARITIES = {
+    'day': ('{column}', 1),
+    'week': ("date({column}, '-6 days', 'weekday 1')", 7),
+    'month': ("date({column}, 'start of month')", 30.44),
+    'quarter': (
+        "date({column}, 'start of month', "
+        "printf('-%d months', (CAST(strftime('%m', {column}) AS INTEGER) - 1) % 3))",
+        91.31
+    ),
+}
+
+
+class BucketError(ValueError):
+    """Invalid granularity parameters; the servers answer 400"""
+
+
+def points(granularity, days):
+    """Roughly how many points days of data make at granularity"""
+    return int(days / GRANULARITIES[granularity][1]) + 1
+
+
+def choose(params, days):
+    """Granularity for ?granularity= (default auto) over days of data
+
+    auto is the finest granularity that fits in MAX_POINTS. An explicit
+    one is always honored, however many points it gives, as callers that
+    asked for daily data over a year got it before buckets existed;
+    ?max_points= (see downsampling.py) can thin it.
+    """
+    granularity = params.get('granularity', ['auto'])[0]
+    if granularity == 'auto':
+        for name in GRANULARITIES:
+            if points(name, days) <= MAX_POINTS:
+                return name
+        return 'quarter'
+    if granularity not in GRANULARITIES:
+        raise BucketError(
+            f"Invalid granularity '{granularity}', expected auto or one of {', '.join(GRANULARITIES)}"
+        )
+    return granularity
+
+
+def bucket_sql(granularity, column):
+    """SQL for the first day of the granularity bucket holding column"""
+    return GRANULARITIES[granularity][0].format(column=column)
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Group commit for the SHOTLIST API servers
+Small, frequent writes (login attempts, sessions, audit entries, sync
+config) are queued and committed by one writer thread, many to a
+transaction, so a burst of logins costs a handful of commits instead of
+one per write
+"""
+
+import os
+import time
+import queue
+import sqlite3
+import logging
+import threading
+
+import db_config
+import db_pool
+
+logger = logging.getLogger(__name__)
+
+# Group commit (override via environment). A batch is flushed once it
+# holds BATCH_SIZE writes or its oldest write has waited BATCH_DELAY
+# seconds. With no delay the writer commits whatever queued up during
+# its previous commit, which batches best when writers wait on commits.
+BATCH_SIZE = int(os.environ.get('API_WRITE_BATCH_SIZE', '256'))
+BATCH_DELAY = float(os.environ.get('API_WRITE_BATCH_DELAY', '0'))
+# Back-pressure: writers block for up to QUEUE_TIMEOUT seconds once
+# QUEUE_SIZE writes are waiting, then get WriteQueueFull
+QUEUE_SIZE = int(os.environ.get('API_WRITE_QUEUE_SIZE', '10000'))
+QUEUE_TIMEOUT = float(os.environ.get('API_WRITE_QUEUE_TIMEOUT', '5'))
+# synchronous pragma of the writer's connection; FULL also survives power loss under WAL
+SYNCHRONOUS = os.environ.get('API_WRITE_BATCH_SYNCHRONOUS', db_config.PRAGMA_PROFILE['synchronous']).upper()
+# Seconds submit(wait=True) waits for the commit
+COMMIT_TIMEOUT = float(os.environ.get('API_WRITE_COMMIT_TIMEOUT', '30'))
+
+
+class WriteQueueFull(Exception):
+    """The writer is too far behind to take another write; the servers answer 503"""
+
+
+class PendingWrite:
+    """One queued write: statements applied atomically within a batch"""
+
+    def __init__(self, statements):
+        self.statements = statements
+        self.queued_at = time.perf_counter()
+        self.error = None
+        self._done = threading.Event()
+
+    def finish(self, error=None):
+        self.error = error
+        self._done.set()
+
+    def wait(self, timeout=COMMIT_TIMEOUT):
+        """Block until the write's batch has committed; re-raises its error"""
+        if not self._done.wait(timeout):
+            raise TimeoutError(f'write not committed after {timeout}s')
+        if self.error is not None:
+            raise self.error
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+
+class WriteBatcher:
+    """Commits queued writes from a background thread, many per transaction
+
+    Each write is a list of (sql, params) run inside its own savepoint, so
+    a write that fails is rolled back alone and the rest of its batch
+    still commits. Callers choose their durability per write: wait for
+    the commit (the write is on disk when submit returns), or return once
+    it is queued (it can be lost if the process dies before the next
+    flush). The queue is bounded; when it is full submit blocks, and
+    gives up with WriteQueueFull after queue_timeout seconds.
+    """
+
+    def __init__(self, database, batch_size=BATCH_SIZE, batch_delay=BATCH_DELAY,
+                 queue_size=QUEUE_SIZE, queue_timeout=QUEUE_TIMEOUT, synchronous=SYNCHRONOUS):
+        db_config._check_choice('synchronous', synchronous)
+        self.database = database
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.queue_timeout = queue_timeout
+        self.synchronous = synchronous
+        self.batches = 0
+        self.writes = 0
+        self.failed_writes = 0
+        self.failed_batches = 0
+        self.rejected = 0
+        self.largest_batch = 0
+        self.last = None
+        self._queue = queue.Queue(queue_size)
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='write-batcher', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=5):
+        """Flush what is queued and stop the writer"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive() and not self._stop.is_set()
+
+    def submit(self, statements, wait=True):
+        """Queue [(sql, params)] as one write; returns its PendingWrite
+
+        With wait the call returns once the write has committed and raises
+        whatever error it met.
+        """
+        write = PendingWrite(statements)
+        try:
+            self._queue.put(write, timeout=self.queue_timeout)
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            raise WriteQueueFull(f'{self._queue.maxsize} writes already waiting for {self.database}')
+        if wait:
+            write.wait()
+        return write
+
+    def _run(self):
+        conn = sqlite3.connect(self.database, isolation_level=None)
+        db_config.apply_profile(conn, dict(db_config.PRAGMA_PROFILE, synchronous=self.synchronous))
+        try:
+            while True:
+                try:
+                    first = self._queue.get(timeout=0.1)
+                except queue.Empty:
+                    if self._stop.is_set():
+                        break
+                    continue
+                self._flush(conn, self._collect(first))
+        finally:
+            conn.close()
+
+    def _collect(self, first):
+        """first plus whatever arrives before the batch is full or due"""
+        batch = [first]
+        deadline = first.queued_at + self.batch_delay
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except queue.Empty:
+                pass
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0 or self._stop.is_set():
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _flush(self, conn, batch):
+        """Run batch in one transaction and tell every writer how it went"""
+        started = time.perf_counter()
+        failed = []
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                for write in batch:
+                    conn.execute('SAVEPOINT write')
+                    try:
+                        for sql, params in write.statements:
+                            conn.execute(sql, params)
+                    except sqlite3.Error as e:
+                        conn.execute('ROLLBACK TO write')
+                        failed.append((write, e))
+                    conn.execute('RELEASE write')
+                conn.execute('COMMIT')
+            except Exception:
+                if conn.in_transaction:
+                    conn.execute('ROLLBACK')
+                raise
+        except Exception as e:
+            with self._lock:
+                self.failed_batches += 1
+                self.failed_writes += len(batch)
+            logger.warning(f"Write batch of {len(batch)} for {self.database} failed: {e}")
+            for write in batch:
+                write.finish(e)
+            return
+
+        with self._lock:
+            self.batches += 1
+            self.writes += len(batch) - len(failed)
+            self.failed_writes += len(failed)
+            self.largest_batch = max(self.largest_batch, len(batch))
+            self.last = {
+                'writes': len(batch),
+                'failed': len(failed),
+                'wait_ms': round((started - batch[0].queued_at) * 1000, 2),
+                'commit_ms': round((time.perf_counter() - started) * 1000, 2),
+                'at': time.time()
+            }
+
+        errors = {id(write): e for write, e in failed}
+        for write in batch:
+            write.finish(errors.get(id(write)))
+        for write, e in failed:
+            logger.warning(f"Batched write failed ({' '.join(write.statements[0][0].split()[:3])}): {e}")
+
+    def stats(self):
+        with self._lock:
+            return {
+                'running': self.running,
+                'queued': self._queue.qsize(),
+                'batch_size': self.batch_size,
+                'batch_delay': self.batch_delay,
+                'synchronous': self.synchronous,
+                'batches': self.batches,
+                'writes': self.writes,
+                'writes_per_batch': round(self.writes / self.batches, 2) if self.batches else 0,
+                'largest_batch': self.largest_batch,
+                'failed_writes': self.failed_writes,
+                'failed_batches': self.failed_batches,
+                'rejected': self.rejected,
+                'last': self.last
+            }
+
+
+batcher = None
+_database = None
+
+
+def start_batcher(database, batch_size=BATCH_SIZE):
+    """Start this process's batcher; a batch_size of 0 disables it"""
+    global batcher, _database
+    if batch_size <= 0:
+        return None
+    _database = database
+    batcher = WriteBatcher(database, batch_size=batch_size).start()
+    return batcher
+
+
+def _forget_batcher():
+    # The writer thread doesn't survive fork; a worker process starts its
+    # own on its first write, and anything queued stays with the parent
+    global batcher
+    batcher = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_forget_batcher)
+
+
+_start_lock = threading.Lock()
+
+
+def _batcher_for(database):
+    global batcher
+    if database != _database:
+        return None
+    if batcher is None:
+        with _start_lock:
+            if batcher is None:
+                batcher = WriteBatcher(database).start()
+    return batcher if batcher.running else None
+
+
+def write(database, statements, wait=True):
+    """Apply [(sql, params)] atomically, group-committed when a batcher runs
+
+    Without a batcher for database (scripts, tests, a disabled batcher)
+    the statements are committed right away on the caller's pooled
+    connection, as they always were.
+    """
+    active = _batcher_for(database)
+    if active is not None:
+        return active.submit(statements, wait=wait)
+
+    conn = db_pool.connect(database)
+    try:
+        for sql, params in statements:
+            conn.execute(sql, params)
+        conn.commit()
+    finally:
+        conn.close()
+    return None
+
+
+def execute(database, sql, params=(), wait=True):
+    """write() of a single statement"""
+    return write(database, [(sql, params)], wait=wait)